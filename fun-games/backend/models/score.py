@@ -25,4 +25,5 @@ class Score(Base):
     __table_args__ = (
         Index('idx_user_game', 'user_id', 'game_id'),
         Index('idx_game_score', 'game_id', 'score'),
+        Index('idx_user_created', 'user_id', 'created_at', 'id'),
     )
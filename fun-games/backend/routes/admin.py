@@ -1,12 +1,13 @@
 """Admin management routes."""
 
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, Response
+from sqlalchemy.orm import Session, joinedload
 from pydantic import BaseModel
-from typing import List
+from typing import List, Optional
 from database import get_db
 from models import User
 from auth import require_admin
+from pagination import paginate, set_next_cursor
 
 router = APIRouter(prefix="/api/admin", tags=["admin"])
 
@@ -24,11 +25,21 @@ class UserWithTierResponse(BaseModel):
 
 @router.get("/users", response_model=List[UserWithTierResponse])
 async def list_users(
+    response: Response,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
     db: Session = Depends(get_db),
     admin: User = Depends(require_admin)
 ):
-    """List all users with their tier data (admin only)."""
-    users = db.query(User).all()
+    """
+    List users with their tier data, one page at a time (admin only).
+    
+    Users are ordered by id; the next page's cursor is returned in the
+    X-Next-Cursor header.
+    """
+    query = db.query(User).options(joinedload(User.tier))
+    users, next_cursor = paginate(query, User.id, cursor=cursor, limit=limit, descending=False)
+    set_next_cursor(response, next_cursor)
     
     result = []
     for user in users:
@@ -1,14 +1,15 @@
 """Score submission and leaderboard routes."""
 
 import os
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, Request
-from sqlalchemy.orm import Session
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from sqlalchemy.orm import Session, joinedload
 from sqlalchemy import desc, func
 from pydantic import BaseModel
 from database import get_db
 from models import User, Game, Score
 from auth import get_current_user
+from pagination import paginate, set_next_cursor
 from services.game_access import check_game_access
 
 router = APIRouter(prefix="/api/scores", tags=["scores"])
@@ -99,11 +100,30 @@ def submit_score(
 
 @router.get("/my", response_model=List[ScoreResponse])
 def get_my_scores(
+    response: Response,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
     user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Get current user's scores."""
-    scores = db.query(Score).filter(Score.user_id == user.id).order_by(desc(Score.created_at)).all()
+    """
+    Get current user's scores, newest first, one page at a time.
+    
+    The next page's cursor is returned in the X-Next-Cursor header.
+    """
+    query = (
+        db.query(Score)
+        .options(joinedload(Score.game))
+        .filter(Score.user_id == user.id)
+    )
+    scores, next_cursor = paginate(
+        query,
+        Score.id,
+        cursor=cursor,
+        limit=limit,
+        sort_column=Score.created_at
+    )
+    set_next_cursor(response, next_cursor)
     
     result = []
     for score in scores:
@@ -50,7 +50,12 @@ export async function apiRequest(method, path, body = null, options = {}) {
   }
 
   // Return JSON response
-  return response.json();
+  const data = await response.json();
+  if (options.withNextCursor) {
+    // Paginated lists send the cursor of the next page in a header
+    return { items: data, nextCursor: response.headers.get('X-Next-Cursor') };
+  }
+  return data;
 }
 
 /**
@@ -58,6 +63,13 @@ export async function apiRequest(method, path, body = null, options = {}) {
  */
 export const api = {
   get: (path) => apiRequest('GET', path),
+  // Fetch one page of a paginated list: resolves to { items, nextCursor }
+  getPage: (path, cursor = null) => apiRequest(
+    'GET',
+    cursor ? `${path}${path.includes('?') ? '&' : '?'}cursor=${encodeURIComponent(cursor)}` : path,
+    null,
+    { withNextCursor: true }
+  ),
   post: (path, body) => apiRequest('POST', path, body),
   put: (path, body) => apiRequest('PUT', path, body),
   delete: (path) => apiRequest('DELETE', path),
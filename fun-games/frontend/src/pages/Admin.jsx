@@ -10,6 +10,7 @@ export default function Admin() {
   
   const [tiers, setTiers] = useState([]);
   const [users, setUsers] = useState([]);
+  const [usersCursor, setUsersCursor] = useState(null);
   const [flags, setFlags] = useState([]);
   const [showTierForm, setShowTierForm] = useState(false);
   const [tierForm, setTierForm] = useState({ name: '', price_cents: 0, features: {} });
@@ -27,17 +28,28 @@ export default function Admin() {
     try {
       const [tiersData, usersData, flagsData] = await Promise.all([
         api.get('/tiers'),
-        api.get('/admin/users'),
+        api.getPage('/admin/users'),
         api.get('/features'),
       ]);
       setTiers(tiersData);
-      setUsers(usersData);
+      setUsers(usersData.items);
+      setUsersCursor(usersData.nextCursor);
       setFlags(flagsData);
     } catch (error) {
       console.error('Failed to load data:', error);
     }
   };
 
+  const loadMoreUsers = async () => {
+    try {
+      const page = await api.getPage('/admin/users', usersCursor);
+      setUsers([...users, ...page.items]);
+      setUsersCursor(page.nextCursor);
+    } catch (error) {
+      console.error('Failed to load users:', error);
+    }
+  };
+
   const handleCreateTier = async (e) => {
     e.preventDefault();
     try {
@@ -124,7 +136,7 @@ export default function Admin() {
           <div className="tab-content">
             <div className="section-header">
               <h2>User Management</h2>
-              <span className="count-badge">{users.length} users</span>
+              <span className="count-badge">{users.length}{usersCursor ? '+' : ''} users</span>
             </div>
             <div className="users-grid">
               {users.map(u => (
@@ -157,6 +169,11 @@ export default function Admin() {
                 </div>
               ))}
             </div>
+            {usersCursor && (
+              <button onClick={loadMoreUsers} className="create-btn">
+                Load more users
+              </button>
+            )}
           </div>
         )}
 
@@ -18,7 +18,7 @@ export default function Dashboard() {
     try {
       const [statsData, scoresData] = await Promise.all([
         api.get('/scores/stats'),
-        api.get('/scores/my')
+        api.get('/scores/my?limit=5')
       ]);
       setStats(statsData);
       setRecentScores(scoresData.slice(0, 5));
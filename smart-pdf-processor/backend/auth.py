@@ -114,7 +114,7 @@ def get_current_user(request: Request, db: Session = Depends(get_db)) -> User:
     
     # Load user from database
     user = db.query(User).filter(User.id == session_data["user_id"]).first()
-    if not user:
+    if not user or user.deletion_requested_at is not None:
         raise HTTPException(status_code=401, detail="User not found")
     
     return user
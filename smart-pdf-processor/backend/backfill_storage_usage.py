@@ -0,0 +1,119 @@
+"""Backfill per-user storage usage from existing documents.
+
+Records the file size of documents uploaded before sizes were tracked (read
+from storage), then rebuilds every user's storage_usage row from their
+documents. Usage is maintained incrementally after that; re-run this only to
+repair drift. Page counts of documents processed before pages were tracked
+stay 0 until they are processed again.
+
+Usage:
+    python backfill_storage_usage.py [--batch-size 500]
+"""
+
+import argparse
+from datetime import datetime
+
+from sqlalchemy import func
+
+from database import SessionLocal
+from models import Document, StorageUsage
+from runtime import file_storage
+from services import FileStorage
+from services.document_purger import DELETING_STATUS
+
+
+def backfill_file_sizes(db, storage: FileStorage, batch_size: int = 500) -> int:
+    """
+    Fill in missing document file sizes from storage.
+
+    Args:
+        db: Database session
+        storage: File storage holding the documents' files
+        batch_size: Number of documents per batch (one commit per batch)
+
+    Returns:
+        Number of documents updated
+    """
+    updated = 0
+    last_id = 0
+
+    while True:
+        documents = (
+            db.query(Document)
+            .filter(Document.id > last_id, Document.file_size == 0)
+            .order_by(Document.id)
+            .limit(batch_size)
+            .all()
+        )
+        if not documents:
+            break
+
+        for document in documents:
+            last_id = document.id
+            if not document.file_path:
+                continue
+            try:
+                document.file_size = storage.stat(document.file_path).size
+                updated += 1
+            except (OSError, ValueError) as e:
+                print(f"Skipping document {document.id}: {e}")
+
+        db.commit()
+
+    return updated
+
+
+def rebuild_storage_usage(db) -> int:
+    """
+    Recompute every user's storage usage from their documents.
+
+    Returns:
+        Number of users with documents
+    """
+    totals = (
+        db.query(
+            Document.user_id,
+            func.coalesce(func.sum(Document.file_size), 0),
+            func.coalesce(func.sum(Document.page_count), 0),
+            func.count(Document.id)
+        )
+        .filter(Document.status != DELETING_STATUS)
+        .group_by(Document.user_id)
+        .all()
+    )
+
+    db.query(StorageUsage).delete(synchronize_session=False)
+    now = datetime.utcnow()
+    db.add_all([
+        StorageUsage(user_id=user_id, bytes=size, pages=pages, documents=count, updated_at=now)
+        for user_id, size, pages, count in totals
+    ])
+    db.commit()
+
+    return len(totals)
+
+
+def main():
+    """Run the backfill on the storage the application is configured with."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+
+    db = SessionLocal()
+
+    try:
+        sizes = backfill_file_sizes(db, file_storage, args.batch_size)
+        print(f"Recorded file sizes of {sizes} documents")
+        users = rebuild_storage_usage(db)
+        print(f"Rebuilt storage usage for {users} users")
+    except Exception as e:
+        print(f"Error: {e}")
+        import traceback
+        traceback.print_exc()
+        db.rollback()
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""Benchmark OFFSET against keyset pagination of the document list.
+
+Seeds a throwaway SQLite database with one user owning --rows documents
+(1,000,000 by default) and times fetching a page at increasing depths with
+both strategies. OFFSET latency grows with the depth; keyset latency should
+stay flat.
+
+Usage:
+    python benchmark_pagination.py [--rows 1000000] [--page-size 50]
+"""
+
+import argparse
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+from database import Base
+from models import User, Document
+from pagination import paginate, encode_cursor
+
+
+def seed(db, rows: int, chunk_size: int = 50_000) -> int:
+    """Insert one user with the given number of documents; returns the user id."""
+    user = User(email="bench@example.com", hashed_password="x")
+    db.add(user)
+    db.commit()
+
+    start = datetime(2020, 1, 1)
+    for first in range(0, rows, chunk_size):
+        db.execute(insert(Document), [
+            {
+                "user_id": user.id,
+                "filename": f"{index}.pdf",
+                "file_path": "",
+                "status": "completed",
+                # Pairs of equal timestamps exercise the id tie-breaker
+                "upload_date": start + timedelta(seconds=index // 2),
+                "created_at": start,
+                "updated_at": start
+            }
+            for index in range(first, min(first + chunk_size, rows))
+        ])
+        db.commit()
+    return user.id
+
+
+def time_call(fn, repeat: int = 5) -> float:
+    """Best-of-N wall time of fn in milliseconds."""
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000
+
+
+def main():
+    """Seed the database and print per-page latency by depth."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--page-size", type=int, default=50)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_engine(f"sqlite:///{os.path.join(directory, 'bench.db')}")
+        Base.metadata.create_all(bind=engine)
+        db = sessionmaker(bind=engine)()
+
+        started = time.perf_counter()
+        user_id = seed(db, args.rows)
+        print(f"Seeded {args.rows} documents in {time.perf_counter() - started:.1f}s")
+
+        base_query = db.query(Document).filter(Document.user_id == user_id)
+        ordered = base_query.order_by(Document.upload_date.desc(), Document.id.desc())
+
+        print(f"{'depth':>10} {'offset ms':>10} {'keyset ms':>10}")
+        depth = args.page_size
+        while depth < args.rows:
+            # The cursor a client would hold after reading `depth` rows
+            last = ordered.offset(depth - 1).limit(1).one()
+            cursor = encode_cursor((last.upload_date, last.id))
+
+            offset_ms = time_call(lambda: ordered.offset(depth).limit(args.page_size).all())
+            keyset_ms = time_call(lambda: paginate(
+                base_query,
+                Document.id,
+                cursor=cursor,
+                limit=args.page_size,
+                sort_column=Document.upload_date
+            ))
+            print(f"{depth:>10} {offset_ms:>10.2f} {keyset_ms:>10.2f}")
+            depth *= 10
+
+        db.close()
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
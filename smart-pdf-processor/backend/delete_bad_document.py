@@ -2,8 +2,8 @@
 
 from database import SessionLocal
 from models import Document
-from services import FileStorage
-import os
+from runtime import content_store
+from services import StorageUsageTracker
 
 def delete_bad_document():
     """Delete the document with 0 words."""
@@ -27,14 +27,15 @@ def delete_bad_document():
         
         # Delete file if it exists
         if doc.file_path:
-            file_storage = FileStorage(base_upload_dir=os.getenv("PDF_UPLOAD_DIR", "uploads"))
             try:
-                file_storage.delete_pdf(doc.file_path)
+                # Shared blobs are only removed with their last reference
+                content_store.release(db, doc.file_path)
                 print(f"Deleted file: {doc.file_path}")
             except Exception as e:
                 print(f"Could not delete file: {e}")
         
         # Delete from database
+        StorageUsageTracker(db).release(doc.user_id, doc.file_size, doc.page_count)
         db.delete(doc)
         db.commit()
         print("✓ Document deleted from database")
@@ -1,85 +1,123 @@
 """
 Main FastAPI application entry point.
+
+``create_app`` builds the application for a set of process roles (see
+runtime.py); ``APP_ROLES`` picks them for the module-level ``app``. A
+process without the ``worker`` role serves the API and leaves uploads
+pending for worker processes (worker.py).
 """
 
+import os
+from typing import Sequence
+
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 from database import init_db
 from routes import auth, tiers, features, admin, health, documents
+from runtime import API_ROLE, ALL_ROLES, parse_roles, start_background_work, stop_background_work
 from exceptions import AuthenticationError, AuthorizationError, NotFoundError, ValidationError
 
-app = FastAPI(title="SaaS Starter Kit API")
-
-# CORS middleware
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["http://localhost"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
-# Global exception handlers
-@app.exception_handler(AuthenticationError)
-async def authentication_error_handler(request: Request, exc: AuthenticationError):
-    return JSONResponse(
-        status_code=401,
-        content={"error": "Unauthorized", "message": str(exc)}
-    )
-
-
-@app.exception_handler(AuthorizationError)
-async def authorization_error_handler(request: Request, exc: AuthorizationError):
-    return JSONResponse(
-        status_code=403,
-        content={"error": "Forbidden", "message": str(exc)}
-    )
-
-
-@app.exception_handler(NotFoundError)
-async def not_found_error_handler(request: Request, exc: NotFoundError):
-    return JSONResponse(
-        status_code=404,
-        content={"error": "Not Found", "message": str(exc)}
-    )
-
-
-@app.exception_handler(ValidationError)
-async def validation_error_handler(request: Request, exc: ValidationError):
-    return JSONResponse(
-        status_code=400,
-        content={"error": "Bad Request", "message": str(exc)}
-    )
-
-
-@app.exception_handler(Exception)
-async def general_exception_handler(request: Request, exc: Exception):
-    return JSONResponse(
-        status_code=500,
-        content={"error": "Internal Server Error", "message": "An unexpected error occurred"}
-    )
-
-
-# Include routers
-app.include_router(auth.router)
-app.include_router(tiers.router)
-app.include_router(features.router)
-app.include_router(admin.router)
-app.include_router(health.router)
-app.include_router(documents.router)
-
-
-@app.on_event("startup")
-async def startup_event():
-    """Initialize database on startup."""
-    init_db()
-    # Seed database with initial data
-    from seed import seed_database
-    seed_database()
-
-
-@app.get("/")
-async def root():
-    """Root endpoint."""
-    return {"message": "SaaS Starter Kit API"}
+# Comma-separated roles of this process: "api", "worker" or both
+APP_ROLES = parse_roles(os.getenv("APP_ROLES", ",".join(ALL_ROLES)))
+
+
+def add_exception_handlers(app: FastAPI) -> None:
+    """Register the global exception handlers."""
+    @app.exception_handler(AuthenticationError)
+    async def authentication_error_handler(request: Request, exc: AuthenticationError):
+        return JSONResponse(
+            status_code=401,
+            content={"error": "Unauthorized", "message": str(exc)}
+        )
+
+    @app.exception_handler(AuthorizationError)
+    async def authorization_error_handler(request: Request, exc: AuthorizationError):
+        return JSONResponse(
+            status_code=403,
+            content={"error": "Forbidden", "message": str(exc)}
+        )
+
+    @app.exception_handler(NotFoundError)
+    async def not_found_error_handler(request: Request, exc: NotFoundError):
+        return JSONResponse(
+            status_code=404,
+            content={"error": "Not Found", "message": str(exc)}
+        )
+
+    @app.exception_handler(ValidationError)
+    async def validation_error_handler(request: Request, exc: ValidationError):
+        return JSONResponse(
+            status_code=400,
+            content={"error": "Bad Request", "message": str(exc)}
+        )
+
+    @app.exception_handler(Exception)
+    async def general_exception_handler(request: Request, exc: Exception):
+        return JSONResponse(
+            status_code=500,
+            content={"error": "Internal Server Error", "message": "An unexpected error occurred"}
+        )
+
+
+def create_app(roles: Sequence[str] = ALL_ROLES) -> FastAPI:
+    """
+    Create the application for a set of process roles.
+
+    Args:
+        roles: Roles of this process; with ``api`` the API routes are
+            served, with ``worker`` uploads are processed in-process and
+            the background loops run
+
+    Returns:
+        FastAPI application
+    """
+    app = FastAPI(title="SaaS Starter Kit API")
+    app.state.roles = tuple(roles)
+
+    # Health checks are served by every role
+    app.include_router(health.router)
+
+    if API_ROLE in roles:
+        # CORS middleware
+        app.add_middleware(
+            CORSMiddleware,
+            allow_origins=["http://localhost"],
+            allow_credentials=True,
+            allow_methods=["*"],
+            allow_headers=["*"],
+        )
+        add_exception_handlers(app)
+
+        # Include routers
+        app.include_router(auth.router)
+        app.include_router(tiers.router)
+        app.include_router(features.router)
+        app.include_router(admin.router)
+        app.include_router(documents.router)
+
+        @app.get("/")
+        async def root():
+            """Root endpoint."""
+            return {"message": "SaaS Starter Kit API"}
+
+    @app.on_event("startup")
+    async def startup_event():
+        """Initialize database and start background work."""
+        if API_ROLE in roles:
+            # Upgrade the schema and seed it (one query when up to date)
+            from seed import seed_database
+            seed_database()
+        else:
+            init_db()
+        app.state.background_stops = start_background_work(roles)
+
+    @app.on_event("shutdown")
+    async def shutdown_event():
+        """Stop background work."""
+        stop_background_work(getattr(app.state, "background_stops", {}))
+
+    return app
+
+
+app = create_app(APP_ROLES)
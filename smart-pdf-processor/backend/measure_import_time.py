@@ -0,0 +1,104 @@
+"""Measure how long the API takes to import, using ``python -X importtime``.
+
+Imports --module (``main`` by default) in fresh interpreters, parses the
+importtime report and prints the best total with the slowest top-level
+packages, so a change that drags a heavy dependency into API startup
+shows up before it ships.
+
+Usage:
+    python measure_import_time.py [--module main] [--runs 3] [--top 15]
+"""
+
+import argparse
+import os
+import re
+import subprocess
+import sys
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Dict, List
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# "import time: self [us] | cumulative | imported package"
+IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+
+@dataclass
+class ImportRecord:
+    """One module from an importtime report."""
+
+    name: str
+    self_us: int
+    cumulative_us: int
+    depth: int
+
+
+def measure(module: str = "main") -> List[ImportRecord]:
+    """
+    Import a module in a fresh interpreter and parse its importtime report.
+
+    Args:
+        module: Module to import, relative to the backend directory
+
+    Returns:
+        Every module imported on the way, in report order
+
+    Raises:
+        RuntimeError: If the import fails
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BACKEND_DIR,
+        capture_output=True,
+        text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{result.stderr[-2000:]}")
+
+    records = []
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            records.append(ImportRecord(name, int(self_us), int(cumulative_us), len(indent) // 2))
+    return records
+
+
+def total_ms(records: List[ImportRecord], module: str = "main") -> float:
+    """Get the cumulative import time of the top-level module in milliseconds."""
+    for record in records:
+        if record.name == module and record.depth == 0:
+            return record.cumulative_us / 1000
+    raise ValueError(f"{module} not in the importtime report")
+
+
+def by_package(records: List[ImportRecord]) -> Dict[str, float]:
+    """Sum the self import time of each top-level package, in milliseconds."""
+    totals: Dict[str, float] = defaultdict(float)
+    for record in records:
+        totals[record.name.split(".")[0]] += record.self_us / 1000
+    return dict(totals)
+
+
+def main():
+    """Print the best import time and the slowest packages."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--module", default="main")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    runs = [measure(args.module) for _ in range(args.runs)]
+    best = min(runs, key=lambda records: total_ms(records, args.module))
+
+    print(f"import {args.module}: {total_ms(best, args.module):.1f} ms "
+          f"(best of {args.runs}, {len(best)} modules)")
+    print(f"{'package':<30} {'ms':>8}")
+    packages = sorted(by_package(best).items(), key=lambda item: item[1], reverse=True)
+    for package, ms in packages[:args.top]:
+        print(f"{package:<30} {ms:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""Migration script to move stored PDFs into the configured storage layout.
+
+Moves every document file to where FileStorage now places it (see
+PDF_STORAGE_LAYOUT and PDF_STORAGE_ROOTS) and rewrites Document.file_path.
+Documents are processed in id order in batches, committing after each batch,
+so the script can be stopped and re-run at any time.
+
+Usage:
+    python migrate_file_layout.py [--batch-size 500] [--dry-run]
+"""
+
+import argparse
+
+from database import SessionLocal
+from models import Document
+from runtime import file_storage
+from services import FileStorage
+
+
+def migrate_file_layout(db, storage: FileStorage, batch_size: int = 500, dry_run: bool = False) -> int:
+    """
+    Relocate document files in batches and record their new paths.
+
+    Args:
+        db: Database session
+        storage: File storage configured with the target layout and roots
+        batch_size: Number of documents per batch (one commit per batch)
+        dry_run: Only report what would move
+
+    Returns:
+        Number of documents whose file path changed (or would change)
+    """
+    moved = 0
+    last_id = 0
+
+    while True:
+        # Keyset pagination keeps each batch query cheap on large tables
+        documents = (
+            db.query(Document)
+            .filter(Document.id > last_id)
+            .order_by(Document.id)
+            .limit(batch_size)
+            .all()
+        )
+        if not documents:
+            break
+
+        for document in documents:
+            last_id = document.id
+            try:
+                if dry_run:
+                    new_path = storage.path_for(document.user_id, document.id, document.filename)
+                    if storage.blob_digest(document.file_path) is not None:
+                        new_path = document.file_path
+                else:
+                    new_path = storage.relocate(
+                        document.file_path, document.user_id, document.id, document.filename
+                    )
+            except (FileNotFoundError, ValueError) as e:
+                print(f"Skipping document {document.id}: {e}")
+                continue
+
+            if new_path != document.file_path:
+                print(f"Document {document.id}: {document.file_path} -> {new_path}")
+                document.file_path = new_path
+                moved += 1
+
+        if dry_run:
+            db.rollback()
+        else:
+            db.commit()
+        print(f"Processed documents up to id {last_id}")
+
+    return moved
+
+
+def main():
+    """Run the migration on the storage the application is configured with."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+
+    try:
+        moved = migrate_file_layout(db, file_storage, args.batch_size, args.dry_run)
+        action = "Would move" if args.dry_run else "Moved"
+        print(f"{action} {moved} documents")
+    except Exception as e:
+        print(f"Error: {e}")
+        import traceback
+        traceback.print_exc()
+        db.rollback()
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -4,5 +4,13 @@ from .user import User
 from .tier import Tier
 from .feature_flag import FeatureFlag
 from .document import Document
+from .upload_session import UploadSession
+from .document_batch import DocumentBatch
+from .blob import Blob
+from .storage_usage import StorageUsage
+from .document_tombstone import DocumentTombstone
+from .document_term import DocumentTerm, TermStatistic
+from .document_signature import DocumentSignature, SignatureBucket
+from .document_tables import DocumentTables
 
-__all__ = ["User", "Tier", "FeatureFlag", "Document"]
+__all__ = ["User", "Tier", "FeatureFlag", "Document", "UploadSession", "DocumentBatch", "Blob", "StorageUsage", "DocumentTombstone", "DocumentTerm", "TermStatistic", "DocumentSignature", "SignatureBucket", "DocumentTables"]
@@ -0,0 +1,16 @@
+"""Content-addressed blob model."""
+
+from datetime import datetime
+from sqlalchemy import Column, Integer, BigInteger, String, DateTime
+from database import Base
+
+
+class Blob(Base):
+    """Stored file shared by every document with identical content."""
+    
+    __tablename__ = "blobs"
+    
+    sha256 = Column(String(64), primary_key=True)
+    size = Column(BigInteger, nullable=False)
+    ref_count = Column(Integer, default=0, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
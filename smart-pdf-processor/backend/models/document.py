@@ -1,10 +1,15 @@
 """Document model."""
 
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Index
+from sqlalchemy import Column, Integer, BigInteger, String, Text, DateTime, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from database import Base
 
+# Statuses of documents with work left to do (processing, retrying or
+# purging); rows in them are the small "work set" covered by the partial
+# indexes below, while completed and failed documents accumulate forever
+ACTIVE_STATUSES = ("pending", "processing", "partial", "retrying", "deleting")
+
 
 class Document(Base):
     """Document model for storing PDF metadata and extracted text."""
@@ -13,19 +18,46 @@ class Document(Base):
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    batch_id = Column(Integer, ForeignKey("document_batches.id", ondelete="SET NULL"), nullable=True, index=True)
     filename = Column(String(255), nullable=False)
     file_path = Column(String(512), nullable=False)
+    file_size = Column(BigInteger, default=0, nullable=False)
+    page_count = Column(Integer, default=0, nullable=False)
     upload_date = Column(DateTime, default=datetime.utcnow, nullable=False)
     status = Column(String(20), default="pending", nullable=False, index=True)
+    # Bumped by every processing status transition, which only applies if
+    # the version is unchanged since the document was read
+    version = Column(Integer, default=0, nullable=False)
     word_count = Column(Integer, default=0)
+    # Percentage of pages read while processing (100 once completed)
+    progress = Column(Integer, default=0, nullable=False)
     extracted_text = Column(Text, nullable=True)
     error_message = Column(Text, nullable=True)
+    # Failed processing attempts, whether the last failure may be retried
+    # ("transient") or not ("permanent"), and when the next retry is due
+    attempts = Column(Integer, default=0, nullable=False)
+    failure_kind = Column(String(20), nullable=True)
+    next_retry_at = Column(DateTime, nullable=True)
+    # Earlier document whose text this one nearly matches
+    duplicate_of_id = Column(Integer, ForeignKey("documents.id", ondelete="SET NULL"), nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
     
-    # Relationship
+    # Relationships
     user = relationship("User", back_populates="documents")
+    batch = relationship("DocumentBatch", back_populates="documents")
 
 
 # Create composite indexes
 Index('idx_documents_user_status', Document.user_id, Document.status)
+Index('idx_documents_user_upload_date', Document.user_id, Document.upload_date, Document.id)
+Index('idx_documents_user_updated', Document.user_id, Document.updated_at, Document.id)
+
+# Partial indexes over the work set, used through services.work_queue
+_active = Document.status.in_(ACTIVE_STATUSES)
+Index('idx_documents_active_status', Document.status, Document.id,
+      postgresql_where=_active, sqlite_where=_active)
+Index('idx_documents_active_retry', Document.status, Document.next_retry_at,
+      postgresql_where=_active, sqlite_where=_active)
+Index('idx_documents_active_updated', Document.status, Document.updated_at,
+      postgresql_where=_active, sqlite_where=_active)
@@ -0,0 +1,20 @@
+"""Document batch model."""
+
+from datetime import datetime
+from sqlalchemy import Column, Integer, DateTime, ForeignKey
+from sqlalchemy.orm import relationship
+from database import Base
+
+
+class DocumentBatch(Base):
+    """Group of documents uploaded together, polled for aggregate progress."""
+    
+    __tablename__ = "document_batches"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    document_count = Column(Integer, default=0, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    
+    # Relationship
+    documents = relationship("Document", back_populates="batch")
@@ -0,0 +1,31 @@
+"""Near-duplicate detection models."""
+
+from sqlalchemy import Column, Integer, BigInteger, LargeBinary, ForeignKey, Index
+from database import Base
+
+
+class DocumentSignature(Base):
+    """MinHash signature of a document's extracted text."""
+
+    __tablename__ = "document_signatures"
+
+    document_id = Column(Integer, ForeignKey("documents.id", ondelete="CASCADE"), primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    # Packed little-endian unsigned 64-bit minimums, one per hash function
+    signature = Column(LargeBinary, nullable=False)
+
+
+class SignatureBucket(Base):
+    """LSH bucket of one band of a document's signature."""
+
+    __tablename__ = "signature_buckets"
+
+    document_id = Column(Integer, ForeignKey("documents.id", ondelete="CASCADE"), primary_key=True)
+    band = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    # Hash of the band number and its rows, so buckets never collide across bands
+    bucket = Column(BigInteger, nullable=False)
+
+
+# Candidate lookup: one user's documents sharing a bucket
+Index('idx_signature_buckets_user_bucket', SignatureBucket.user_id, SignatureBucket.bucket)
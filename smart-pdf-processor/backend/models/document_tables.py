@@ -0,0 +1,17 @@
+"""Extracted document tables model."""
+
+from datetime import datetime
+from sqlalchemy import Column, Integer, Text, DateTime, ForeignKey
+from database import Base
+
+
+class DocumentTables(Base):
+    """Tables extracted from a document, cached after the first request."""
+    
+    __tablename__ = "document_tables"
+    
+    document_id = Column(Integer, ForeignKey("documents.id", ondelete="CASCADE"), primary_key=True)
+    # Compact JSON: [{"page": n, "tables": [[[cell, ...], ...], ...]}, ...]
+    # for pages that have tables
+    pages = Column(Text, nullable=False)
+    extracted_at = Column(DateTime, default=datetime.utcnow, nullable=False)
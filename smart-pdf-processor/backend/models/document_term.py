@@ -0,0 +1,30 @@
+"""Related-document index models."""
+
+from sqlalchemy import Column, Integer, String, Float, ForeignKey, Index
+from database import Base
+
+
+class DocumentTerm(Base):
+    """One weighted term of a document's TF-IDF vector (a posting list entry)."""
+
+    __tablename__ = "document_terms"
+
+    document_id = Column(Integer, ForeignKey("documents.id", ondelete="CASCADE"), primary_key=True)
+    term = Column(String(64), primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    # L2-normalised TF-IDF weight, so a dot product of two vectors is their cosine
+    weight = Column(Float, nullable=False)
+
+
+class TermStatistic(Base):
+    """Number of a user's documents containing a term (its document frequency)."""
+
+    __tablename__ = "term_statistics"
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    term = Column(String(64), primary_key=True)
+    documents = Column(Integer, default=0, nullable=False)
+
+
+# Posting lists: one user's documents containing a term
+Index('idx_document_terms_user_term', DocumentTerm.user_id, DocumentTerm.term)
@@ -0,0 +1,21 @@
+"""Document tombstone model."""
+
+from datetime import datetime
+from sqlalchemy import Column, Integer, DateTime, ForeignKey, Index
+from database import Base
+
+
+class DocumentTombstone(Base):
+    """Record of a deleted document, kept so sync clients learn about the delete."""
+    
+    __tablename__ = "document_tombstones"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    # Not a foreign key: the document row is gone (or about to be)
+    document_id = Column(Integer, nullable=False)
+    deleted_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+
+# Changes feed reads one user's tombstones in (deleted_at, id) order
+Index('idx_document_tombstones_user_deleted', DocumentTombstone.user_id, DocumentTombstone.deleted_at, DocumentTombstone.id)
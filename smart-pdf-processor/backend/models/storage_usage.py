@@ -0,0 +1,21 @@
+"""Per-user storage usage model."""
+
+from datetime import datetime
+from sqlalchemy import Column, Integer, BigInteger, DateTime, ForeignKey
+from sqlalchemy.orm import relationship
+from database import Base
+
+
+class StorageUsage(Base):
+    """Running totals of what a user stores, kept in step with their documents."""
+    
+    __tablename__ = "storage_usage"
+    
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    bytes = Column(BigInteger, default=0, nullable=False)
+    pages = Column(BigInteger, default=0, nullable=False)
+    documents = Column(Integer, default=0, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+    
+    # Relationships
+    user = relationship("User", back_populates="storage_usage")
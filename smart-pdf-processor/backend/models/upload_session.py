@@ -0,0 +1,25 @@
+"""Upload session model."""
+
+from datetime import datetime
+from sqlalchemy import Column, Integer, BigInteger, String, DateTime, ForeignKey
+from database import Base
+
+
+class UploadSession(Base):
+    """Resumable upload in progress, tracking how many bytes have been received."""
+    
+    __tablename__ = "upload_sessions"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    filename = Column(String(255), nullable=False)
+    file_path = Column(String(512), nullable=False)
+    total_size = Column(BigInteger, nullable=False)
+    received_size = Column(BigInteger, default=0, nullable=False)
+    # Claim of the request writing the next chunk, so concurrent PUTs for the
+    # same offset cannot both write to the partial file; expired claims
+    # (e.g. of a crashed request) can be taken over
+    writer_token = Column(String(32), nullable=True)
+    writer_expires_at = Column(DateTime, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
@@ -17,7 +17,15 @@ class User(Base):
     is_admin = Column(Boolean, default=False, nullable=False)
     tier_id = Column(Integer, ForeignKey("tiers.id"), nullable=True, index=True)
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    # Set when the account is being purged; the user can no longer sign in
+    deletion_requested_at = Column(DateTime, nullable=True, index=True)
     
     # Relationships
     tier = relationship("Tier", back_populates="users")
     documents = relationship("Document", back_populates="user", cascade="all, delete-orphan")
+    storage_usage = relationship(
+        "StorageUsage",
+        back_populates="user",
+        uselist=False,
+        cascade="all, delete-orphan"
+    )
@@ -0,0 +1,118 @@
+"""Keyset (cursor) pagination for list endpoints."""
+
+import base64
+import json
+import os
+from datetime import datetime
+from typing import Any, List, Optional, Tuple
+
+from fastapi import HTTPException, Response
+from sqlalchemy import tuple_
+from sqlalchemy.orm import Query
+
+# Page size used when a request does not ask for one, and the largest allowed
+DEFAULT_PAGE_SIZE = int(os.getenv("DEFAULT_PAGE_SIZE", "50"))
+MAX_PAGE_SIZE = int(os.getenv("MAX_PAGE_SIZE", "200"))
+
+# Response header carrying the cursor of the next page (absent on the last page)
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(values: Tuple[Any, ...]) -> str:
+    """
+    Encode the sort key of the last row of a page as an opaque cursor.
+
+    Args:
+        values: Sort column values followed by the id
+
+    Returns:
+        URL-safe cursor string
+    """
+    encoded = [value.isoformat() if isinstance(value, datetime) else value for value in values]
+    raw = json.dumps(encoded, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, columns: List) -> Tuple[Any, ...]:
+    """
+    Decode a cursor produced by ``encode_cursor``.
+
+    Args:
+        cursor: Cursor string from a previous page
+        columns: The columns the cursor values belong to, in order
+
+    Returns:
+        Tuple of values, converted back to the columns' Python types
+
+    Raises:
+        HTTPException: 400 if the cursor is malformed
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(values, list) or len(values) != len(columns):
+            raise ValueError("wrong number of values")
+
+        decoded = []
+        for column, value in zip(columns, values):
+            if column.type.python_type is datetime:
+                value = datetime.fromisoformat(value)
+            decoded.append(value)
+        return tuple(decoded)
+    except (ValueError, TypeError, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def paginate(
+    query: Query,
+    id_column,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = None,
+    sort_column=None,
+    descending: bool = True
+) -> Tuple[list, Optional[str]]:
+    """
+    Fetch one page of a query ordered by ``(sort_column, id_column)``.
+
+    Instead of OFFSET, each page starts strictly after the last row of the
+    previous one (a row-value comparison), so with an index ending in the
+    same columns every page costs the same however deep it is. The id breaks
+    ties between equal sort values.
+
+    Args:
+        query: Filtered query returning one entity per row (not yet ordered)
+        id_column: Unique column used as the tie-breaker
+        cursor: Cursor returned with the previous page, or None for the first
+        limit: Page size (defaults to DEFAULT_PAGE_SIZE, capped at MAX_PAGE_SIZE)
+        sort_column: Column to sort by; None sorts by the id alone
+        descending: Sort newest/largest first
+
+    Returns:
+        Tuple of (rows, cursor for the next page or None on the last page)
+
+    Raises:
+        HTTPException: 400 if the cursor is malformed
+    """
+    columns = [id_column] if sort_column is None else [sort_column, id_column]
+    limit = min(max(limit or DEFAULT_PAGE_SIZE, 1), MAX_PAGE_SIZE)
+
+    if cursor:
+        after = decode_cursor(cursor, columns)
+        key = tuple_(*columns)
+        query = query.filter(key < tuple_(*after) if descending else key > tuple_(*after))
+
+    query = query.order_by(*[column.desc() if descending else column.asc() for column in columns])
+    rows = query.limit(limit + 1).all()
+
+    if len(rows) <= limit:
+        return rows, None
+
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor(tuple(getattr(last, column.key) for column in columns))
+
+
+def set_next_cursor(response: Response, next_cursor: Optional[str]) -> None:
+    """Advertise the next page's cursor on a list response."""
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
@@ -0,0 +1,77 @@
+"""Rebuild the related-document index from completed documents.
+
+Indexes documents completed before related documents were tracked, and
+refreshes vectors whose TF-IDF weights have drifted as libraries grew.
+Documents are indexed as processing completes after that; re-run this only
+to backfill or repair drift.
+
+Usage:
+    python rebuild_related_index.py [--batch-size 200]
+"""
+
+import argparse
+
+from database import SessionLocal
+from models import Document
+from services import RelatedDocumentIndex
+
+
+def rebuild_related_index(db, batch_size: int = 200) -> int:
+    """
+    Reindex every completed document.
+
+    Args:
+        db: Database session
+        batch_size: Number of documents per batch (one commit per batch)
+
+    Returns:
+        Number of documents indexed
+    """
+    index = RelatedDocumentIndex(db)
+    indexed = 0
+    last_id = 0
+
+    while True:
+        documents = (
+            db.query(Document)
+            .filter(Document.id > last_id, Document.status == "completed")
+            .order_by(Document.id)
+            .limit(batch_size)
+            .all()
+        )
+        if not documents:
+            break
+
+        for document in documents:
+            last_id = document.id
+            index.remove_document(document)
+            index.index_document(document)
+            indexed += 1
+
+        db.commit()
+
+    return indexed
+
+
+def main():
+    """Run the rebuild against the configured database."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--batch-size", type=int, default=200)
+    args = parser.parse_args()
+
+    db = SessionLocal()
+
+    try:
+        indexed = rebuild_related_index(db, args.batch_size)
+        print(f"Indexed {indexed} documents")
+    except Exception as e:
+        print(f"Error: {e}")
+        import traceback
+        traceback.print_exc()
+        db.rollback()
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
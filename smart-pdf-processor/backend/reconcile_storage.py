@@ -0,0 +1,57 @@
+"""Reconcile stored PDF files with document records.
+
+Reports files that no document refers to (orphans) and documents whose file
+is missing (dangling rows). With --delete, orphans are removed and dangling
+rows are deleted in batches.
+
+Usage:
+    python reconcile_storage.py [--delete] [--batch-size 500] [--min-age-minutes 60]
+"""
+
+import argparse
+
+from database import SessionLocal
+from runtime import content_store, file_storage
+from services import StorageReconciler
+
+
+def print_difference(kind, item):
+    """Print one reconciliation finding."""
+    if kind == "orphan":
+        print(f"Orphaned file: {item}")
+    else:
+        document_id, file_path = item
+        print(f"Dangling document {document_id}: {file_path or '(no file path)'}")
+
+
+def main():
+    """Run reconciliation on the storage the application is configured with."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--delete", action="store_true", help="Delete orphans and dangling rows")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--min-age-minutes", type=int, default=60)
+    args = parser.parse_args()
+
+    # The same storage (including PDF_STORAGE_BACKEND) the application uses,
+    # so files on a remote backend are never mistaken for missing
+    reconciler = StorageReconciler(
+        SessionLocal,
+        file_storage,
+        batch_size=args.batch_size,
+        min_age_seconds=args.min_age_minutes * 60,
+        content_store=content_store
+    )
+
+    try:
+        counts = reconciler.reconcile(delete=args.delete, report=print_difference)
+        print(f"Found {counts['orphans']} orphaned files and {counts['dangling']} dangling documents")
+        if args.delete:
+            print(f"Deleted {counts['files_deleted']} files and {counts['rows_deleted']} documents")
+    except Exception as e:
+        print(f"Error: {e}")
+        import traceback
+        traceback.print_exc()
+
+
+if __name__ == "__main__":
+    main()
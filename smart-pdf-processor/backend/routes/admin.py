@@ -1,15 +1,30 @@
 """Admin management routes."""
 
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
+import os
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, Response
+from sqlalchemy import update
+from sqlalchemy.orm import Session, joinedload
 from pydantic import BaseModel
-from typing import List
+from typing import List, Optional
 from database import get_db
-from models import User
+from models import User, Document
 from auth import require_admin
+from pagination import paginate, set_next_cursor
+from routes.documents import run_document_purge, enqueue_batches, get_inline_processing
+from services.document_purger import DELETING_STATUS
+from services.feed_stamps import restamp_on_commit
+from services.metrics import metrics
+from services.retry_policy import RETRYING_STATUS
 
 router = APIRouter(prefix="/api/admin", tags=["admin"])
 
+# Most documents one reprocess request may select
+REPROCESS_MAX_DOCUMENTS = int(os.getenv("REPROCESS_MAX_DOCUMENTS", "1000"))
+
+# Statuses a document can be reprocessed from (not queued, running or deleting)
+REPROCESSABLE_STATUSES = ("failed", "completed", RETRYING_STATUS)
+
 
 class UserWithTierResponse(BaseModel):
     id: int
@@ -22,13 +37,46 @@ class UserWithTierResponse(BaseModel):
         from_attributes = True
 
 
+class FailedDocumentResponse(BaseModel):
+    id: int
+    user_id: int
+    user_email: str
+    filename: str
+    failure_kind: str | None
+    attempts: int
+    error_message: str | None
+    updated_at: datetime
+
+
+class ReprocessRequest(BaseModel):
+    document_ids: List[int]
+
+
+class ReprocessResponse(BaseModel):
+    requested: int
+    queued: int
+    batches: int
+
+
 @router.get("/users", response_model=List[UserWithTierResponse])
 async def list_users(
+    response: Response,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
     db: Session = Depends(get_db),
     admin: User = Depends(require_admin)
 ):
-    """List all users with their tier data (admin only)."""
-    users = db.query(User).all()
+    """
+    List users with their tier data, one page at a time (admin only).
+    
+    Users are ordered by id; the next page's cursor is returned in the
+    X-Next-Cursor header.
+    """
+    query = db.query(User).options(joinedload(User.tier)).filter(
+        User.deletion_requested_at.is_(None)
+    )
+    users, next_cursor = paginate(query, User.id, cursor=cursor, limit=limit, descending=False)
+    set_next_cursor(response, next_cursor)
     
     result = []
     for user in users:
@@ -41,3 +89,138 @@ async def list_users(
         })
     
     return result
+
+
+@router.delete("/users/{user_id}", status_code=202)
+async def delete_user(
+    user_id: int,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db),
+    admin: User = Depends(require_admin)
+):
+    """
+    Delete a user account and all of its documents (admin only).
+    
+    The user is signed out and hidden at once; documents, files and the
+    account itself are removed by the background purger.
+    """
+    user = db.query(User).filter(User.id == user_id).first()
+    if not user or user.deletion_requested_at is not None:
+        raise HTTPException(status_code=404, detail="User not found")
+    if user.id == admin.id:
+        raise HTTPException(status_code=400, detail="You cannot delete your own account")
+    
+    user.deletion_requested_at = datetime.utcnow()
+    db.query(Document).filter(Document.user_id == user.id).update(
+        {Document.status: DELETING_STATUS, Document.updated_at: datetime.utcnow()},
+        synchronize_session=False
+    )
+    restamp_on_commit(db, Document, Document.user_id == user.id)
+    db.commit()
+    
+    background_tasks.add_task(run_document_purge)
+    
+    return {"message": "User scheduled for deletion"}
+
+
+@router.get("/documents/failed", response_model=List[FailedDocumentResponse])
+async def list_failed_documents(
+    response: Response,
+    kind: Optional[str] = None,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db),
+    admin: User = Depends(require_admin)
+):
+    """
+    List dead-lettered documents across all users, most recent first (admin only).
+    
+    These are documents that failed permanently or ran out of automatic
+    retries. Filter with ``kind=transient`` or ``kind=permanent``; the next
+    page's cursor is returned in the X-Next-Cursor header.
+    """
+    query = db.query(Document).options(joinedload(Document.user)).filter(
+        Document.status == "failed"
+    )
+    if kind:
+        query = query.filter(Document.failure_kind == kind)
+    documents, next_cursor = paginate(
+        query,
+        Document.id,
+        cursor=cursor,
+        limit=limit,
+        sort_column=Document.updated_at
+    )
+    set_next_cursor(response, next_cursor)
+    
+    return [
+        FailedDocumentResponse(
+            id=document.id,
+            user_id=document.user_id,
+            user_email=document.user.email,
+            filename=document.filename,
+            failure_kind=document.failure_kind,
+            attempts=document.attempts,
+            error_message=document.error_message,
+            updated_at=document.updated_at
+        )
+        for document in documents
+    ]
+
+
+@router.post("/documents/reprocess", response_model=ReprocessResponse, status_code=202)
+async def reprocess_documents(
+    data: ReprocessRequest,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db),
+    admin: User = Depends(require_admin),
+    inline: bool = Depends(get_inline_processing)
+):
+    """
+    Queue selected documents for processing again (admin only).
+    
+    Documents that are failed, completed or waiting for a retry are reset
+    to ``pending`` with a fresh retry budget and processed in background
+    batches; others (queued, running or being deleted) are skipped.
+    """
+    document_ids = sorted(set(data.document_ids))
+    if len(document_ids) > REPROCESS_MAX_DOCUMENTS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {REPROCESS_MAX_DOCUMENTS} documents can be reprocessed at once"
+        )
+    
+    # One conditional UPDATE; documents picked up or deleted meanwhile are skipped
+    queued = sorted(db.execute(
+        update(Document)
+        .where(Document.id.in_(document_ids), Document.status.in_(REPROCESSABLE_STATUSES))
+        .values({
+            Document.status: "pending",
+            Document.attempts: 0,
+            Document.failure_kind: None,
+            Document.next_retry_at: None,
+            Document.error_message: None,
+            Document.version: Document.version + 1,
+            Document.updated_at: datetime.utcnow()
+        })
+        .returning(Document.id)
+        .execution_options(synchronize_session=False)
+    ).scalars())
+    restamp_on_commit(db, Document, Document.id.in_(queued))
+    db.commit()
+    
+    batches = enqueue_batches(background_tasks, queued, inline)
+    metrics.increment("processing.reprocessed", len(queued))
+    
+    return ReprocessResponse(requested=len(document_ids), queued=len(queued), batches=batches)
+
+
+@router.get("/metrics")
+async def get_metrics(admin: User = Depends(require_admin)):
+    """Operational counters of this API process (admin only)."""
+    counters = metrics.snapshot()
+    purge_seconds = counters.get("purge.seconds", 0)
+    counters["purge.documents_per_second"] = (
+        counters.get("purge.documents", 0) / purge_seconds if purge_seconds else 0.0
+    )
+    return counters
@@ -3,6 +3,7 @@
 from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from sqlalchemy.orm import Session
 from pydantic import BaseModel, EmailStr
+from typing import Optional
 from database import get_db
 from models import User
 from auth import (
@@ -13,6 +14,7 @@ from auth import (
     clear_session_cookie,
     get_current_user
 )
+from services import StorageUsageTracker
 
 router = APIRouter(prefix="/api/auth", tags=["auth"])
 
@@ -37,6 +39,17 @@ class UserResponse(BaseModel):
         from_attributes = True
 
 
+class StorageUsageResponse(BaseModel):
+    bytes: int
+    pages: int
+    documents: int
+    limit_bytes: Optional[int] = None
+
+
+class CurrentUserResponse(UserResponse):
+    storage: StorageUsageResponse
+
+
 @router.post("/register", response_model=UserResponse)
 async def register(
     request: Request,
@@ -89,7 +102,7 @@ async def login(
     """Login with email and password."""
     # Find user
     user = db.query(User).filter(User.email == data.email.lower()).first()
-    if not user:
+    if not user or user.deletion_requested_at is not None:
         raise HTTPException(status_code=401, detail="Invalid credentials")
     
     # Verify password
@@ -117,7 +130,24 @@ async def logout(response: Response):
     return {"message": "Logged out successfully"}
 
 
-@router.get("/me", response_model=UserResponse)
-async def get_me(user: User = Depends(get_current_user)):
-    """Get current user info."""
-    return user
+@router.get("/me", response_model=CurrentUserResponse)
+async def get_me(
+    user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Get current user info, including storage used against the tier limit."""
+    tracker = StorageUsageTracker(db)
+    usage = tracker.get_usage(user.id)
+    
+    return CurrentUserResponse(
+        id=user.id,
+        email=user.email,
+        is_admin=user.is_admin,
+        tier_id=user.tier_id,
+        storage=StorageUsageResponse(
+            bytes=usage.bytes,
+            pages=usage.pages,
+            documents=usage.documents,
+            limit_bytes=tracker.get_limit_bytes(user)
+        )
+    )
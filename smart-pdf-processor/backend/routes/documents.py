@@ -1,27 +1,82 @@
 """Document management routes."""
 
 import os
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, BackgroundTasks
-from fastapi.responses import Response
+import re
+import uuid
+import zipfile
+from email.utils import formatdate, parsedate_to_datetime
+from urllib.parse import quote
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, BackgroundTasks, Request
+from fastapi.responses import Response, FileResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy import func, or_
 from sqlalchemy.orm import Session
 from pydantic import BaseModel
-from typing import Optional
-from datetime import datetime
+from typing import BinaryIO, Callable, List, Optional
+from datetime import datetime, timedelta, timezone
 
-from database import get_db
-from models import User, Document
+from database import get_db, SessionLocal
+from pagination import MAX_PAGE_SIZE, paginate, set_next_cursor
+from models import User, Document, UploadSession, DocumentBatch
 from auth import get_current_user
-from services import FileStorage, process_document
+from runtime import (
+    ALL_ROLES,
+    WORKER_ROLE,
+    PDF_STORAGE_BACKEND,
+    file_storage,
+    content_store,
+    document_purger
+)
+from services import (
+    StorageUsageTracker,
+    ChangeFeed,
+    LibraryExporter,
+    DocumentTableCache,
+    RelatedDocumentIndex,
+    process_document,
+    process_batch
+)
+from services.change_feed import ChangeTokenExpired
+from services.document_purger import DELETING_STATUS
+from services.feed_stamps import restamp_on_commit
+from services.admission_control import AdmissionController, UploadRejected
+from services.feature_gate import require_feature
+from services.file_storage import SHARD_PATH_PREFIX
+from services.library_export import EXPORT_FORMATS
+from services.storage_usage import StorageQuotaExceeded
 
 router = APIRouter(prefix="/api/documents", tags=["documents"])
 
 # Configuration
 PDF_MAX_SIZE_MB = int(os.getenv("PDF_MAX_SIZE_MB", "10"))
 PDF_MAX_SIZE_BYTES = PDF_MAX_SIZE_MB * 1024 * 1024
-PDF_UPLOAD_DIR = os.getenv("PDF_UPLOAD_DIR", "uploads")
+UPLOAD_CHUNK_SIZE_MB = int(os.getenv("UPLOAD_CHUNK_SIZE_MB", "4"))
+UPLOAD_CHUNK_SIZE_BYTES = UPLOAD_CHUNK_SIZE_MB * 1024 * 1024
+# Larger chunks are refused, so one PUT cannot stream an unbounded body
+UPLOAD_MAX_CHUNK_SIZE_MB = max(int(os.getenv("UPLOAD_MAX_CHUNK_SIZE_MB", "16")), UPLOAD_CHUNK_SIZE_MB)
+UPLOAD_MAX_CHUNK_SIZE_BYTES = UPLOAD_MAX_CHUNK_SIZE_MB * 1024 * 1024
+# How long a PUT may hold its claim on an upload while writing a chunk
+UPLOAD_CHUNK_LEASE_SECONDS = int(os.getenv("UPLOAD_CHUNK_LEASE_SECONDS", "300"))
+BATCH_MAX_FILES = int(os.getenv("BATCH_MAX_FILES", "500"))
+# Uploads are refused with 429 while this many documents wait for
+# processing (0 disables); tiers can cap each user's own backlog with the
+# max_processing_backlog feature
+UPLOAD_MAX_BACKLOG = int(os.getenv("UPLOAD_MAX_BACKLOG", "1000"))
+# When set (e.g. "/protected-uploads/"), downloads are handed to nginx via
+# X-Accel-Redirect so file bytes never pass through a Python worker
+PDF_ACCEL_REDIRECT_PREFIX = os.getenv("PDF_ACCEL_REDIRECT_PREFIX", "")
 
-# Initialize file storage service
-file_storage = FileStorage(base_upload_dir=PDF_UPLOAD_DIR)
+# Documents re-enqueued per background task by the admin reprocess endpoint
+REPROCESS_BATCH_SIZE = int(os.getenv("REPROCESS_BATCH_SIZE", "50"))
+
+# Response header with a /changes token on the first page of the document list
+SYNC_TOKEN_HEADER = "X-Sync-Token"
+
+CONTENT_RANGE_PATTERN = re.compile(r"^bytes (\d+)-(\d+)/(\d+)$")
+RANGE_PATTERN = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+library_exporter = LibraryExporter(SessionLocal)
+admission_controller = AdmissionController(UPLOAD_MAX_BACKLOG)
 
 
 class DocumentResponse(BaseModel):
@@ -44,6 +99,37 @@ class UploadResponse(BaseModel):
     message: str
 
 
+class UploadSessionCreate(BaseModel):
+    """Request model for starting a resumable upload."""
+    filename: str
+    total_size: int
+
+
+class UploadSessionResponse(BaseModel):
+    """Response model for a resumable upload session."""
+    upload_id: int
+    filename: str
+    total_size: int
+    offset: int
+    chunk_size: int
+
+
+class BatchUploadResponse(BaseModel):
+    """Response model for batch upload."""
+    batch_id: int
+    document_ids: List[int]
+    status: str
+    message: str
+
+
+class BatchStatusResponse(BaseModel):
+    """Response model for aggregate batch progress."""
+    batch_id: int
+    total: int
+    status_counts: dict[str, int]
+    progress: float
+
+
 class DocumentListItem(BaseModel):
     """Response model for document list item."""
     id: int
@@ -51,11 +137,51 @@ class DocumentListItem(BaseModel):
     upload_date: datetime
     status: str
     word_count: int
+    progress: int = 0
+    duplicate_of_id: Optional[int] = None
 
     class Config:
         from_attributes = True
 
 
+class DocumentSummary(BaseModel):
+    """Response model for library statistics."""
+    total: int
+    status_counts: dict[str, int]
+    total_words: int
+    last_updated: Optional[datetime] = None
+    recent: List[DocumentListItem]
+
+
+class DocumentChanges(BaseModel):
+    """Response model for incremental library sync."""
+    changed: List[DocumentListItem]
+    deleted: List[int]
+    next_token: str
+    has_more: bool
+
+
+class RelatedDocument(BaseModel):
+    """Response model for a similar document."""
+    id: int
+    filename: str
+    upload_date: datetime
+    word_count: int
+    score: float
+
+
+class TablePage(BaseModel):
+    """Tables found on one page; each table is a list of rows of cells."""
+    page: int
+    tables: List[List[List[str]]]
+
+
+class DocumentTablesResponse(BaseModel):
+    """Response model for a document's extracted tables."""
+    document_id: int
+    pages: List[TablePage]
+
+
 class DocumentDetail(BaseModel):
     """Response model for document detail."""
     id: int
@@ -63,55 +189,220 @@ class DocumentDetail(BaseModel):
     upload_date: datetime
     status: str
     word_count: int
+    progress: int = 0
     extracted_text: Optional[str] = None
     error_message: Optional[str] = None
+    duplicate_of_id: Optional[int] = None
 
     class Config:
         from_attributes = True
 
 
-def validate_pdf_file(file: UploadFile) -> None:
+def validate_pdf_file(file: UploadFile) -> int:
     """
     Validate uploaded PDF file.
     
     Args:
         file: Uploaded file
         
+    Returns:
+        File size in bytes
+        
+    Raises:
+        HTTPException: If validation fails
+    """
+    # Check file size
+    # Read file to check size
+    file.file.seek(0, 2)  # Seek to end
+    file_size = file.file.tell()
+    file.file.seek(0)  # Reset to beginning
+    
+    validate_pdf_metadata(file.filename, file_size)
+    
+    return file_size
+
+
+def validate_pdf_metadata(filename: Optional[str], file_size: int) -> None:
+    """
+    Validate the name and size of a PDF upload.
+    
+    Args:
+        filename: Original filename
+        file_size: File size in bytes
+        
     Raises:
         HTTPException: If validation fails
     """
     # Check file type by extension
-    if not file.filename:
+    if not filename:
         raise HTTPException(status_code=400, detail="No filename provided")
     
-    if not file.filename.lower().endswith('.pdf'):
+    if not filename.lower().endswith('.pdf'):
         raise HTTPException(
             status_code=400,
             detail="Invalid file type. Only PDF files are allowed"
         )
     
-    # Check file size
-    # Read file to check size
-    file.file.seek(0, 2)  # Seek to end
-    file_size = file.file.tell()
-    file.file.seek(0)  # Reset to beginning
-    
     if file_size > PDF_MAX_SIZE_BYTES:
         raise HTTPException(
             status_code=413,
             detail=f"File too large. Maximum size is {PDF_MAX_SIZE_MB}MB"
         )
     
-    if file_size == 0:
+    if file_size <= 0:
         raise HTTPException(status_code=400, detail="File is empty")
 
 
+def parse_content_range(header: Optional[str], total_size: int) -> tuple[int, int]:
+    """
+    Parse a ``Content-Range: bytes start-end/total`` chunk header.
+    
+    Args:
+        header: Raw Content-Range header value
+        total_size: Declared size of the whole upload
+        
+    Returns:
+        Tuple of (start offset, end offset exclusive)
+        
+    Raises:
+        HTTPException: If the header is missing or inconsistent with the upload
+    """
+    match = CONTENT_RANGE_PATTERN.match(header or "")
+    if not match:
+        raise HTTPException(
+            status_code=400,
+            detail="Content-Range header must be 'bytes start-end/total'"
+        )
+    
+    start, end, total = (int(value) for value in match.groups())
+    if total != total_size or start > end or end >= total_size:
+        raise HTTPException(
+            status_code=416,
+            detail=f"Invalid range for an upload of {total_size} bytes"
+        )
+    
+    return start, end + 1
+
+
+def reserve_storage(db: Session, user: User, size: int, documents: int = 1) -> None:
+    """
+    Count new documents against the user's storage limit.
+    
+    Runs in the caller's transaction, so the reservation is committed or
+    rolled back together with the documents themselves.
+    
+    Args:
+        db: Database session
+        user: Owner of the new documents
+        size: Total size of the new files in bytes
+        documents: Number of new documents
+        
+    Raises:
+        HTTPException: 413 if the files do not fit in the user's limit
+    """
+    try:
+        StorageUsageTracker(db).reserve(user, size, documents)
+    except StorageQuotaExceeded as e:
+        raise HTTPException(status_code=413, detail=str(e))
+
+
+def admit_uploads(db: Session, user: User, documents: int = 1) -> None:
+    """
+    Refuse new documents while the processing backlog is full.
+    
+    Args:
+        db: Database session
+        user: Uploading user
+        documents: Number of documents in the upload
+        
+    Raises:
+        HTTPException: 429 with Retry-After if the global or the user's
+            backlog limit is reached
+    """
+    try:
+        admission_controller.check(db, user, documents)
+    except UploadRejected as e:
+        raise HTTPException(
+            status_code=429,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)}
+        )
+
+
+def get_inline_processing(request: Request) -> bool:
+    """
+    Whether this app has the worker role and processes uploads in-process.
+    
+    API-only apps leave new documents ``pending`` for worker processes to
+    pick up.
+    """
+    return WORKER_ROLE in getattr(request.app.state, "roles", ALL_ROLES)
+
+
+def enqueue_processing(background_tasks: BackgroundTasks, document_id: int, inline: bool = True) -> None:
+    """
+    Queue a document for background text extraction.
+    
+    Args:
+        background_tasks: FastAPI background tasks
+        document_id: ID of the document to process
+        inline: Process it in this process (otherwise a worker will)
+    """
+    if not inline:
+        return
+    
+    background_tasks.add_task(
+        process_document,
+        document_id,
+        SessionLocal(),
+        file_storage
+    )
+
+
+def enqueue_batches(
+    background_tasks: BackgroundTasks,
+    document_ids: List[int],
+    inline: bool = True,
+    batch_size: int = REPROCESS_BATCH_SIZE
+) -> int:
+    """
+    Queue documents for processing in batches.
+    
+    Each batch runs as one background task with its own session, so a large
+    selection neither holds one session for long nor starts a task per
+    document.
+    
+    Args:
+        background_tasks: FastAPI background tasks
+        document_ids: IDs of the documents to process
+        inline: Process them in this process (otherwise workers will)
+        batch_size: Documents per background task
+        
+    Returns:
+        Number of batches queued (0 when left to workers)
+    """
+    if not inline:
+        return 0
+    
+    batches = 0
+    for start in range(0, len(document_ids), batch_size):
+        background_tasks.add_task(
+            process_batch,
+            document_ids[start:start + batch_size],
+            SessionLocal(),
+            file_storage
+        )
+        batches += 1
+    return batches
+
+
 @router.post("/upload", response_model=UploadResponse)
 async def upload_document(
     background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
     user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    inline: bool = Depends(get_inline_processing)
 ):
     """
     Upload a PDF document for processing.
@@ -121,19 +412,25 @@ async def upload_document(
         file: PDF file to upload
         user: Current authenticated user
         db: Database session
+        inline: Whether to process the document in this process
         
     Returns:
         Upload response with document ID and status
     """
+    admit_uploads(db, user)
+    
     # Validate file
-    validate_pdf_file(file)
+    file_size = validate_pdf_file(file)
     
     try:
+        reserve_storage(db, user, file_size)
+        
         # Create document record with pending status
         document = Document(
             user_id=user.id,
             filename=file.filename,
             file_path="",  # Will be updated after saving
+            file_size=file_size,
             status="pending",
             word_count=0
         )
@@ -143,7 +440,7 @@ async def upload_document(
         
         # Save file to storage
         try:
-            file_path = file_storage.save_pdf(file, user.id, document.id)
+            file_path = content_store.save(db, file.file, user.id, document.id, file.filename)
             
             # Update document with file path
             document.file_path = file_path
@@ -151,7 +448,9 @@ async def upload_document(
             
         except Exception as e:
             # If file save fails, delete the document record
+            db.rollback()
             db.delete(document)
+            StorageUsageTracker(db).release(user.id, file_size)
             db.commit()
             raise HTTPException(
                 status_code=500,
@@ -159,14 +458,7 @@ async def upload_document(
             )
         
         # Trigger background processing
-        # Note: We need to create a new DB session for the background task
-        from database import SessionLocal
-        background_tasks.add_task(
-            process_document,
-            document.id,
-            SessionLocal(),
-            file_storage
-        )
+        enqueue_processing(background_tasks, document.id, inline)
         
         return UploadResponse(
             document_id=document.id,
@@ -184,125 +476,1076 @@ async def upload_document(
         )
 
 
-@router.get("", response_model=list[DocumentListItem])
-async def list_documents(
-    limit: Optional[int] = None,
-    offset: Optional[int] = 0,
-    user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
-):
+def collect_batch_entries(
+    files: List[UploadFile]
+) -> List[tuple[str, int, Callable[[], BinaryIO]]]:
     """
-    List all documents for the current user.
+    Expand uploaded PDFs and ZIP archives into the PDFs to store.
+    
+    Every entry is validated before anything is written, so a bad file
+    rejects the whole batch. ZIP members are not extracted here; each entry
+    carries an opener that streams it from the archive when saved.
     
     Args:
-        limit: Optional limit for pagination
-        offset: Optional offset for pagination
-        user: Current authenticated user
-        db: Database session
+        files: Uploaded PDF files and/or ZIP archives
         
     Returns:
-        List of documents
+        List of (filename, size in bytes, opener) tuples
+        
+    Raises:
+        HTTPException: If any entry is invalid or the batch is too large
     """
-    # Query documents for current user, ordered by upload_date descending
-    query = db.query(Document).filter(
-        Document.user_id == user.id
-    ).order_by(Document.upload_date.desc())
+    entries = []
     
-    # Apply pagination if specified
-    if offset:
-        query = query.offset(offset)
-    if limit:
-        query = query.limit(limit)
+    for file in files:
+        if file.filename and file.filename.lower().endswith('.zip'):
+            try:
+                archive = zipfile.ZipFile(file.file)
+            except zipfile.BadZipFile:
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Invalid ZIP archive: {file.filename}"
+                )
+            
+            for info in archive.infolist():
+                name = os.path.basename(info.filename)
+                # Skip folders, macOS resource forks and non-PDF members
+                if info.is_dir() or name.startswith('.') or not name.lower().endswith('.pdf'):
+                    continue
+                validate_pdf_metadata(name, info.file_size)
+                entries.append((
+                    name,
+                    info.file_size,
+                    lambda archive=archive, info=info: archive.open(info)
+                ))
+        else:
+            file_size = validate_pdf_file(file)
+            entries.append((file.filename, file_size, lambda file=file: file.file))
+        
+        if len(entries) > BATCH_MAX_FILES:
+            raise HTTPException(
+                status_code=413,
+                detail=f"Too many files. Maximum batch size is {BATCH_MAX_FILES} PDFs"
+            )
     
-    documents = query.all()
+    if not entries:
+        raise HTTPException(status_code=400, detail="No PDF files found in upload")
     
-    return documents
+    return entries
 
 
-@router.get("/{document_id}", response_model=DocumentDetail)
-async def get_document(
-    document_id: int,
-    user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
-):
+def parse_range_header(header: Optional[str], file_size: int) -> Optional[tuple[int, int]]:
     """
-    Get detailed information about a specific document.
+    Parse a single-range ``Range: bytes=...`` request header.
     
     Args:
-        document_id: Document ID
-        user: Current authenticated user
-        db: Database session
+        header: Raw Range header value
+        file_size: Size of the file being served
         
     Returns:
-        Document details including extracted text
+        Tuple of (start offset, end offset exclusive), or None to serve the
+        whole file (no header, or a multi-range request)
         
     Raises:
-        HTTPException: 404 if document not found, 403 if not owned by user
+        HTTPException: 416 if the range cannot be satisfied
     """
-    # Query document
-    document = db.query(Document).filter(Document.id == document_id).first()
+    if not header:
+        return None
     
-    if not document:
-        raise HTTPException(status_code=404, detail="Document not found")
+    match = RANGE_PATTERN.match(header.strip())
+    if not match:
+        # Multiple ranges are not supported; the full file is a valid reply
+        return None
     
-    # Verify document belongs to current user
-    if document.user_id != user.id:
+    first, last = match.groups()
+    if first:
+        start = int(first)
+        end = min(int(last) + 1, file_size) if last else file_size
+    elif last:
+        # Suffix range: the final N bytes
+        start = max(file_size - int(last), 0)
+        end = file_size
+    else:
+        start, end = file_size, file_size
+    
+    if start >= end:
         raise HTTPException(
-            status_code=403,
-            detail="You do not have permission to access this document"
+            status_code=416,
+            detail="Requested range not satisfiable",
+            headers={"Content-Range": f"bytes */{file_size}"}
         )
     
-    return document
+    return start, end
 
 
-@router.delete("/{document_id}", status_code=204)
-async def delete_document(
-    document_id: int,
-    user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
-):
+def is_not_modified(header: Optional[str], modified_time: float) -> bool:
     """
-    Delete a document and its associated file.
+    Check an ``If-Modified-Since`` header against a file's mtime.
     
     Args:
-        document_id: Document ID
-        user: Current authenticated user
-        db: Database session
+        header: Raw If-Modified-Since header value
+        modified_time: File modification time (POSIX timestamp)
         
     Returns:
-        204 No Content on success
-        
+        True if the client's copy is still current
+    """
+    if not header:
+        return False
+    
+    try:
+        since = parsedate_to_datetime(header)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        # "-0000" dates parse as naive, but are UTC like "GMT" ones
+        since = since.replace(tzinfo=timezone.utc)
+    
+    # HTTP dates have one-second resolution
+    return int(modified_time) <= since.timestamp()
+
+
+def content_disposition(filename: str) -> str:
+    """Build an inline Content-Disposition header value for a filename."""
+    quoted = quote(filename)
+    if quoted != filename:
+        return f"inline; filename*=utf-8''{quoted}"
+    return f'inline; filename="{filename}"'
+
+
+def get_user_document(document_id: int, user: User, db: Session) -> Document:
+    """
+    Load a document owned by the current user.
+    
+    Documents being deleted are treated as already gone.
+    
     Raises:
         HTTPException: 404 if document not found, 403 if not owned by user
     """
     # Query document
     document = db.query(Document).filter(Document.id == document_id).first()
     
-    if not document:
+    if not document or document.status == DELETING_STATUS:
         raise HTTPException(status_code=404, detail="Document not found")
     
     # Verify document belongs to current user
     if document.user_id != user.id:
         raise HTTPException(
             status_code=403,
-            detail="You do not have permission to delete this document"
+            detail="You do not have permission to access this document"
         )
     
-    # Delete file from storage
+    return document
+
+
+def run_document_purge() -> None:
+    """Purge documents marked for deletion (background task)."""
     try:
-        file_storage.delete_pdf(document.file_path)
-    except FileNotFoundError:
-        # File already deleted or never existed, continue with database deletion
-        pass
+        document_purger.run_once()
     except Exception as e:
-        # Log error but continue with database deletion
-        print(f"Warning: Failed to delete file {document.file_path}: {e}")
+        print(f"Purge run failed: {e}")
+
+
+def get_upload_session(upload_id: int, user: User, db: Session) -> UploadSession:
+    """
+    Load an upload session owned by the current user.
+    
+    Raises:
+        HTTPException: 404 if session not found, 403 if not owned by user
+    """
+    upload = db.query(UploadSession).filter(UploadSession.id == upload_id).first()
+    
+    if not upload:
+        raise HTTPException(status_code=404, detail="Upload session not found")
+    
+    if upload.user_id != user.id:
+        raise HTTPException(
+            status_code=403,
+            detail="You do not have permission to access this upload"
+        )
+    
+    return upload
+
+
+def claim_chunk(db: Session, upload: UploadSession, start: int) -> str:
+    """
+    Claim an upload for writing the chunk at an offset.
+    
+    Only one request at a time holds the claim, so the partial file is
+    touched by a single writer. A claim left by a crashed request expires
+    after UPLOAD_CHUNK_LEASE_SECONDS.
     
-    # Delete document record from database
-    db.delete(document)
+    Returns:
+        Token identifying the claim
+        
+    Raises:
+        HTTPException: 409 if the offset moved or another chunk is being written
+    """
+    now = datetime.utcnow()
+    token = uuid.uuid4().hex
+    claimed = db.query(UploadSession).filter(
+        UploadSession.id == upload.id,
+        UploadSession.received_size == start,
+        or_(UploadSession.writer_token.is_(None), UploadSession.writer_expires_at < now)
+    ).update({
+        UploadSession.writer_token: token,
+        UploadSession.writer_expires_at: now + timedelta(seconds=UPLOAD_CHUNK_LEASE_SECONDS)
+    }, synchronize_session=False)
     db.commit()
     
-    return None
+    if not claimed:
+        db.refresh(upload)
+        if upload.received_size != start:
+            raise HTTPException(
+                status_code=409,
+                detail=f"Chunk must start at offset {upload.received_size}"
+            )
+        raise HTTPException(
+            status_code=409,
+            detail="Another chunk of this upload is being written"
+        )
+    return token
+
+
+def release_chunk(db: Session, upload: UploadSession, token: str) -> None:
+    """Give up a chunk claim without advancing the upload."""
+    db.rollback()
+    db.query(UploadSession).filter(
+        UploadSession.id == upload.id,
+        UploadSession.writer_token == token
+    ).update({
+        UploadSession.writer_token: None,
+        UploadSession.writer_expires_at: None
+    }, synchronize_session=False)
+    db.commit()
+
+
+def to_upload_session_response(upload: UploadSession) -> UploadSessionResponse:
+    """Build the API response for an upload session."""
+    return UploadSessionResponse(
+        upload_id=upload.id,
+        filename=upload.filename,
+        total_size=upload.total_size,
+        offset=upload.received_size,
+        chunk_size=UPLOAD_CHUNK_SIZE_BYTES
+    )
+
+
+@router.post("/uploads", response_model=UploadSessionResponse, status_code=201)
+async def create_upload_session(
+    data: UploadSessionCreate,
+    user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Start a resumable upload.
+    
+    The client then PUTs byte ranges to ``/uploads/{upload_id}`` with a
+    ``Content-Range`` header, and calls ``/uploads/{upload_id}/complete``
+    once ``offset`` reaches ``total_size``.
+    """
+    validate_pdf_metadata(data.filename, data.total_size)
+    
+    # Fail early; the limits are enforced when the upload completes
+    if not StorageUsageTracker(db).has_room(user, data.total_size):
+        raise HTTPException(status_code=413, detail="Storage limit exceeded")
+    admit_uploads(db, user)
+    
+    upload = UploadSession(
+        user_id=user.id,
+        filename=data.filename,
+        file_path="",  # Will be updated once the partial file exists
+        total_size=data.total_size,
+        received_size=0
+    )
+    db.add(upload)
+    db.flush()
+    
+    try:
+        upload.file_path = file_storage.create_partial(upload.id)
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to create upload: {str(e)}"
+        )
+    
+    db.commit()
+    db.refresh(upload)
+    
+    return to_upload_session_response(upload)
 
 
+@router.get("/uploads/{upload_id}", response_model=UploadSessionResponse)
+async def get_upload_session_status(
+    upload_id: int,
+    user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Get the offset a client should resume an interrupted upload from."""
+    upload = get_upload_session(upload_id, user, db)
+    return to_upload_session_response(upload)
+
 
+@router.put("/uploads/{upload_id}", response_model=UploadSessionResponse)
+async def upload_chunk(
+    upload_id: int,
+    request: Request,
+    user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Append a byte range to a resumable upload.
+    
+    The request body is streamed straight into the partial file. A chunk
+    must start exactly at the current offset; anything else gets a 409 with
+    the offset to resume from. The upload is claimed before the file is
+    opened, so concurrent PUTs never write to it at the same time.
+    """
+    upload = get_upload_session(upload_id, user, db)
+    start, end = parse_content_range(
+        request.headers.get("content-range"),
+        upload.total_size
+    )
+    
+    if end - start > UPLOAD_MAX_CHUNK_SIZE_BYTES:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Chunks may be at most {UPLOAD_MAX_CHUNK_SIZE_MB}MB"
+        )
+    
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > end - start:
+        raise HTTPException(
+            status_code=400,
+            detail="Chunk body is larger than its Content-Range"
+        )
+    
+    if start != upload.received_size:
+        raise HTTPException(
+            status_code=409,
+            detail=f"Chunk must start at offset {upload.received_size}"
+        )
+    
+    token = claim_chunk(db, upload, start)
+    
+    try:
+        written = 0
+        with file_storage.open_partial(upload.file_path, start) as buffer:
+            async for chunk in request.stream():
+                written += len(chunk)
+                if written > end - start:
+                    raise HTTPException(
+                        status_code=400,
+                        detail="Chunk body is larger than its Content-Range"
+                    )
+                buffer.write(chunk)
+        
+        if written != end - start:
+            raise HTTPException(
+                status_code=400,
+                detail="Chunk body does not match its Content-Range"
+            )
+    except BaseException:
+        release_chunk(db, upload, token)
+        raise
+    
+    # Only the claim holder advances the offset; a claim that expired and
+    # was taken over no longer matches
+    updated = db.query(UploadSession).filter(
+        UploadSession.id == upload.id,
+        UploadSession.received_size == start,
+        UploadSession.writer_token == token
+    ).update({
+        UploadSession.received_size: end,
+        UploadSession.writer_token: None,
+        UploadSession.writer_expires_at: None
+    }, synchronize_session=False)
+    db.commit()
+    
+    if not updated:
+        db.refresh(upload)
+        raise HTTPException(
+            status_code=409,
+            detail=f"Chunk must start at offset {upload.received_size}"
+        )
+    
+    db.refresh(upload)
+    return to_upload_session_response(upload)
+
+
+@router.post("/uploads/{upload_id}/complete", response_model=UploadResponse)
+async def complete_upload(
+    upload_id: int,
+    background_tasks: BackgroundTasks,
+    user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+    inline: bool = Depends(get_inline_processing)
+):
+    """
+    Finalize a resumable upload and queue the document for processing.
+    
+    The document record is only created here, once every byte has arrived.
+    """
+    upload = get_upload_session(upload_id, user, db)
+    
+    if upload.received_size != upload.total_size:
+        raise HTTPException(
+            status_code=409,
+            detail=f"Upload incomplete: received {upload.received_size} of {upload.total_size} bytes"
+        )
+    
+    admit_uploads(db, user)
+    reserve_storage(db, user, upload.total_size)
+    
+    document = Document(
+        user_id=user.id,
+        filename=upload.filename,
+        file_path="",  # Will be updated after moving the file
+        file_size=upload.total_size,
+        status="pending",
+        word_count=0
+    )
+    db.add(document)
+    db.flush()
+    
+    try:
+        file_path = content_store.save_partial(
+            db,
+            upload.file_path,
+            user.id,
+            document.id,
+            upload.filename
+        )
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to save file: {str(e)}"
+        )
+    
+    document.file_path = file_path
+    upload_id = upload.id
+    db.delete(upload)
+    try:
+        db.commit()
+    except Exception:
+        # The partial file has been moved, so the session cannot be
+        # completed again; remove both rather than leave them behind
+        db.rollback()
+        discard_completed_upload(db, upload_id, file_path)
+        raise HTTPException(
+            status_code=500,
+            detail="Failed to save file; please upload it again"
+        )
+    
+    enqueue_processing(background_tasks, document.id, inline)
+    
+    return UploadResponse(
+        document_id=document.id,
+        status=document.status,
+        message="Document uploaded successfully and queued for processing"
+    )
+
+
+def discard_completed_upload(db: Session, upload_id: int, file_path: str) -> None:
+    """Remove the stored file and session of an upload whose completion was rolled back."""
+    try:
+        try:
+            content_store.discard(db, file_path)
+        except FileNotFoundError:
+            pass
+        db.query(UploadSession).filter(UploadSession.id == upload_id).delete(synchronize_session=False)
+        db.commit()
+    except Exception as e:
+        # Left for the reconciler and the upload expiry
+        db.rollback()
+        print(f"Warning: Failed to discard upload {upload_id}: {e}")
+
+
+@router.delete("/uploads/{upload_id}", status_code=204)
+async def abort_upload(
+    upload_id: int,
+    user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Abort a resumable upload and discard the bytes received so far.
+    
+    Returns 409 while a chunk is being written, like a second chunk would.
+    """
+    upload = get_upload_session(upload_id, user, db)
+    claim_chunk(db, upload, upload.received_size)
+    
+    try:
+        file_storage.delete_pdf(upload.file_path)
+    except FileNotFoundError:
+        pass
+    
+    db.delete(upload)
+    db.commit()
+    
+    return None
+
+
+def discard_stored_files(db: Session, file_paths: List[str]) -> None:
+    """
+    Remove the files of a batch whose transaction was rolled back.
+    
+    Blobs other documents still reference are kept; each file is undone
+    in a savepoint, so one failure does not keep the others.
+    """
+    for file_path in file_paths:
+        try:
+            with db.begin_nested():
+                content_store.discard(db, file_path)
+        except FileNotFoundError:
+            pass  # Already removed, e.g. the same blob earlier in the batch
+        except Exception as e:
+            print(f"Warning: Failed to delete file {file_path}: {e}")
+    db.commit()
+
+
+@router.post("/batch", response_model=BatchUploadResponse)
+async def upload_batch(
+    background_tasks: BackgroundTasks,
+    files: List[UploadFile] = File(...),
+    user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+    inline: bool = Depends(get_inline_processing)
+):
+    """
+    Upload many PDFs at once, as separate files and/or ZIP archives.
+    
+    All document records are inserted together and committed once, and the
+    batch is processed by a single background task. Poll
+    ``/batch/{batch_id}`` for aggregate progress.
+    """
+    entries = collect_batch_entries(files)
+    admit_uploads(db, user, len(entries))
+    
+    # One usage update for the whole batch
+    reserve_storage(db, user, sum(size for _, size, _ in entries), len(entries))
+    
+    batch = DocumentBatch(user_id=user.id, document_count=len(entries))
+    db.add(batch)
+    db.flush()
+    
+    documents = [
+        Document(
+            user_id=user.id,
+            batch_id=batch.id,
+            filename=filename,
+            file_path="",  # Will be updated after saving
+            file_size=size,
+            status="pending",
+            word_count=0
+        )
+        for filename, size, _ in entries
+    ]
+    # Flushed together as one multi-row INSERT
+    db.add_all(documents)
+    db.flush()
+    
+    saved_paths = []
+    try:
+        for document, (_, _, open_source) in zip(documents, entries):
+            with open_source() as source:
+                document.file_path = content_store.save(
+                    db,
+                    source,
+                    user.id,
+                    document.id,
+                    document.filename,
+                    max_bytes=PDF_MAX_SIZE_BYTES
+                )
+            saved_paths.append(document.file_path)
+        
+        # Read IDs before commit expires the instances
+        batch_id = batch.id
+        document_ids = [document.id for document in documents]
+        db.commit()
+        
+    except Exception as e:
+        db.rollback()
+        discard_stored_files(db, saved_paths)
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to save batch: {str(e)}"
+        )
+    
+    if inline:
+        background_tasks.add_task(
+            process_batch,
+            document_ids,
+            SessionLocal(),
+            file_storage
+        )
+    
+    return BatchUploadResponse(
+        batch_id=batch_id,
+        document_ids=document_ids,
+        status="pending",
+        message=f"{len(document_ids)} documents uploaded and queued for processing"
+    )
+
+
+@router.get("/batch/{batch_id}", response_model=BatchStatusResponse)
+async def get_batch_status(
+    batch_id: int,
+    user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Get aggregate processing progress for a batch upload.
+    
+    Raises:
+        HTTPException: 404 if batch not found, 403 if not owned by user
+    """
+    batch = db.query(DocumentBatch).filter(DocumentBatch.id == batch_id).first()
+    
+    if not batch:
+        raise HTTPException(status_code=404, detail="Batch not found")
+    
+    if batch.user_id != user.id:
+        raise HTTPException(
+            status_code=403,
+            detail="You do not have permission to access this batch"
+        )
+    
+    rows = db.query(Document.status, func.count(Document.id)).filter(
+        Document.batch_id == batch.id,
+        Document.status != DELETING_STATUS
+    ).group_by(Document.status).all()
+    
+    status_counts = {status: count for status, count in rows}
+    total = sum(status_counts.values())
+    finished = status_counts.get("completed", 0) + status_counts.get("failed", 0)
+    
+    return BatchStatusResponse(
+        batch_id=batch.id,
+        total=total,
+        status_counts=status_counts,
+        progress=finished / total if total else 1.0
+    )
+
+
+@router.get("/summary", response_model=DocumentSummary)
+async def get_document_summary(
+    recent: int = 5,
+    user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Get library statistics for the current user without listing documents.
+    
+    Counts, word totals and the latest change time come from one grouped
+    query over the user's rows of ``idx_documents_user_status``; only the
+    ``recent`` newest documents are loaded. Clients can poll this and
+    refetch the list only when ``total`` or ``last_updated`` changes.
+    
+    Args:
+        recent: Number of most recent documents to include (at most 20)
+        user: Current authenticated user
+        db: Database session
+        
+    Returns:
+        Counts by status, total words and the most recent documents
+    """
+    rows = db.query(
+        Document.status,
+        func.count(Document.id),
+        func.coalesce(func.sum(Document.word_count), 0),
+        func.max(Document.updated_at)
+    ).filter(
+        Document.user_id == user.id,
+        Document.status != DELETING_STATUS
+    ).group_by(Document.status).all()
+    
+    status_counts = {status: count for status, count, _, _ in rows}
+    updates = [updated_at for _, _, _, updated_at in rows if updated_at is not None]
+    
+    recent_documents = db.query(Document).filter(
+        Document.user_id == user.id,
+        Document.status != DELETING_STATUS
+    ).order_by(Document.upload_date.desc()).limit(max(0, min(recent, 20))).all()
+    
+    return DocumentSummary(
+        total=sum(status_counts.values()),
+        status_counts=status_counts,
+        total_words=sum(words for _, _, words, _ in rows),
+        last_updated=max(updates) if updates else None,
+        recent=recent_documents
+    )
+
+
+@router.get("/changes", response_model=DocumentChanges)
+async def get_document_changes(
+    since: Optional[str] = None,
+    limit: int = 200,
+    user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Get the documents created, updated or deleted since a sync token.
+    
+    Clients keep ``next_token`` and send it as ``since`` on their next
+    refresh, then upsert ``changed`` and remove ``deleted`` locally. Without
+    ``since`` the whole library is returned. Call again straight away while
+    ``has_more`` is true.
+    
+    Args:
+        since: Token from the previous response
+        limit: Maximum changed (and deleted) documents per response
+        user: Current authenticated user
+        db: Database session
+        
+    Returns:
+        Changed documents, deleted document IDs and the next token
+        
+    Raises:
+        HTTPException: 400 if the token is invalid, 410 if it is too old
+            and the client must reload the full library
+    """
+    try:
+        changes = ChangeFeed(db).changes_since(
+            user.id,
+            since,
+            limit=min(max(limit, 1), MAX_PAGE_SIZE)
+        )
+    except ChangeTokenExpired as e:
+        raise HTTPException(status_code=410, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    return DocumentChanges(
+        changed=changes.changed,
+        deleted=changes.deleted,
+        next_token=changes.token,
+        has_more=changes.has_more
+    )
+
+
+@router.get("/export")
+async def export_documents(
+    format: str = "ndjson",
+    user: User = Depends(get_current_user)
+):
+    """
+    Download every document with its extracted text in one response.
+    
+    ``ndjson`` streams one JSON object per line; ``zip`` streams an archive
+    with one text file per document. The body is sent with chunked
+    transfer encoding as rows are read, so memory use is constant and the
+    download starts at once.
+    
+    Args:
+        format: "ndjson" or "zip"
+        user: Current authenticated user
+        
+    Returns:
+        Streaming download of the library
+        
+    Raises:
+        HTTPException: 400 if the format is not supported
+    """
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unsupported export format. Use one of: {', '.join(EXPORT_FORMATS)}"
+        )
+    
+    if format == "zip":
+        body, media_type = library_exporter.iter_zip(user.id), "application/zip"
+    else:
+        body, media_type = library_exporter.iter_ndjson(user.id), "application/x-ndjson"
+    
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="documents.{format}"'}
+    )
+
+
+@router.get("", response_model=list[DocumentListItem])
+async def list_documents(
+    response: Response,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    List the current user's documents, newest first, one page at a time.
+    
+    Pages are keyset-paginated on (upload_date, id); the cursor for the next
+    page is returned in the X-Next-Cursor header, which is absent on the
+    last page. The first page also carries an X-Sync-Token header for
+    ``/changes``.
+    
+    Args:
+        response: Response (for the next-page cursor header)
+        limit: Page size (defaults to DEFAULT_PAGE_SIZE)
+        cursor: Cursor from the previous page
+        user: Current authenticated user
+        db: Database session
+        
+    Returns:
+        List of documents
+    """
+    query = db.query(Document).filter(
+        Document.user_id == user.id,
+        Document.status != DELETING_STATUS
+    )
+    
+    documents, next_cursor = paginate(
+        query,
+        Document.id,
+        cursor=cursor,
+        limit=limit,
+        sort_column=Document.upload_date
+    )
+    set_next_cursor(response, next_cursor)
+    if not cursor:
+        # Lets the client keep the list current through /changes
+        response.headers[SYNC_TOKEN_HEADER] = ChangeFeed(db).current_token()
+    
+    return documents
+
+
+@router.get("/{document_id}", response_model=DocumentDetail)
+async def get_document(
+    document_id: int,
+    user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Get detailed information about a specific document.
+    
+    Args:
+        document_id: Document ID
+        user: Current authenticated user
+        db: Database session
+        
+    Returns:
+        Document details including extracted text
+        
+    Raises:
+        HTTPException: 404 if document not found, 403 if not owned by user
+    """
+    return get_user_document(document_id, user, db)
+
+
+@router.get("/{document_id}/related", response_model=list[RelatedDocument])
+async def get_related_documents(
+    document_id: int,
+    limit: int = 5,
+    user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Get the documents in the user's library most similar to a document.
+    
+    Similarity is the cosine of the documents' TF-IDF vectors, built when
+    processing completes. Documents still processing have no related ones.
+    
+    Args:
+        document_id: Document ID
+        limit: Maximum number of documents to return (at most 20)
+        user: Current authenticated user
+        db: Database session
+        
+    Returns:
+        Related documents with their similarity score, most similar first
+        
+    Raises:
+        HTTPException: 404 if document not found, 403 if not owned by user
+    """
+    document = get_user_document(document_id, user, db)
+    related = RelatedDocumentIndex(db).related(document, limit=max(1, min(limit, 20)))
+    
+    return [
+        RelatedDocument(
+            id=related_document.id,
+            filename=related_document.filename,
+            upload_date=related_document.upload_date,
+            word_count=related_document.word_count,
+            score=round(score, 4)
+        )
+        for related_document, score in related
+    ]
+
+
+@router.get("/{document_id}/tables", response_model=DocumentTablesResponse)
+async def get_document_tables(
+    document_id: int,
+    user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Get the tables found in a document, page by page.
+    
+    Requires the ``pdf_tables`` feature. Tables are extracted from the PDF
+    on the first request (off the event loop) and cached, so only the
+    first call is slow.
+    
+    Args:
+        document_id: Document ID
+        user: Current authenticated user
+        db: Database session
+        
+    Returns:
+        Pages that have tables, with their rows of cells
+        
+    Raises:
+        HTTPException: 403 if the user's tier lacks the feature or the
+            document is not theirs, 404 if not found, 409 if the document
+            has not finished processing, 500 if the PDF cannot be read
+    """
+    require_feature("pdf_tables", user, db)
+    document = get_user_document(document_id, user, db)
+    
+    if document.status != "completed":
+        raise HTTPException(status_code=409, detail="Document has not finished processing")
+    
+    try:
+        pages = await run_in_threadpool(DocumentTableCache(db, file_storage).get_tables, document)
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to extract tables: {str(e)}"
+        )
+    
+    return DocumentTablesResponse(document_id=document.id, pages=pages)
+
+
+@router.get("/{document_id}/file")
+async def download_document_file(
+    document_id: int,
+    request: Request,
+    user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Download the original uploaded PDF.
+    
+    Supports single byte ranges (206 Partial Content) and If-Modified-Since
+    (304). With PDF_ACCEL_REDIRECT_PREFIX set, the transfer is delegated to
+    nginx, which handles ranges and conditional requests itself.
+    
+    Raises:
+        HTTPException: 404 if document or file not found, 403 if not owned
+            by user, 416 if the range cannot be satisfied
+    """
+    document = get_user_document(document_id, user, db)
+    
+    # nginx only serves the local base upload directory; other roots stream from here
+    if (
+        PDF_ACCEL_REDIRECT_PREFIX
+        and PDF_STORAGE_BACKEND == "local"
+        and not document.file_path.startswith(SHARD_PATH_PREFIX)
+    ):
+        return Response(
+            media_type="application/pdf",
+            headers={
+                "X-Accel-Redirect": PDF_ACCEL_REDIRECT_PREFIX + quote(document.file_path),
+                "Content-Disposition": content_disposition(document.filename)
+            }
+        )
+    
+    try:
+        stat_result = file_storage.stat(document.file_path)
+        file_path = file_storage.local_path(document.file_path)
+    except (ValueError, OSError):
+        raise HTTPException(status_code=404, detail="Original file not found")
+    
+    headers = {
+        "Accept-Ranges": "bytes",
+        "Last-Modified": formatdate(stat_result.mtime, usegmt=True)
+    }
+    
+    if is_not_modified(request.headers.get("if-modified-since"), stat_result.mtime):
+        return Response(status_code=304, headers=headers)
+    
+    byte_range = parse_range_header(request.headers.get("range"), stat_result.size)
+    if byte_range is None and file_path is not None:
+        return FileResponse(
+            file_path,
+            media_type="application/pdf",
+            headers={"Accept-Ranges": "bytes"},
+            filename=document.filename,
+            content_disposition_type="inline"
+        )
+    
+    # Remote backends stream the whole file through the same path as ranges
+    start, end = byte_range or (0, stat_result.size)
+    headers.update({
+        "Content-Length": str(end - start),
+        "Content-Disposition": content_disposition(document.filename)
+    })
+    if byte_range is not None:
+        headers["Content-Range"] = f"bytes {start}-{end - 1}/{stat_result.size}"
+    return StreamingResponse(
+        file_storage.iter_range(document.file_path, start, end),
+        status_code=206 if byte_range is not None else 200,
+        media_type="application/pdf",
+        headers=headers
+    )
+
+
+@router.delete("/{document_id}", status_code=204)
+async def delete_document(
+    document_id: int,
+    background_tasks: BackgroundTasks,
+    user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Delete a document and its associated file.
+    
+    The document is marked as deleting and disappears from the API at
+    once; its file and row are removed by the background purger.
+    
+    Args:
+        document_id: Document ID
+        background_tasks: FastAPI background tasks
+        user: Current authenticated user
+        db: Database session
+        
+    Returns:
+        204 No Content on success
+        
+    Raises:
+        HTTPException: 404 if document not found, 403 if not owned by user
+    """
+    # Query document
+    document = db.query(Document).filter(Document.id == document_id).first()
+    
+    if not document or document.status == DELETING_STATUS:
+        raise HTTPException(status_code=404, detail="Document not found")
+    
+    # Verify document belongs to current user
+    if document.user_id != user.id:
+        raise HTTPException(
+            status_code=403,
+            detail="You do not have permission to delete this document"
+        )
+    
+    # Conditional so that concurrent deletes release the usage only once
+    marked = db.query(Document).filter(
+        Document.id == document.id,
+        Document.status != DELETING_STATUS
+    ).update({
+        Document.status: DELETING_STATUS,
+        Document.updated_at: datetime.utcnow()
+    }, synchronize_session=False)
+    if not marked:
+        raise HTTPException(status_code=404, detail="Document not found")
+    restamp_on_commit(db, Document, Document.id == document.id)
+    
+    StorageUsageTracker(db).release(user.id, document.file_size, document.page_count)
+    ChangeFeed(db).record_deletions(user.id, [document.id])
+    db.commit()
+    
+    background_tasks.add_task(run_document_purge)
+    
+    return None
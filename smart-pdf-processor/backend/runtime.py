@@ -0,0 +1,127 @@
+"""
+Process-wide services shared by the API and workers, and the background
+work each role runs.
+
+A process has one or both roles: ``api`` serves HTTP, ``worker`` processes
+documents and runs the purge and retry loops. Nothing here imports the web
+framework, so worker-only processes (see worker.py) do not load it.
+"""
+
+import os
+import threading
+from typing import Dict, Sequence, Tuple
+
+from database import SessionLocal
+from services.change_feed import TOMBSTONE_RETENTION_DAYS
+from services.content_store import ContentStore
+from services.document_purger import DocumentPurger, start_purge_thread
+from services.document_worker import DocumentWorker, start_worker_thread
+from services.file_storage import FileStorage, parse_storage_roots
+from services.retry_scheduler import RetryScheduler, start_retry_thread
+from services.storage_backends import create_s3_backend
+
+API_ROLE = "api"
+WORKER_ROLE = "worker"
+ALL_ROLES = (API_ROLE, WORKER_ROLE)
+
+# Configuration
+PDF_UPLOAD_DIR = os.getenv("PDF_UPLOAD_DIR", "uploads")
+# "user" ({user_id}/...) or "hashed" (two-level hashed fan-out)
+PDF_STORAGE_LAYOUT = os.getenv("PDF_STORAGE_LAYOUT", "user")
+# Extra volumes as "name=/path,name2=/path2"; files are spread by consistent hashing
+PDF_STORAGE_ROOTS = parse_storage_roots(os.getenv("PDF_STORAGE_ROOTS", ""))
+# "local" keeps files in PDF_UPLOAD_DIR; "s3" stores them in an S3-compatible bucket
+PDF_STORAGE_BACKEND = os.getenv("PDF_STORAGE_BACKEND", "local")
+PDF_S3_BUCKET = os.getenv("PDF_S3_BUCKET", "")
+PDF_S3_ENDPOINT_URL = os.getenv("PDF_S3_ENDPOINT_URL") or None
+PDF_S3_PREFIX = os.getenv("PDF_S3_PREFIX", "")
+# Store identical uploads once, keyed by SHA-256, with reference counting
+PDF_CONTENT_ADDRESSED = os.getenv("PDF_CONTENT_ADDRESSED", "false").lower() == "true"
+
+# Deleted documents are removed by a background purger in batches of this size
+PURGE_BATCH_SIZE = int(os.getenv("PURGE_BATCH_SIZE", "100"))
+# How often the purger looks for leftover work (0 disables the loop)
+PURGE_INTERVAL_SECONDS = float(os.getenv("PURGE_INTERVAL_SECONDS", "30"))
+# Resumable uploads without a chunk for this long are expired by the purger
+UPLOAD_SESSION_TTL_HOURS = float(os.getenv("UPLOAD_SESSION_TTL_HOURS", "24"))
+# How often documents waiting for a retry are checked (0 disables retries)
+RETRY_INTERVAL_SECONDS = float(os.getenv("RETRY_INTERVAL_SECONDS", "15"))
+RETRY_BATCH_SIZE = int(os.getenv("RETRY_BATCH_SIZE", "50"))
+# How often an idle worker polls for pending documents (0 disables polling)
+WORKER_POLL_INTERVAL_SECONDS = float(os.getenv("WORKER_POLL_INTERVAL_SECONDS", "2"))
+WORKER_BATCH_SIZE = int(os.getenv("WORKER_BATCH_SIZE", "10"))
+# In processes that also serve the API, uploads are processed in-process
+# and the worker only takes pending documents older than this
+WORKER_PENDING_GRACE_SECONDS = float(os.getenv("WORKER_PENDING_GRACE_SECONDS", "60"))
+
+# File storage shared by the API, workers and maintenance scripts, so all
+# of them resolve paths on the same backend
+file_storage = FileStorage(
+    base_upload_dir=PDF_UPLOAD_DIR,
+    layout=PDF_STORAGE_LAYOUT,
+    shard_roots=PDF_STORAGE_ROOTS,
+    backend=(
+        create_s3_backend(PDF_S3_BUCKET, PDF_S3_ENDPOINT_URL, PDF_S3_PREFIX)
+        if PDF_STORAGE_BACKEND == "s3" else None
+    )
+)
+content_store = ContentStore(file_storage, enabled=PDF_CONTENT_ADDRESSED)
+document_purger = DocumentPurger(
+    SessionLocal,
+    content_store,
+    batch_size=PURGE_BATCH_SIZE,
+    tombstone_retention_days=TOMBSTONE_RETENTION_DAYS,
+    upload_ttl_hours=UPLOAD_SESSION_TTL_HOURS
+)
+retry_scheduler = RetryScheduler(SessionLocal, file_storage, batch_size=RETRY_BATCH_SIZE)
+document_worker = DocumentWorker(SessionLocal, file_storage, batch_size=WORKER_BATCH_SIZE)
+
+
+def parse_roles(value: str) -> Tuple[str, ...]:
+    """
+    Parse a comma-separated role list such as ``"api,worker"``.
+
+    Raises:
+        ValueError: If a role is unknown or none is given
+    """
+    roles = tuple(dict.fromkeys(role.strip() for role in value.split(",") if role.strip()))
+    unknown = set(roles) - set(ALL_ROLES)
+    if unknown or not roles:
+        raise ValueError(f"Roles must be a non-empty subset of {', '.join(ALL_ROLES)}, got {value!r}")
+    return roles
+
+
+def start_background_work(roles: Sequence[str]) -> Dict[str, threading.Event]:
+    """
+    Start the background loops of the worker role.
+
+    Args:
+        roles: Roles of this process
+
+    Returns:
+        Stop events of the started loops by name (empty without the
+        worker role)
+    """
+    if WORKER_ROLE not in roles:
+        return {}
+
+    # API processes queue their own uploads in-process
+    document_worker.pending_grace_seconds = WORKER_PENDING_GRACE_SECONDS if API_ROLE in roles else 0
+
+    stops = {}
+    # Remove deleted documents and users left over from earlier runs, and
+    # keep doing so periodically
+    if PURGE_INTERVAL_SECONDS > 0:
+        stops["purge"] = start_purge_thread(document_purger, PURGE_INTERVAL_SECONDS)
+    # Retry documents whose processing failed for a transient reason
+    if RETRY_INTERVAL_SECONDS > 0:
+        stops["retry"] = start_retry_thread(retry_scheduler, RETRY_INTERVAL_SECONDS)
+    if WORKER_POLL_INTERVAL_SECONDS > 0:
+        stops["worker"] = start_worker_thread(document_worker, WORKER_POLL_INTERVAL_SECONDS)
+    return stops
+
+
+def stop_background_work(stops: Dict[str, threading.Event]) -> None:
+    """Signal the loops started by start_background_work to stop."""
+    for stop in stops.values():
+        stop.set()
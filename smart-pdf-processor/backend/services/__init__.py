@@ -2,7 +2,21 @@
 
 from .pdf_extractor import PDFExtractor
 from .word_limiter import WordLimiter
+from .storage_usage import StorageUsageTracker
+from .related_documents import RelatedDocumentIndex
+from .near_duplicates import NearDuplicateIndex
 from .file_storage import FileStorage
-from .pdf_processor import PDFProcessor, process_document
+from .storage_backends import StorageBackend, LocalBackend, MemoryBackend, S3Backend
+from .pdf_processor import PDFProcessor, process_document, process_batch
+from .storage_reconciler import StorageReconciler
+from .content_store import ContentStore
+from .document_purger import DocumentPurger
+from .change_feed import ChangeFeed
+from .feed_stamps import restamp_on_commit
+from .library_export import LibraryExporter
+from .table_cache import DocumentTableCache
+from .retry_scheduler import RetryScheduler
+from .admission_control import AdmissionController
+from .document_worker import DocumentWorker
 
-__all__ = ['PDFExtractor', 'WordLimiter', 'FileStorage', 'PDFProcessor', 'process_document']
+__all__ = ['PDFExtractor', 'WordLimiter', 'StorageUsageTracker', 'RelatedDocumentIndex', 'NearDuplicateIndex', 'FileStorage', 'StorageBackend', 'LocalBackend', 'MemoryBackend', 'S3Backend', 'PDFProcessor', 'process_document', 'process_batch', 'StorageReconciler', 'ContentStore', 'DocumentPurger', 'ChangeFeed', 'restamp_on_commit', 'LibraryExporter', 'DocumentTableCache', 'RetryScheduler', 'AdmissionController', 'DocumentWorker']
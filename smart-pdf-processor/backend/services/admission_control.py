@@ -0,0 +1,236 @@
+"""Queue-depth aware admission control for uploads."""
+
+import math
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Deque, Optional, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from models import Document, User
+from services.metrics import metrics
+from services.work_queue import work_set
+
+# How far back the drain rate is measured, and how often it is sampled
+DRAIN_WINDOW_SECONDS = float(os.getenv("DRAIN_WINDOW_SECONDS", "300"))
+DRAIN_SAMPLE_SECONDS = float(os.getenv("DRAIN_SAMPLE_SECONDS", "5"))
+# Bounds on the Retry-After sent with rejected uploads
+RETRY_AFTER_MIN_SECONDS = int(os.getenv("RETRY_AFTER_MIN_SECONDS", "5"))
+RETRY_AFTER_MAX_SECONDS = int(os.getenv("RETRY_AFTER_MAX_SECONDS", "3600"))
+# Retry-After while the drain rate is not measured yet
+RETRY_AFTER_DEFAULT_SECONDS = int(os.getenv("RETRY_AFTER_DEFAULT_SECONDS", "60"))
+
+# Statuses of documents waiting for or undergoing text extraction
+BACKLOG_STATUSES = ("pending", "processing", "partial", "retrying")
+# Statuses of documents that have left the backlog
+FINISHED_STATUSES = ("completed", "failed")
+
+
+class UploadRejected(Exception):
+    """Raised when the processing backlog is too deep to accept more uploads."""
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class DrainRateEstimator:
+    """
+    Estimates how many documents per second leave the processing backlog.
+
+    Workers may run in other processes, so instead of counting completions
+    the estimator samples two cheap database values: the backlog size and
+    the highest document id. Over the window, documents that arrived
+    (growth of the highest id) minus growth of the backlog is what was
+    drained.
+    """
+
+    def __init__(self, window_seconds: float = DRAIN_WINDOW_SECONDS, sample_seconds: float = DRAIN_SAMPLE_SECONDS):
+        """
+        Initialize the estimator.
+
+        Args:
+            window_seconds: Age of the oldest sample kept
+            sample_seconds: Minimum time between samples
+        """
+        self.window_seconds = window_seconds
+        self.sample_seconds = sample_seconds
+        self._samples: Deque[Tuple[float, int, int]] = deque()
+        self._lock = threading.Lock()
+
+    def observe(self, db: Session) -> int:
+        """
+        Count the backlog, keeping it as a sample unless one was taken recently.
+
+        Args:
+            db: Database session
+
+        Returns:
+            The current backlog
+        """
+        backlog = count_backlog(db)
+        now = time.monotonic()
+        with self._lock:
+            if self._samples and now - self._samples[-1][0] < self.sample_seconds:
+                return backlog
+
+        max_id = db.query(func.max(Document.id)).scalar() or 0
+        with self._lock:
+            if not self._samples or now - self._samples[-1][0] >= self.sample_seconds:
+                self._samples.append((now, backlog, max_id))
+            while self._samples and now - self._samples[0][0] > self.window_seconds:
+                self._samples.popleft()
+        return backlog
+
+    def rate(self) -> Optional[float]:
+        """
+        Get the measured drain rate.
+
+        Returns:
+            Documents per second, or None until two samples span some time
+        """
+        with self._lock:
+            if len(self._samples) < 2:
+                return None
+            (start, start_backlog, start_id), (end, end_backlog, end_id) = self._samples[0], self._samples[-1]
+
+        elapsed = end - start
+        if elapsed <= 0:
+            return None
+        drained = (end_id - start_id) - (end_backlog - start_backlog)
+        return max(drained, 0) / elapsed
+
+
+def count_backlog(db: Session, user_id: Optional[int] = None) -> int:
+    """
+    Count documents waiting for or undergoing processing.
+
+    Args:
+        db: Database session
+        user_id: Only count this user's documents
+
+    Returns:
+        Number of backlog documents
+    """
+    query = work_set(db, BACKLOG_STATUSES, func.count(Document.id))
+    if user_id is not None:
+        query = query.filter(Document.user_id == user_id)
+    return query.scalar()
+
+
+class AdmissionController:
+    """
+    Rejects uploads while the processing backlog is over its limits.
+
+    Two limits apply: ``max_backlog`` documents in total, and the
+    ``max_processing_backlog`` feature of the uploader's tier for their own
+    documents (missing or None for unlimited). Limits are checked before
+    the upload is stored, so concurrent uploads may overshoot them
+    slightly.
+
+    Rejections carry a Retry-After estimate of how long the backlog needs
+    to get back under the limit: the global drain rate for the global
+    limit, and the rate the user's own documents finished at for theirs.
+    """
+
+    def __init__(self, max_backlog: int, estimator: Optional[DrainRateEstimator] = None):
+        """
+        Initialize the controller.
+
+        Args:
+            max_backlog: Most documents in the global backlog (0 disables)
+            estimator: Drain rate estimator shared by checks
+        """
+        self.max_backlog = max_backlog
+        self.estimator = estimator or DrainRateEstimator()
+
+    def get_user_limit(self, user: User) -> Optional[int]:
+        """
+        Get a user's backlog limit from their tier's ``max_processing_backlog`` feature.
+
+        Returns:
+            Limit in documents, or None for unlimited
+        """
+        features = (user.tier.features if user.tier else None) or {}
+        limit = features.get("max_processing_backlog")
+
+        if limit is None or limit < 0:
+            return None
+        return int(limit)
+
+    def check(self, db: Session, user: User, documents: int = 1) -> None:
+        """
+        Admit new documents or reject them.
+
+        Args:
+            db: Database session
+            user: Uploading user
+            documents: Number of documents in the upload
+
+        Raises:
+            UploadRejected: If the global or the user's backlog is full
+        """
+        backlog = self.estimator.observe(db)
+        if self.max_backlog and backlog + documents > self.max_backlog:
+            self._reject(
+                "global",
+                backlog + documents - self.max_backlog,
+                self.estimator.rate(),
+                "Document processing is busy; please retry later"
+            )
+
+        user_limit = self.get_user_limit(user)
+        if user_limit is not None:
+            user_backlog = count_backlog(db, user.id)
+            if user_backlog + documents > user_limit:
+                self._reject(
+                    "tier",
+                    user_backlog + documents - user_limit,
+                    self.user_drain_rate(db, user.id),
+                    f"At most {user_limit} documents can be waiting for processing on your plan"
+                )
+
+    def user_drain_rate(self, db: Session, user_id: int) -> Optional[float]:
+        """
+        Get the rate at which a user's documents finished processing recently.
+
+        Read through the (user_id, updated_at) index over the estimator's
+        window, so it costs O(recent documents of the user).
+
+        Returns:
+            Documents per second, or None if none finished within the window
+        """
+        window = self.estimator.window_seconds
+        finished = db.query(func.count(Document.id)).filter(
+            Document.user_id == user_id,
+            Document.updated_at >= datetime.utcnow() - timedelta(seconds=window),
+            Document.status.in_(FINISHED_STATUSES)
+        ).scalar()
+        return finished / window if finished else None
+
+    def retry_after(self, excess: int, rate: Optional[float]) -> int:
+        """
+        Estimate the seconds until ``excess`` backlog documents have drained.
+
+        Args:
+            excess: Documents over the limit
+            rate: Documents per second leaving that backlog, or None if unknown
+
+        Returns:
+            Seconds, within RETRY_AFTER_MIN_SECONDS..RETRY_AFTER_MAX_SECONDS
+        """
+        if rate is None:
+            return RETRY_AFTER_DEFAULT_SECONDS
+        if rate == 0:
+            return RETRY_AFTER_MAX_SECONDS  # Nothing is draining
+        return min(RETRY_AFTER_MAX_SECONDS, max(RETRY_AFTER_MIN_SECONDS, math.ceil(excess / rate)))
+
+    def _reject(self, scope: str, excess: int, rate: Optional[float], message: str) -> None:
+        """Count a rejection and raise it."""
+        metrics.increment("uploads.rejected")
+        metrics.increment(f"uploads.rejected.{scope}")
+        raise UploadRejected(message, self.retry_after(excess, rate))
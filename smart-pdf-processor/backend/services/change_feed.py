@@ -0,0 +1,199 @@
+"""Incremental sync of document libraries (changes since a token)."""
+
+import base64
+import json
+import os
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import List, Optional, Tuple
+
+from sqlalchemy import tuple_
+from sqlalchemy.orm import Session
+
+from models import Document, DocumentTombstone
+from services.document_purger import DELETING_STATUS
+
+# Rows changed this recently are held back until the next poll, so a
+# transaction that commits slightly after a later one is never skipped.
+# Rows written through an application session are restamped as their
+# transaction commits (see services.feed_stamps), so long transactions
+# stay within the window.
+CHANGES_SETTLE_SECONDS = float(os.getenv("CHANGES_SETTLE_SECONDS", "2"))
+# Tombstones older than this are pruned; older tokens must resync in full
+TOMBSTONE_RETENTION_DAYS = int(os.getenv("TOMBSTONE_RETENTION_DAYS", "30"))
+
+# Position in one stream: (timestamp, id) of the last row delivered
+Position = Tuple[datetime, int]
+
+EPOCH = datetime(1970, 1, 1)
+
+class ChangeTokenExpired(Exception):
+    """Raised when a token predates the retained tombstones."""
+    pass
+
+
+@dataclass
+class ChangeSet:
+    """Documents changed and deleted since a token."""
+
+    changed: List[Document] = field(default_factory=list)
+    deleted: List[int] = field(default_factory=list)
+    token: str = ""
+    has_more: bool = False
+
+
+def encode_token(documents: Position, tombstones: Position) -> str:
+    """Encode the positions of both streams as an opaque token."""
+    raw = json.dumps([
+        documents[0].isoformat(), documents[1],
+        tombstones[0].isoformat(), tombstones[1]
+    ], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_token(token: str) -> Tuple[Position, Position]:
+    """
+    Decode a token produced by ``encode_token``.
+
+    Raises:
+        ValueError: If the token is malformed
+    """
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        doc_time, doc_id, tomb_time, tomb_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return (
+            (datetime.fromisoformat(doc_time), int(doc_id)),
+            (datetime.fromisoformat(tomb_time), int(tomb_id))
+        )
+    except (ValueError, TypeError, UnicodeDecodeError):
+        raise ValueError("Invalid sync token")
+
+
+class ChangeFeed:
+    """
+    Reports which of a user's documents changed or were deleted since a token.
+
+    Changes are read from ``Document.updated_at`` and deletions from
+    ``document_tombstones``, each through a (user_id, timestamp, id) index,
+    so a poll costs O(changes) rather than O(library). The token holds the
+    position reached in both streams.
+    """
+
+    def __init__(
+        self,
+        db: Session,
+        settle_seconds: float = CHANGES_SETTLE_SECONDS,
+        retention_days: int = TOMBSTONE_RETENTION_DAYS
+    ):
+        """
+        Initialize the feed.
+
+        Args:
+            db: Database session
+            settle_seconds: Hold back rows changed more recently than this
+            retention_days: How long tombstones (and so tokens) stay valid
+        """
+        self.db = db
+        self.settle_seconds = settle_seconds
+        self.retention_days = retention_days
+
+    def record_deletions(self, user_id: int, document_ids: List[int]) -> None:
+        """
+        Add tombstones for deleted documents (in the caller's transaction).
+
+        Args:
+            user_id: Owner of the documents
+            document_ids: IDs of the deleted documents
+        """
+        now = datetime.utcnow()
+        self.db.add_all([
+            DocumentTombstone(user_id=user_id, document_id=document_id, deleted_at=now)
+            for document_id in document_ids
+        ])
+
+    def current_token(self) -> str:
+        """
+        Get a token for a client that has just loaded the full library.
+
+        Rows changed within the settle window are delivered again by the
+        next poll, which is harmless since clients upsert by id.
+        """
+        upper = datetime.utcnow() - timedelta(seconds=self.settle_seconds)
+        return encode_token((upper, 0), (upper, 0))
+
+    def changes_since(self, user_id: int, token: Optional[str] = None, limit: int = 200) -> ChangeSet:
+        """
+        Get documents changed and deleted since a token.
+
+        Without a token every current document is returned (in pages) and
+        no deletions; clients start with that and keep the returned token.
+        While ``has_more`` is set the client should call again at once.
+
+        Args:
+            user_id: Owner of the library
+            token: Token from the previous call, or None for a full sync
+            limit: Maximum rows per stream in one response
+
+        Returns:
+            The changes and the token to send next time
+
+        Raises:
+            ValueError: If the token is malformed
+            ChangeTokenExpired: If deletions since the token may have been pruned
+        """
+        now = datetime.utcnow()
+        upper = now - timedelta(seconds=self.settle_seconds)
+
+        if token:
+            doc_position, tomb_position = decode_token(token)
+            if tomb_position[0] < now - timedelta(days=self.retention_days):
+                raise ChangeTokenExpired("Sync token expired; reload the full library")
+        else:
+            doc_position, tomb_position = (EPOCH, 0), (upper, 0)
+
+        documents = (
+            self.db.query(Document)
+            .filter(
+                Document.user_id == user_id,
+                Document.status != DELETING_STATUS,
+                tuple_(Document.updated_at, Document.id) > tuple_(*doc_position),
+                Document.updated_at <= upper
+            )
+            .order_by(Document.updated_at, Document.id)
+            .limit(limit + 1)
+            .all()
+        )
+        tombstones = (
+            self.db.query(DocumentTombstone)
+            .filter(
+                DocumentTombstone.user_id == user_id,
+                tuple_(DocumentTombstone.deleted_at, DocumentTombstone.id) > tuple_(*tomb_position),
+                DocumentTombstone.deleted_at <= upper
+            )
+            .order_by(DocumentTombstone.deleted_at, DocumentTombstone.id)
+            .limit(limit + 1)
+            .all()
+        )
+
+        more_documents = len(documents) > limit
+        more_tombstones = len(tombstones) > limit
+        documents = documents[:limit]
+        tombstones = tombstones[:limit]
+
+        # A drained stream jumps to the window's end, so tokens of quiet
+        # libraries keep moving forward and never expire
+        if more_documents:
+            doc_position = (documents[-1].updated_at, documents[-1].id)
+        else:
+            doc_position = max(doc_position, (upper, 0))
+        if more_tombstones:
+            tomb_position = (tombstones[-1].deleted_at, tombstones[-1].id)
+        else:
+            tomb_position = max(tomb_position, (upper, 0))
+
+        return ChangeSet(
+            changed=documents,
+            deleted=[tombstone.document_id for tombstone in tombstones],
+            token=encode_token(doc_position, tomb_position),
+            has_more=more_documents or more_tombstones
+        )
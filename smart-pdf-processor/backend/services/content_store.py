@@ -0,0 +1,182 @@
+"""Content-addressed document file storage with reference counting."""
+
+from typing import BinaryIO, Optional
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from models import Blob
+from services.file_storage import FileStorage
+
+
+class ContentStore:
+    """
+    Stores document files, deduplicating identical uploads when enabled.
+
+    With deduplication enabled every file is stored once under its SHA-256
+    and the ``blobs`` table counts how many documents point at it. When
+    disabled, calls go straight to FileStorage's per-document layout, so
+    routes can use this class unconditionally.
+
+    Reference changes are made in the caller's transaction: commit the
+    session together with the document change that caused them.
+    """
+
+    def __init__(self, file_storage: FileStorage, enabled: bool = False):
+        """
+        Initialize the content store.
+
+        Args:
+            file_storage: Underlying file storage
+            enabled: Store new files content-addressed
+        """
+        self.file_storage = file_storage
+        self.enabled = enabled
+
+    def save(
+        self,
+        db: Session,
+        source: BinaryIO,
+        user_id: int,
+        document_id: int,
+        filename: Optional[str],
+        max_bytes: Optional[int] = None
+    ) -> str:
+        """
+        Store a document file.
+
+        Args:
+            db: Database session (not committed)
+            source: Readable binary stream
+            user_id: User ID who uploaded the file
+            document_id: Document ID
+            filename: Original filename
+            max_bytes: Reject streams larger than this many bytes
+
+        Returns:
+            Stored path for Document.file_path
+        """
+        if not self.enabled:
+            return self.file_storage.save_stream(source, user_id, document_id, filename, max_bytes)
+
+        try:
+            temp_path, sha256, size = self.file_storage.write_blob_temp(source, max_bytes)
+        except Exception as e:
+            raise Exception(f"Failed to save PDF file: {str(e)}")
+        return self._adopt(db, temp_path, sha256, size)
+
+    def save_partial(
+        self,
+        db: Session,
+        partial_path: str,
+        user_id: int,
+        document_id: int,
+        filename: str
+    ) -> str:
+        """
+        Store a completed resumable upload.
+
+        Args:
+            db: Database session (not committed)
+            partial_path: Stored path of the partial file
+            user_id: User ID who uploaded the file
+            document_id: Document ID
+            filename: Original filename
+
+        Returns:
+            Stored path for Document.file_path
+        """
+        if not self.enabled:
+            return self.file_storage.finalize_partial(partial_path, user_id, document_id, filename)
+
+        sha256, size = self.file_storage.hash_partial(partial_path)
+        return self._adopt(db, partial_path, sha256, size)
+
+    def discard(self, db: Session, file_path: str) -> None:
+        """
+        Remove a file stored by a save whose transaction was rolled back.
+
+        The rolled-back reference is taken again and released, so the file
+        is deleted under the blob's row lock, and only if no other document
+        uses it.
+
+        Args:
+            db: Database session (not committed)
+            file_path: Stored path returned by the save
+
+        Raises:
+            FileNotFoundError: If the file no longer exists
+        """
+        sha256 = self.file_storage.blob_digest(file_path)
+        if sha256 is not None:
+            self._add_reference(db, sha256, 0)
+        self.release(db, file_path)
+
+    def _adopt(self, db: Session, temp_path: str, sha256: str, size: int) -> str:
+        """
+        Reference a blob, then move the temporary file to its address.
+
+        The reference is taken first: a concurrent release of the last
+        reference holds the row lock while it removes the file, so the
+        rename below always happens after any such removal.
+        """
+        try:
+            self._add_reference(db, sha256, size)
+            return self.file_storage.place_blob(temp_path, sha256)
+        except Exception:
+            try:
+                self.file_storage.delete_pdf(temp_path)
+            except Exception:
+                pass
+            raise
+
+    def _add_reference(self, db: Session, sha256: str, size: int) -> None:
+        """Increment a blob's reference count, creating the row if needed."""
+        updated = (
+            db.query(Blob)
+            .filter(Blob.sha256 == sha256)
+            .update({Blob.ref_count: Blob.ref_count + 1}, synchronize_session=False)
+        )
+        if updated:
+            return
+
+        try:
+            # Savepoint so a concurrent insert of the same blob does not
+            # roll back the caller's document changes
+            with db.begin_nested():
+                db.add(Blob(sha256=sha256, size=size, ref_count=1))
+        except IntegrityError:
+            db.query(Blob).filter(Blob.sha256 == sha256).update(
+                {Blob.ref_count: Blob.ref_count + 1}, synchronize_session=False
+            )
+
+    def release(self, db: Session, file_path: str) -> None:
+        """
+        Drop a document's reference to its file, deleting the file when unused.
+
+        Per-document files are always deleted. Blobs are deleted only when
+        the last reference goes.
+
+        Args:
+            db: Database session (not committed)
+            file_path: Stored path from Document.file_path
+
+        Raises:
+            FileNotFoundError: If the file no longer exists
+        """
+        sha256 = self.file_storage.blob_digest(file_path)
+        if sha256 is None:
+            self.file_storage.delete_pdf(file_path)
+            return
+
+        db.query(Blob).filter(Blob.sha256 == sha256).update(
+            {Blob.ref_count: Blob.ref_count - 1}, synchronize_session=False
+        )
+        removed = (
+            db.query(Blob)
+            .filter(Blob.sha256 == sha256, Blob.ref_count <= 0)
+            .delete(synchronize_session=False)
+        )
+        if removed:
+            # Still holding the row lock, so no upload can re-reference the
+            # blob between this delete and the commit
+            self.file_storage.delete_pdf(file_path)
@@ -0,0 +1,276 @@
+"""Background removal of deleted documents and purged user accounts."""
+
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Callable, Optional, Tuple
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+
+from models import Document, DocumentTombstone, User, UploadSession
+from services.content_store import ContentStore
+from services.metrics import metrics
+from services.near_duplicates import NearDuplicateIndex
+from services.related_documents import RelatedDocumentIndex
+from services.work_queue import work_set
+
+# Status of documents whose file and row are waiting to be removed
+DELETING_STATUS = "deleting"
+
+
+@dataclass
+class PurgeStats:
+    """Work done by one purge run."""
+
+    documents: int = 0
+    files: int = 0
+    users: int = 0
+    uploads: int = 0
+    seconds: float = 0.0
+
+    @property
+    def documents_per_second(self) -> float:
+        """Purge throughput of the run."""
+        return self.documents / self.seconds if self.seconds else 0.0
+
+
+class DocumentPurger:
+    """
+    Removes files and rows of documents marked ``deleting``.
+
+    Requests only mark rows, so deletes return immediately; the purger then
+    works through the marked rows in batches. Users with
+    ``deletion_requested_at`` set have all their documents marked and are
+    removed once none remain. Resumable uploads abandoned for longer than
+    ``upload_ttl_hours`` are expired along with their partial files.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        content_store: ContentStore,
+        batch_size: int = 100,
+        tombstone_retention_days: int = 30,
+        upload_ttl_hours: float = 24
+    ):
+        """
+        Initialize the purger.
+
+        Args:
+            session_factory: Callable returning a new database session
+            content_store: Store used to release document files
+            batch_size: Documents removed per transaction
+            tombstone_retention_days: Age after which deletion tombstones
+                (kept for sync clients) are pruned
+            upload_ttl_hours: Time without a chunk after which a resumable
+                upload is expired
+        """
+        self.session_factory = session_factory
+        self.content_store = content_store
+        self.batch_size = batch_size
+        self.tombstone_retention_days = tombstone_retention_days
+        self.upload_ttl_hours = upload_ttl_hours
+        # One run at a time per process; concurrent processes are kept
+        # apart by row locks
+        self._lock = threading.Lock()
+
+    def run_once(self) -> Optional[PurgeStats]:
+        """
+        Purge everything currently marked for deletion.
+
+        Returns:
+            Stats for the run, or None if another run was already in progress
+        """
+        if not self._lock.acquire(blocking=False):
+            return None
+
+        stats = PurgeStats()
+        started = time.monotonic()
+        db = self.session_factory()
+        try:
+            self._mark_user_documents(db)
+            while True:
+                fetched, removed, files = self._purge_batch(db)
+                stats.documents += removed
+                stats.files += files
+                # Stop when drained, or when every remaining file is failing
+                if fetched < self.batch_size or removed == 0:
+                    break
+            stats.users = self._remove_purged_users(db)
+            self._prune_tombstones(db)
+            stats.uploads = self._expire_uploads(db)
+        finally:
+            db.close()
+            self._lock.release()
+            stats.seconds = time.monotonic() - started
+
+        # Idle runs are left out so the counters give purge throughput
+        if stats.documents or stats.users or stats.uploads:
+            metrics.increment("purge.runs")
+            metrics.increment("purge.documents", stats.documents)
+            metrics.increment("purge.files", stats.files)
+            metrics.increment("purge.users", stats.users)
+            metrics.increment("purge.uploads", stats.uploads)
+            metrics.increment("purge.seconds", stats.seconds)
+        return stats
+
+    def _mark_user_documents(self, db: Session) -> None:
+        """Mark every document of users being purged for deletion."""
+        purged_users = db.query(User.id).filter(User.deletion_requested_at.isnot(None))
+        db.query(Document).filter(
+            Document.user_id.in_(purged_users.scalar_subquery()),
+            Document.status != DELETING_STATUS
+        ).update({
+            Document.status: DELETING_STATUS,
+            Document.updated_at: datetime.utcnow()
+        }, synchronize_session=False)
+        db.commit()
+
+    def _purge_batch(self, db: Session) -> Tuple[int, int, int]:
+        """
+        Remove one batch of marked documents in a single transaction.
+
+        Rows whose file could not be removed (other than already missing)
+        stay marked and are retried on the next run.
+
+        Returns:
+            Tuple of (documents fetched, documents removed, files released)
+        """
+        query = (
+            work_set(db, (DELETING_STATUS,))
+            .order_by(Document.id)
+            .limit(self.batch_size)
+        )
+        if db.bind.dialect.name == "postgresql":
+            # Lets several purgers share the backlog without double-releasing blobs
+            query = query.with_for_update(skip_locked=True)
+        documents = query.all()
+
+        related_index = RelatedDocumentIndex(db)
+        duplicate_index = NearDuplicateIndex(db)
+        removed_ids = []
+        files = 0
+        for document in documents:
+            try:
+                # Savepoint, so a failed release leaves the blob count untouched
+                with db.begin_nested():
+                    if document.file_path:
+                        try:
+                            self.content_store.release(db, document.file_path)
+                            files += 1
+                        except FileNotFoundError:
+                            pass  # Already gone
+            except Exception as e:
+                print(f"Warning: Failed to delete file {document.file_path}: {e}")
+                continue
+            related_index.remove_document(document)
+            duplicate_index.remove_document(document)
+            removed_ids.append(document.id)
+
+        if removed_ids:
+            db.query(Document).filter(Document.id.in_(removed_ids)).delete(synchronize_session=False)
+        db.commit()
+
+        return len(documents), len(removed_ids), files
+
+    def _remove_purged_users(self, db: Session) -> int:
+        """Delete users being purged once none of their documents remain."""
+        users = db.query(User).filter(
+            User.deletion_requested_at.isnot(None),
+            ~User.documents.any()
+        ).all()
+
+        for user in users:
+            for upload in db.query(UploadSession).filter(UploadSession.user_id == user.id):
+                try:
+                    self.content_store.file_storage.delete_pdf(upload.file_path)
+                except FileNotFoundError:
+                    pass
+                db.delete(upload)
+            db.delete(user)
+        db.commit()
+        return len(users)
+
+    def _prune_tombstones(self, db: Session) -> None:
+        """Delete deletion tombstones past their retention period."""
+        cutoff = datetime.utcnow() - timedelta(days=self.tombstone_retention_days)
+        db.query(DocumentTombstone).filter(
+            DocumentTombstone.deleted_at < cutoff
+        ).delete(synchronize_session=False)
+        db.commit()
+
+    def _expire_uploads(self, db: Session) -> int:
+        """
+        Expire abandoned resumable uploads and stray partial files.
+
+        Sessions without a chunk for ``upload_ttl_hours`` are removed unless
+        a chunk is being written. Partial files as old that no session
+        refers to (left behind by failed requests) are deleted too.
+
+        Returns:
+            Number of upload sessions expired
+        """
+        now = datetime.utcnow()
+        cutoff = now - timedelta(hours=self.upload_ttl_hours)
+        file_storage = self.content_store.file_storage
+
+        uploads = db.query(UploadSession).filter(
+            UploadSession.updated_at < cutoff,
+            or_(UploadSession.writer_token.is_(None), UploadSession.writer_expires_at < now)
+        ).all()
+        for upload in uploads:
+            try:
+                file_storage.delete_pdf(upload.file_path)
+            except FileNotFoundError:
+                pass
+            except Exception as e:
+                print(f"Warning: Failed to delete partial upload {upload.file_path}: {e}")
+                continue
+            db.delete(upload)
+        db.commit()
+
+        live = {file_path for (file_path,) in db.query(UploadSession.file_path)}
+        file_cutoff = time.time() - self.upload_ttl_hours * 3600
+        for file_path, mtime in file_storage.iter_partials():
+            if mtime < file_cutoff and file_path not in live:
+                try:
+                    file_storage.delete_pdf(file_path)
+                except FileNotFoundError:
+                    pass
+        return len(uploads)
+
+
+def run_purge_loop(purger: DocumentPurger, interval_seconds: float, stop: threading.Event) -> None:
+    """
+    Run the purger periodically until stopped.
+
+    Args:
+        purger: Purger to run
+        interval_seconds: Pause between runs
+        stop: Event that ends the loop
+    """
+    while not stop.is_set():
+        try:
+            purger.run_once()
+        except Exception as e:
+            print(f"Purge run failed: {e}")
+        stop.wait(interval_seconds)
+
+
+def start_purge_thread(purger: DocumentPurger, interval_seconds: float) -> threading.Event:
+    """
+    Start the purge loop in a daemon thread.
+
+    Returns:
+        Event that stops the loop when set
+    """
+    stop = threading.Event()
+    thread = threading.Thread(
+        target=run_purge_loop,
+        args=(purger, interval_seconds, stop),
+        name="document-purger",
+        daemon=True
+    )
+    thread.start()
+    return stop
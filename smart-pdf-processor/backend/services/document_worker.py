@@ -0,0 +1,129 @@
+"""Background processing of pending documents by worker processes."""
+
+import threading
+from datetime import datetime, timedelta
+from typing import Callable, List
+
+from sqlalchemy.orm import Session
+
+from models import Document
+from services.file_storage import FileStorage
+from services.pdf_processor import process_batch
+from services.work_queue import work_set
+
+
+class DocumentWorker:
+    """
+    Processes ``pending`` documents found in the database.
+
+    API processes without the worker role leave uploads pending; workers
+    poll for them through the work-set index. Several workers may pick the
+    same document: the processor's compare-and-set claim lets exactly one
+    of them process it.
+
+    ``pending_grace_seconds`` leaves recent uploads to the API process that
+    queued them in-process, so a combined API and worker process only
+    picks up documents whose in-process task was lost (e.g. on restart).
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        file_storage: FileStorage,
+        batch_size: int = 10,
+        pending_grace_seconds: float = 0
+    ):
+        """
+        Initialize the worker.
+
+        Args:
+            session_factory: Callable returning a new database session
+            file_storage: File storage service instance
+            batch_size: Documents processed per run
+            pending_grace_seconds: Age a pending document must reach
+                before this worker takes it
+        """
+        self.session_factory = session_factory
+        self.file_storage = file_storage
+        self.batch_size = batch_size
+        self.pending_grace_seconds = pending_grace_seconds
+        self._lock = threading.Lock()
+
+    def find_pending(self, db: Session) -> List[int]:
+        """
+        Find the oldest pending documents this worker may take.
+
+        Returns:
+            Document IDs, oldest first
+        """
+        cutoff = datetime.utcnow() - timedelta(seconds=self.pending_grace_seconds)
+        return [
+            document_id for (document_id,) in work_set(db, ("pending",), Document.id)
+            .filter(Document.updated_at <= cutoff)
+            .order_by(Document.updated_at)
+            .limit(self.batch_size)
+        ]
+
+    def run_once(self) -> int:
+        """
+        Process one batch of pending documents.
+
+        Returns:
+            Number of documents found (0 if another run was in progress)
+        """
+        if not self._lock.acquire(blocking=False):
+            return 0
+
+        try:
+            db = self.session_factory()
+            try:
+                pending = self.find_pending(db)
+            finally:
+                db.close()
+
+            if pending:
+                # process_batch closes its session
+                process_batch(pending, self.session_factory(), self.file_storage)
+            return len(pending)
+        finally:
+            self._lock.release()
+
+
+def run_worker_loop(worker: DocumentWorker, interval_seconds: float, stop: threading.Event) -> None:
+    """
+    Process pending documents until stopped.
+
+    Runs back to back while there is work and pauses for
+    ``interval_seconds`` once none is left.
+
+    Args:
+        worker: Worker to run
+        interval_seconds: Pause between polls of an empty queue
+        stop: Event that ends the loop
+    """
+    while not stop.is_set():
+        try:
+            found = worker.run_once()
+        except Exception as e:
+            print(f"Worker run failed: {e}")
+            found = 0
+        if not found:
+            stop.wait(interval_seconds)
+
+
+def start_worker_thread(worker: DocumentWorker, interval_seconds: float) -> threading.Event:
+    """
+    Start the worker loop in a daemon thread.
+
+    Returns:
+        Event that stops the loop when set
+    """
+    stop = threading.Event()
+    thread = threading.Thread(
+        target=run_worker_loop,
+        args=(worker, interval_seconds, stop),
+        name="document-worker",
+        daemon=True
+    )
+    thread.start()
+    return stop
@@ -0,0 +1,94 @@
+"""Commit-time timestamps for the change feed's streams."""
+
+from datetime import datetime, timedelta
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session, SessionTransaction
+
+from database import AppSession
+from models import Document, DocumentTombstone
+
+# Timestamp each feed stream is ordered by
+STREAM_COLUMNS = {
+    Document: Document.updated_at,
+    DocumentTombstone: DocumentTombstone.deleted_at,
+}
+
+# Session.info keys of the feed rows flushed and bulk-updated in the
+# current transaction and of when it began
+FLUSHED_ROWS_KEY = "change_feed_rows"
+BULK_ROWS_KEY = "change_feed_bulk_rows"
+TRANSACTION_STARTED_KEY = "change_feed_started"
+
+
+def restamp_on_commit(session: Session, model: type, criterion) -> None:
+    """
+    Restamp rows changed by a bulk UPDATE when the session commits.
+
+    Bulk UPDATEs bypass the flush, so their rows are not tracked like ORM
+    changes. ``criterion`` must still match the rows after the UPDATE
+    (e.g. their ids); only rows stamped during the transaction are moved.
+
+    Args:
+        session: Session the UPDATE ran in
+        model: Feed model updated (Document or DocumentTombstone)
+        criterion: Filter selecting the updated rows
+    """
+    # Only application sessions restamp at commit
+    if isinstance(session, AppSession):
+        session.info.setdefault(BULK_ROWS_KEY, []).append((model, criterion))
+
+
+@event.listens_for(AppSession, "after_transaction_create")
+def _record_transaction_start(session: Session, transaction: SessionTransaction) -> None:
+    """Remember when the outermost transaction began."""
+    if transaction.parent is None:
+        session.info[TRANSACTION_STARTED_KEY] = datetime.utcnow()
+
+
+@event.listens_for(AppSession, "after_flush")
+def _track_flushed_rows(session: Session, flush_context) -> None:
+    """Remember the feed rows a transaction has written."""
+    for instance in list(session.new) + list(session.dirty):
+        if type(instance) in STREAM_COLUMNS and instance.id is not None:
+            flushed = session.info.setdefault(FLUSHED_ROWS_KEY, {})
+            flushed.setdefault(type(instance), set()).add(instance.id)
+
+
+@event.listens_for(AppSession, "before_commit")
+def _restamp_flushed_rows(session: Session) -> None:
+    """
+    Move the feed timestamps of rows written in a transaction to its commit.
+
+    Timestamps are set when rows are flushed, which can be long before the
+    commit (e.g. while a large upload is stored). A poll in between would
+    move its token past rows it cannot see yet, and they would never be
+    delivered; restamped rows become visible within the settle window.
+    Timestamps set explicitly to before the transaction (e.g. backfills)
+    are left alone.
+    """
+    if session.in_nested_transaction():
+        return
+    if session.new or session.dirty:
+        session.flush()
+    flushed = session.info.pop(FLUSHED_ROWS_KEY, {})
+    bulk = session.info.pop(BULK_ROWS_KEY, [])
+    if not flushed and not bulk:
+        return
+    now = datetime.utcnow()
+    # Allow for timestamps taken just before the transaction began
+    started = session.info.get(TRANSACTION_STARTED_KEY, now) - timedelta(seconds=1)
+    updates = [(model, model.id.in_(ids)) for model, ids in flushed.items()] + bulk
+    for model, criterion in updates:
+        column = STREAM_COLUMNS[model]
+        session.query(model).filter(criterion, column >= started).update(
+            {column: now}, synchronize_session=False
+        )
+
+
+@event.listens_for(AppSession, "after_transaction_end")
+def _forget_flushed_rows(session: Session, transaction: SessionTransaction) -> None:
+    """Drop rows tracked by a transaction that was rolled back."""
+    if transaction.parent is None:
+        session.info.pop(FLUSHED_ROWS_KEY, None)
+        session.info.pop(BULK_ROWS_KEY, None)
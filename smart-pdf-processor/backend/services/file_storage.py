@@ -1,76 +1,211 @@
 """File storage service for managing PDF uploads."""
 
+import bisect
+import hashlib
+import heapq
 import os
 import shutil
+import tempfile
+import uuid
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Optional
-from fastapi import UploadFile
+from typing import TYPE_CHECKING, BinaryIO, Dict, Iterator, List, Optional, Tuple, Union
+
+from services.storage_backends import (
+    COPY_CHUNK_SIZE,
+    LocalBackend,
+    ObjectStat,
+    StorageBackend,
+    normalize_key,
+)
+
+if TYPE_CHECKING:
+    # Type only: worker processes do not import the web framework
+    from fastapi import UploadFile
+
+# Directory (inside the upload dir) holding in-progress resumable uploads
+PARTIAL_UPLOAD_DIR = ".partial"
+
+# Storage layouts: "user" keeps {user_id}/{document_id}_{name}; "hashed" spreads
+# files over two levels of 256 hashed subdirectories
+STORAGE_LAYOUTS = ("user", "hashed")
+
+# Stored paths on an additional storage root are written as "@{root}/{path}"
+SHARD_PATH_PREFIX = "@"
+
+# Content-addressed blobs live under this directory of the base root
+BLOB_DIR = "blobs"
+
+
+def parse_storage_roots(value: str) -> Dict[str, str]:
+    """
+    Parse additional storage roots from ``name=/path,name2=/path2``.
+    
+    Args:
+        value: Comma-separated name=directory pairs (may be empty)
+        
+    Returns:
+        Mapping of root name to directory
+        
+    Raises:
+        ValueError: If an entry is malformed
+    """
+    roots = {}
+    for entry in filter(None, (item.strip() for item in value.split(","))):
+        name, separator, directory = entry.partition("=")
+        if not separator or not name.strip().isalnum() or not directory.strip():
+            raise ValueError(f"Invalid storage root '{entry}', expected name=/path")
+        roots[name.strip()] = directory.strip()
+    return roots
 
 
 class FileStorage:
     """Service for storing and managing uploaded PDF files."""
     
-    def __init__(self, base_upload_dir: str = "uploads"):
+    def __init__(
+        self,
+        base_upload_dir: str = "uploads",
+        layout: str = "user",
+        shard_roots: Optional[Dict[str, Union[str, StorageBackend]]] = None,
+        virtual_nodes: int = 64,
+        backend: Optional[StorageBackend] = None
+    ):
         """
         Initialize file storage service.
         
         Args:
-            base_upload_dir: Base directory for storing uploaded files
+            base_upload_dir: Base directory for storing uploaded files; partial
+                uploads are always staged here, even with another backend
+            layout: Directory layout for new files ("user" or "hashed")
+            shard_roots: Additional named storage roots (directories or
+                backends); new files are spread over all roots by consistent
+                hashing
+            virtual_nodes: Points per root on the consistent hash ring
+            backend: Backend for the base root (default: files in base_upload_dir)
         """
+        if layout not in STORAGE_LAYOUTS:
+            raise ValueError(f"Unknown storage layout '{layout}'")
+        
         self.base_upload_dir = Path(base_upload_dir)
-        self._ensure_base_directory()
-    
-    def _ensure_base_directory(self) -> None:
-        """Ensure the base upload directory exists."""
         self.base_upload_dir.mkdir(parents=True, exist_ok=True)
+        self.layout = layout
+        
+        # The base root is unnamed, so existing relative paths stay valid
+        self.roots: Dict[str, StorageBackend] = {"": backend or LocalBackend(base_upload_dir)}
+        for name, root in (shard_roots or {}).items():
+            self.roots[name] = LocalBackend(root) if isinstance(root, str) else root
+        
+        self._skip_prefixes = self._build_skip_prefixes()
+        self._build_hash_ring(virtual_nodes)
     
-    def _get_user_directory(self, user_id: int) -> Path:
+    def _build_skip_prefixes(self) -> Dict[str, List[str]]:
+        """
+        Key prefixes each root's listing must skip: partial uploads, and
+        other roots whose directories are nested inside it.
         """
-        Get the directory path for a specific user.
+        skip = {name: [] for name in self.roots}
+        skip[""].append(PARTIAL_UPLOAD_DIR + "/")
+        
+        local_roots = {
+            name: root.root.resolve()
+            for name, root in self.roots.items()
+            if isinstance(root, LocalBackend)
+        }
+        for name, directory in local_roots.items():
+            for other_name, other in local_roots.items():
+                if other_name != name and other.is_relative_to(directory):
+                    skip[name].append(other.relative_to(directory).as_posix() + "/")
+        return skip
+    
+    def _build_hash_ring(self, virtual_nodes: int) -> None:
+        """
+        Place each storage root on a consistent hash ring.
+        
+        Adding a root only moves the keys that land on its new points, so
+        existing files mostly keep their root when volumes are added.
+        """
+        ring = sorted(
+            (self._hash(f"{name}#{replica}"), name)
+            for name in self.roots
+            for replica in range(virtual_nodes)
+        )
+        self._ring_points = [point for point, _ in ring]
+        self._ring_roots = [name for _, name in ring]
+    
+    @staticmethod
+    def _hash(value: str) -> int:
+        """Stable 64-bit hash of a string."""
+        return int.from_bytes(hashlib.sha1(value.encode()).digest()[:8], "big")
+    
+    def _choose_root(self, key: str) -> str:
+        """
+        Pick the storage root for a key by consistent hashing.
         
         Args:
-            user_id: User ID
+            key: Placement key
             
         Returns:
-            Path to user's upload directory
+            Root name ("" for the base directory)
         """
-        return self.base_upload_dir / str(user_id)
+        if len(self.roots) == 1:
+            return ""
+        index = bisect.bisect(self._ring_points, self._hash(key)) % len(self._ring_points)
+        return self._ring_roots[index]
     
-    def _ensure_user_directory(self, user_id: int) -> Path:
+    def _split_root(self, file_path: str) -> Tuple[str, str]:
+        """
+        Split a stored path into its root name and root-relative path.
+        
+        Raises:
+            ValueError: If the path names an unknown storage root
         """
-        Ensure user's upload directory exists.
+        if not file_path.startswith(SHARD_PATH_PREFIX):
+            return "", file_path
+        
+        name, _, relative_path = file_path[len(SHARD_PATH_PREFIX):].partition("/")
+        if name not in self.roots:
+            raise ValueError(f"Unknown storage root '{name}'")
+        return name, relative_path
+    
+    def _resolve(self, file_path: str) -> Tuple[StorageBackend, str]:
+        """
+        Resolve a stored path to its backend and validated key.
         
         Args:
-            user_id: User ID
+            file_path: Stored path (relative, optionally "@root/" prefixed)
             
         Returns:
-            Path to user's upload directory
+            Tuple of (backend, key)
+            
+        Raises:
+            ValueError: If path is invalid or outside its storage root
         """
-        user_dir = self._get_user_directory(user_id)
-        user_dir.mkdir(parents=True, exist_ok=True)
-        return user_dir
+        name, relative_path = self._split_root(file_path)
+        return self.roots[name], normalize_key(relative_path)
+    
+    def _to_stored_path(self, root_name: str, key: str) -> str:
+        """Convert a key on a root into the path stored on Document."""
+        if not root_name:
+            return key
+        return f"{SHARD_PATH_PREFIX}{root_name}/{key}"
     
-    def _validate_file_path(self, file_path: str) -> None:
+    def _staging_path(self, file_path: str) -> Path:
         """
-        Validate that a file path is within the upload directory.
+        Resolve a partial upload or temporary file, which is always local.
         
-        Args:
-            file_path: File path to validate
-            
         Raises:
-            ValueError: If path is invalid or outside upload directory
+            ValueError: If the path is not inside the partial upload directory
         """
-        try:
-            path = Path(file_path).resolve()
-            base = self.base_upload_dir.resolve()
-            
-            # Check if path is within base directory
-            if not str(path).startswith(str(base)):
-                raise ValueError("File path is outside upload directory")
-        except Exception as e:
-            raise ValueError(f"Invalid file path: {str(e)}")
+        key = normalize_key(file_path)
+        if not key.startswith(PARTIAL_UPLOAD_DIR + "/"):
+            raise ValueError(f"Not a partial upload path: {file_path}")
+        return self.base_upload_dir / key
+    
+    def _is_staged(self, file_path: str) -> bool:
+        """Whether a stored path refers to a partial upload or temporary file."""
+        return file_path.startswith(PARTIAL_UPLOAD_DIR + "/")
     
-    def save_pdf(self, file: UploadFile, user_id: int, document_id: int) -> str:
+    def save_pdf(self, file: "UploadFile", user_id: int, document_id: int) -> str:
         """
         Save uploaded PDF file to storage.
         
@@ -85,25 +220,318 @@ class FileStorage:
         Raises:
             Exception: If file cannot be saved
         """
+        return self.save_stream(file.file, user_id, document_id, file.filename)
+    
+    def save_stream(
+        self,
+        source: BinaryIO,
+        user_id: int,
+        document_id: int,
+        filename: Optional[str],
+        max_bytes: Optional[int] = None
+    ) -> str:
+        """
+        Save a PDF from any readable binary stream.
+        
+        Args:
+            source: Binary stream to copy from (e.g. a ZIP archive member)
+            user_id: User ID who uploaded the file
+            document_id: Document ID for organizing files
+            filename: Original filename
+            max_bytes: Optional size cap; the partial file is removed if exceeded
+            
+        Returns:
+            Relative file path where the PDF was saved
+            
+        Raises:
+            Exception: If file cannot be saved or exceeds max_bytes
+        """
         try:
-            # Ensure user directory exists
-            user_dir = self._ensure_user_directory(user_id)
+            stored_path = self.path_for(user_id, document_id, filename)
+            backend, key = self._resolve(stored_path)
+            backend.save_stream(key, source, max_bytes)
+            return stored_path
+        except Exception as e:
+            raise Exception(f"Failed to save PDF file: {str(e)}")
+    
+    def path_for(self, user_id: int, document_id: int, filename: Optional[str]) -> str:
+        """
+        Build the stored path the current layout and roots give a document.
+        
+        Args:
+            user_id: User ID who uploaded the file
+            document_id: Document ID for organizing files
+            filename: Original filename
+            
+        Returns:
+            Stored path for Document.file_path
+        """
+        # Create filename: {document_id}_{original_filename}
+        safe_filename = self._sanitize_filename(filename or "document.pdf")
+        
+        if self.layout == "hashed":
+            # Two levels of fan-out keep every directory small
+            placement = f"{user_id}:{document_id}"
+            digest = hashlib.sha1(placement.encode()).hexdigest()
+            key = f"{digest[:2]}/{digest[2:4]}/{user_id}_{document_id}_{safe_filename}"
+        else:
+            placement = str(user_id)
+            key = f"{user_id}/{document_id}_{safe_filename}"
+        
+        return self._to_stored_path(self._choose_root(placement), key)
+    
+    def relocate(
+        self,
+        file_path: str,
+        user_id: int,
+        document_id: int,
+        filename: Optional[str]
+    ) -> str:
+        """
+        Move a stored file to where the current layout and roots place it.
+        
+        Safe to re-run after an interruption: if the file was already moved
+        but its new path was never recorded, the new path is returned.
+        
+        Args:
+            file_path: Current stored path
+            user_id: User ID who uploaded the file
+            document_id: Document ID
+            filename: Original filename
             
-            # Create filename: {document_id}_{original_filename}
-            safe_filename = self._sanitize_filename(file.filename or "document.pdf")
-            filename = f"{document_id}_{safe_filename}"
-            file_path = user_dir / filename
+        Returns:
+            New stored path (unchanged if already in place)
+            
+        Raises:
+            FileNotFoundError: If the file exists at neither location
+            ValueError: If file path is invalid
+        """
+        if self.blob_digest(file_path) is not None:
+            # Blobs are addressed by content, not by layout
+            return file_path
+        
+        target_path = self.path_for(user_id, document_id, filename)
+        if target_path == file_path:
+            return file_path
+        
+        source, source_key = self._resolve(file_path)
+        target, target_key = self._resolve(target_path)
+        
+        try:
+            source.stat(source_key)
+        except FileNotFoundError:
+            # Moved by an earlier run that stopped before recording it
+            target.stat(target_key)
+            return target_path
+        
+        if source is target:
+            source.move(source_key, target_key)
+        else:
+            with source.open_stream(source_key) as stream:
+                target.save_stream(target_key, stream)
+            source.delete(source_key)
+        
+        return target_path
+    
+    def write_blob_temp(
+        self,
+        source: BinaryIO,
+        max_bytes: Optional[int] = None
+    ) -> Tuple[str, str, int]:
+        """
+        Copy a stream to a temporary file while computing its SHA-256.
+        
+        Args:
+            source: Readable binary stream
+            max_bytes: Reject streams larger than this many bytes
             
-            # Save file
-            with open(file_path, "wb") as buffer:
-                shutil.copyfileobj(file.file, buffer)
+        Returns:
+            Tuple of (temporary stored path, hex digest, size in bytes)
             
-            # Return relative path from base upload directory
-            relative_path = file_path.relative_to(self.base_upload_dir)
-            return str(relative_path)
+        Raises:
+            ValueError: If the stream exceeds max_bytes
+        """
+        partial_dir = self.base_upload_dir / PARTIAL_UPLOAD_DIR
+        partial_dir.mkdir(parents=True, exist_ok=True)
+        temp_path = partial_dir / f"blob-{uuid.uuid4().hex}.tmp"
+        
+        digest = hashlib.sha256()
+        size = 0
+        try:
+            with open(temp_path, "wb") as target:
+                while True:
+                    chunk = source.read(COPY_CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    size += len(chunk)
+                    if max_bytes is not None and size > max_bytes:
+                        raise ValueError(f"File exceeds maximum size of {max_bytes} bytes")
+                    digest.update(chunk)
+                    target.write(chunk)
+        except Exception:
+            temp_path.unlink(missing_ok=True)
+            raise
+        
+        return temp_path.relative_to(self.base_upload_dir).as_posix(), digest.hexdigest(), size
+    
+    def hash_partial(self, file_path: str) -> Tuple[str, int]:
+        """
+        Compute the SHA-256 and size of a partial upload.
+        
+        Args:
+            file_path: Relative path of the partial file
             
+        Returns:
+            Tuple of (hex digest, size in bytes)
+        """
+        digest = hashlib.sha256()
+        size = 0
+        with open(self._staging_path(file_path), "rb") as source:
+            while True:
+                chunk = source.read(COPY_CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                digest.update(chunk)
+        return digest.hexdigest(), size
+    
+    def place_blob(self, temp_path: str, sha256: str) -> str:
+        """
+        Move a hashed temporary file to its content address.
+        
+        The move replaces any existing blob with identical content, so the
+        blob is guaranteed to exist afterwards even if it was being removed
+        concurrently.
+        
+        Args:
+            temp_path: Stored path of the temporary file
+            sha256: Hex digest of its content
+            
+        Returns:
+            Stored path of the blob
+        """
+        blob_path = f"{BLOB_DIR}/{sha256[:2]}/{sha256[2:4]}/{sha256}.pdf"
+        self._store_staged(temp_path, blob_path)
+        return blob_path
+    
+    def blob_digest(self, file_path: str) -> Optional[str]:
+        """
+        Return the SHA-256 a stored path addresses, or None for per-document files.
+        
+        Args:
+            file_path: Stored path
+        """
+        parts = file_path.split("/")
+        if len(parts) != 4 or parts[0] != BLOB_DIR or not parts[3].endswith(".pdf"):
+            return None
+        return parts[3][:-len(".pdf")]
+    
+    def create_partial(self, upload_id: int) -> str:
+        """
+        Create an empty file for a resumable upload.
+        
+        Args:
+            upload_id: Upload session ID
+            
+        Returns:
+            Relative path of the partial file
+        """
+        partial_dir = self.base_upload_dir / PARTIAL_UPLOAD_DIR
+        partial_dir.mkdir(parents=True, exist_ok=True)
+        
+        file_path = partial_dir / f"{upload_id}.part"
+        file_path.touch()
+        return file_path.relative_to(self.base_upload_dir).as_posix()
+    
+    def iter_partials(self) -> Iterator[Tuple[str, float]]:
+        """
+        List partial uploads and temporary files.
+        
+        Yields:
+            Tuples of (relative path, modification time)
+        """
+        partial_dir = self.base_upload_dir / PARTIAL_UPLOAD_DIR
+        if not partial_dir.is_dir():
+            return
+        for path in sorted(partial_dir.iterdir()):
+            if path.is_file():
+                yield path.relative_to(self.base_upload_dir).as_posix(), path.stat().st_mtime
+    
+    def open_partial(self, file_path: str, offset: int) -> BinaryIO:
+        """
+        Open a partial upload for writing at a byte offset.
+        
+        Anything after the offset (e.g. the tail of an interrupted chunk) is
+        discarded so the file always ends where the next chunk begins.
+        
+        Args:
+            file_path: Relative path of the partial file
+            offset: Byte offset to start writing at
+            
+        Returns:
+            Binary file handle positioned at offset
+            
+        Raises:
+            FileNotFoundError: If the partial file does not exist
+            ValueError: If file path is invalid
+        """
+        full_path = self._staging_path(file_path)
+        
+        buffer = open(full_path, "r+b")
+        buffer.seek(offset)
+        buffer.truncate()
+        return buffer
+    
+    def finalize_partial(
+        self,
+        file_path: str,
+        user_id: int,
+        document_id: int,
+        filename: str
+    ) -> str:
+        """
+        Move a completed partial upload to its permanent location.
+        
+        Args:
+            file_path: Relative path of the partial file
+            user_id: User ID who uploaded the file
+            document_id: Document ID for organizing files
+            filename: Original filename
+            
+        Returns:
+            Relative file path where the PDF was stored
+            
+        Raises:
+            ValueError: If file path is invalid
+            Exception: If file cannot be moved
+        """
+        self._staging_path(file_path)
+        
+        try:
+            stored_path = self.path_for(user_id, document_id, filename)
+            self._store_staged(file_path, stored_path)
+            return stored_path
         except Exception as e:
-            raise Exception(f"Failed to save PDF file: {str(e)}")
+            raise Exception(f"Failed to finalize PDF file: {str(e)}")
+    
+    def _store_staged(self, staged_path: str, stored_path: str) -> None:
+        """
+        Move a staged local file to a stored path.
+        
+        A rename when the target root is a local directory on the same
+        volume; otherwise the file is uploaded and the staged copy removed.
+        """
+        local_file = self._staging_path(staged_path)
+        backend, key = self._resolve(stored_path)
+        target = backend.local_path(key)
+        
+        if target is not None:
+            Path(target).parent.mkdir(parents=True, exist_ok=True)
+            shutil.move(str(local_file), target)
+        else:
+            with open(local_file, "rb") as source:
+                backend.save_stream(key, source)
+            local_file.unlink()
     
     def _sanitize_filename(self, filename: str) -> str:
         """
@@ -146,19 +574,15 @@ class FileStorage:
             ValueError: If file path is invalid
             Exception: If file cannot be deleted
         """
-        # Validate file path
-        full_path = self.base_upload_dir / file_path
-        self._validate_file_path(str(full_path))
-        
         try:
-            if not full_path.exists():
-                raise FileNotFoundError(f"File not found: {file_path}")
-            
-            if not full_path.is_file():
-                raise ValueError(f"Path is not a file: {file_path}")
-            
-            # Delete the file
-            full_path.unlink()
+            if self._is_staged(file_path):
+                full_path = self._staging_path(file_path)
+                if not full_path.is_file():
+                    raise FileNotFoundError(f"File not found: {file_path}")
+                full_path.unlink()
+            else:
+                backend, key = self._resolve(file_path)
+                backend.delete(key)
             
         except FileNotFoundError:
             raise
@@ -167,6 +591,57 @@ class FileStorage:
         except Exception as e:
             raise Exception(f"Failed to delete PDF file: {str(e)}")
     
+    def stat(self, file_path: str) -> ObjectStat:
+        """
+        Get the size and modification time of a stored file.
+        
+        Args:
+            file_path: Stored path
+            
+        Raises:
+            FileNotFoundError: If file does not exist
+            ValueError: If file path is invalid
+        """
+        backend, key = self._resolve(file_path)
+        return backend.stat(key)
+    
+    def iter_files(self) -> Iterator[Tuple[str, float]]:
+        """
+        List every storage root and yield stored files in sorted order.
+        
+        Paths are yielded as they would be stored on Document.file_path,
+        ordered by code point so the stream can be merge-joined with a
+        query ordered the same way. Partial uploads are skipped.
+        
+        Yields:
+            Tuples of (stored path, modification time)
+        """
+        return heapq.merge(*(self._iter_root(name) for name in self.roots))
+    
+    def _iter_root(self, root_name: str) -> Iterator[Tuple[str, float]]:
+        """Yield the stored files of one root in stored-path order."""
+        skip = tuple(self._skip_prefixes[root_name])
+        for key, stat in self.roots[root_name].iter_objects():
+            if skip and key.startswith(skip):
+                continue
+            yield self._to_stored_path(root_name, key), stat.mtime
+    
+    def local_path(self, file_path: str) -> Optional[str]:
+        """
+        Get the local filesystem path of a stored file, if it has one.
+        
+        Args:
+            file_path: Stored path
+            
+        Returns:
+            Absolute file path, or None for files held by a remote backend
+            
+        Raises:
+            ValueError: If file path is invalid
+        """
+        backend, key = self._resolve(file_path)
+        return backend.local_path(key)
+    
     def get_absolute_path(self, file_path: str) -> str:
         """
         Get absolute path for a relative file path.
@@ -178,11 +653,72 @@ class FileStorage:
             Absolute file path
             
         Raises:
+            ValueError: If file path is invalid or not held on local disk
+        """
+        local_path = self.local_path(file_path)
+        if local_path is None:
+            raise ValueError(f"File is not stored on local disk: {file_path}")
+        return local_path
+    
+    @contextmanager
+    def local_copy(self, file_path: str) -> Iterator[str]:
+        """
+        Provide a local file for a stored path, for readers that need one.
+        
+        Local files are used in place; files on remote backends are
+        downloaded to a temporary file that is removed afterwards.
+        
+        Args:
+            file_path: Stored path
+            
+        Yields:
+            Local file path
+        """
+        local_path = self.local_path(file_path)
+        if local_path is not None:
+            yield local_path
+            return
+        
+        backend, key = self._resolve(file_path)
+        with tempfile.NamedTemporaryFile(suffix=".pdf") as target:
+            with backend.open_stream(key) as source:
+                shutil.copyfileobj(source, target, COPY_CHUNK_SIZE)
+            target.flush()
+            yield target.name
+    
+    def iter_range(
+        self,
+        file_path: str,
+        start: int,
+        end: int,
+        chunk_size: int = 64 * 1024
+    ) -> Iterator[bytes]:
+        """
+        Read a byte range of a stored file in chunks.
+        
+        Args:
+            file_path: Relative path from base upload directory
+            start: First byte offset (inclusive)
+            end: Last byte offset (exclusive)
+            chunk_size: Maximum size of each yielded chunk
+            
+        Yields:
+            Consecutive chunks covering [start, end)
+            
+        Raises:
+            FileNotFoundError: If file does not exist
             ValueError: If file path is invalid
         """
-        full_path = self.base_upload_dir / file_path
-        self._validate_file_path(str(full_path))
-        return str(full_path.resolve())
+        backend, key = self._resolve(file_path)
+        
+        with backend.open_stream(key, start) as source:
+            remaining = end - start
+            while remaining > 0:
+                chunk = source.read(min(chunk_size, remaining))
+                if not chunk:
+                    return
+                remaining -= len(chunk)
+                yield chunk
     
     def file_exists(self, file_path: str) -> bool:
         """
@@ -195,7 +731,9 @@ class FileStorage:
             True if file exists, False otherwise
         """
         try:
-            full_path = self.base_upload_dir / file_path
-            return full_path.exists() and full_path.is_file()
+            if self._is_staged(file_path):
+                return self._staging_path(file_path).is_file()
+            self.stat(file_path)
+            return True
         except Exception:
             return False
@@ -0,0 +1,123 @@
+"""Streaming export of a user's extracted document library."""
+
+import json
+import os
+import re
+import zipfile
+from typing import Callable, Iterator, List
+
+from sqlalchemy.orm import Session
+
+from models import Document
+from services.document_purger import DELETING_STATUS
+
+EXPORT_FORMATS = ("ndjson", "zip")
+
+
+class _ChunkBuffer:
+    """Write-only, non-seekable sink that hands written bytes back in chunks."""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+
+    def write(self, data: bytes) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        """Return and forget everything written so far."""
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+class LibraryExporter:
+    """
+    Streams every document of a user with its extracted text.
+
+    Rows are read through a server-side cursor (``yield_per``) on a session
+    owned by the generator, and each document is emitted as soon as it is
+    read, so memory stays constant however large the library is and the
+    first bytes go out before the query has finished.
+    """
+
+    def __init__(self, session_factory: Callable[[], Session], batch_size: int = 200):
+        """
+        Initialize the exporter.
+
+        Args:
+            session_factory: Callable returning a new database session
+            batch_size: Rows fetched from the cursor at a time
+        """
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+
+    def iter_documents(self, user_id: int) -> Iterator[Document]:
+        """
+        Stream a user's documents in id order.
+
+        The session stays open while the caller iterates and is closed when
+        the generator finishes or is closed.
+        """
+        db = self.session_factory()
+        try:
+            query = (
+                db.query(Document)
+                .filter(Document.user_id == user_id, Document.status != DELETING_STATUS)
+                .order_by(Document.id)
+                .execution_options(stream_results=True)
+                .yield_per(self.batch_size)
+            )
+            for document in query:
+                yield document
+                # Nothing is modified, so exported rows need not stay in the identity map
+                db.expunge(document)
+        finally:
+            db.close()
+
+    def iter_ndjson(self, user_id: int) -> Iterator[bytes]:
+        """
+        Stream the library as newline-delimited JSON, one document per line.
+
+        Yields:
+            UTF-8 encoded lines
+        """
+        for document in self.iter_documents(user_id):
+            record = {
+                "id": document.id,
+                "filename": document.filename,
+                "upload_date": document.upload_date.isoformat(),
+                "status": document.status,
+                "word_count": document.word_count,
+                "page_count": document.page_count,
+                "extracted_text": document.extracted_text
+            }
+            yield (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8")
+
+    def iter_zip(self, user_id: int) -> Iterator[bytes]:
+        """
+        Stream the library as a ZIP archive with one text file per document.
+
+        The archive is written to a non-seekable sink, so zipfile uses data
+        descriptors and each member can be sent as soon as it is compressed.
+
+        Yields:
+            Chunks of the ZIP archive
+        """
+        sink = _ChunkBuffer()
+        with zipfile.ZipFile(sink, mode="w", compression=zipfile.ZIP_DEFLATED) as archive:
+            for document in self.iter_documents(user_id):
+                with archive.open(self._member_name(document), mode="w") as member:
+                    member.write((document.extracted_text or "").encode("utf-8"))
+                yield sink.drain()
+        # Central directory
+        yield sink.drain()
+
+    def _member_name(self, document: Document) -> str:
+        """Build a unique, path-free archive member name for a document."""
+        stem = os.path.splitext(os.path.basename(document.filename))[0]
+        stem = re.sub(r'[^\w\s.-]', '_', stem).strip() or "document"
+        return f"{document.id}_{stem}.txt"
@@ -0,0 +1,49 @@
+"""In-process counters for operational metrics."""
+
+import threading
+from collections import defaultdict
+from typing import Dict
+
+
+class Metrics:
+    """
+    Thread-safe named counters.
+    
+    Counters live in the process that increments them; each API or worker
+    process reports its own values.
+    """
+    
+    def __init__(self):
+        """Initialize an empty set of counters."""
+        self._counters: Dict[str, float] = defaultdict(float)
+        self._lock = threading.Lock()
+    
+    def increment(self, name: str, value: float = 1) -> None:
+        """
+        Add to a counter.
+        
+        Args:
+            name: Counter name, e.g. "purge.documents"
+            value: Amount to add
+        """
+        with self._lock:
+            self._counters[name] += value
+    
+    def get(self, name: str) -> float:
+        """Return a counter's current value (0 if never incremented)."""
+        with self._lock:
+            return self._counters.get(name, 0)
+    
+    def snapshot(self) -> Dict[str, float]:
+        """Return a copy of all counters."""
+        with self._lock:
+            return dict(self._counters)
+    
+    def reset(self) -> None:
+        """Clear all counters."""
+        with self._lock:
+            self._counters.clear()
+
+
+# Shared by every service in the process
+metrics = Metrics()
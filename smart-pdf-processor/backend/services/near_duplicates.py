@@ -0,0 +1,229 @@
+"""Near-duplicate detection with MinHash signatures and LSH buckets."""
+
+import hashlib
+import os
+import re
+import struct
+from datetime import datetime
+from typing import List, Optional
+
+from sqlalchemy.orm import Session
+
+from models import Document, DocumentSignature, SignatureBucket
+from services.feed_stamps import restamp_on_commit
+from services.metrics import metrics
+
+# Estimated Jaccard similarity of shingle sets at which documents are flagged
+DUPLICATE_THRESHOLD = float(os.getenv("DUPLICATE_THRESHOLD", "0.8"))
+
+# 16 bands of 8 rows: pairs around 0.7 similarity or more almost always
+# share a bucket, pairs below 0.4 almost never do
+MINHASH_BANDS = 16
+MINHASH_ROWS = 8
+MINHASH_PERMUTATIONS = MINHASH_BANDS * MINHASH_ROWS
+
+# Words per shingle; shorter paragraphs become a single shingle
+SHINGLE_WORDS = 5
+
+IMAGE_MARKER = "**[IMAGE]**"
+WORD_PATTERN = re.compile(r"\w+")
+
+# Bits of a shingle hash that pick its bin; the rest is the value compared
+_BIN_BITS = MINHASH_PERMUTATIONS.bit_length() - 1
+_VALUE_BITS = 64 - _BIN_BITS
+
+
+def shingles(paragraphs: List[str]) -> set:
+    """
+    Hash the word shingles of each paragraph.
+
+    Shingles do not cross paragraph boundaries, so documents whose
+    paragraphs were reflowed or reordered still share most shingles.
+    Case, punctuation and spacing are ignored.
+
+    Args:
+        paragraphs: Extracted paragraphs
+
+    Returns:
+        Set of 64-bit shingle hashes
+    """
+    hashes = set()
+    for paragraph in paragraphs:
+        if paragraph.strip() == IMAGE_MARKER:
+            continue
+        words = WORD_PATTERN.findall(paragraph.lower())
+        for start in range(max(1, len(words) - SHINGLE_WORDS + 1)):
+            shingle = " ".join(words[start:start + SHINGLE_WORDS])
+            if shingle:
+                digest = hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest()
+                hashes.add(int.from_bytes(digest, "little"))
+    return hashes
+
+
+def minhash(paragraphs: List[str]) -> Optional[List[int]]:
+    """
+    Compute the MinHash signature of a document's paragraphs.
+
+    Uses one-permutation hashing: each shingle hash is sent to one of
+    MINHASH_PERMUTATIONS bins by its low bits and each bin keeps its
+    smallest value, so the signature costs one pass over the shingles
+    instead of one per hash function. Empty bins borrow the value of the
+    next non-empty bin, offset by the distance, which keeps equal bins as
+    likely as the shingle sets' Jaccard similarity.
+
+    Args:
+        paragraphs: Extracted paragraphs
+
+    Returns:
+        MINHASH_PERMUTATIONS minimum hash values, or None for a document
+        without text
+    """
+    hashes = shingles(paragraphs)
+    if not hashes:
+        return None
+
+    bins: List[Optional[int]] = [None] * MINHASH_PERMUTATIONS
+    mask = MINHASH_PERMUTATIONS - 1
+    for x in hashes:
+        index, value = x & mask, x >> _BIN_BITS
+        if bins[index] is None or value < bins[index]:
+            bins[index] = value
+
+    signature = []
+    for index in range(MINHASH_PERMUTATIONS):
+        distance = 0
+        while bins[(index + distance) % MINHASH_PERMUTATIONS] is None:
+            distance += 1
+        signature.append(bins[(index + distance) % MINHASH_PERMUTATIONS] + (distance << _VALUE_BITS))
+    return signature
+
+
+def similarity(first: List[int], second: List[int]) -> float:
+    """Estimate the Jaccard similarity of two documents from their signatures."""
+    return sum(1 for x, y in zip(first, second) if x == y) / len(first)
+
+
+def band_buckets(signature: List[int]) -> List[int]:
+    """Hash each band of a signature to a signed 64-bit bucket id."""
+    buckets = []
+    for band in range(MINHASH_BANDS):
+        rows = signature[band * MINHASH_ROWS:(band + 1) * MINHASH_ROWS]
+        digest = hashlib.blake2b(struct.pack(f"<{MINHASH_ROWS + 1}Q", band, *rows), digest_size=8).digest()
+        buckets.append(int.from_bytes(digest, "little", signed=True))
+    return buckets
+
+
+def pack_signature(signature: List[int]) -> bytes:
+    """Serialize a signature for storage."""
+    return struct.pack(f"<{len(signature)}Q", *signature)
+
+
+def unpack_signature(data: bytes) -> List[int]:
+    """Deserialize a stored signature."""
+    return list(struct.unpack(f"<{len(data) // 8}Q", data))
+
+
+class NearDuplicateIndex:
+    """
+    Flags documents whose text nearly matches an earlier one in the library.
+
+    Each completed document stores its MinHash signature and one LSH bucket
+    per band. Finding candidates is an indexed lookup of the new document's
+    buckets on (user_id, bucket), so it costs the same however large the
+    library is; only the few candidates found are compared signature by
+    signature. Nothing is committed here.
+    """
+
+    def __init__(self, db: Session, threshold: float = DUPLICATE_THRESHOLD):
+        """
+        Initialize the index.
+
+        Args:
+            db: Database session
+            threshold: Minimum estimated similarity to flag a duplicate
+        """
+        self.db = db
+        self.threshold = threshold
+
+    def index_document(self, document: Document, signature: Optional[List[int]]) -> None:
+        """
+        Store a document's signature and flag it if it duplicates another.
+
+        Any previous signature of the document must have been removed first
+        (see ``remove_document``).
+
+        Args:
+            document: Completed document
+            signature: Signature from ``minhash``, or None for empty text
+        """
+        document.duplicate_of_id = None
+        if signature is None:
+            return
+
+        buckets = band_buckets(signature)
+        document.duplicate_of_id = self.find_duplicate(document, signature, buckets)
+        if document.duplicate_of_id is not None:
+            metrics.increment("documents.near_duplicates")
+
+        self.db.add(DocumentSignature(
+            document_id=document.id,
+            user_id=document.user_id,
+            signature=pack_signature(signature)
+        ))
+        self.db.add_all([
+            SignatureBucket(document_id=document.id, band=band, user_id=document.user_id, bucket=bucket)
+            for band, bucket in enumerate(buckets)
+        ])
+
+    def find_duplicate(self, document: Document, signature: List[int], buckets: List[int]) -> Optional[int]:
+        """
+        Find the earliest completed document the given signature nearly matches.
+
+        Args:
+            document: Document the signature belongs to (never matched itself)
+            signature: Its MinHash signature
+            buckets: Its band buckets
+
+        Returns:
+            ID of the duplicated document, or None
+        """
+        candidates = (
+            self.db.query(DocumentSignature.document_id, DocumentSignature.signature)
+            .join(Document, Document.id == DocumentSignature.document_id)
+            .filter(
+                DocumentSignature.document_id.in_(
+                    self.db.query(SignatureBucket.document_id).filter(
+                        SignatureBucket.user_id == document.user_id,
+                        SignatureBucket.bucket.in_(buckets)
+                    )
+                ),
+                DocumentSignature.document_id != document.id,
+                Document.status == "completed"
+            )
+            .order_by(DocumentSignature.document_id)
+            .all()
+        )
+        for document_id, data in candidates:
+            if similarity(signature, unpack_signature(data)) >= self.threshold:
+                return document_id
+        return None
+
+    def remove_document(self, document: Document) -> None:
+        """
+        Remove a document's signature and unflag documents pointing to it.
+
+        Args:
+            document: Document being reprocessed or deleted
+        """
+        self.db.query(SignatureBucket).filter(
+            SignatureBucket.document_id == document.id
+        ).delete(synchronize_session=False)
+        self.db.query(DocumentSignature).filter(
+            DocumentSignature.document_id == document.id
+        ).delete(synchronize_session=False)
+        self.db.query(Document).filter(Document.duplicate_of_id == document.id).update(
+            {Document.duplicate_of_id: None, Document.updated_at: datetime.utcnow()},
+            synchronize_session=False
+        )
+        # Unflagged rows no longer point here; find them by owner instead
+        restamp_on_commit(self.db, Document, Document.user_id == document.user_id)
@@ -1,13 +1,41 @@
 """PDF text extraction service with paragraph preservation and image detection."""
 
-import pdfplumber
-from typing import List, Optional
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 import re
 
 
+def _open_pdf(pdf_path: str):
+    """
+    Open a PDF with pdfplumber, importing it on first use.
+    
+    pdfplumber pulls in pdfminer and its dependencies, a large share of an
+    API process's startup time and memory; processes that never extract
+    text (most API workers) never load it.
+    
+    Args:
+        pdf_path: Path to the PDF file
+        
+    Returns:
+        Open pdfplumber PDF, to be used as a context manager
+    """
+    import pdfplumber
+    return pdfplumber.open(pdf_path)
+
+
 class PDFExtractor:
     """Service for extracting text from PDF files with structure preservation."""
     
+    def __init__(self, low_memory: bool = False):
+        """
+        Initialize PDF extractor.
+        
+        Args:
+            low_memory: Release each page's cached layout objects as soon as
+                the page has been processed, keeping memory bounded regardless
+                of page count
+        """
+        self.low_memory = low_memory
+    
     def extract_text(self, pdf_path: str) -> List[str]:
         """
         Extract text from PDF maintaining paragraph structure.
@@ -21,36 +49,147 @@ class PDFExtractor:
         Raises:
             Exception: If PDF cannot be read or processed
         """
-        paragraphs = []
+        return list(self.iter_paragraphs(pdf_path))
+    
+    def iter_paragraphs(self, pdf_path: str) -> Iterator[str]:
+        """
+        Lazily extract paragraphs from a PDF, one page at a time.
+        
+        Pages are only parsed as the caller consumes paragraphs, so a consumer
+        that stops early (e.g. once a word limit is reached) never pays for
+        the remaining pages.
+        
+        Args:
+            pdf_path: Path to the PDF file
+            
+        Yields:
+            Paragraphs with image markers inserted
+            
+        Raises:
+            Exception: If PDF cannot be read or processed
+        """
+        for _, page_paragraphs in self.iter_pages(pdf_path):
+            yield from page_paragraphs
+    
+    def iter_pages(self, pdf_path: str) -> Iterator[Tuple[int, List[str]]]:
+        """
+        Lazily extract paragraphs page by page.
         
+        Args:
+            pdf_path: Path to the PDF file
+            
+        Yields:
+            Tuples of (page number, paragraphs on that page)
+            
+        Raises:
+            Exception: If PDF cannot be read or processed
+        """
         try:
-            with pdfplumber.open(pdf_path) as pdf:
+            with _open_pdf(pdf_path) as pdf:
                 for page in pdf.pages:
-                    # Extract text from the page
-                    page_text = page.extract_text()
+                    page_paragraphs = self._extract_page(page)
                     
-                    # Check for images on this page
-                    images = page.images
-                    has_images = len(images) > 0
+                    if self.low_memory:
+                        # pdfplumber keeps every page's parsed layout objects
+                        # alive for the lifetime of the pdf handle
+                        page.close()
+                    
+                    yield page.page_number, page_paragraphs
                     
-                    if page_text:
-                        # Split text into paragraphs (separated by blank lines)
-                        page_paragraphs = self._detect_paragraphs(page_text)
-                        
-                        # If there are images on this page, insert marker
-                        if has_images and page_paragraphs:
-                            # Insert image marker after first paragraph of page
-                            page_paragraphs.insert(1, "**[IMAGE]**")
-                        
-                        paragraphs.extend(page_paragraphs)
-                    elif has_images:
-                        # Page has only images, no text
-                        paragraphs.append("**[IMAGE]**")
-                        
         except Exception as e:
             raise Exception(f"Failed to extract text from PDF: {str(e)}")
+    
+    def count_pages(self, pdf_path: str) -> int:
+        """
+        Count the pages of a PDF without extracting any text.
+        
+        Args:
+            pdf_path: Path to the PDF file
+            
+        Returns:
+            Number of pages
+            
+        Raises:
+            Exception: If PDF cannot be read
+        """
+        try:
+            with _open_pdf(pdf_path) as pdf:
+                return len(pdf.pages)
+        except Exception as e:
+            raise Exception(f"Failed to read PDF: {str(e)}")
+    
+    def extract_tables(self, pdf_path: str) -> List[Dict[str, Any]]:
+        """
+        Extract the tables of every page.
+        
+        Cells are strings with whitespace collapsed (empty for merged or
+        missing cells); tables without any text are dropped.
+        
+        Args:
+            pdf_path: Path to the PDF file
+            
+        Returns:
+            List of {"page": page number, "tables": list of row lists} for
+            pages that have tables
+            
+        Raises:
+            Exception: If PDF cannot be read or processed
+        """
+        try:
+            pages = []
+            with _open_pdf(pdf_path) as pdf:
+                for page in pdf.pages:
+                    tables = []
+                    for table in page.extract_tables():
+                        rows = [
+                            [re.sub(r'\s+', ' ', cell).strip() if cell else "" for cell in row]
+                            for row in table
+                        ]
+                        if any(any(row) for row in rows):
+                            tables.append(rows)
+                    
+                    if self.low_memory:
+                        page.close()
+                    
+                    if tables:
+                        pages.append({"page": page.page_number, "tables": tables})
+            return pages
+            
+        except Exception as e:
+            raise Exception(f"Failed to read PDF: {str(e)}")
+    
+    def _extract_page(self, page) -> List[str]:
+        """
+        Extract paragraphs from a single page.
+        
+        Args:
+            page: pdfplumber page object
+            
+        Returns:
+            List of paragraphs with an image marker inserted if the page has images
+        """
+        # Extract text from the page
+        page_text = page.extract_text()
+        
+        # Check for images on this page
+        images = page.images
+        has_images = len(images) > 0
+        
+        if page_text:
+            # Split text into paragraphs (separated by blank lines)
+            page_paragraphs = self._detect_paragraphs(page_text)
+            
+            # If there are images on this page, insert marker
+            if has_images and page_paragraphs:
+                # Insert image marker after first paragraph of page
+                page_paragraphs.insert(1, "**[IMAGE]**")
+            
+            return page_paragraphs
+        elif has_images:
+            # Page has only images, no text
+            return ["**[IMAGE]**"]
         
-        return paragraphs
+        return []
     
     def _detect_paragraphs(self, text: str) -> List[str]:
         """
@@ -1,37 +1,93 @@
 """PDF processing service for background document processing."""
 
+import os
 import time
-from typing import Optional
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
 from sqlalchemy.exc import OperationalError, DBAPIError
 
 from models import Document
-from services import PDFExtractor, WordLimiter, FileStorage
+from services import PDFExtractor, WordLimiter, StorageUsageTracker, RelatedDocumentIndex, FileStorage
+from services.document_purger import DELETING_STATUS
+from services.feed_stamps import restamp_on_commit
+from services.metrics import metrics
+from services.near_duplicates import NearDuplicateIndex, minhash
+from services.retry_policy import (
+    PROCESSING_MAX_ATTEMPTS,
+    RETRYING_STATUS,
+    TRANSIENT,
+    classify_failure,
+    next_retry_at
+)
+from services.table_cache import DocumentTableCache
+
+# Configuration
+PDF_LOW_MEMORY_MODE = os.getenv("PDF_LOW_MEMORY_MODE", "false").lower() == "true"
+# Publish the text extracted so far every this many pages (0 disables)
+PDF_PARTIAL_PAGES = int(os.getenv("PDF_PARTIAL_PAGES", "5"))
+
+# Status of documents still processing whose first pages are already readable
+PARTIAL_STATUS = "partial"
+
+# Statuses of a document some processor has claimed
+IN_PROGRESS_STATUSES = ("processing", PARTIAL_STATUS)
+
+
+class ProcessingCancelled(Exception):
+    """Raised when a document is deleted while it is being processed."""
+    pass
 
 
 class PDFProcessor:
     """Service for processing PDF documents in the background."""
     
-    def __init__(self, db: Session, file_storage: FileStorage):
+    def __init__(
+        self,
+        db: Session,
+        file_storage: FileStorage,
+        low_memory: bool = PDF_LOW_MEMORY_MODE,
+        partial_pages: int = PDF_PARTIAL_PAGES
+    ):
         """
         Initialize PDF processor.
         
         Args:
             db: Database session
             file_storage: File storage service instance
+            low_memory: Release each page's parsed layout as soon as it is
+                read and publish progress without partial text
+            partial_pages: Publish partial results every this many pages
+                (0 disables)
         """
         self.db = db
         self.file_storage = file_storage
-        self.pdf_extractor = PDFExtractor()
+        self.low_memory = low_memory
+        self.partial_pages = partial_pages
+        self.pdf_extractor = PDFExtractor(low_memory=low_memory)
         self.word_limiter = WordLimiter(db)
+        self.storage_usage = StorageUsageTracker(db)
+        self.related_index = RelatedDocumentIndex(db)
+        self.duplicate_index = NearDuplicateIndex(db)
+        self.table_cache = DocumentTableCache(db, file_storage, self.pdf_extractor)
+        # Version of the document being processed as this run last saw or
+        # wrote it; every write is conditional on it still being current
+        self._expected_version: Optional[int] = None
     
     def process_document(self, document_id: int) -> None:
         """
         Process a PDF document: extract text, apply word limits, update database.
         
+        Only one run processes a document: the run that moves it from
+        ``pending`` to ``processing``. Duplicate deliveries of the same
+        document (another worker or node got there first, or it is already
+        done) return without extracting anything.
+        
         Args:
             document_id: ID of document to process
         """
+        self._expected_version = None
         try:
             # Load document with retry logic
             document = self._load_document_with_retry(document_id)
@@ -39,46 +95,52 @@ class PDFProcessor:
             if not document:
                 raise ValueError(f"Document {document_id} not found")
             
-            # Update status to processing
-            self._update_status_with_retry(document, "processing")
+            if document.status == DELETING_STATUS:
+                return  # Deleted before processing started
             
-            # Get absolute file path
-            file_path = self.file_storage.get_absolute_path(document.file_path)
-            
-            # Extract text from PDF
-            paragraphs = self.pdf_extractor.extract_text(file_path)
+            # Claim the document by moving it to processing
+            self._expected_version = document.version
+            if not self._begin_processing_with_retry(document):
+                return
             
-            # Apply word limit based on user's tier
-            limited_text = self.word_limiter.apply_word_limit(
-                document.user_id,
-                paragraphs
-            )
+            # Get a local file (downloaded first for remote storage backends)
+            with self.file_storage.local_copy(document.file_path) as file_path:
+                page_count = self.pdf_extractor.count_pages(file_path)
+                
+                # Extract text, applying the word limit of the user's tier
+                limited_text, word_count = self._extract_with_progress(
+                    document,
+                    file_path,
+                    page_count
+                )
             
-            # Count words in final text
-            word_count = self._count_words(limited_text)
+            # Fingerprint the text for near-duplicate detection
+            signature = minhash(limited_text.split("\n\n"))
             
-            # Update document with results
+            # Update document with results (skipped if it was deleted meanwhile)
             self._update_document_with_retry(
                 document,
                 extracted_text=limited_text,
                 word_count=word_count,
+                page_count=page_count,
                 status="completed",
-                error_message=None
+                error_message=None,
+                signature=signature
             )
             
+        except ProcessingCancelled:
+            return
+            
         except Exception as e:
             # Handle any errors during processing
-            error_message = str(e)
-            
             try:
                 # Try to load document again in case of stale session
+                self.db.rollback()
                 document = self._load_document_with_retry(document_id)
                 if document:
-                    self._update_status_with_retry(
-                        document,
-                        "failed",
-                        error_message=error_message
-                    )
+                    if self._expected_version is None:
+                        self._expected_version = document.version
+                    self._record_failure_with_retry(document, e)
             except Exception as update_error:
                 # Log error but don't raise - processing already failed
                 print(f"Failed to update document status: {update_error}")
@@ -86,6 +148,102 @@ class PDFProcessor:
             # Re-raise original exception for logging
             raise
     
+    def _extract_with_progress(
+        self,
+        document: Document,
+        file_path: str,
+        page_count: int
+    ) -> Tuple[str, int]:
+        """
+        Extract and word-limit text, publishing partial results as pages are read.
+        
+        Paragraphs are streamed page by page from the extractor through the
+        word limiter, so extraction stops as soon as the tier's word limit
+        is reached. Every ``partial_pages`` pages the text so far is saved
+        with status ``partial`` and the share of pages read.
+        
+        The extracted text is saved to the document as one string, so its
+        size bounds peak memory in both modes. Low-memory mode bounds the
+        extractor's per-page caches only, and publishes just the progress
+        to avoid joining a second copy of the text read so far.
+        
+        Args:
+            document: Document being processed
+            file_path: Absolute path to the PDF file
+            page_count: Number of pages in the PDF
+            
+        Returns:
+            Tuple of (limited text, word count)
+            
+        Raises:
+            ProcessingCancelled: If the document was deleted meanwhile
+        """
+        limit = self.word_limiter.get_word_limit(document.user_id)
+        collected: List[str] = []
+        word_count = 0
+        
+        def read_pages():
+            for page_number, page_paragraphs in self.pdf_extractor.iter_pages(file_path):
+                yield from page_paragraphs
+                # The limiter asks for the next paragraph only after the loop
+                # below has collected the previous one, so every paragraph up
+                # to this page is in by now
+                if self.partial_pages and page_number % self.partial_pages == 0 and page_number < page_count:
+                    self._publish_partial(
+                        document,
+                        None if self.low_memory else '\n\n'.join(collected),
+                        word_count,
+                        page_number * 100 // page_count
+                    )
+        
+        for paragraph in self.word_limiter.limit_paragraphs(read_pages(), limit):
+            word_count += self._count_words(paragraph)
+            collected.append(paragraph)
+        
+        return '\n\n'.join(collected), word_count
+    
+    def _publish_partial(
+        self,
+        document: Document,
+        text: Optional[str],
+        word_count: int,
+        progress: int
+    ) -> None:
+        """
+        Save the results so far of a document that is still processing.
+        
+        The update only applies while this run's claim on the document
+        holds, so a document deleted meanwhile is left alone.
+        
+        Args:
+            document: Document being processed
+            text: Text extracted so far, or None to publish progress only
+            word_count: Words in that text
+            progress: Percentage of pages read
+            
+        Raises:
+            ProcessingCancelled: If the document is no longer processing
+        """
+        values = {
+            Document.status: PARTIAL_STATUS,
+            Document.progress: progress,
+            Document.word_count: word_count,
+            Document.updated_at: datetime.utcnow()
+        }
+        if text is not None:
+            values[Document.extracted_text] = text
+        
+        updated = self.db.query(Document).filter(
+            Document.id == document.id,
+            Document.status.in_(IN_PROGRESS_STATUSES),
+            Document.version == self._expected_version
+        ).update(values, synchronize_session=False)
+        restamp_on_commit(self.db, Document, Document.id == document.id)
+        self.db.commit()
+        
+        if not updated:
+            raise ProcessingCancelled(f"Document {document.id} is no longer processing")
+    
     def _load_document_with_retry(
         self,
         document_id: int,
@@ -118,29 +276,132 @@ class PDFProcessor:
         
         return None
     
-    def _update_status_with_retry(
+    def _begin_processing_with_retry(self, document: Document, max_retries: int = 3) -> bool:
+        """
+        Claim a pending document for processing, dropping data derived from earlier text.
+        
+        The ``pending`` to ``processing`` transition is a compare-and-set,
+        so when the same document is delivered to several processors only
+        one claims it; the others count an avoided duplicate run.
+        
+        Partial results overwrite ``extracted_text`` while processing, so
+        the related-document vector, near-duplicate signature and cached
+        tables of a reprocessed document are removed first, while the text
+        they were built from is still there.
+        
+        Args:
+            document: Document to start processing
+            max_retries: Maximum number of retry attempts
+            
+        Returns:
+            True if this run claimed the document
+        """
+        for attempt in range(max_retries):
+            try:
+                if not self._compare_and_set(document, ("pending",), {
+                    Document.status: "processing",
+                    Document.progress: 0
+                }):
+                    self.db.rollback()
+                    metrics.increment("processing.duplicates_avoided")
+                    return False
+                self.related_index.remove_document(document)
+                self.duplicate_index.remove_document(document)
+                self.table_cache.invalidate(document.id)
+                self.db.commit()
+                self._expected_version += 1
+                return True
+            except (OperationalError, DBAPIError) as e:
+                self.db.rollback()
+                if attempt < max_retries - 1:
+                    # Exponential backoff
+                    time.sleep(0.1 * (2 ** attempt))
+                    # Refresh document to get latest state
+                    self.db.refresh(document)
+                else:
+                    raise
+    
+    def _compare_and_set(
         self,
         document: Document,
-        status: str,
-        error_message: Optional[str] = None,
+        from_statuses: Sequence[str],
+        values: Dict[Any, Any]
+    ) -> bool:
+        """
+        Apply a status transition if nobody else changed the document first.
+        
+        The UPDATE only matches while the document is in one of
+        ``from_statuses`` and still at the version this run expects, and
+        bumps the version, so of two concurrent transitions from the same
+        state exactly one succeeds. Nothing is committed; callers advance
+        ``_expected_version`` once their transaction commits.
+        
+        Args:
+            document: Document to update
+            from_statuses: Statuses the transition is allowed from
+            values: Column values to set, including the new status
+            
+        Returns:
+            True if the transition was applied
+        """
+        new_version = self._expected_version + 1
+        updated = self.db.query(Document).filter(
+            Document.id == document.id,
+            Document.status.in_(from_statuses),
+            Document.version == self._expected_version
+        ).update(
+            {**values, Document.version: new_version, Document.updated_at: datetime.utcnow()},
+            synchronize_session=False
+        )
+        if not updated:
+            return False
+        restamp_on_commit(self.db, Document, Document.id == document.id)
+        
+        # Keep the loaded document in step without marking it changed
+        set_committed_value(document, "version", new_version)
+        if Document.status in values:
+            set_committed_value(document, "status", values[Document.status])
+        return True
+    
+    def _record_failure_with_retry(
+        self,
+        document: Document,
+        error: Exception,
         max_retries: int = 3
     ) -> None:
         """
-        Update document status with retry logic.
+        Record a processing failure, scheduling a retry if it may be transient.
+        
+        Transient failures (database, network or storage unavailable) are
+        retried with exponential backoff until PROCESSING_MAX_ATTEMPTS
+        attempts have been made; those and permanent failures (e.g. a
+        corrupt PDF) end as ``failed``, the dead-letter state admins review.
+        
+        Nothing is recorded if the document was deleted or another run
+        took it over meanwhile.
         
         Args:
-            document: Document to update
-            status: New status
-            error_message: Optional error message
+            document: Document that failed
+            error: Exception raised while processing
             max_retries: Maximum number of retry attempts
         """
+        kind = classify_failure(error)
         for attempt in range(max_retries):
             try:
-                document.status = status
-                if error_message is not None:
-                    document.error_message = error_message
+                attempts = (document.attempts or 0) + 1
+                retry = kind == TRANSIENT and attempts < PROCESSING_MAX_ATTEMPTS
+                if not self._compare_and_set(document, ("pending",) + IN_PROGRESS_STATUSES, {
+                    Document.status: RETRYING_STATUS if retry else "failed",
+                    Document.attempts: attempts,
+                    Document.failure_kind: kind,
+                    Document.error_message: str(error),
+                    Document.next_retry_at: next_retry_at(attempts) if retry else None
+                }):
+                    self.db.rollback()
+                    return
                 self.db.commit()
-                return
+                self._expected_version += 1
+                break
             except (OperationalError, DBAPIError) as e:
                 self.db.rollback()
                 if attempt < max_retries - 1:
@@ -150,34 +411,62 @@ class PDFProcessor:
                     self.db.refresh(document)
                 else:
                     raise
+        
+        if retry:
+            metrics.increment("processing.retries_scheduled")
+        else:
+            metrics.increment("processing.dead_lettered")
     
     def _update_document_with_retry(
         self,
         document: Document,
         extracted_text: str,
         word_count: int,
+        page_count: int,
         status: str,
         error_message: Optional[str],
+        signature: Optional[List[int]] = None,
         max_retries: int = 3
     ) -> None:
         """
         Update document with processing results with retry logic.
         
+        The owner's storage usage gets the page count change, and completed
+        documents their related-document vector and near-duplicate flag, in
+        the same commit. Nothing is saved if the document was deleted or
+        another run took it over meanwhile.
+        
         Args:
             document: Document to update
             extracted_text: Extracted text content
             word_count: Word count
+            page_count: Number of pages in the PDF
             status: Processing status
             error_message: Optional error message
+            signature: MinHash signature of the extracted text
             max_retries: Maximum number of retry attempts
         """
         for attempt in range(max_retries):
             try:
+                if not self._compare_and_set(document, IN_PROGRESS_STATUSES, {Document.status: status}):
+                    self.db.rollback()
+                    return
+                self.storage_usage.add_pages(
+                    document.user_id,
+                    page_count - (document.page_count or 0)
+                )
                 document.extracted_text = extracted_text
                 document.word_count = word_count
-                document.status = status
+                document.page_count = page_count
                 document.error_message = error_message
+                if status == "completed":
+                    document.progress = 100
+                    document.failure_kind = None
+                    document.next_retry_at = None
+                    self.related_index.index_document(document)
+                    self.duplicate_index.index_document(document, signature)
                 self.db.commit()
+                self._expected_version += 1
                 return
             except (OperationalError, DBAPIError) as e:
                 self.db.rollback()
@@ -216,3 +505,28 @@ def process_document(document_id: int, db: Session, file_storage: FileStorage) -
     """
     processor = PDFProcessor(db, file_storage)
     processor.process_document(document_id)
+
+
+def process_batch(document_ids: List[int], db: Session, file_storage: FileStorage) -> None:
+    """
+    Process a batch of documents sequentially with one database session.
+    
+    A failure in one document is recorded on that document and does not
+    stop the rest of the batch.
+    
+    Args:
+        document_ids: IDs of documents to process, in order
+        db: Database session (closed when the batch is done)
+        file_storage: File storage service instance
+    """
+    processor = PDFProcessor(db, file_storage)
+    
+    try:
+        for document_id in document_ids:
+            try:
+                processor.process_document(document_id)
+            except Exception as e:
+                # Already recorded as failed on the document
+                print(f"Failed to process document {document_id}: {e}")
+    finally:
+        db.close()
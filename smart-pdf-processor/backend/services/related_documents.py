@@ -0,0 +1,235 @@
+"""Related-document recommendations from per-user TF-IDF vectors."""
+
+import heapq
+import math
+import os
+import re
+from collections import Counter
+from typing import Dict, Iterable, List, Set, Tuple
+
+from sqlalchemy import update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from models import Document, DocumentTerm, TermStatistic, StorageUsage
+
+# Terms kept per document vector; rarer terms dominate similarity, so the
+# common ones dropped here barely change scores but keep posting lists short
+RELATED_MAX_TERMS = int(os.getenv("RELATED_MAX_TERMS", "64"))
+
+# Terms per IN (...) list, well below SQLite's bound-parameter limit
+TERM_CHUNK_SIZE = 500
+
+IMAGE_MARKER = "**[IMAGE]**"
+WORD_PATTERN = re.compile(r"[^\W\d_]{3,}")
+STOP_WORDS = frozenset("""
+    about above after again against all also and any are because been before being
+    below between both but can could did does doing down during each few for from
+    further had has have having her here hers him his how into its itself just more
+    most not now off once only other our ours out over own same she should some such
+    than that the their theirs them then there these they this those through too
+    under until very was were what when where which while who whom why will with
+    would you your yours
+""".split())
+
+
+def tokenize(text: str) -> Counter:
+    """
+    Split extracted text into lowercase index terms.
+
+    Args:
+        text: Extracted document text
+
+    Returns:
+        Counter of term occurrences
+    """
+    words = WORD_PATTERN.findall(text.replace(IMAGE_MARKER, " ").lower())
+    return Counter(word[:64] for word in words if word not in STOP_WORDS)
+
+
+class RelatedDocumentIndex:
+    """
+    Per-user TF-IDF index for finding documents similar to a given one.
+
+    Each completed document is stored as a sparse vector of its
+    ``RELATED_MAX_TERMS`` highest-weighted terms, L2-normalised at index time
+    so cosine similarity is a plain dot product. The rows double as an
+    inverted index on (user_id, term): a query reads only the posting lists
+    of its own terms and accumulates every candidate's score in one pass, so
+    its cost depends on how many documents share those terms rather than on
+    the size of the library.
+
+    Document frequencies are kept per user and updated as documents are
+    indexed and removed. Weights use the frequencies at index time, so they
+    drift slightly as a library grows; reindexing a document refreshes it.
+    Nothing is committed here.
+    """
+
+    def __init__(self, db: Session, max_terms: int = RELATED_MAX_TERMS):
+        """
+        Initialize the index.
+
+        Args:
+            db: Database session
+            max_terms: Terms kept per document vector
+        """
+        self.db = db
+        self.max_terms = max_terms
+
+    def index_document(self, document: Document) -> None:
+        """
+        Add a document's current extracted text to its owner's index.
+
+        Any previous vector of the document must have been removed first
+        (see ``remove_document``).
+
+        Args:
+            document: Document with extracted text
+        """
+        counts = tokenize(document.extracted_text or "")
+        if not counts:
+            return
+
+        self._adjust_frequencies(document.user_id, set(counts), 1)
+        frequencies = self._frequencies(document.user_id, counts)
+        usage = self.db.query(StorageUsage.documents).filter(
+            StorageUsage.user_id == document.user_id
+        ).scalar() or 0
+
+        weights = {}
+        for term, count in counts.items():
+            frequency = frequencies.get(term, 1)
+            total = max(usage, frequency)
+            idf = math.log((1 + total) / (1 + frequency)) + 1
+            weights[term] = (1 + math.log(count)) * idf
+
+        top = heapq.nlargest(self.max_terms, weights.items(), key=lambda item: (item[1], item[0]))
+        norm = math.sqrt(sum(weight * weight for _, weight in top))
+        self.db.add_all([
+            DocumentTerm(
+                document_id=document.id,
+                user_id=document.user_id,
+                term=term,
+                weight=weight / norm
+            )
+            for term, weight in top
+        ])
+
+    def remove_document(self, document: Document) -> None:
+        """
+        Remove a document's vector and its contribution to term frequencies.
+
+        Must be called while ``extracted_text`` still holds the indexed text.
+        Documents that were never indexed are left alone.
+
+        Args:
+            document: Document to remove
+        """
+        deleted = self.db.query(DocumentTerm).filter(
+            DocumentTerm.document_id == document.id
+        ).delete(synchronize_session=False)
+        if deleted:
+            terms = set(tokenize(document.extracted_text or ""))
+            self._adjust_frequencies(document.user_id, terms, -1)
+
+    def related(self, document: Document, limit: int = 5) -> List[Tuple[Document, float]]:
+        """
+        Find the documents most similar to a document in the same library.
+
+        Args:
+            document: Document to find relatives of
+            limit: Maximum number of results
+
+        Returns:
+            List of (document, cosine similarity) pairs, most similar first
+        """
+        query_vector = dict(
+            self.db.query(DocumentTerm.term, DocumentTerm.weight)
+            .filter(DocumentTerm.document_id == document.id)
+            .all()
+        )
+        if not query_vector:
+            return []
+
+        scores: Dict[int, float] = {}
+        for terms in self._chunks(query_vector):
+            postings = self.db.query(
+                DocumentTerm.document_id, DocumentTerm.term, DocumentTerm.weight
+            ).filter(
+                DocumentTerm.user_id == document.user_id,
+                DocumentTerm.term.in_(terms),
+                DocumentTerm.document_id != document.id
+            )
+            for document_id, term, weight in postings:
+                scores[document_id] = scores.get(document_id, 0.0) + weight * query_vector[term]
+
+        # Spare candidates cover documents being deleted or reprocessed
+        best = heapq.nlargest(limit * 2, scores.items(), key=lambda item: (item[1], -item[0]))
+        documents = {
+            candidate.id: candidate
+            for candidate in self.db.query(Document).filter(
+                Document.id.in_([document_id for document_id, _ in best]),
+                Document.status == "completed"
+            )
+        }
+        return [
+            (documents[document_id], score)
+            for document_id, score in best
+            if document_id in documents
+        ][:limit]
+
+    def _frequencies(self, user_id: int, terms: Iterable[str]) -> Dict[str, int]:
+        """Look up the document frequencies of terms in a user's library."""
+        frequencies = {}
+        for chunk in self._chunks(terms):
+            frequencies.update(
+                self.db.query(TermStatistic.term, TermStatistic.documents).filter(
+                    TermStatistic.user_id == user_id,
+                    TermStatistic.term.in_(chunk)
+                )
+            )
+        return frequencies
+
+    def _adjust_frequencies(self, user_id: int, terms: Set[str], delta: int) -> None:
+        """
+        Add delta to the document frequency of each term.
+
+        Existing rows get a relative UPDATE; missing ones (only when adding)
+        are inserted, retrying as updates if a concurrent index created them.
+        Rows no document counts any more are deleted, so the table only holds
+        terms of the user's current documents.
+        """
+        for chunk in self._chunks(terms):
+            # RETURNING tells which rows took the update, even if a
+            # concurrent removal deleted one since it was read
+            existing = set(self.db.execute(
+                update(TermStatistic)
+                .where(TermStatistic.user_id == user_id, TermStatistic.term.in_(chunk))
+                .values({TermStatistic.documents: TermStatistic.documents + delta})
+                .returning(TermStatistic.term)
+                .execution_options(synchronize_session=False)
+            ).scalars())
+
+            if delta < 0:
+                self.db.query(TermStatistic).filter(
+                    TermStatistic.user_id == user_id,
+                    TermStatistic.term.in_(chunk),
+                    TermStatistic.documents <= 0
+                ).delete(synchronize_session=False)
+
+            missing = set(chunk) - existing
+            if missing and delta > 0:
+                try:
+                    with self.db.begin_nested():
+                        self.db.add_all([
+                            TermStatistic(user_id=user_id, term=term, documents=delta)
+                            for term in missing
+                        ])
+                except IntegrityError:
+                    self._adjust_frequencies(user_id, missing, delta)
+
+    def _chunks(self, terms: Iterable[str]) -> Iterable[List[str]]:
+        """Split terms into lists short enough for one IN (...) clause."""
+        terms = sorted(terms)
+        for start in range(0, len(terms), TERM_CHUNK_SIZE):
+            yield terms[start:start + TERM_CHUNK_SIZE]
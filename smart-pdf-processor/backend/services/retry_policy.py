@@ -0,0 +1,90 @@
+"""Failure classification and retry backoff for document processing."""
+
+import os
+import random
+from datetime import datetime, timedelta
+from typing import Iterator, Tuple, Type
+
+from sqlalchemy.exc import OperationalError
+
+# Attempts (including the first) before a transient failure is dead-lettered
+PROCESSING_MAX_ATTEMPTS = int(os.getenv("PROCESSING_MAX_ATTEMPTS", "5"))
+# Delay before the first retry, doubled for each later one up to the maximum
+RETRY_BASE_SECONDS = float(os.getenv("RETRY_BASE_SECONDS", "30"))
+RETRY_MAX_SECONDS = float(os.getenv("RETRY_MAX_SECONDS", "3600"))
+# Processing documents not updated for this long are treated as abandoned by
+# a crashed worker and retried (0 disables); must exceed the longest gap
+# between progress updates
+PROCESSING_STALL_SECONDS = float(os.getenv("PROCESSING_STALL_SECONDS", "1800"))
+
+# Status of documents waiting for an automatic retry
+RETRYING_STATUS = "retrying"
+
+TRANSIENT = "transient"
+PERMANENT = "permanent"
+
+# Errors worth retrying: the database, network or storage was unavailable,
+# not something wrong with the document itself
+TRANSIENT_ERRORS: Tuple[Type[BaseException], ...] = (OperationalError, TimeoutError, ConnectionError)
+try:
+    from botocore.exceptions import (
+        ConnectionClosedError,
+        ConnectTimeoutError,
+        EndpointConnectionError,
+        ReadTimeoutError
+    )
+    TRANSIENT_ERRORS += (ConnectionClosedError, ConnectTimeoutError, EndpointConnectionError, ReadTimeoutError)
+except ImportError:
+    pass
+
+
+def _exception_chain(error: BaseException) -> Iterator[BaseException]:
+    """Yield an exception and the exceptions it was raised from or during."""
+    seen = set()
+    while error is not None and id(error) not in seen:
+        seen.add(id(error))
+        yield error
+        error = error.__cause__ or error.__context__
+
+
+def classify_failure(error: BaseException) -> str:
+    """
+    Decide whether a processing failure may succeed if retried.
+
+    The extractor re-raises parser errors as plain exceptions, so the whole
+    chain of causes is inspected.
+
+    Args:
+        error: Exception raised while processing
+
+    Returns:
+        TRANSIENT or PERMANENT
+    """
+    if any(isinstance(cause, TRANSIENT_ERRORS) for cause in _exception_chain(error)):
+        return TRANSIENT
+    return PERMANENT
+
+
+def retry_delay(attempt: int, base_seconds: float = RETRY_BASE_SECONDS, max_seconds: float = RETRY_MAX_SECONDS) -> float:
+    """
+    Get the delay before retrying after a failed attempt.
+
+    Exponential backoff with "equal jitter": half the backoff is fixed and
+    half random, so documents that failed together (e.g. during a database
+    outage) do not all come back at the same moment.
+
+    Args:
+        attempt: Number of attempts made so far (1 after the first failure)
+        base_seconds: Delay after the first failure before jitter
+        max_seconds: Cap on the delay before jitter
+
+    Returns:
+        Delay in seconds
+    """
+    backoff = min(max_seconds, base_seconds * (2 ** (attempt - 1)))
+    return backoff / 2 + random.uniform(0, backoff / 2)
+
+
+def next_retry_at(attempt: int) -> datetime:
+    """Get the time after which a failed document should be retried."""
+    return datetime.utcnow() + timedelta(seconds=retry_delay(attempt))
@@ -0,0 +1,200 @@
+"""Background retries of documents whose processing failed transiently."""
+
+import threading
+from datetime import datetime, timedelta
+from typing import Callable, List
+
+from sqlalchemy.orm import Session
+
+from models import Document
+from services.feed_stamps import restamp_on_commit
+from services.file_storage import FileStorage
+from services.metrics import metrics
+from services.pdf_processor import IN_PROGRESS_STATUSES, process_batch
+from services.retry_policy import (
+    PROCESSING_MAX_ATTEMPTS,
+    PROCESSING_STALL_SECONDS,
+    RETRYING_STATUS,
+    TRANSIENT,
+    next_retry_at
+)
+from services.work_queue import work_set
+
+
+class RetryScheduler:
+    """
+    Re-runs processing of ``retrying`` documents once their backoff is over.
+
+    Due documents are claimed by flipping them back to ``pending`` with a
+    conditional UPDATE, so a document deleted meanwhile is skipped and two
+    schedulers never process the same one.
+
+    Each run also sweeps documents stuck processing (their worker died) into
+    ``retrying``, counting it as a transient failure.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        file_storage: FileStorage,
+        batch_size: int = 50,
+        stall_seconds: float = PROCESSING_STALL_SECONDS
+    ):
+        """
+        Initialize the scheduler.
+
+        Args:
+            session_factory: Callable returning a new database session
+            file_storage: File storage service instance
+            batch_size: Documents retried per run
+            stall_seconds: Age of the last update after which a processing
+                document is considered stalled (0 disables the sweep)
+        """
+        self.session_factory = session_factory
+        self.file_storage = file_storage
+        self.batch_size = batch_size
+        self.stall_seconds = stall_seconds
+        self._lock = threading.Lock()
+
+    def requeue_stalled(self, db: Session) -> int:
+        """
+        Move documents stuck processing to ``retrying``.
+
+        Each transition is conditional on the document's version, so a slow
+        but live run that publishes progress meanwhile keeps its document,
+        and a run that resumes after its document was swept discards its
+        results.
+
+        Returns:
+            Number of documents requeued or, once out of attempts, failed
+        """
+        if not self.stall_seconds:
+            return 0
+
+        cutoff = datetime.utcnow() - timedelta(seconds=self.stall_seconds)
+        stalled = (
+            work_set(db, IN_PROGRESS_STATUSES, Document.id, Document.version, Document.attempts)
+            .filter(Document.updated_at < cutoff)
+            .limit(self.batch_size)
+            .all()
+        )
+
+        swept = 0
+        for document_id, version, attempts in stalled:
+            attempts = (attempts or 0) + 1
+            retry = attempts < PROCESSING_MAX_ATTEMPTS
+            swept += db.query(Document).filter(
+                Document.id == document_id,
+                Document.status.in_(IN_PROGRESS_STATUSES),
+                Document.version == version
+            ).update({
+                Document.status: RETRYING_STATUS if retry else "failed",
+                Document.attempts: attempts,
+                Document.failure_kind: TRANSIENT,
+                Document.error_message: "Processing stalled",
+                Document.next_retry_at: next_retry_at(attempts) if retry else None,
+                Document.version: version + 1,
+                Document.updated_at: datetime.utcnow()
+            }, synchronize_session=False)
+            restamp_on_commit(db, Document, Document.id == document_id)
+        db.commit()
+
+        if swept:
+            metrics.increment("processing.stalled", swept)
+        return swept
+
+    def claim_due(self, db: Session) -> List[int]:
+        """
+        Claim documents whose retry is due.
+
+        Returns:
+            IDs of the claimed documents, now ``pending``
+        """
+        now = datetime.utcnow()
+        due = [
+            document_id for (document_id,) in work_set(db, (RETRYING_STATUS,), Document.id)
+            .filter(Document.next_retry_at <= now)
+            .order_by(Document.next_retry_at)
+            .limit(self.batch_size)
+        ]
+
+        claimed = []
+        for document_id in due:
+            updated = db.query(Document).filter(
+                Document.id == document_id,
+                Document.status == RETRYING_STATUS
+            ).update(
+                {
+                    Document.status: "pending",
+                    Document.next_retry_at: None,
+                    Document.version: Document.version + 1,
+                    Document.updated_at: now
+                },
+                synchronize_session=False
+            )
+            if updated:
+                restamp_on_commit(db, Document, Document.id == document_id)
+                claimed.append(document_id)
+        db.commit()
+        return claimed
+
+    def run_once(self) -> int:
+        """
+        Retry the documents currently due.
+
+        Returns:
+            Number of documents retried (0 if another run was in progress)
+        """
+        if not self._lock.acquire(blocking=False):
+            return 0
+
+        try:
+            db = self.session_factory()
+            try:
+                self.requeue_stalled(db)
+                claimed = self.claim_due(db)
+            finally:
+                db.close()
+
+            if claimed:
+                metrics.increment("processing.retries", len(claimed))
+                # process_batch closes its session
+                process_batch(claimed, self.session_factory(), self.file_storage)
+            return len(claimed)
+        finally:
+            self._lock.release()
+
+
+def run_retry_loop(scheduler: RetryScheduler, interval_seconds: float, stop: threading.Event) -> None:
+    """
+    Run the scheduler periodically until stopped.
+
+    Args:
+        scheduler: Scheduler to run
+        interval_seconds: Pause between runs
+        stop: Event that ends the loop
+    """
+    while not stop.is_set():
+        try:
+            scheduler.run_once()
+        except Exception as e:
+            print(f"Retry run failed: {e}")
+        stop.wait(interval_seconds)
+
+
+def start_retry_thread(scheduler: RetryScheduler, interval_seconds: float) -> threading.Event:
+    """
+    Start the retry loop in a daemon thread.
+
+    Returns:
+        Event that stops the loop when set
+    """
+    stop = threading.Event()
+    thread = threading.Thread(
+        target=run_retry_loop,
+        args=(scheduler, interval_seconds, stop),
+        name="processing-retries",
+        daemon=True
+    )
+    thread.start()
+    return stop
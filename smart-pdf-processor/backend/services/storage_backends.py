@@ -0,0 +1,418 @@
+"""Storage backends holding the bytes of stored files.
+
+Keys are relative, "/"-separated paths. Every backend lists keys in plain
+string (code point) order so listings can be merge-joined with database
+queries ordered by path.
+"""
+
+import io
+import os
+import posixpath
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import BinaryIO, Dict, Iterator, NamedTuple, Optional, Protocol, Tuple
+
+COPY_CHUNK_SIZE = 1024 * 1024
+
+
+class ObjectStat(NamedTuple):
+    """Size and modification time of a stored object."""
+
+    size: int
+    mtime: float
+
+
+class StorageBackend(Protocol):
+    """Operations FileStorage needs from a place that holds file bytes."""
+
+    def save_stream(self, key: str, source: BinaryIO, max_bytes: Optional[int] = None) -> int:
+        """Store a stream under key, returning its size; nothing is left behind on failure."""
+
+    def open_stream(self, key: str, start: int = 0) -> BinaryIO:
+        """Open a stored object for reading from a byte offset."""
+
+    def delete(self, key: str) -> None:
+        """Delete a stored object."""
+
+    def stat(self, key: str) -> ObjectStat:
+        """Return the size and modification time of a stored object."""
+
+    def iter_objects(self, prefix: str = "") -> Iterator[Tuple[str, ObjectStat]]:
+        """Yield (key, stat) for stored objects below prefix, in key order."""
+
+    def move(self, source_key: str, target_key: str) -> None:
+        """Move an object to a new key, replacing any object already there."""
+
+    def local_path(self, key: str) -> Optional[str]:
+        """Return a local filesystem path for the key, if the backend has one."""
+
+
+def normalize_key(key: str) -> str:
+    """
+    Normalize a storage key and reject keys escaping the storage root.
+
+    Args:
+        key: Relative "/"-separated key
+
+    Returns:
+        Normalized key
+
+    Raises:
+        ValueError: If the key is absolute or points outside the root
+    """
+    normalized = posixpath.normpath(key.replace("\\", "/"))
+    if normalized.startswith("/") or normalized == ".." or normalized.startswith("../"):
+        raise ValueError("Invalid file path: File path is outside upload directory")
+    return normalized
+
+
+def copy_limited(source: BinaryIO, target: BinaryIO, max_bytes: Optional[int]) -> int:
+    """
+    Copy a stream, refusing to write more than max_bytes.
+
+    Declared sizes (e.g. in ZIP headers) can lie, so the cap is enforced
+    on the bytes actually copied.
+
+    Returns:
+        Number of bytes copied
+
+    Raises:
+        ValueError: If the source is larger than max_bytes
+    """
+    copied = 0
+    while True:
+        chunk = source.read(COPY_CHUNK_SIZE)
+        if not chunk:
+            return copied
+        copied += len(chunk)
+        if max_bytes is not None and copied > max_bytes:
+            raise ValueError(f"File exceeds maximum size of {max_bytes} bytes")
+        target.write(chunk)
+
+
+class LocalBackend:
+    """Stores objects as files below a directory."""
+
+    def __init__(self, root: str):
+        """
+        Initialize the backend.
+
+        Args:
+            root: Directory holding the files
+        """
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, key: str) -> Path:
+        """Map a key to a file path, refusing paths outside the root."""
+        path = self.root / normalize_key(key)
+        if not path.resolve().is_relative_to(self.root.resolve()):
+            raise ValueError("Invalid file path: File path is outside upload directory")
+        return path
+
+    def save_stream(self, key: str, source: BinaryIO, max_bytes: Optional[int] = None) -> int:
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            with open(path, "wb") as target:
+                return copy_limited(source, target, max_bytes)
+        except Exception:
+            path.unlink(missing_ok=True)
+            raise
+
+    def open_stream(self, key: str, start: int = 0) -> BinaryIO:
+        stream = open(self._path(key), "rb")
+        stream.seek(start)
+        return stream
+
+    def delete(self, key: str) -> None:
+        path = self._path(key)
+        if not path.exists():
+            raise FileNotFoundError(f"File not found: {key}")
+        if not path.is_file():
+            raise ValueError(f"Path is not a file: {key}")
+        path.unlink()
+
+    def stat(self, key: str) -> ObjectStat:
+        path = self._path(key)
+        if not path.is_file():
+            raise FileNotFoundError(f"File not found: {key}")
+        result = path.stat()
+        return ObjectStat(result.st_size, result.st_mtime)
+
+    def iter_objects(self, prefix: str = "") -> Iterator[Tuple[str, ObjectStat]]:
+        directory = self._path(prefix) if prefix else self.root
+        if not directory.is_dir():
+            return iter(())
+        return self._walk(directory)
+
+    def _walk(self, directory: Path) -> Iterator[Tuple[str, ObjectStat]]:
+        """Yield files below a directory in key order, one listing at a time."""
+        with os.scandir(directory) as entries:
+            # Sorting directories as "name/" makes depth-first order match
+            # plain string order of the full keys
+            listing = sorted(
+                entries,
+                key=lambda entry: entry.name + "/" if entry.is_dir(follow_symlinks=False) else entry.name
+            )
+
+        for entry in listing:
+            if entry.is_dir(follow_symlinks=False):
+                yield from self._walk(Path(entry.path))
+            elif entry.is_file(follow_symlinks=False):
+                result = entry.stat(follow_symlinks=False)
+                key = Path(entry.path).relative_to(self.root).as_posix()
+                yield key, ObjectStat(result.st_size, result.st_mtime)
+
+    def move(self, source_key: str, target_key: str) -> None:
+        target = self._path(target_key)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        source = self._path(source_key)
+        os.replace(source, target)
+        if source.parent != self.root:
+            try:
+                source.parent.rmdir()
+            except OSError:
+                pass  # Directory still has other files
+
+    def local_path(self, key: str) -> Optional[str]:
+        return str(self._path(key).resolve())
+
+
+class MemoryBackend:
+    """Keeps objects in memory; for tests and benchmarks without disk I/O."""
+
+    def __init__(self):
+        """Initialize an empty backend."""
+        self._objects: Dict[str, Tuple[bytes, float]] = {}
+        self._lock = threading.Lock()
+
+    def save_stream(self, key: str, source: BinaryIO, max_bytes: Optional[int] = None) -> int:
+        key = normalize_key(key)
+        buffer = io.BytesIO()
+        size = copy_limited(source, buffer, max_bytes)
+        with self._lock:
+            self._objects[key] = (buffer.getvalue(), time.time())
+        return size
+
+    def _get(self, key: str) -> Tuple[bytes, float]:
+        try:
+            return self._objects[normalize_key(key)]
+        except KeyError:
+            raise FileNotFoundError(f"File not found: {key}")
+
+    def open_stream(self, key: str, start: int = 0) -> BinaryIO:
+        data, _ = self._get(key)
+        stream = io.BytesIO(data)
+        stream.seek(start)
+        return stream
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._get(key)
+            del self._objects[normalize_key(key)]
+
+    def stat(self, key: str) -> ObjectStat:
+        data, mtime = self._get(key)
+        return ObjectStat(len(data), mtime)
+
+    def iter_objects(self, prefix: str = "") -> Iterator[Tuple[str, ObjectStat]]:
+        prefix = normalize_key(prefix) + "/" if prefix else ""
+        with self._lock:
+            keys = sorted(key for key in self._objects if key.startswith(prefix))
+        for key in keys:
+            try:
+                yield key, self.stat(key)
+            except FileNotFoundError:
+                continue  # Deleted while listing
+
+    def move(self, source_key: str, target_key: str) -> None:
+        with self._lock:
+            self._objects[normalize_key(target_key)] = self._get(source_key)
+            del self._objects[normalize_key(source_key)]
+
+    def local_path(self, key: str) -> Optional[str]:
+        return None
+
+
+def _is_missing(error: Exception) -> bool:
+    """Whether an S3 client error means the object does not exist."""
+    response = getattr(error, "response", None) or {}
+    return response.get("Error", {}).get("Code") in ("NoSuchKey", "404", "NotFound")
+
+
+class S3Backend:
+    """
+    Stores objects in an S3-compatible bucket (AWS S3, MinIO, Ceph, ...).
+
+    Large streams are sent as multipart uploads with several parts in
+    flight at once; at most ``max_workers`` parts are buffered in memory.
+    """
+
+    def __init__(
+        self,
+        client,
+        bucket: str,
+        prefix: str = "",
+        part_size: int = 8 * 1024 * 1024,
+        max_workers: int = 4
+    ):
+        """
+        Initialize the backend.
+
+        Args:
+            client: boto3 S3 client (or any object with the same methods)
+            bucket: Bucket name
+            prefix: Key prefix for every object, e.g. "uploads/"
+            part_size: Multipart part size; streams smaller than this are
+                sent with a single PUT (S3 requires parts of at least 5MB)
+            max_workers: Parts uploaded concurrently
+        """
+        self.client = client
+        self.bucket = bucket
+        self.prefix = prefix
+        self.part_size = part_size
+        self.max_workers = max_workers
+
+    def _key(self, key: str) -> str:
+        return self.prefix + normalize_key(key)
+
+    def save_stream(self, key: str, source: BinaryIO, max_bytes: Optional[int] = None) -> int:
+        first = self._read_part(source, 0, max_bytes)
+        if len(first) < self.part_size:
+            self.client.put_object(Bucket=self.bucket, Key=self._key(key), Body=first)
+            return len(first)
+        return self._multipart_upload(self._key(key), source, first, max_bytes)
+
+    def _read_part(self, source: BinaryIO, offset: int, max_bytes: Optional[int]) -> bytes:
+        """Read up to one part, enforcing max_bytes on the running total."""
+        data = source.read(self.part_size)
+        while data and len(data) < self.part_size:
+            more = source.read(self.part_size - len(data))
+            if not more:
+                break
+            data += more
+        if max_bytes is not None and offset + len(data) > max_bytes:
+            raise ValueError(f"File exceeds maximum size of {max_bytes} bytes")
+        return data
+
+    def _multipart_upload(self, key: str, source: BinaryIO, first: bytes, max_bytes: Optional[int]) -> int:
+        """Upload parts in parallel; the upload is aborted if anything fails."""
+        upload_id = self.client.create_multipart_upload(Bucket=self.bucket, Key=key)["UploadId"]
+        # Bounds the parts read ahead of the uploads
+        slots = threading.BoundedSemaphore(self.max_workers)
+
+        def upload_part(number: int, data: bytes) -> dict:
+            try:
+                response = self.client.upload_part(
+                    Bucket=self.bucket,
+                    Key=key,
+                    UploadId=upload_id,
+                    PartNumber=number,
+                    Body=data
+                )
+                return {"PartNumber": number, "ETag": response["ETag"]}
+            finally:
+                slots.release()
+
+        futures = []
+        size = 0
+        try:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                data = first
+                while data:
+                    slots.acquire()
+                    futures.append(executor.submit(upload_part, len(futures) + 1, data))
+                    size += len(data)
+                    data = self._read_part(source, size, max_bytes)
+                parts = [future.result() for future in futures]
+
+            self.client.complete_multipart_upload(
+                Bucket=self.bucket,
+                Key=key,
+                UploadId=upload_id,
+                MultipartUpload={"Parts": parts}
+            )
+            return size
+        except Exception:
+            self.client.abort_multipart_upload(Bucket=self.bucket, Key=key, UploadId=upload_id)
+            raise
+
+    def open_stream(self, key: str, start: int = 0) -> BinaryIO:
+        request = {"Bucket": self.bucket, "Key": self._key(key)}
+        if start:
+            request["Range"] = f"bytes={start}-"
+        try:
+            return self.client.get_object(**request)["Body"]
+        except Exception as e:
+            if _is_missing(e):
+                raise FileNotFoundError(f"File not found: {key}")
+            raise
+
+    def delete(self, key: str) -> None:
+        # DeleteObject succeeds for missing keys, so check first
+        self.stat(key)
+        self.client.delete_object(Bucket=self.bucket, Key=self._key(key))
+
+    def stat(self, key: str) -> ObjectStat:
+        try:
+            response = self.client.head_object(Bucket=self.bucket, Key=self._key(key))
+        except Exception as e:
+            if _is_missing(e):
+                raise FileNotFoundError(f"File not found: {key}")
+            raise
+        return ObjectStat(response["ContentLength"], response["LastModified"].timestamp())
+
+    def iter_objects(self, prefix: str = "") -> Iterator[Tuple[str, ObjectStat]]:
+        # S3 lists keys in UTF-8 byte order, which matches code point order
+        request = {"Bucket": self.bucket, "Prefix": self.prefix + (normalize_key(prefix) + "/" if prefix else "")}
+        while True:
+            response = self.client.list_objects_v2(**request)
+            for item in response.get("Contents", []):
+                key = item["Key"][len(self.prefix):]
+                yield key, ObjectStat(item["Size"], item["LastModified"].timestamp())
+            if not response.get("IsTruncated"):
+                return
+            request["ContinuationToken"] = response["NextContinuationToken"]
+
+    def move(self, source_key: str, target_key: str) -> None:
+        self.client.copy_object(
+            Bucket=self.bucket,
+            Key=self._key(target_key),
+            CopySource={"Bucket": self.bucket, "Key": self._key(source_key)}
+        )
+        self.client.delete_object(Bucket=self.bucket, Key=self._key(source_key))
+
+    def local_path(self, key: str) -> Optional[str]:
+        return None
+
+
+def create_s3_backend(
+    bucket: str,
+    endpoint_url: Optional[str] = None,
+    prefix: str = "",
+    max_workers: int = 4
+) -> S3Backend:
+    """
+    Create an S3 backend using boto3 (optional dependency).
+
+    Credentials come from the usual AWS environment variables or config.
+
+    Args:
+        bucket: Bucket name
+        endpoint_url: Endpoint of an S3-compatible service (e.g. MinIO)
+        prefix: Key prefix for every object
+        max_workers: Parts uploaded concurrently
+
+    Raises:
+        ImportError: If boto3 is not installed
+    """
+    try:
+        import boto3
+    except ImportError:
+        raise ImportError("boto3 is required for S3 storage: pip install boto3")
+
+    client = boto3.client("s3", endpoint_url=endpoint_url)
+    return S3Backend(client, bucket, prefix=prefix, max_workers=max_workers)
@@ -0,0 +1,230 @@
+"""Reconciliation between stored PDF files and document records."""
+
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from models import Document
+from services.change_feed import ChangeFeed
+from services.content_store import ContentStore
+from services.document_purger import DELETING_STATUS
+from services.file_storage import FileStorage
+from services.near_duplicates import NearDuplicateIndex
+from services.related_documents import RelatedDocumentIndex
+from services.storage_usage import StorageUsageTracker
+
+
+class StorageReconciler:
+    """
+    Finds files without documents (orphans) and documents without files
+    (dangling rows) by merge-joining two sorted streams.
+
+    The storage tree is walked with os.scandir and document paths are
+    streamed from the database with a server-side cursor, both ordered by
+    path, so memory use does not grow with the number of documents.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        file_storage: FileStorage,
+        batch_size: int = 500,
+        min_age_seconds: int = 3600,
+        content_store: Optional[ContentStore] = None
+    ):
+        """
+        Initialize the reconciler.
+
+        Args:
+            session_factory: Callable returning a new database session
+            file_storage: File storage to reconcile
+            batch_size: Rows fetched per round trip and deleted per commit
+            min_age_seconds: Ignore files and rows younger than this, so
+                uploads in progress are never treated as inconsistent
+            content_store: Store releasing the blob references of deleted
+                rows (defaults to one over file_storage)
+        """
+        self.session_factory = session_factory
+        self.file_storage = file_storage
+        self.content_store = content_store or ContentStore(file_storage)
+        self.batch_size = batch_size
+        self.min_age_seconds = min_age_seconds
+
+    def _iter_documents(self, db: Session) -> Iterator[Tuple[str, int, datetime]]:
+        """Stream (file_path, id, created_at) for all documents ordered by path."""
+        order = Document.file_path
+        if db.bind.dialect.name == "postgresql":
+            # Byte order, matching Python's string ordering of the file walk
+            order = Document.file_path.collate("C")
+
+        query = (
+            db.query(Document.file_path, Document.id, Document.created_at)
+            .order_by(order, Document.id)
+            .execution_options(yield_per=self.batch_size)
+        )
+        for file_path, document_id, created_at in query:
+            yield file_path or "", document_id, created_at
+
+    def iter_differences(self, db: Session) -> Iterator[Tuple[str, object]]:
+        """
+        Merge-join stored files with document paths.
+
+        Args:
+            db: Session used for the streaming read
+
+        Yields:
+            ("orphan", file_path) for files no document refers to, and
+            ("dangling", (document_id, file_path)) for documents whose
+            file is missing
+        """
+        file_cutoff = time.time() - self.min_age_seconds
+        row_cutoff = datetime.utcnow() - timedelta(seconds=self.min_age_seconds)
+
+        files = iter(self.file_storage.iter_files())
+        rows = self._iter_documents(db)
+        file_entry = next(files, None)
+        row = next(rows, None)
+
+        while file_entry is not None or row is not None:
+            if row is None or (file_entry is not None and file_entry[0] < row[0]):
+                file_path, mtime = file_entry
+                if mtime < file_cutoff:
+                    yield "orphan", file_path
+                file_entry = next(files, None)
+            elif file_entry is None or row[0] < file_entry[0]:
+                file_path, document_id, created_at = row
+                if created_at < row_cutoff:
+                    yield "dangling", (document_id, file_path)
+                row = next(rows, None)
+            else:
+                # Several documents may share a file; consume them all
+                matched_path = file_entry[0]
+                while row is not None and row[0] == matched_path:
+                    row = next(rows, None)
+                file_entry = next(files, None)
+
+    def reconcile(
+        self,
+        delete: bool = False,
+        report: Optional[Callable[[str, object], None]] = None
+    ) -> Dict[str, int]:
+        """
+        Report, and optionally remove, orphaned files and dangling rows.
+
+        Dangling rows are deleted in batches on a separate session so the
+        streaming read is never interrupted by a commit.
+
+        Args:
+            delete: Delete orphans and dangling rows instead of only reporting
+            report: Optional callback invoked with each (kind, item)
+
+        Returns:
+            Counts of orphans and dangling rows found, and of deletions
+        """
+        counts = {"orphans": 0, "dangling": 0, "files_deleted": 0, "rows_deleted": 0}
+        read_db = self.session_factory()
+        write_db = self.session_factory() if delete else None
+        pending_ids: List[int] = []
+
+        try:
+            for kind, item in self.iter_differences(read_db):
+                if report is not None:
+                    report(kind, item)
+
+                if kind == "orphan":
+                    counts["orphans"] += 1
+                    if delete:
+                        try:
+                            self.file_storage.delete_pdf(item)
+                            counts["files_deleted"] += 1
+                        except FileNotFoundError:
+                            pass  # Removed since the scan saw it
+                else:
+                    counts["dangling"] += 1
+                    if delete:
+                        pending_ids.append(item[0])
+                        if len(pending_ids) >= self.batch_size:
+                            counts["rows_deleted"] += self._delete_rows(write_db, pending_ids)
+                            pending_ids = []
+
+            if pending_ids:
+                counts["rows_deleted"] += self._delete_rows(write_db, pending_ids)
+
+            return counts
+
+        finally:
+            read_db.close()
+            if write_db is not None:
+                write_db.close()
+
+    def _delete_rows(self, db: Session, document_ids: List[int]) -> int:
+        """
+        Delete a batch of documents in one transaction, releasing their
+        usage and blob references.
+
+        Rows whose file reference could not be released are kept for the
+        next run, as the purger does.
+        """
+        try:
+            released = []
+            for document_id, file_path in (
+                db.query(Document.id, Document.file_path).filter(Document.id.in_(document_ids))
+            ):
+                try:
+                    # Savepoint, so a failed release leaves the blob count untouched
+                    with db.begin_nested():
+                        if file_path:
+                            try:
+                                self.content_store.release(db, file_path)
+                            except FileNotFoundError:
+                                pass  # The missing file is why the row dangles
+                except Exception as e:
+                    print(f"Warning: Failed to release file {file_path}: {e}")
+                    continue
+                released.append(document_id)
+            document_ids = released
+
+            # Documents already marked deleting were released when marked
+            totals = (
+                db.query(
+                    Document.user_id,
+                    func.sum(Document.file_size),
+                    func.sum(Document.page_count),
+                    func.count(Document.id)
+                )
+                .filter(Document.id.in_(document_ids), Document.status != DELETING_STATUS)
+                .group_by(Document.user_id)
+                .all()
+            )
+            usage = StorageUsageTracker(db)
+            for user_id, size, pages, count in totals:
+                usage.release(user_id, size or 0, pages or 0, count)
+
+            # Let sync clients drop the rows too (deleting ones already have tombstones)
+            live = (
+                db.query(Document.user_id, Document.id)
+                .filter(Document.id.in_(document_ids), Document.status != DELETING_STATUS)
+                .all()
+            )
+            feed = ChangeFeed(db)
+            for user_id, document_id in live:
+                feed.record_deletions(user_id, [document_id])
+
+            related_index = RelatedDocumentIndex(db)
+            duplicate_index = NearDuplicateIndex(db)
+            for document in db.query(Document).filter(Document.id.in_(document_ids)):
+                related_index.remove_document(document)
+                duplicate_index.remove_document(document)
+
+            deleted = (
+                db.query(Document)
+                .filter(Document.id.in_(document_ids))
+                .delete(synchronize_session=False)
+            )
+            db.commit()
+            return deleted
+        except Exception:
+            db.rollback()
+            raise
@@ -0,0 +1,164 @@
+"""Per-user storage usage accounting and tier storage limits."""
+
+from datetime import datetime
+from typing import Optional
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from models import User, StorageUsage
+
+
+class StorageQuotaExceeded(Exception):
+    """Raised when an upload would take a user past their tier's storage limit."""
+    pass
+
+
+class StorageUsageTracker:
+    """
+    Keeps each user's stored bytes, pages and document count up to date.
+
+    Totals live in one ``storage_usage`` row per user and are adjusted with
+    relative UPDATEs inside the caller's transaction, alongside the document
+    change that causes them, so reading or enforcing usage never has to
+    aggregate the documents table. Nothing is committed here.
+    """
+
+    def __init__(self, db: Session):
+        """
+        Initialize the tracker.
+
+        Args:
+            db: SQLAlchemy database session
+        """
+        self.db = db
+
+    def get_limit_bytes(self, user: User) -> Optional[int]:
+        """
+        Get a user's storage limit from their tier's ``storage_mb`` feature.
+
+        Args:
+            user: User to look up
+
+        Returns:
+            Limit in bytes, or None for unlimited (no tier, missing, None or
+            negative ``storage_mb``)
+        """
+        features = (user.tier.features if user.tier else None) or {}
+        storage_mb = features.get("storage_mb")
+
+        if storage_mb is None or storage_mb < 0:
+            return None
+        return int(storage_mb * 1024 * 1024)
+
+    def get_usage(self, user_id: int) -> StorageUsage:
+        """
+        Get a user's current totals.
+
+        Returns:
+            The user's usage row, or an unsaved all-zero row if they have none
+        """
+        usage = self.db.query(StorageUsage).filter(StorageUsage.user_id == user_id).first()
+        if usage is None:
+            usage = StorageUsage(user_id=user_id, bytes=0, pages=0, documents=0)
+        return usage
+
+    def has_room(self, user: User, size: int) -> bool:
+        """
+        Check whether files of the given size currently fit in the limit.
+
+        Advisory only (e.g. when an upload starts); ``reserve`` is what
+        enforces the limit.
+
+        Args:
+            user: User to check
+            size: Size of the planned upload in bytes
+        """
+        limit = self.get_limit_bytes(user)
+        if limit is None:
+            return True
+        return self.get_usage(user.id).bytes + size <= limit
+
+    def reserve(self, user: User, size: int, documents: int = 1) -> None:
+        """
+        Add new documents to a user's usage if they fit in the tier limit.
+
+        The limit check and the increment are one conditional UPDATE, so
+        concurrent uploads cannot overshoot the limit between them.
+
+        Args:
+            user: Owner of the new documents
+            size: Total size of the new files in bytes
+            documents: Number of new documents
+
+        Raises:
+            StorageQuotaExceeded: If the files do not fit in the limit
+        """
+        limit = self.get_limit_bytes(user)
+
+        query = self.db.query(StorageUsage).filter(StorageUsage.user_id == user.id)
+        if limit is not None:
+            query = query.filter(StorageUsage.bytes + size <= limit)
+        updated = query.update({
+            StorageUsage.bytes: StorageUsage.bytes + size,
+            StorageUsage.documents: StorageUsage.documents + documents,
+            StorageUsage.updated_at: datetime.utcnow()
+        }, synchronize_session=False)
+        if updated:
+            return
+
+        exists = self.db.query(StorageUsage.user_id).filter(
+            StorageUsage.user_id == user.id
+        ).first()
+        if exists or (limit is not None and size > limit):
+            raise StorageQuotaExceeded(self._quota_message(limit))
+
+        # First upload: create the row, unless a concurrent request just did
+        try:
+            with self.db.begin_nested():
+                self.db.add(StorageUsage(
+                    user_id=user.id,
+                    bytes=size,
+                    pages=0,
+                    documents=documents
+                ))
+        except IntegrityError:
+            self.reserve(user, size, documents)
+
+    def release(self, user_id: int, size: int, pages: int = 0, documents: int = 1) -> None:
+        """
+        Remove deleted documents from a user's usage.
+
+        Args:
+            user_id: Owner of the documents
+            size: Total size of their files in bytes
+            pages: Total page count of the documents
+            documents: Number of documents
+        """
+        self._apply(user_id, {
+            StorageUsage.bytes: StorageUsage.bytes - size,
+            StorageUsage.pages: StorageUsage.pages - pages,
+            StorageUsage.documents: StorageUsage.documents - documents
+        })
+
+    def add_pages(self, user_id: int, pages: int) -> None:
+        """
+        Record pages counted while processing a document.
+
+        Args:
+            user_id: Owner of the document
+            pages: Change in page count (negative when a document shrinks on
+                reprocessing)
+        """
+        if pages:
+            self._apply(user_id, {StorageUsage.pages: StorageUsage.pages + pages})
+
+    def _apply(self, user_id: int, values: dict) -> None:
+        """Apply relative changes to a user's usage row, if they have one."""
+        values[StorageUsage.updated_at] = datetime.utcnow()
+        self.db.query(StorageUsage).filter(StorageUsage.user_id == user_id).update(
+            values, synchronize_session=False
+        )
+
+    def _quota_message(self, limit: Optional[int]) -> str:
+        """Build the error message for an exceeded limit."""
+        return f"Storage limit exceeded. Your plan allows {limit / (1024 * 1024):g}MB"
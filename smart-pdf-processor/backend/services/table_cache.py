@@ -0,0 +1,78 @@
+"""Lazily extracted, cached document tables."""
+
+import json
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from models import Document, DocumentTables
+from services.file_storage import FileStorage
+from services.metrics import metrics
+from services.pdf_extractor import PDFExtractor
+
+
+class DocumentTableCache:
+    """
+    Extracts a document's tables on first request and keeps the result.
+
+    Table detection is several times slower than text extraction, so it is
+    not part of processing: documents whose tables are never viewed cost
+    nothing extra. The first request parses the PDF and stores every page's
+    tables as compact JSON in ``document_tables``; later requests read that
+    row. Reprocessing a document drops the cached row (``invalidate``).
+    """
+
+    def __init__(self, db: Session, file_storage: FileStorage, extractor: Optional[PDFExtractor] = None):
+        """
+        Initialize the cache.
+
+        Args:
+            db: Database session
+            file_storage: Storage holding the documents' files
+            extractor: Extractor used for cache misses
+        """
+        self.db = db
+        self.file_storage = file_storage
+        self.extractor = extractor or PDFExtractor(low_memory=True)
+
+    def get_tables(self, document: Document) -> List[Dict[str, Any]]:
+        """
+        Get a document's tables, extracting and caching them if needed.
+
+        Args:
+            document: Document to read
+
+        Returns:
+            List of {"page": page number, "tables": list of row lists} for
+            pages that have tables
+
+        Raises:
+            Exception: If the PDF cannot be read
+        """
+        cached = self.db.get(DocumentTables, document.id)
+        if cached is not None:
+            metrics.increment("tables.cache_hits")
+            return json.loads(cached.pages)
+
+        with self.file_storage.local_copy(document.file_path) as file_path:
+            pages = self.extractor.extract_tables(file_path)
+        metrics.increment("tables.extractions")
+
+        try:
+            with self.db.begin_nested():
+                self.db.add(DocumentTables(
+                    document_id=document.id,
+                    pages=json.dumps(pages, ensure_ascii=False, separators=(",", ":"))
+                ))
+            self.db.commit()
+        except IntegrityError:
+            # A concurrent request cached the same result first
+            self.db.rollback()
+        return pages
+
+    def invalidate(self, document_id: int) -> None:
+        """Drop a document's cached tables (in the caller's transaction)."""
+        self.db.query(DocumentTables).filter(
+            DocumentTables.document_id == document_id
+        ).delete(synchronize_session=False)
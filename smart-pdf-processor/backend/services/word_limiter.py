@@ -1,6 +1,6 @@
 """Word limiting service based on user tier configuration."""
 
-from typing import Optional
+from typing import Iterable, Iterator, Optional
 from sqlalchemy.orm import Session
 from models.user import User
 
@@ -60,35 +60,50 @@ class WordLimiter:
             ValueError: If user not found or has no tier
         """
         limit = self.get_word_limit(user_id)
+        return '\n\n'.join(self.limit_paragraphs(paragraphs, limit))
+    
+    def limit_paragraphs(
+        self,
+        paragraphs: Iterable[str],
+        limit: Optional[int]
+    ) -> Iterator[str]:
+        """
+        Lazily yield the paragraphs that fit within a word limit.
         
-        if limit is None:
-            # No limit - return all paragraphs
-            return '\n\n'.join(paragraphs)
+        Stops consuming ``paragraphs`` as soon as the limit is reached, so a
+        lazy paragraph source is never read past the truncation point.
         
-        if not paragraphs:
-            return ''
+        Args:
+            paragraphs: Iterable of paragraphs
+            limit: Maximum number of words (None for unlimited)
+            
+        Yields:
+            Paragraphs within the limit, in order
+        """
+        if limit is None:
+            # No limit - yield all paragraphs
+            yield from paragraphs
+            return
         
-        result_paragraphs = []
         total_words = 0
+        emitted = False
         
         for paragraph in paragraphs:
             para_word_count = self._count_words(paragraph)
             
             # Check if adding this paragraph would exceed the limit
             if total_words + para_word_count <= limit:
-                result_paragraphs.append(paragraph)
+                emitted = True
                 total_words += para_word_count
+                yield paragraph
             else:
                 # If we haven't added any paragraphs yet and this first paragraph
                 # exceeds the limit, truncate it to the word limit
-                if not result_paragraphs:
+                if not emitted:
                     words = paragraph.split()
-                    truncated = ' '.join(words[:limit])
-                    result_paragraphs.append(truncated)
+                    yield ' '.join(words[:limit])
                 # Stop at paragraph boundary before exceeding limit
                 break
-        
-        return '\n\n'.join(result_paragraphs)
     
     def _count_words(self, text: str) -> int:
         """
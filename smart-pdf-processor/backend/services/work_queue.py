@@ -0,0 +1,45 @@
+"""Queries over the processing work set: documents in non-terminal statuses."""
+
+from typing import Any, Sequence
+
+from sqlalchemy import bindparam
+from sqlalchemy.orm import Query, Session
+
+from models import Document
+from models.document import ACTIVE_STATUSES
+
+# The partial indexes' predicate, rendered with inline literals: SQLite only
+# uses a partial index when the query repeats its WHERE terms with the same
+# constants, which bound parameters are not
+_IN_WORK_SET = Document.status.in_(
+    bindparam("work_set_statuses", ACTIVE_STATUSES, expanding=True, literal_execute=True)
+)
+
+
+def work_set(db: Session, statuses: Sequence[str], *entities: Any) -> Query:
+    """
+    Query documents in some non-terminal statuses through the partial indexes.
+
+    Queue-style scans (pending and retrying documents, stalled processing,
+    the purge backlog) go through here so their cost follows the number of
+    active documents rather than every document ever uploaded.
+
+    Args:
+        db: Database session
+        statuses: Statuses to select, all from ACTIVE_STATUSES
+        entities: What to select (defaults to Document)
+
+    Returns:
+        Query filtered to those statuses
+
+    Raises:
+        ValueError: If a status is terminal (not covered by the indexes)
+    """
+    terminal = set(statuses) - set(ACTIVE_STATUSES)
+    if terminal:
+        raise ValueError(f"Not work-set statuses: {', '.join(sorted(terminal))}")
+
+    return db.query(*(entities or (Document,))).filter(
+        _IN_WORK_SET,
+        Document.status.in_(statuses)
+    )
@@ -0,0 +1,185 @@
+"""Tests for upload admission control.
+
+Feature: smart-pdf-processor
+"""
+
+import os
+import tempfile
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+# routes.documents creates its FileStorage at import time
+os.environ.setdefault("PDF_UPLOAD_DIR", tempfile.mkdtemp())
+
+from database import Base
+from models import User, Tier, Document
+from services import admission_control
+from services.admission_control import (
+    RETRY_AFTER_DEFAULT_SECONDS,
+    RETRY_AFTER_MAX_SECONDS,
+    AdmissionController,
+    DrainRateEstimator,
+    UploadRejected
+)
+from services.metrics import metrics
+from routes import documents as document_routes
+
+
+@pytest.fixture
+def db():
+    """Create a fresh in-memory database session."""
+    engine = create_engine("sqlite:///:memory:")
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    yield session
+    session.close()
+    engine.dispose()
+
+
+class FakeClock:
+    """Monotonic clock advanced by hand."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Replace the estimator's clock."""
+    fake = FakeClock()
+    monkeypatch.setattr(admission_control.time, "monotonic", fake)
+    return fake
+
+
+def create_user(db, email: str, backlog_limit=None) -> User:
+    """Create a user whose tier allows backlog_limit queued documents."""
+    tier = Tier(name=email, price_cents=0, features={"max_processing_backlog": backlog_limit})
+    user = User(email=email, hashed_password="x", tier=tier)
+    db.add(user)
+    db.commit()
+    return user
+
+
+def add_documents(db, user: User, count: int, status: str = "pending") -> list:
+    """Add documents in a status."""
+    documents = [
+        Document(user_id=user.id, filename=f"{i}.pdf", file_path=f"{user.id}/{i}.pdf", status=status)
+        for i in range(count)
+    ]
+    db.add_all(documents)
+    db.commit()
+    return documents
+
+
+def test_global_backlog_limit_rejects_uploads(db, clock):
+    """Uploads that would take the backlog past the limit should be refused."""
+    metrics.reset()
+    user = create_user(db, "user@example.com")
+    add_documents(db, user, 3)
+    add_documents(db, user, 5, status="completed")
+    controller = AdmissionController(max_backlog=4)
+
+    controller.check(db, user)
+    with pytest.raises(UploadRejected) as rejected:
+        controller.check(db, user, documents=2)
+
+    assert rejected.value.retry_after == RETRY_AFTER_DEFAULT_SECONDS
+    assert metrics.get("uploads.rejected") == 1
+    assert metrics.get("uploads.rejected.global") == 1
+
+
+def test_tier_limit_applies_to_each_users_backlog(db, clock):
+    """A user at their tier's limit should not block other users."""
+    metrics.reset()
+    busy = create_user(db, "busy@example.com", backlog_limit=2)
+    other = create_user(db, "other@example.com", backlog_limit=2)
+    add_documents(db, busy, 1, status="processing")
+    add_documents(db, busy, 1, status="retrying")
+    controller = AdmissionController(max_backlog=0)
+
+    with pytest.raises(UploadRejected):
+        controller.check(db, busy)
+    controller.check(db, other, documents=2)
+
+    assert metrics.get("uploads.rejected.tier") == 1
+
+
+def test_drain_rate_counts_arrivals_and_backlog_change(db, clock):
+    """Documents that arrived minus backlog growth over the window is what drained."""
+    user = create_user(db, "user@example.com")
+    queued = add_documents(db, user, 10)
+    estimator = DrainRateEstimator(window_seconds=300, sample_seconds=5)
+    estimator.observe(db)
+
+    # 60 seconds later: 4 more arrived and 6 finished
+    clock.now += 60
+    add_documents(db, user, 4)
+    for document in queued[:6]:
+        document.status = "completed"
+    db.commit()
+    assert estimator.observe(db) == 8
+
+    assert estimator.rate() == pytest.approx(6 / 60)
+
+
+def test_retry_after_follows_drain_rate(db, clock):
+    """Retry-After should be the time the measured rate needs to clear the excess."""
+    user = create_user(db, "user@example.com")
+    queued = add_documents(db, user, 30)
+    controller = AdmissionController(max_backlog=20)
+    controller.estimator.observe(db)
+
+    clock.now += 100
+    for document in queued[:10]:
+        document.status = "completed"
+    db.commit()
+    add_documents(db, user, 10)
+
+    # 0.1 documents/second drained; 10 over the limit plus this upload
+    with pytest.raises(UploadRejected) as rejected:
+        controller.check(db, user)
+    assert rejected.value.retry_after == 110
+
+
+def test_retry_after_is_capped_when_nothing_drains(db, clock):
+    """A stalled backlog should send clients away for the maximum time."""
+    user = create_user(db, "user@example.com")
+    add_documents(db, user, 5)
+    controller = AdmissionController(max_backlog=5)
+    controller.estimator.observe(db)
+    clock.now += 60
+
+    with pytest.raises(UploadRejected) as rejected:
+        controller.check(db, user)
+    assert rejected.value.retry_after == RETRY_AFTER_MAX_SECONDS
+
+
+def test_tier_retry_after_follows_the_users_own_completions(db, clock, monkeypatch):
+    """A user over their limit should wait for their own documents, not the global rate."""
+    user = create_user(db, "user@example.com", backlog_limit=2)
+    add_documents(db, user, 2)
+    finished = add_documents(db, user, 3, status="completed")
+    finished[0].updated_at = datetime.utcnow() - timedelta(hours=1)
+    db.commit()
+    controller = AdmissionController(max_backlog=0, estimator=DrainRateEstimator(window_seconds=300))
+    monkeypatch.setattr(document_routes, "admission_controller", controller)
+
+    # 2 documents finished in the last 300 seconds, one over the limit
+    with pytest.raises(HTTPException) as rejected:
+        document_routes.admit_uploads(db, user)
+    assert rejected.value.status_code == 429
+    assert rejected.value.headers["Retry-After"] == "150"
+
+    # Without recent completions a conservative default is sent
+    db.query(Document).filter(Document.status == "completed").delete()
+    db.commit()
+    with pytest.raises(HTTPException) as rejected:
+        document_routes.admit_uploads(db, user)
+    assert rejected.value.headers["Retry-After"] == str(RETRY_AFTER_DEFAULT_SECONDS)
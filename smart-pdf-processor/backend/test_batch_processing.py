@@ -0,0 +1,146 @@
+"""Tests for batch document processing.
+
+Feature: smart-pdf-processor
+"""
+
+import asyncio
+import os
+import tempfile
+import zipfile
+from io import BytesIO
+
+import pytest
+from fastapi import BackgroundTasks, HTTPException, UploadFile
+from reportlab.pdfgen import canvas
+from sqlalchemy import create_engine, func
+from sqlalchemy.orm import sessionmaker
+
+# routes.documents creates its FileStorage at import time
+os.environ.setdefault("PDF_UPLOAD_DIR", tempfile.mkdtemp())
+
+from database import Base
+from models import Blob, User, Tier, Document, DocumentBatch
+from routes import documents as document_routes
+from services.content_store import ContentStore
+from services.file_storage import FileStorage
+from services.pdf_processor import process_batch
+
+
+@pytest.fixture
+def temp_dir():
+    """Create a temporary upload directory."""
+    with tempfile.TemporaryDirectory() as path:
+        yield path
+
+
+@pytest.fixture
+def session_factory():
+    """Create a fresh in-memory database."""
+    engine = create_engine("sqlite:///:memory:")
+    Base.metadata.create_all(bind=engine)
+    yield sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    engine.dispose()
+
+
+def create_pdf(path: str, text: str) -> None:
+    """Create a one-page PDF containing text."""
+    c = canvas.Canvas(path)
+    c.drawString(50, 750, text)
+    c.save()
+
+
+def test_process_batch_continues_after_failure(temp_dir, session_factory):
+    """A broken document should be marked failed without stopping the batch."""
+    db = session_factory()
+    tier = Tier(name="Free", price_cents=0, features={"pdf_word_limit": 100})
+    user = User(email="user@example.com", hashed_password="x", tier=tier)
+    db.add(user)
+    db.flush()
+    
+    batch = DocumentBatch(user_id=user.id, document_count=3)
+    db.add(batch)
+    db.flush()
+    
+    os.makedirs(os.path.join(temp_dir, str(user.id)))
+    documents = []
+    for index, name in enumerate(["first.pdf", "missing.pdf", "last.pdf"]):
+        file_path = f"{user.id}/{index}_{name}"
+        if name != "missing.pdf":
+            create_pdf(os.path.join(temp_dir, file_path), f"Text of {name}")
+        documents.append(Document(
+            user_id=user.id,
+            batch_id=batch.id,
+            filename=name,
+            file_path=file_path
+        ))
+    db.add_all(documents)
+    db.commit()
+    batch_id = batch.id
+    document_ids = [document.id for document in documents]
+    db.close()
+    
+    process_batch(document_ids, session_factory(), FileStorage(base_upload_dir=temp_dir))
+    
+    db = session_factory()
+    statuses = {
+        document.filename: document.status
+        for document in db.query(Document).filter(Document.batch_id == batch_id)
+    }
+    assert statuses == {"first.pdf": "completed", "missing.pdf": "failed", "last.pdf": "completed"}
+    
+    counts = dict(db.query(Document.status, func.count(Document.id)).filter(
+        Document.batch_id == batch_id
+    ).group_by(Document.status).all())
+    assert counts == {"completed": 2, "failed": 1}
+    db.close()
+
+
+class FailingContentStore(ContentStore):
+    """Content store whose save fails on the Nth call."""
+
+    def __init__(self, file_storage, fail_on: int):
+        super().__init__(file_storage, enabled=True)
+        self.fail_on = fail_on
+        self.saves = 0
+
+    def save(self, *args, **kwargs):
+        self.saves += 1
+        if self.saves == self.fail_on:
+            raise OSError("disk full")
+        return super().save(*args, **kwargs)
+
+
+def test_failed_batch_releases_the_files_it_stored(temp_dir, session_factory, monkeypatch):
+    """A member failing mid-batch should leave no new blobs, and keep shared ones."""
+    db = session_factory()
+    user = User(email="user@example.com", hashed_password="x")
+    db.add(user)
+    db.commit()
+    store = FailingContentStore(FileStorage(base_upload_dir=temp_dir), fail_on=4)
+    monkeypatch.setattr(document_routes, "content_store", store)
+    shared = store.save(db, BytesIO(b"shared pdf"), user.id, 99, "old.pdf")
+    db.commit()
+    store.saves = 0
+    
+    archive = BytesIO()
+    with zipfile.ZipFile(archive, "w") as zip_file:
+        zip_file.writestr("a.pdf", b"new pdf")
+        zip_file.writestr("b.pdf", b"shared pdf")
+        zip_file.writestr("c.pdf", b"new pdf")
+        zip_file.writestr("d.pdf", b"never stored")
+    archive.seek(0)
+    
+    with pytest.raises(HTTPException) as failed:
+        asyncio.run(document_routes.upload_batch(
+            BackgroundTasks(),
+            files=[UploadFile(file=archive, filename="batch.zip")],
+            user=user,
+            db=db,
+            inline=False
+        ))
+    assert failed.value.status_code == 500
+    
+    assert db.query(Document).count() == 0
+    assert [(blob.ref_count,) for blob in db.query(Blob)] == [(1,)]
+    assert [path for path, _ in store.file_storage.iter_files()] == [shared]
+    db.close()
@@ -0,0 +1,181 @@
+"""Tests for incremental document library sync.
+
+Feature: smart-pdf-processor
+"""
+
+import time
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from database import AppSession, Base
+from models import User, Document
+from services.change_feed import ChangeFeed, ChangeTokenExpired, encode_token
+from services.feed_stamps import restamp_on_commit
+
+
+@pytest.fixture
+def db():
+    """Create a fresh in-memory database session."""
+    engine = create_engine("sqlite:///:memory:")
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    yield session
+    session.close()
+    engine.dispose()
+
+
+@pytest.fixture
+def user(db):
+    """Create a user."""
+    user = User(email="user@example.com", hashed_password="x")
+    db.add(user)
+    db.commit()
+    return user
+
+
+def add_document(db, user, name):
+    """Add and commit a document."""
+    document = Document(user_id=user.id, filename=name, file_path="", status="pending")
+    db.add(document)
+    db.commit()
+    return document
+
+
+def sync(feed, user, token=None, limit=200):
+    """Follow has_more to the end; returns (changed ids, deleted ids, token)."""
+    changed, deleted = [], []
+    while True:
+        changes = feed.changes_since(user.id, token, limit=limit)
+        changed.extend(document.id for document in changes.changed)
+        deleted.extend(changes.deleted)
+        token = changes.token
+        if not changes.has_more:
+            return changed, deleted, token
+
+
+def test_only_changes_since_token_are_returned(db, user):
+    """A refresh should return just the updated, created and deleted documents."""
+    feed = ChangeFeed(db, settle_seconds=0)
+    documents = [add_document(db, user, f"{index}.pdf") for index in range(5)]
+    
+    changed, deleted, token = sync(feed, user, limit=2)
+    assert sorted(changed) == [document.id for document in documents]
+    assert deleted == []
+    
+    documents[1].status = "completed"
+    new_document = add_document(db, user, "new.pdf")
+    documents[2].status = "deleting"
+    feed.record_deletions(user.id, [documents[2].id])
+    db.commit()
+    
+    changed, deleted, token = sync(feed, user, token)
+    assert sorted(changed) == [documents[1].id, new_document.id]
+    assert deleted == [documents[2].id]
+    
+    assert sync(feed, user, token)[:2] == ([], [])
+
+
+def test_bulk_status_update_counts_as_change(db, user):
+    """Query-level status updates should bump updated_at as well."""
+    feed = ChangeFeed(db, settle_seconds=0)
+    document = add_document(db, user, "a.pdf")
+    _, _, token = sync(feed, user)
+    
+    db.query(Document).filter(Document.id == document.id).update(
+        {Document.status: "failed"}, synchronize_session=False
+    )
+    db.commit()
+    
+    assert sync(feed, user, token)[0] == [document.id]
+
+
+def test_recent_changes_wait_for_settle_window(db, user):
+    """Rows changed inside the settle window are delivered on a later poll."""
+    document = add_document(db, user, "a.pdf")
+    
+    assert sync(ChangeFeed(db, settle_seconds=60), user)[0] == []
+    assert sync(ChangeFeed(db, settle_seconds=0), user)[0] == [document.id]
+
+
+def test_expired_and_invalid_tokens(db, user):
+    """Tokens older than tombstone retention must fall back to a full reload."""
+    feed = ChangeFeed(db, settle_seconds=0, retention_days=30)
+    old = datetime.utcnow() - timedelta(days=31)
+    
+    with pytest.raises(ChangeTokenExpired):
+        feed.changes_since(user.id, encode_token((old, 0), (old, 0)))
+    with pytest.raises(ValueError):
+        feed.changes_since(user.id, "garbage")
+
+
+@pytest.fixture
+def app_sessions(tmp_path):
+    """Reader and writer application sessions sharing a database file."""
+    engine = create_engine(f"sqlite:///{tmp_path / 'feed.db'}")
+    Base.metadata.create_all(bind=engine)
+    factory = sessionmaker(class_=AppSession, autocommit=False, autoflush=False, bind=engine)
+    reader, writer = factory(), factory()
+    yield reader, writer
+    reader.close()
+    writer.close()
+    engine.dispose()
+
+
+def test_rows_committed_after_the_settle_window_are_delivered(app_sessions):
+    """A row flushed long before its commit should still reach clients polling meanwhile."""
+    reader, writer = app_sessions
+    user = User(email="user@example.com", hashed_password="x")
+    reader.add(user)
+    reader.commit()
+    feed = ChangeFeed(reader, settle_seconds=0.1)
+    token = feed.current_token()
+    
+    # Flushed now, committed after a slow step (e.g. storing a large upload)
+    document = Document(user_id=user.id, filename="slow.pdf", file_path="", status="pending")
+    writer.add(document)
+    writer.flush()
+    time.sleep(0.3)
+    
+    changes = feed.changes_since(user.id, token)
+    assert changes.changed == []
+    token = changes.token
+    reader.commit()
+    
+    writer.commit()
+    time.sleep(0.3)
+    
+    assert [changed.id for changed in feed.changes_since(user.id, token).changed] == [document.id]
+
+
+def test_bulk_updates_committed_after_the_settle_window_are_delivered(app_sessions):
+    """Rows changed by a bulk UPDATE are restamped at commit when registered."""
+    reader, writer = app_sessions
+    user = User(email="user@example.com", hashed_password="x")
+    reader.add(user)
+    reader.commit()
+    document = add_document(reader, user, "a.pdf")
+    feed = ChangeFeed(reader, settle_seconds=0.1)
+    time.sleep(0.3)
+    token = sync(feed, user)[2]
+    reader.commit()
+    
+    # Stamped at statement time, committed after a slow step
+    writer.query(Document).filter(Document.id == document.id).update(
+        {Document.status: "completed", Document.updated_at: datetime.utcnow()},
+        synchronize_session=False
+    )
+    restamp_on_commit(writer, Document, Document.id == document.id)
+    time.sleep(0.3)
+    
+    changes = feed.changes_since(user.id, token)
+    assert changes.changed == []
+    token = changes.token
+    reader.commit()
+    
+    writer.commit()
+    time.sleep(0.3)
+    
+    assert [changed.id for changed in feed.changes_since(user.id, token).changed] == [document.id]
@@ -0,0 +1,122 @@
+"""Tests for content-addressed storage with reference counting.
+
+Feature: smart-pdf-processor
+"""
+
+import os
+import tempfile
+from io import BytesIO
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from database import Base
+from models import Blob
+from services.content_store import ContentStore
+from services.file_storage import FileStorage
+
+
+@pytest.fixture
+def temp_dir():
+    """Create a temporary upload directory."""
+    with tempfile.TemporaryDirectory() as path:
+        yield path
+
+
+@pytest.fixture
+def db():
+    """Create a fresh in-memory database session."""
+    engine = create_engine("sqlite:///:memory:")
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    yield session
+    session.close()
+    engine.dispose()
+
+
+@pytest.fixture
+def store(temp_dir):
+    """Create a content store with deduplication enabled."""
+    return ContentStore(FileStorage(base_upload_dir=temp_dir), enabled=True)
+
+
+def test_identical_uploads_share_one_blob(store, db, temp_dir):
+    """Uploads with the same bytes should point at one stored file."""
+    first = store.save(db, BytesIO(b"same pdf"), 1, 1, "a.pdf")
+    second = store.save(db, BytesIO(b"same pdf"), 2, 2, "b.pdf")
+    other = store.save(db, BytesIO(b"other pdf"), 1, 3, "c.pdf")
+    db.commit()
+    
+    assert first == second != other
+    assert store.file_storage.blob_digest(first) is not None
+    assert db.query(Blob).filter(Blob.ref_count == 2).count() == 1
+    assert not os.listdir(os.path.join(temp_dir, ".partial"))
+
+
+def test_blob_is_removed_with_last_reference(store, db):
+    """Releasing a shared blob should keep the file until no document uses it."""
+    first = store.save(db, BytesIO(b"same pdf"), 1, 1, "a.pdf")
+    second = store.save(db, BytesIO(b"same pdf"), 2, 2, "b.pdf")
+    db.commit()
+    
+    store.release(db, first)
+    db.commit()
+    assert store.file_storage.file_exists(second)
+    
+    store.release(db, second)
+    db.commit()
+    assert not store.file_storage.file_exists(second)
+    assert db.query(Blob).count() == 0
+
+
+def test_save_partial_deduplicates_completed_upload(store, db):
+    """Resumable uploads should be adopted as blobs without another copy."""
+    existing = store.save(db, BytesIO(b"big pdf"), 1, 1, "a.pdf")
+    partial_path = store.file_storage.create_partial(upload_id=9)
+    with store.file_storage.open_partial(partial_path, 0) as buffer:
+        buffer.write(b"big pdf")
+    
+    file_path = store.save_partial(db, partial_path, 2, 2, "b.pdf")
+    db.commit()
+    
+    assert file_path == existing
+    assert not store.file_storage.file_exists(partial_path)
+    assert db.query(Blob).one().ref_count == 2
+
+
+def test_oversized_stream_leaves_no_blob(store, db):
+    """Rejected uploads should not create blobs or temporary files."""
+    with pytest.raises(Exception, match="exceeds maximum size"):
+        store.save(db, BytesIO(b"x" * 100), 1, 1, "a.pdf", max_bytes=10)
+    
+    assert db.query(Blob).count() == 0
+    assert list(store.file_storage.iter_files()) == []
+
+
+def test_disabled_store_uses_per_document_layout(temp_dir, db):
+    """Without deduplication files are stored and deleted per document."""
+    store = ContentStore(FileStorage(base_upload_dir=temp_dir))
+    
+    file_path = store.save(db, BytesIO(b"pdf"), 1, 5, "a.pdf")
+    assert file_path == "1/5_a.pdf"
+    
+    store.release(db, file_path)
+    assert not store.file_storage.file_exists(file_path)
+
+
+def test_discard_keeps_blobs_other_documents_use(store, db):
+    """Undoing a rolled-back save should only delete a blob nobody references."""
+    shared = store.save(db, BytesIO(b"shared pdf"), 1, 1, "a.pdf")
+    db.commit()
+    
+    again = store.save(db, BytesIO(b"shared pdf"), 2, 2, "b.pdf")
+    fresh = store.save(db, BytesIO(b"fresh pdf"), 2, 3, "c.pdf")
+    db.rollback()
+    store.discard(db, again)
+    store.discard(db, fresh)
+    db.commit()
+    
+    assert store.file_storage.file_exists(shared)
+    assert not store.file_storage.file_exists(fresh)
+    assert [(blob.ref_count,) for blob in db.query(Blob)] == [(1,)]
@@ -0,0 +1,133 @@
+"""Tests for versioned schema upgrades and seeding on startup.
+
+Feature: smart-pdf-processor
+"""
+
+import pytest
+from sqlalchemy import create_engine, event, inspect, text
+from sqlalchemy.orm import sessionmaker
+
+import seed
+from database import init_db, schema_fingerprint
+from models import Tier, FeatureFlag, User, Document
+
+# The users and documents tables as first released, before columns and
+# indexes were added to them
+LEGACY_SCHEMA = [
+    """CREATE TABLE tiers (
+        id INTEGER PRIMARY KEY, name VARCHAR(100) NOT NULL UNIQUE,
+        price_cents INTEGER NOT NULL, features JSON NOT NULL, created_at DATETIME NOT NULL
+    )""",
+    """CREATE TABLE users (
+        id INTEGER PRIMARY KEY, email VARCHAR(255) NOT NULL, hashed_password VARCHAR(255) NOT NULL,
+        is_admin BOOLEAN NOT NULL, tier_id INTEGER REFERENCES tiers (id), created_at DATETIME NOT NULL
+    )""",
+    "CREATE UNIQUE INDEX ix_users_email ON users (email)",
+    """CREATE TABLE documents (
+        id INTEGER PRIMARY KEY, user_id INTEGER NOT NULL REFERENCES users (id) ON DELETE CASCADE,
+        filename VARCHAR(255) NOT NULL, file_path VARCHAR(512) NOT NULL, upload_date DATETIME NOT NULL,
+        status VARCHAR(20) NOT NULL, word_count INTEGER, extracted_text TEXT, error_message TEXT,
+        created_at DATETIME NOT NULL, updated_at DATETIME NOT NULL
+    )""",
+    "CREATE INDEX idx_documents_user_upload_date ON documents (user_id, upload_date)",
+    "INSERT INTO tiers VALUES (1, 'Free', 0, '{\"pdf_word_limit\": 50, \"storage_mb\": 500}', '2024-01-01')",
+    "INSERT INTO users VALUES (1, 'user@example.com', 'x', 0, 1, '2024-01-01')",
+    """INSERT INTO documents VALUES (1, 1, 'a.pdf', '1/a.pdf', '2024-01-01', 'completed', 3,
+        'some text', NULL, '2024-01-01', '2024-01-01')""",
+]
+
+
+@pytest.fixture
+def engine():
+    """Create an empty in-memory database."""
+    engine = create_engine("sqlite://")
+    yield engine
+    engine.dispose()
+
+
+def record_queries(engine) -> list:
+    """Record the SQL executed on an engine from now on."""
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    return statements
+
+
+def test_startup_is_one_query_when_up_to_date(engine):
+    """Once seeded, starting again should only read the versions."""
+    assert seed.seed_database(engine)
+    statements = record_queries(engine)
+
+    assert not seed.seed_database(engine)
+    assert not init_db(bind=engine)
+    assert len(statements) == 2
+
+
+def test_seeding_is_idempotent(engine, monkeypatch):
+    """Seeding again after a version bump should not duplicate rows."""
+    seed.seed_database(engine)
+    monkeypatch.setattr(seed, "SEED_VERSION", "test")
+    assert seed.seed_database(engine)
+
+    db = sessionmaker(bind=engine)()
+    assert db.query(Tier).count() == len(seed.TIERS)
+    assert db.query(FeatureFlag).count() == len(seed.FEATURE_FLAGS)
+    assert db.query(User).filter(User.is_admin).count() == 1
+    db.close()
+
+
+def test_upgrade_adds_columns_and_indexes_to_existing_tables(engine):
+    """A database from an earlier release should gain the new schema and keep its rows."""
+    with engine.begin() as connection:
+        for statement in LEGACY_SCHEMA:
+            connection.execute(text(statement))
+
+    assert seed.seed_database(engine)
+
+    db = sessionmaker(bind=engine)()
+    document = db.get(Document, 1)
+    assert document.extracted_text == "some text"
+    assert (document.version, document.attempts, document.progress, document.file_size) == (0, 0, 0, 0)
+    assert document.batch_id is None and document.next_retry_at is None
+    assert db.get(User, 1).deletion_requested_at is None
+
+    free = db.query(Tier).filter(Tier.name == "Free").one()
+    # Enforced features are reset, an admin's other changes are kept
+    assert free.features["pdf_word_limit"] == 100
+    assert free.features["storage_mb"] == 500
+    assert free.features["max_processing_backlog"] == 20
+    db.close()
+
+    indexes = {index["name"]: index["column_names"] for index in inspect(engine).get_indexes("documents")}
+    assert indexes["idx_documents_user_upload_date"] == ["user_id", "upload_date", "id"]
+    assert "idx_documents_active_retry" in indexes
+    assert inspect(engine).has_table("document_tombstones")
+
+
+def test_model_changes_trigger_an_upgrade(engine, monkeypatch):
+    """A different schema fingerprint should upgrade an up-to-date database again."""
+    init_db(bind=engine)
+    assert not init_db(bind=engine)
+
+    monkeypatch.setattr("database.schema_fingerprint", lambda bind: schema_fingerprint(bind) + "x")
+    assert init_db(bind=engine)
+    assert not init_db(bind=engine)
+
+
+def test_upgrade_rebuilds_partial_indexes_with_a_changed_predicate(engine):
+    """A partial index built for other statuses should be recreated from the model."""
+    init_db(bind=engine)
+    with engine.begin() as connection:
+        connection.execute(text("DROP INDEX idx_documents_active_retry"))
+        connection.execute(text(
+            "CREATE INDEX idx_documents_active_retry ON documents (status, next_retry_at) "
+            "WHERE status IN ('pending')"
+        ))
+        connection.execute(text("DELETE FROM schema_versions"))
+
+    assert init_db(bind=engine)
+
+    with engine.connect() as connection:
+        ddl = connection.execute(text(
+            "SELECT sql FROM sqlite_master WHERE name = 'idx_documents_active_retry'"
+        )).scalar()
+    assert "'retrying'" in ddl
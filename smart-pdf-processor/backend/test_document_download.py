@@ -0,0 +1,96 @@
+"""Unit tests for original PDF download helpers.
+
+Feature: smart-pdf-processor
+"""
+
+import os
+import tempfile
+import time
+
+import pytest
+from fastapi import HTTPException
+from hypothesis import given, strategies as st, settings
+
+# routes.documents creates its FileStorage at import time
+os.environ.setdefault("PDF_UPLOAD_DIR", tempfile.mkdtemp())
+
+from routes.documents import parse_range_header, is_not_modified, content_disposition
+
+
+def test_no_range_header_serves_whole_file():
+    """Test that requests without a Range header get the full file."""
+    assert parse_range_header(None, 1000) is None
+
+
+def test_multi_range_falls_back_to_whole_file():
+    """Test that unsupported multi-range requests get the full file."""
+    assert parse_range_header("bytes=0-1,5-6", 1000) is None
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("bytes=0-99", (0, 100)),
+    ("bytes=900-", (900, 1000)),
+    ("bytes=-100", (900, 1000)),
+    ("bytes=-5000", (0, 1000)),
+    ("bytes=990-5000", (990, 1000)),
+])
+def test_parse_range_header(header, expected):
+    """Test explicit, open-ended, suffix and clamped ranges."""
+    assert parse_range_header(header, 1000) == expected
+
+
+@pytest.mark.parametrize("header", ["bytes=1000-", "bytes=500-100", "bytes=-0", "bytes=-"])
+def test_unsatisfiable_range_raises_416(header):
+    """Test that unsatisfiable ranges are rejected with the file size."""
+    with pytest.raises(HTTPException) as exc_info:
+        parse_range_header(header, 1000)
+    
+    assert exc_info.value.status_code == 416
+    assert exc_info.value.headers["Content-Range"] == "bytes */1000"
+
+
+@settings(max_examples=100)
+@given(
+    file_size=st.integers(min_value=1, max_value=10_000),
+    first=st.integers(min_value=0, max_value=10_000),
+    length=st.integers(min_value=0, max_value=10_000)
+)
+def test_property_parsed_range_within_file(file_size, first, length):
+    """Any satisfiable range should lie within the file and be non-empty."""
+    try:
+        start, end = parse_range_header(f"bytes={first}-{first + length}", file_size)
+    except HTTPException:
+        assert first >= file_size
+        return
+    
+    assert 0 <= start < end <= file_size
+    assert start == first
+
+
+def test_is_not_modified():
+    """Test If-Modified-Since comparison at one-second resolution."""
+    modified = 1_700_000_000.75
+    
+    assert is_not_modified("Tue, 14 Nov 2023 22:13:20 GMT", modified) is True
+    assert is_not_modified("Tue, 14 Nov 2023 22:13:19 GMT", modified) is False
+    assert is_not_modified("not a date", modified) is False
+    assert is_not_modified(None, modified) is False
+
+
+def test_is_not_modified_treats_minus_zero_dates_as_utc(monkeypatch):
+    """A "-0000" date should compare as UTC whatever the server's local zone."""
+    monkeypatch.setenv("TZ", "America/New_York")
+    time.tzset()
+    try:
+        modified = 1_700_000_000.75
+        assert is_not_modified("Tue, 14 Nov 2023 22:13:20 -0000", modified) is True
+        assert is_not_modified("Tue, 14 Nov 2023 22:13:19 -0000", modified) is False
+    finally:
+        monkeypatch.undo()
+        time.tzset()
+
+
+def test_content_disposition_encodes_non_ascii():
+    """Test that non-ASCII filenames use RFC 5987 encoding."""
+    assert content_disposition("report.pdf") == 'inline; filename="report.pdf"'
+    assert content_disposition("réport.pdf") == "inline; filename*=utf-8''r%C3%A9port.pdf"
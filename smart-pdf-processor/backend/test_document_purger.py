@@ -0,0 +1,196 @@
+"""Tests for asynchronous document deletion and user purges.
+
+Feature: smart-pdf-processor
+"""
+
+import os
+import tempfile
+from datetime import datetime, timedelta
+from io import BytesIO
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from database import Base
+from models import User, Document, DocumentTombstone, UploadSession, Blob
+from services.content_store import ContentStore
+from services.document_purger import DocumentPurger, DELETING_STATUS
+from services.file_storage import FileStorage
+from services.metrics import metrics
+from services.storage_backends import MemoryBackend
+
+
+class FailingBackend(MemoryBackend):
+    """Memory backend whose deletes fail, like an unavailable volume."""
+
+    def delete(self, key):
+        raise OSError("volume unavailable")
+
+
+@pytest.fixture
+def session_factory():
+    """Create an in-memory database shared by all sessions."""
+    engine = create_engine(
+        "sqlite:///:memory:",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool
+    )
+    Base.metadata.create_all(bind=engine)
+    yield sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    engine.dispose()
+
+
+@pytest.fixture
+def storage():
+    """Create file storage backed by memory."""
+    with tempfile.TemporaryDirectory() as staging:
+        yield FileStorage(base_upload_dir=staging, backend=MemoryBackend())
+
+
+def add_documents(db, storage, user, count, status=DELETING_STATUS):
+    """Store count documents for a user and return their paths."""
+    paths = []
+    for index in range(count):
+        document = Document(user_id=user.id, filename="a.pdf", file_path="", status=status)
+        db.add(document)
+        db.flush()
+        document.file_path = storage.save_stream(BytesIO(b"pdf"), user.id, document.id, "a.pdf")
+        paths.append(document.file_path)
+    db.commit()
+    return paths
+
+
+def test_purges_marked_documents_in_batches(session_factory, storage):
+    """Marked documents should lose their files and rows; others stay."""
+    db = session_factory()
+    user = User(email="user@example.com", hashed_password="x")
+    db.add(user)
+    db.commit()
+    deleted_paths = add_documents(db, storage, user, 5)
+    kept_paths = add_documents(db, storage, user, 1, status="completed")
+    
+    metrics.reset()
+    stats = DocumentPurger(session_factory, ContentStore(storage), batch_size=2).run_once()
+    
+    assert (stats.documents, stats.files, stats.users) == (5, 5, 0)
+    assert not any(storage.file_exists(path) for path in deleted_paths)
+    assert storage.file_exists(kept_paths[0])
+    assert db.query(Document).count() == 1
+    assert metrics.get("purge.documents") == 5
+    db.close()
+
+
+def test_failed_file_removal_keeps_row_for_retry(session_factory):
+    """Rows stay marked when their file cannot be removed."""
+    with tempfile.TemporaryDirectory() as staging:
+        storage = FileStorage(base_upload_dir=staging, backend=FailingBackend())
+        db = session_factory()
+        user = User(email="user@example.com", hashed_password="x")
+        db.add(user)
+        db.commit()
+        add_documents(db, storage, user, 3)
+        
+        stats = DocumentPurger(session_factory, ContentStore(storage), batch_size=2).run_once()
+        
+        assert stats.documents == 0
+        assert db.query(Document).filter(Document.status == DELETING_STATUS).count() == 3
+        db.close()
+
+
+def test_shared_blob_survives_until_last_document_purged(session_factory, storage):
+    """Purging one of two documents sharing a blob must keep the blob."""
+    store = ContentStore(storage, enabled=True)
+    db = session_factory()
+    user = User(email="user@example.com", hashed_password="x")
+    db.add(user)
+    db.commit()
+    documents = []
+    for status in (DELETING_STATUS, "completed"):
+        document = Document(user_id=user.id, filename="a.pdf", file_path="", status=status)
+        db.add(document)
+        db.flush()
+        document.file_path = store.save(db, BytesIO(b"same"), user.id, document.id, "a.pdf")
+        documents.append(document)
+    db.commit()
+    blob_path = documents[1].file_path
+    
+    DocumentPurger(session_factory, store).run_once()
+    
+    assert storage.file_exists(blob_path)
+    assert db.query(Blob).one().ref_count == 1
+    db.close()
+
+
+def test_user_purge_removes_documents_uploads_and_account(session_factory, storage):
+    """A user marked for deletion should be removed with all their data."""
+    db = session_factory()
+    user = User(email="gone@example.com", hashed_password="x")
+    other = User(email="stays@example.com", hashed_password="x")
+    db.add_all([user, other])
+    db.commit()
+    paths = add_documents(db, storage, user, 3, status="completed")
+    other_paths = add_documents(db, storage, other, 1, status="completed")
+    partial_path = storage.create_partial(upload_id=1)
+    db.add(UploadSession(user_id=user.id, filename="a.pdf", file_path=partial_path, total_size=10))
+    user.deletion_requested_at = datetime.utcnow()
+    db.commit()
+    
+    stats = DocumentPurger(session_factory, ContentStore(storage), batch_size=2).run_once()
+    
+    assert (stats.documents, stats.users) == (3, 1)
+    assert [u.email for u in db.query(User)] == ["stays@example.com"]
+    assert db.query(UploadSession).count() == 0
+    assert not storage.file_exists(partial_path)
+    assert not any(storage.file_exists(path) for path in paths)
+    assert storage.file_exists(other_paths[0])
+    db.close()
+
+
+def test_prunes_old_tombstones(session_factory, storage):
+    """Tombstones past their retention should be removed; recent ones kept."""
+    db = session_factory()
+    user = User(email="user@example.com", hashed_password="x")
+    db.add(user)
+    db.flush()
+    db.add_all([
+        DocumentTombstone(user_id=user.id, document_id=1, deleted_at=datetime.utcnow() - timedelta(days=40)),
+        DocumentTombstone(user_id=user.id, document_id=2, deleted_at=datetime.utcnow())
+    ])
+    db.commit()
+    
+    DocumentPurger(session_factory, ContentStore(storage), tombstone_retention_days=30).run_once()
+    
+    assert [tombstone.document_id for tombstone in db.query(DocumentTombstone)] == [2]
+    db.close()
+
+
+def test_expires_abandoned_uploads_and_stray_partial_files(session_factory, storage):
+    """Old uploads without an active writer and unreferenced partial files should be removed."""
+    db = session_factory()
+    user = User(email="user@example.com", hashed_password="x")
+    db.add(user)
+    db.commit()
+    old = datetime.utcnow() - timedelta(hours=48)
+    paths = [storage.create_partial(upload_id=upload_id) for upload_id in (1, 2, 3, 4)]
+    db.add_all([
+        UploadSession(user_id=user.id, filename="a.pdf", file_path=paths[0], total_size=10, updated_at=old),
+        UploadSession(user_id=user.id, filename="b.pdf", file_path=paths[1], total_size=10),
+        UploadSession(
+            user_id=user.id, filename="c.pdf", file_path=paths[2], total_size=10, updated_at=old,
+            writer_token="writing", writer_expires_at=datetime.utcnow() + timedelta(minutes=5)
+        )
+    ])
+    db.commit()
+    # paths[3] has no session, as after a failed request
+    stale = old.timestamp()
+    for path in (paths[0], paths[3]):
+        os.utime(storage.base_upload_dir / path, (stale, stale))
+    
+    stats = DocumentPurger(session_factory, ContentStore(storage), upload_ttl_hours=24).run_once()
+    
+    assert stats.uploads == 1
+    assert sorted(upload.filename for upload in db.query(UploadSession)) == ["b.pdf", "c.pdf"]
+    assert [storage.file_exists(path) for path in paths] == [False, True, True, False]
+    db.close()
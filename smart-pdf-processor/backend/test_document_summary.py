@@ -0,0 +1,73 @@
+"""Tests for the document library summary.
+
+Feature: smart-pdf-processor
+"""
+
+import asyncio
+import os
+import tempfile
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+# routes.documents creates its FileStorage at import time
+os.environ.setdefault("PDF_UPLOAD_DIR", tempfile.mkdtemp())
+
+from database import Base
+from models import User, Document
+from routes.documents import get_document_summary
+
+
+@pytest.fixture
+def db():
+    """Create a fresh in-memory database session."""
+    engine = create_engine("sqlite:///:memory:")
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    yield session
+    session.close()
+    engine.dispose()
+
+
+def test_summary_counts_words_and_recent(db):
+    """The summary should aggregate the user's documents, excluding deleted ones."""
+    user = User(email="user@example.com", hashed_password="x")
+    other = User(email="other@example.com", hashed_password="x")
+    db.add_all([user, other])
+    db.flush()
+    
+    start = datetime(2024, 1, 1)
+    statuses = ["completed", "completed", "failed", "pending", "deleting"]
+    for index, status in enumerate(statuses):
+        db.add(Document(
+            user_id=user.id,
+            filename=f"{index}.pdf",
+            file_path="",
+            status=status,
+            word_count=10 * (index + 1),
+            upload_date=start + timedelta(days=index)
+        ))
+    db.add(Document(user_id=other.id, filename="x.pdf", file_path="", status="completed", word_count=99))
+    db.commit()
+    
+    summary = asyncio.run(get_document_summary(recent=2, user=user, db=db))
+    
+    assert summary.total == 4
+    assert summary.status_counts == {"completed": 2, "failed": 1, "pending": 1}
+    assert summary.total_words == 10 + 20 + 30 + 40
+    assert [document.filename for document in summary.recent] == ["3.pdf", "2.pdf"]
+    assert summary.last_updated is not None
+
+
+def test_summary_of_empty_library(db):
+    """An empty library should report zeros and no recent documents."""
+    user = User(email="user@example.com", hashed_password="x")
+    db.add(user)
+    db.commit()
+    
+    summary = asyncio.run(get_document_summary(recent=5, user=user, db=db))
+    
+    assert (summary.total, summary.total_words, summary.recent) == (0, 0, [])
+    assert summary.last_updated is None
@@ -0,0 +1,133 @@
+"""Tests for worker processing of pending documents and process roles.
+
+Feature: smart-pdf-processor
+"""
+
+import os
+import tempfile
+from datetime import datetime, timedelta
+
+import pytest
+from reportlab.pdfgen import canvas
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from database import Base
+from models import User, Tier, Document
+from runtime import parse_roles
+from services.document_worker import DocumentWorker
+from services.file_storage import FileStorage
+
+
+@pytest.fixture
+def temp_dir():
+    """Create a temporary upload directory."""
+    with tempfile.TemporaryDirectory() as path:
+        yield path
+
+
+@pytest.fixture
+def session_factory():
+    """Create an in-memory database shared by several sessions."""
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool
+    )
+    Base.metadata.create_all(bind=engine)
+    yield sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    engine.dispose()
+
+
+@pytest.fixture
+def user_id(temp_dir, session_factory):
+    """A user with an upload directory."""
+    db = session_factory()
+    tier = Tier(name="Test", price_cents=0, features={"pdf_word_limit": None})
+    user = User(email="user@example.com", hashed_password="x", tier=tier)
+    db.add(user)
+    db.commit()
+    os.makedirs(os.path.join(temp_dir, str(user.id)))
+    user_id = user.id
+    db.close()
+    return user_id
+
+
+def add_document(temp_dir, session_factory, user_id, name, status="pending", age_seconds=0) -> int:
+    """Add a document with a one-page PDF, last updated age_seconds ago."""
+    file_path = f"{user_id}/{name}"
+    c = canvas.Canvas(os.path.join(temp_dir, file_path))
+    c.drawString(50, 750, f"Text of {name}")
+    c.showPage()
+    c.save()
+
+    db = session_factory()
+    document = Document(
+        user_id=user_id,
+        filename=name,
+        file_path=file_path,
+        status=status,
+        updated_at=datetime.utcnow() - timedelta(seconds=age_seconds)
+    )
+    db.add(document)
+    db.commit()
+    document_id = document.id
+    db.close()
+    return document_id
+
+
+def test_find_pending_skips_recent_and_other_statuses(temp_dir, session_factory, user_id):
+    """Only pending documents past the grace period should be taken, oldest first."""
+    newer = add_document(temp_dir, session_factory, user_id, "newer.pdf", age_seconds=120)
+    older = add_document(temp_dir, session_factory, user_id, "older.pdf", age_seconds=600)
+    add_document(temp_dir, session_factory, user_id, "recent.pdf", age_seconds=5)
+    add_document(temp_dir, session_factory, user_id, "done.pdf", status="completed", age_seconds=600)
+    add_document(temp_dir, session_factory, user_id, "busy.pdf", status="processing", age_seconds=600)
+    worker = DocumentWorker(session_factory, FileStorage(base_upload_dir=temp_dir), pending_grace_seconds=60)
+
+    db = session_factory()
+    assert worker.find_pending(db) == [older, newer]
+    worker.batch_size = 1
+    assert worker.find_pending(db) == [older]
+    db.close()
+
+
+def test_run_once_processes_pending_documents(temp_dir, session_factory, user_id):
+    """A worker run should complete the pending documents it finds."""
+    document_ids = [
+        add_document(temp_dir, session_factory, user_id, f"{i}.pdf")
+        for i in range(3)
+    ]
+    worker = DocumentWorker(session_factory, FileStorage(base_upload_dir=temp_dir))
+
+    assert worker.run_once() == 3
+    assert worker.run_once() == 0
+
+    db = session_factory()
+    documents = db.query(Document).filter(Document.id.in_(document_ids)).all()
+    assert {document.status for document in documents} == {"completed"}
+    assert all("Text of" in document.extracted_text for document in documents)
+    db.close()
+
+
+def test_parse_roles():
+    """Roles should be deduplicated and validated."""
+    assert parse_roles("api, worker,api") == ("api", "worker")
+    assert parse_roles("worker") == ("worker",)
+    with pytest.raises(ValueError):
+        parse_roles("api,scheduler")
+    with pytest.raises(ValueError):
+        parse_roles(" , ")
+
+
+def test_worker_only_app_serves_no_api_routes():
+    """An app without the api role should only expose health checks."""
+    from main import create_app
+
+    paths = {route.path for route in create_app(("worker",)).routes}
+    api_paths = {route.path for route in create_app(("api",)).routes}
+
+    assert not any(path.startswith("/api/documents") for path in paths)
+    assert any(path.startswith("/api/documents") for path in api_paths)
+    assert any("health" in path for path in paths)
@@ -149,3 +149,122 @@ class TestFileStorage:
         # Both directories should exist
         assert (Path(temp_dir) / "100").exists()
         assert (Path(temp_dir) / "200").exists()
+    
+    def test_partial_upload_chunks_are_appended(self, storage, temp_dir):
+        """Test that chunks written at increasing offsets build the full file."""
+        partial_path = storage.create_partial(upload_id=7)
+        
+        with storage.open_partial(partial_path, 0) as buffer:
+            buffer.write(b"first-")
+        with storage.open_partial(partial_path, 6) as buffer:
+            buffer.write(b"second")
+        
+        assert (Path(temp_dir) / partial_path).read_bytes() == b"first-second"
+    
+    def test_open_partial_discards_interrupted_tail(self, storage, temp_dir):
+        """Test that resuming at an offset truncates bytes written after it."""
+        partial_path = storage.create_partial(upload_id=7)
+        
+        with storage.open_partial(partial_path, 0) as buffer:
+            buffer.write(b"complete-torn")
+        with storage.open_partial(partial_path, 9) as buffer:
+            buffer.write(b"retry")
+        
+        assert (Path(temp_dir) / partial_path).read_bytes() == b"complete-retry"
+    
+    def test_finalize_partial_moves_file_into_user_directory(self, storage, temp_dir):
+        """Test that finalizing a partial upload stores it like save_pdf does."""
+        partial_path = storage.create_partial(upload_id=7)
+        with storage.open_partial(partial_path, 0) as buffer:
+            buffer.write(b"PDF file content here")
+        
+        file_path = storage.finalize_partial(partial_path, user_id=123, document_id=1, filename="big.pdf")
+        
+        assert file_path == "123/1_big.pdf"
+        assert (Path(temp_dir) / file_path).read_bytes() == b"PDF file content here"
+        assert not (Path(temp_dir) / partial_path).exists()
+    
+    def test_save_stream_stores_content(self, storage, temp_dir):
+        """Test that save_stream stores any readable stream."""
+        file_path = storage.save_stream(BytesIO(b"zip member"), 123, 1, "member.pdf")
+        
+        assert file_path == "123/1_member.pdf"
+        assert (Path(temp_dir) / file_path).read_bytes() == b"zip member"
+    
+    def test_save_stream_enforces_max_bytes(self, storage, temp_dir):
+        """Test that oversized streams are rejected and leave no file behind."""
+        with pytest.raises(Exception, match="exceeds maximum size"):
+            storage.save_stream(BytesIO(b"x" * 100), 123, 1, "big.pdf", max_bytes=10)
+        
+        assert not (Path(temp_dir) / "123" / "1_big.pdf").exists()
+    
+    def test_iter_range_returns_requested_bytes(self, storage):
+        """Test that iter_range yields exactly the requested byte range."""
+        content = bytes(range(256)) * 4
+        file_path = storage.save_pdf(self.create_upload_file("test.pdf", content), 123, 1)
+        
+        chunks = list(storage.iter_range(file_path, 10, 1000, chunk_size=100))
+        
+        assert b"".join(chunks) == content[10:1000]
+        assert max(len(chunk) for chunk in chunks) == 100
+    
+    def test_hashed_layout_fans_out_into_two_levels(self, temp_dir):
+        """Test that the hashed layout stores files under two hashed subdirectories."""
+        storage = FileStorage(base_upload_dir=temp_dir, layout="hashed")
+        
+        file_path = storage.save_stream(BytesIO(b"content"), 123, 1, "doc.pdf")
+        
+        first, second, name = file_path.split("/")
+        assert len(first) == 2 and len(second) == 2
+        assert name == "123_1_doc.pdf"
+        assert storage.file_exists(file_path)
+    
+    def test_shard_roots_spread_files_with_stable_placement(self, temp_dir):
+        """Test that extra roots receive files and placement is deterministic."""
+        roots = {"vol1": os.path.join(temp_dir, "vol1"), "vol2": os.path.join(temp_dir, "vol2")}
+        storage = FileStorage(base_upload_dir=os.path.join(temp_dir, "base"), layout="hashed", shard_roots=roots)
+        again = FileStorage(base_upload_dir=os.path.join(temp_dir, "base"), layout="hashed", shard_roots=roots)
+        
+        paths = [storage.save_stream(BytesIO(b"x"), 1, doc_id, "a.pdf") for doc_id in range(60)]
+        
+        prefixes = {path.split("/")[0] if path.startswith("@") else "" for path in paths}
+        assert prefixes == {"", "@vol1", "@vol2"}
+        assert paths == [again.path_for(1, doc_id, "a.pdf") for doc_id in range(60)]
+        assert all(storage.file_exists(path) for path in paths)
+        
+        storage.delete_pdf(paths[0])
+        assert not storage.file_exists(paths[0])
+    
+    def test_adding_shard_root_moves_only_some_files(self, temp_dir):
+        """Test that consistent hashing keeps most placements when a root is added."""
+        two = FileStorage(temp_dir, layout="hashed", shard_roots={"vol1": os.path.join(temp_dir, "v1")})
+        three = FileStorage(temp_dir, layout="hashed", shard_roots={
+            "vol1": os.path.join(temp_dir, "v1"), "vol2": os.path.join(temp_dir, "v2")
+        })
+        
+        keys = [f"1:{doc_id}" for doc_id in range(1000)]
+        changed = sum(two._choose_root(key) != three._choose_root(key) for key in keys)
+        
+        assert 0 < changed < 500
+    
+    def test_shard_path_cannot_escape_root(self, temp_dir):
+        """Test that prefixed paths are validated against their own root."""
+        storage = FileStorage(temp_dir, shard_roots={"vol1": os.path.join(temp_dir, "vol1")})
+        
+        with pytest.raises(ValueError):
+            storage.get_absolute_path("@vol1/../../etc/passwd")
+        with pytest.raises(ValueError):
+            storage.get_absolute_path("@missing/1/1_a.pdf")
+    
+    def test_relocate_moves_file_and_is_idempotent(self, storage, temp_dir):
+        """Test that relocate moves into the new layout and tolerates re-runs."""
+        old_path = storage.save_stream(BytesIO(b"content"), 123, 1, "doc.pdf")
+        hashed = FileStorage(base_upload_dir=temp_dir, layout="hashed")
+        
+        new_path = hashed.relocate(old_path, 123, 1, "doc.pdf")
+        
+        assert new_path != old_path
+        assert (Path(temp_dir) / new_path).read_bytes() == b"content"
+        assert not (Path(temp_dir) / "123").exists()
+        assert hashed.relocate(old_path, 123, 1, "doc.pdf") == new_path
+        assert hashed.relocate(new_path, 123, 1, "doc.pdf") == new_path
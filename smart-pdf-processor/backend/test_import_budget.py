@@ -0,0 +1,80 @@
+"""Tests that API and worker startup stay free of unneeded imports.
+
+Feature: smart-pdf-processor
+"""
+
+import os
+import subprocess
+import sys
+
+import pytest
+
+from measure_import_time import BACKEND_DIR, measure, total_ms
+
+# Measured baseline (1350-1900 ms best of three, depending on machine
+# load) plus a small margin; raise it deliberately when a new startup
+# import is worth its cost
+API_IMPORT_BUDGET_MS = float(os.getenv("API_IMPORT_BUDGET_MS", "2200"))
+
+# Loaded on first extraction only
+EXTRACTION_PACKAGES = {"pdfplumber", "pdfminer", "pypdfium2", "PIL"}
+
+# Not needed by worker processes, which serve no HTTP
+WEB_PACKAGES = {"fastapi", "starlette", "uvicorn"}
+
+
+@pytest.fixture(scope="module")
+def api_imports():
+    """Importtime report of the API, best of three fresh interpreters."""
+    runs = [measure("main") for _ in range(3)]
+    return min(runs, key=total_ms)
+
+
+def test_api_startup_does_not_import_extraction_engines(api_imports):
+    """Importing the app should not load pdfplumber or its dependencies."""
+    loaded = {record.name.split(".")[0] for record in api_imports}
+    assert not loaded & EXTRACTION_PACKAGES
+
+
+def test_api_role_leaves_pdf_engines_unloaded():
+    """An API-only process should not have pdfplumber or pdfminer in sys.modules."""
+    script = (
+        "import sys, main; "
+        "print(' '.join(sorted(m for m in sys.modules "
+        "if m.split('.')[0] in ('pdfplumber', 'pdfminer'))))"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", script],
+        cwd=BACKEND_DIR,
+        env={**os.environ, "APP_ROLES": "api"},
+        capture_output=True,
+        text=True
+    )
+    assert result.returncode == 0, result.stderr[-2000:]
+    assert result.stdout.split() == []
+
+
+def test_api_startup_import_time_within_budget(api_imports):
+    """Importing the app should stay within the startup budget."""
+    assert total_ms(api_imports) < API_IMPORT_BUDGET_MS
+
+
+def test_worker_startup_does_not_import_web_framework():
+    """Importing the worker entry point should not load the web framework."""
+    loaded = {record.name.split(".")[0] for record in measure("worker")}
+    assert not loaded & WEB_PACKAGES
+    assert not loaded & EXTRACTION_PACKAGES
+
+
+def test_extraction_engine_loads_on_first_use(tmp_path):
+    """The extractor should still work once pdfplumber is needed."""
+    from reportlab.pdfgen import canvas
+    from services.pdf_extractor import PDFExtractor
+
+    path = str(tmp_path / "doc.pdf")
+    c = canvas.Canvas(path)
+    c.drawString(50, 750, "Hello")
+    c.showPage()
+    c.save()
+
+    assert PDFExtractor().count_pages(path) == 1
@@ -0,0 +1,87 @@
+"""Tests for streaming library export.
+
+Feature: smart-pdf-processor
+"""
+
+import io
+import json
+import zipfile
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from database import Base
+from models import User, Document
+from services.library_export import LibraryExporter
+
+
+@pytest.fixture
+def session_factory():
+    """Create an in-memory database shared by all sessions."""
+    engine = create_engine(
+        "sqlite:///:memory:",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool
+    )
+    Base.metadata.create_all(bind=engine)
+    yield sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    engine.dispose()
+
+
+@pytest.fixture
+def user_id(session_factory):
+    """Create a user with five documents (one being deleted) and another user's document."""
+    db = session_factory()
+    user = User(email="user@example.com", hashed_password="x")
+    other = User(email="other@example.com", hashed_password="x")
+    db.add_all([user, other])
+    db.flush()
+    for index in range(5):
+        db.add(Document(
+            user_id=user.id,
+            filename=f"report {index}.pdf",
+            file_path="",
+            status="deleting" if index == 4 else "completed",
+            extracted_text=f"Text of report {index} – ünïcode"
+        ))
+    db.add(Document(user_id=other.id, filename="x.pdf", file_path="", extracted_text="secret"))
+    db.commit()
+    user_id = user.id
+    db.close()
+    return user_id
+
+
+def test_ndjson_export_streams_one_document_per_line(session_factory, user_id):
+    """Each line should be one of the user's documents, in id order."""
+    exporter = LibraryExporter(session_factory, batch_size=2)
+    
+    lines = b"".join(exporter.iter_ndjson(user_id)).decode("utf-8").splitlines()
+    records = [json.loads(line) for line in lines]
+    
+    assert [record["filename"] for record in records] == [f"report {i}.pdf" for i in range(4)]
+    assert records[0]["extracted_text"] == "Text of report 0 – ünïcode"
+
+
+def test_export_is_lazy(session_factory, user_id):
+    """The first document should be available before the rest are read."""
+    stream = LibraryExporter(session_factory, batch_size=1).iter_ndjson(user_id)
+    
+    first = json.loads(next(stream))
+    stream.close()
+    
+    assert first["filename"] == "report 0.pdf"
+
+
+def test_zip_export_contains_text_files(session_factory, user_id):
+    """The streamed archive should be a valid ZIP with one text file per document."""
+    chunks = list(LibraryExporter(session_factory).iter_zip(user_id))
+    
+    with zipfile.ZipFile(io.BytesIO(b"".join(chunks))) as archive:
+        names = archive.namelist()
+        assert len(names) == 4
+        assert names[0].endswith("_report 0.txt")
+        assert archive.read(names[1]).decode("utf-8") == "Text of report 1 – ünïcode"
+    # One chunk per document plus the central directory
+    assert len(chunks) == 5
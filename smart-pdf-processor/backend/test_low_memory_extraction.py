@@ -0,0 +1,158 @@
+"""Tests for bounded-memory PDF extraction.
+
+Feature: smart-pdf-processor
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+
+import pytest
+from reportlab.pdfgen import canvas
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from database import Base
+from models import User, Tier, Document
+from services.file_storage import FileStorage
+from services.pdf_extractor import PDFExtractor
+from services.pdf_processor import PDFProcessor
+from services.word_limiter import WordLimiter
+
+
+# Measures peak RSS growth (KB) caused by extraction alone, in a fresh process
+# so that earlier tests and imports do not mask it.
+PEAK_RSS_SCRIPT = """
+import resource, sys
+from services.pdf_extractor import PDFExtractor
+
+def peak_kb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+before = peak_kb()
+for _ in PDFExtractor(low_memory=True).iter_paragraphs(sys.argv[1]):
+    pass
+print(peak_kb() - before)
+"""
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def create_pdf_with_pages(filename: str, page_count: int) -> str:
+    """Create a PDF with one short paragraph per page."""
+    c = canvas.Canvas(filename)
+    for page in range(page_count):
+        c.drawString(50, 750, f"Page {page} paragraph text")
+        c.showPage()
+    c.save()
+    return filename
+
+
+def measure_extraction_peak_rss_kb(pdf_path: str) -> int:
+    """Run low-memory extraction in a subprocess and return its peak RSS growth."""
+    result = subprocess.run(
+        [sys.executable, "-c", PEAK_RSS_SCRIPT, pdf_path],
+        cwd=BACKEND_DIR,
+        capture_output=True,
+        text=True,
+        check=True
+    )
+    return int(result.stdout.strip().splitlines()[-1])
+
+
+@pytest.fixture
+def temp_dir():
+    """Create a temporary directory for generated PDFs."""
+    with tempfile.TemporaryDirectory() as path:
+        yield path
+
+
+def test_low_memory_matches_default_extraction(temp_dir):
+    """Low-memory mode should produce exactly the same paragraphs."""
+    pdf_path = create_pdf_with_pages(os.path.join(temp_dir, "small.pdf"), 5)
+
+    default = PDFExtractor().extract_text(pdf_path)
+    low_memory = PDFExtractor(low_memory=True).extract_text(pdf_path)
+
+    assert low_memory == default
+    assert default == [f"Page {page} paragraph text" for page in range(5)]
+
+
+def test_iter_pages_reports_page_numbers(temp_dir):
+    """Pages should be yielded in order with 1-based page numbers."""
+    pdf_path = create_pdf_with_pages(os.path.join(temp_dir, "pages.pdf"), 3)
+
+    pages = list(PDFExtractor(low_memory=True).iter_pages(pdf_path))
+
+    assert [number for number, _ in pages] == [1, 2, 3]
+    assert pages[1][1] == ["Page 1 paragraph text"]
+
+
+def test_limit_paragraphs_stops_consuming_at_limit():
+    """The word limiter should not read past the paragraph that hits the limit."""
+    consumed = []
+
+    def paragraphs():
+        for i in range(1000):
+            consumed.append(i)
+            yield "one two three four five"
+
+    limited = list(WordLimiter(db=None).limit_paragraphs(paragraphs(), 12))
+
+    assert len(limited) == 2
+    assert len(consumed) == 3
+
+
+@pytest.mark.parametrize("word_limit", [None, 6])
+def test_processor_low_memory_matches_default(temp_dir, word_limit):
+    """Low-memory and default processing should store identical text, word count and status."""
+    engine = create_engine("sqlite:///:memory:")
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    storage = FileStorage(base_upload_dir=temp_dir)
+
+    try:
+        tier = Tier(name="Test", price_cents=0, features={"pdf_word_limit": word_limit})
+        user = User(email="user@example.com", hashed_password="x", tier=tier)
+        db.add(user)
+        db.commit()
+
+        os.makedirs(os.path.join(temp_dir, str(user.id)))
+        file_path = f"{user.id}/1_doc.pdf"
+        create_pdf_with_pages(os.path.join(temp_dir, file_path), 4)
+
+        results = []
+        for low_memory in (False, True):
+            document = Document(user_id=user.id, filename="doc.pdf", file_path=file_path)
+            db.add(document)
+            db.commit()
+            PDFProcessor(db, storage, low_memory=low_memory).process_document(document.id)
+            db.refresh(document)
+            results.append((document.status, document.extracted_text, document.word_count))
+
+        assert results[0] == results[1]
+        assert results[1][0] == "completed"
+    finally:
+        db.close()
+        engine.dispose()
+
+
+def test_low_memory_peak_rss_is_independent_of_page_count(temp_dir):
+    """
+    Peak RSS should stay roughly constant between a 50 and a 2,000 page PDF.
+
+    Without releasing page caches the 2,000 page document grows RSS by
+    ~100MB more than the 50 page one; with low-memory mode the difference
+    stays within a few MB.
+    """
+    small = create_pdf_with_pages(os.path.join(temp_dir, "small.pdf"), 50)
+    large = create_pdf_with_pages(os.path.join(temp_dir, "large.pdf"), 2000)
+
+    small_peak_kb = measure_extraction_peak_rss_kb(small)
+    large_peak_kb = measure_extraction_peak_rss_kb(large)
+
+    assert large_peak_kb - small_peak_kb < 32 * 1024, (
+        f"Peak RSS grew from {small_peak_kb}KB to {large_peak_kb}KB"
+    )
@@ -0,0 +1,101 @@
+"""Tests for keyset pagination.
+
+Feature: smart-pdf-processor
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import HTTPException
+from hypothesis import given, settings, strategies as st
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from database import Base
+from models import User, Document
+from pagination import paginate, encode_cursor, decode_cursor
+
+
+def make_session():
+    """Create a fresh in-memory database session."""
+    engine = create_engine("sqlite:///:memory:")
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+
+
+def read_all_pages(db, limit, descending=True):
+    """Follow cursors until the last page and return the ids in page order."""
+    ids, cursor, pages = [], None, 0
+    while True:
+        rows, cursor = paginate(
+            db.query(Document),
+            Document.id,
+            cursor=cursor,
+            limit=limit,
+            sort_column=Document.upload_date,
+            descending=descending
+        )
+        ids.extend(row.id for row in rows)
+        pages += 1
+        if cursor is None:
+            return ids, pages
+
+
+@settings(max_examples=30, deadline=None)
+@given(
+    day_offsets=st.lists(st.integers(min_value=0, max_value=3), max_size=30),
+    limit=st.integers(min_value=1, max_value=7),
+    descending=st.booleans()
+)
+def test_pages_cover_every_row_once_in_order(day_offsets, limit, descending):
+    """
+    Property: Following cursors returns every row exactly once, in sort order,
+    even when many rows share the same sort value.
+    """
+    db = make_session()
+    try:
+        user = User(email="user@example.com", hashed_password="x")
+        db.add(user)
+        db.flush()
+        start = datetime(2024, 1, 1)
+        db.add_all([
+            Document(
+                user_id=user.id,
+                filename="a.pdf",
+                file_path="",
+                upload_date=start + timedelta(days=offset)
+            )
+            for offset in day_offsets
+        ])
+        db.commit()
+        
+        ids, pages = read_all_pages(db, limit, descending)
+        
+        expected = [
+            document.id for document in sorted(
+                db.query(Document).all(),
+                key=lambda document: (document.upload_date, document.id),
+                reverse=descending
+            )
+        ]
+        assert ids == expected
+        # No trailing empty page, even when the rows fill the last page exactly
+        assert pages == max(1, -(-len(expected) // limit))
+    finally:
+        db.close()
+
+
+def test_cursor_round_trip():
+    """Cursors should restore datetimes and ids."""
+    values = (datetime(2024, 5, 6, 7, 8, 9, 123456), 42)
+    
+    assert decode_cursor(encode_cursor(values), [Document.upload_date, Document.id]) == values
+
+
+@pytest.mark.parametrize("cursor", ["not-base64!", encode_cursor((1, 2, 3)), encode_cursor(("x", 1))])
+def test_invalid_cursor_rejected(cursor):
+    """Malformed cursors should be a 400, not a server error."""
+    with pytest.raises(HTTPException) as exc_info:
+        decode_cursor(cursor, [Document.upload_date, Document.id])
+    
+    assert exc_info.value.status_code == 400
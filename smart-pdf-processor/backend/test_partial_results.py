@@ -0,0 +1,155 @@
+"""Tests for partial results published while a document is processing.
+
+Feature: smart-pdf-processor
+"""
+
+import os
+import tempfile
+
+import pytest
+from reportlab.pdfgen import canvas
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from database import Base
+from models import User, Tier, Document
+from services.file_storage import FileStorage
+from services.pdf_processor import PDFProcessor, PARTIAL_STATUS
+
+
+@pytest.fixture
+def temp_dir():
+    """Create a temporary upload directory."""
+    with tempfile.TemporaryDirectory() as path:
+        yield path
+
+
+@pytest.fixture
+def session_factory():
+    """Create an in-memory database shared by several sessions."""
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool
+    )
+    Base.metadata.create_all(bind=engine)
+    yield sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    engine.dispose()
+
+
+def create_document(db, temp_dir, page_count: int) -> Document:
+    """Create a pending document whose PDF has one paragraph per page."""
+    tier = Tier(name="Test", price_cents=0, features={"pdf_word_limit": None})
+    user = User(email="user@example.com", hashed_password="x", tier=tier)
+    db.add(user)
+    db.commit()
+
+    os.makedirs(os.path.join(temp_dir, str(user.id)))
+    file_path = f"{user.id}/1_doc.pdf"
+    c = canvas.Canvas(os.path.join(temp_dir, file_path))
+    for page in range(page_count):
+        c.drawString(50, 750, f"Page {page} paragraph text")
+        c.showPage()
+    c.save()
+
+    document = Document(user_id=user.id, filename="doc.pdf", file_path=file_path)
+    db.add(document)
+    db.commit()
+    return document
+
+
+class RecordingProcessor(PDFProcessor):
+    """Processor that records what each partial publish left in the database."""
+
+    def __init__(self, *args, observer_factory, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.observer_factory = observer_factory
+        self.snapshots = []
+
+    def _publish_partial(self, document, text, word_count, progress):
+        super()._publish_partial(document, text, word_count, progress)
+        observer = self.observer_factory()
+        try:
+            row = observer.get(Document, document.id)
+            self.snapshots.append((row.status, row.progress, row.extracted_text, row.word_count))
+        finally:
+            observer.close()
+
+
+def test_partial_text_is_published_every_n_pages(temp_dir, session_factory):
+    """Readers should see the first pages, with progress, before completion."""
+    db = session_factory()
+    document = create_document(db, temp_dir, page_count=6)
+    processor = RecordingProcessor(
+        db,
+        FileStorage(base_upload_dir=temp_dir),
+        partial_pages=2,
+        observer_factory=session_factory
+    )
+
+    processor.process_document(document.id)
+    db.refresh(document)
+
+    assert [(status, progress) for status, progress, _, _ in processor.snapshots] == [
+        (PARTIAL_STATUS, 33),
+        (PARTIAL_STATUS, 66)
+    ]
+    first_text = processor.snapshots[0][2]
+    assert first_text == "Page 0 paragraph text\n\nPage 1 paragraph text"
+    assert processor.snapshots[0][3] == 8
+    assert document.extracted_text.startswith(processor.snapshots[1][2])
+    assert document.status == "completed"
+    assert document.progress == 100
+    db.close()
+
+
+def test_low_memory_mode_publishes_progress_only(temp_dir, session_factory):
+    """Low-memory mode should publish progress without partial text."""
+    db = session_factory()
+    document = create_document(db, temp_dir, page_count=4)
+    processor = RecordingProcessor(
+        db,
+        FileStorage(base_upload_dir=temp_dir),
+        low_memory=True,
+        partial_pages=2,
+        observer_factory=session_factory
+    )
+
+    processor.process_document(document.id)
+
+    assert processor.snapshots == [(PARTIAL_STATUS, 50, None, 8)]
+    db.close()
+
+
+def test_deleting_during_processing_stops_extraction(temp_dir, session_factory):
+    """A document deleted mid-way should stay deleted and stop being processed."""
+    db = session_factory()
+    document = create_document(db, temp_dir, page_count=6)
+    document_id = document.id
+
+    def delete_document():
+        other = session_factory()
+        other.get(Document, document_id).status = "deleting"
+        other.commit()
+        other.close()
+
+    processor = PDFProcessor(db, FileStorage(base_upload_dir=temp_dir), partial_pages=2)
+    processor._publish_partial = _wrap_before(processor._publish_partial, delete_document)
+
+    processor.process_document(document_id)
+
+    check = session_factory()
+    row = check.get(Document, document_id)
+    assert row.status == "deleting"
+    assert row.extracted_text is None
+    check.close()
+    db.close()
+
+
+def _wrap_before(method, action):
+    """Run action before each call of method."""
+    def wrapper(*args, **kwargs):
+        action()
+        return method(*args, **kwargs)
+    return wrapper
@@ -0,0 +1,155 @@
+"""Tests for compare-and-set claims on documents being processed.
+
+Feature: smart-pdf-processor
+"""
+
+import os
+import tempfile
+
+import pytest
+from reportlab.pdfgen import canvas
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from database import Base
+from models import User, Tier, Document
+from services.file_storage import FileStorage
+from services.metrics import metrics
+from services.pdf_processor import PDFProcessor
+
+
+@pytest.fixture
+def temp_dir():
+    """Create a temporary upload directory."""
+    with tempfile.TemporaryDirectory() as path:
+        yield path
+
+
+@pytest.fixture
+def session_factory():
+    """Create an in-memory database shared by several sessions."""
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool
+    )
+    Base.metadata.create_all(bind=engine)
+    yield sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    engine.dispose()
+
+
+@pytest.fixture
+def document_id(temp_dir, session_factory):
+    """A pending document with a one-page PDF."""
+    db = session_factory()
+    tier = Tier(name="Test", price_cents=0, features={"pdf_word_limit": None})
+    user = User(email="user@example.com", hashed_password="x", tier=tier)
+    db.add(user)
+    db.flush()
+    os.makedirs(os.path.join(temp_dir, str(user.id)))
+    file_path = f"{user.id}/1_doc.pdf"
+    c = canvas.Canvas(os.path.join(temp_dir, file_path))
+    c.drawString(50, 750, "Quarterly report text")
+    c.showPage()
+    c.save()
+    document = Document(user_id=user.id, filename="doc.pdf", file_path=file_path)
+    db.add(document)
+    db.commit()
+    document_id = document.id
+    db.close()
+    return document_id
+
+
+class CountingProcessor(PDFProcessor):
+    """Processor that counts the PDFs it opens."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.extractions = 0
+        count_pages = self.pdf_extractor.count_pages
+
+        def counting(file_path):
+            self.extractions += 1
+            return count_pages(file_path)
+        self.pdf_extractor.count_pages = counting
+
+
+def test_transitions_bump_the_version(temp_dir, session_factory, document_id):
+    """Claiming and completing a document should each bump its version once."""
+    db = session_factory()
+    CountingProcessor(db, FileStorage(base_upload_dir=temp_dir), partial_pages=0).process_document(document_id)
+
+    document = db.get(Document, document_id)
+    assert document.status == "completed"
+    assert document.version == 2
+    db.close()
+
+
+def test_redelivered_document_is_not_processed_again(temp_dir, session_factory, document_id):
+    """A document delivered again after it completed should be a no-op."""
+    metrics.reset()
+    storage = FileStorage(base_upload_dir=temp_dir)
+    first = CountingProcessor(session_factory(), storage)
+    second = CountingProcessor(session_factory(), storage)
+
+    first.process_document(document_id)
+    second.process_document(document_id)
+
+    assert (first.extractions, second.extractions) == (1, 0)
+    assert metrics.get("processing.duplicates_avoided") == 1
+    first.db.close()
+    second.db.close()
+
+
+def test_concurrent_deliveries_process_once(temp_dir, session_factory, document_id):
+    """Of two processors that both read the document as pending, only one should claim it."""
+    metrics.reset()
+    storage = FileStorage(base_upload_dir=temp_dir)
+    winner = CountingProcessor(session_factory(), storage)
+    loser = CountingProcessor(session_factory(), storage)
+    claim = loser._begin_processing_with_retry
+
+    def claim_after_winner(document):
+        # The loser has already loaded the pending document
+        assert document.status == "pending"
+        winner.process_document(document_id)
+        return claim(document)
+    loser._begin_processing_with_retry = claim_after_winner
+
+    loser.process_document(document_id)
+
+    assert (winner.extractions, loser.extractions) == (1, 0)
+    assert metrics.get("processing.duplicates_avoided") == 1
+    check = session_factory()
+    assert check.get(Document, document_id).status == "completed"
+    check.close()
+    winner.db.close()
+    loser.db.close()
+
+
+def test_stale_run_cannot_overwrite_a_reclaimed_document(temp_dir, session_factory, document_id):
+    """Results of a run whose claim was taken over should be discarded."""
+    db = session_factory()
+    processor = PDFProcessor(db, FileStorage(base_upload_dir=temp_dir), partial_pages=0)
+    extract = processor._extract_with_progress
+
+    def extract_then_lose_claim(document, file_path, page_count):
+        result = extract(document, file_path, page_count)
+        # Someone requeued and claimed the document meanwhile
+        other = session_factory()
+        row = other.get(Document, document_id)
+        row.version += 2
+        other.commit()
+        other.close()
+        return result
+    processor._extract_with_progress = extract_then_lose_claim
+
+    processor.process_document(document_id)
+
+    check = session_factory()
+    row = check.get(Document, document_id)
+    assert row.status == "processing"
+    assert row.extracted_text is None
+    check.close()
+    db.close()
@@ -0,0 +1,164 @@
+"""Tests for related-document recommendations.
+
+Feature: smart-pdf-processor
+"""
+
+import math
+
+import pytest
+from hypothesis import given, settings, strategies as st
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from database import Base
+from models import User, Document, DocumentTerm, TermStatistic, StorageUsage
+from services.related_documents import RelatedDocumentIndex, tokenize
+
+
+@pytest.fixture
+def db():
+    """Create a fresh in-memory database session."""
+    engine = create_engine("sqlite:///:memory:")
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    yield session
+    session.close()
+    engine.dispose()
+
+
+def add_user(db, email="user@example.com"):
+    """Create a user with a usage row."""
+    user = User(email=email, hashed_password="x")
+    db.add(user)
+    db.flush()
+    db.add(StorageUsage(user_id=user.id, bytes=0, pages=0, documents=0))
+    db.flush()
+    return user
+
+
+def add_document(db, index, user, text):
+    """Create and index a completed document."""
+    document = Document(
+        user_id=user.id,
+        filename=f"{text.split()[0]}-{user.id}.pdf",
+        file_path="",
+        status="completed",
+        extracted_text=text
+    )
+    db.add(document)
+    db.query(StorageUsage).filter(StorageUsage.user_id == user.id).update(
+        {StorageUsage.documents: StorageUsage.documents + 1}
+    )
+    db.flush()
+    index.index_document(document)
+    db.commit()
+    return document
+
+
+def test_tokenize_skips_stop_words_and_image_markers():
+    """Short words, stop words, digits and image markers should not become terms."""
+    counts = tokenize("The Rocket rocket engine\n\n**[IMAGE]**\n\nof 2024 at")
+
+    assert counts == {"rocket": 2, "engine": 1}
+
+
+def test_related_ranks_similar_documents_first(db):
+    """Documents sharing rare terms should rank above unrelated ones."""
+    index = RelatedDocumentIndex(db)
+    user = add_user(db)
+    other = add_user(db, "other@example.com")
+
+    rockets = add_document(db, index, user, "rocket engine thrust propellant nozzle combustion")
+    similar = add_document(db, index, user, "rocket propellant combustion chamber nozzle design")
+    loose = add_document(db, index, user, "garden soil compost nozzle watering")
+    add_document(db, index, user, "sourdough bread flour yeast oven")
+    add_document(db, index, other, "rocket engine thrust propellant nozzle combustion")
+
+    related = index.related(rockets, limit=5)
+
+    assert [document.id for document, _ in related] == [similar.id, loose.id]
+    assert related[0][1] > related[1][1] > 0
+
+
+def test_related_skips_documents_not_completed(db):
+    """Documents being deleted or reprocessed should not be recommended."""
+    index = RelatedDocumentIndex(db)
+    user = add_user(db)
+    first = add_document(db, index, user, "quantum entanglement photon experiment")
+    second = add_document(db, index, user, "quantum photon entanglement theory")
+
+    second.status = "deleting"
+    db.commit()
+
+    assert index.related(first) == []
+
+
+def test_remove_document_reverts_frequencies(db):
+    """Removing a document should drop its vector and its frequency counts."""
+    index = RelatedDocumentIndex(db)
+    user = add_user(db)
+    keep = add_document(db, index, user, "glacier moraine erosion")
+    remove = add_document(db, index, user, "glacier ice sheet erosion")
+
+    index.remove_document(remove)
+    db.commit()
+
+    assert db.query(DocumentTerm).filter(DocumentTerm.document_id == remove.id).count() == 0
+    frequencies = dict(db.query(TermStatistic.term, TermStatistic.documents))
+    assert frequencies["glacier"] == 1
+    assert frequencies["erosion"] == 1
+    # Terms no remaining document contains are dropped
+    assert "sheet" not in frequencies and "ice" not in frequencies
+    assert db.query(DocumentTerm).filter(DocumentTerm.document_id == keep.id).count() == 3
+
+
+VOCABULARY = ["alpha", "bravo", "charlie", "delta", "echo", "foxtrot", "golf", "hotel"]
+
+
+@given(texts=st.lists(
+    st.lists(st.sampled_from(VOCABULARY), min_size=1, max_size=12).map(" ".join),
+    min_size=2,
+    max_size=8
+))
+@settings(max_examples=30, deadline=None)
+def test_scores_match_cosine_of_stored_vectors(texts):
+    """
+    Property: scores equal the cosine similarity of the stored vectors.
+
+    The inverted-index accumulation must give the same result as comparing
+    every pair of vectors directly.
+    """
+    engine = create_engine("sqlite:///:memory:")
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    try:
+        index = RelatedDocumentIndex(db)
+        user = add_user(db)
+        documents = [add_document(db, index, user, text) for text in texts]
+
+        vectors = {}
+        for term in db.query(DocumentTerm):
+            vectors.setdefault(term.document_id, {})[term.term] = term.weight
+
+        for vector in vectors.values():
+            assert math.isclose(sum(w * w for w in vector.values()), 1.0, rel_tol=1e-9)
+
+        query = documents[0]
+        expected = {}
+        for document in documents[1:]:
+            score = sum(
+                weight * vectors[document.id].get(term, 0.0)
+                for term, weight in vectors[query.id].items()
+            )
+            if score > 0:
+                expected[document.id] = score
+
+        related = index.related(query, limit=len(documents))
+
+        assert {document.id for document, _ in related} == set(expected)
+        for document, score in related:
+            assert math.isclose(score, expected[document.id], rel_tol=1e-9)
+            assert score <= 1.0 + 1e-9
+    finally:
+        db.close()
+        engine.dispose()
@@ -0,0 +1,199 @@
+"""Tests for retrying transient processing failures.
+
+Feature: smart-pdf-processor
+"""
+
+import asyncio
+import os
+import tempfile
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import BackgroundTasks
+from hypothesis import given, strategies as st
+from sqlalchemy import create_engine, event
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+# routes.documents creates its FileStorage at import time
+os.environ.setdefault("PDF_UPLOAD_DIR", tempfile.mkdtemp())
+
+from database import Base
+from models import User, Document
+from services.file_storage import FileStorage
+from services.pdf_processor import PDFProcessor
+from services.retry_policy import (
+    PERMANENT,
+    PROCESSING_MAX_ATTEMPTS,
+    RETRYING_STATUS,
+    TRANSIENT,
+    classify_failure,
+    retry_delay
+)
+from services.retry_scheduler import RetryScheduler
+from routes.admin import ReprocessRequest, reprocess_documents
+
+
+@pytest.fixture
+def temp_dir():
+    """Create a temporary upload directory."""
+    with tempfile.TemporaryDirectory() as path:
+        yield path
+
+
+@pytest.fixture
+def session_factory():
+    """Create an in-memory database shared by several sessions."""
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool
+    )
+    Base.metadata.create_all(bind=engine)
+    yield sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    engine.dispose()
+
+
+class UnavailableStorage(FileStorage):
+    """Storage whose backend cannot be reached."""
+
+    def local_copy(self, file_path):
+        raise ConnectionError("storage unreachable")
+
+
+def create_document(db, **fields) -> Document:
+    """Create a document owned by a new user."""
+    user = User(email=f"user{db.query(User).count()}@example.com", hashed_password="x")
+    db.add(user)
+    db.flush()
+    document = Document(user_id=user.id, filename="doc.pdf", file_path=f"{user.id}/1_doc.pdf", **fields)
+    db.add(document)
+    db.commit()
+    return document
+
+
+def test_classify_failure_inspects_causes():
+    """A transient error wrapped by the extractor should still be retried."""
+    try:
+        try:
+            raise TimeoutError("read timed out")
+        except TimeoutError as e:
+            raise Exception("Failed to read PDF: read timed out") from e
+    except Exception as wrapped:
+        assert classify_failure(wrapped) == TRANSIENT
+
+    assert classify_failure(OperationalError("SELECT 1", {}, Exception("gone"))) == TRANSIENT
+    assert classify_failure(ValueError("Invalid PDF file")) == PERMANENT
+
+
+@given(attempt=st.integers(min_value=1, max_value=40))
+def test_retry_delay_is_bounded(attempt):
+    """Delays should grow with attempts but stay within half to all of the capped backoff."""
+    backoff = min(3600, 30 * 2 ** (attempt - 1))
+    delay = retry_delay(attempt, base_seconds=30, max_seconds=3600)
+    assert backoff / 2 <= delay <= backoff
+
+
+def test_transient_failure_is_retried_until_dead_lettered(temp_dir, session_factory):
+    """Transient failures should be scheduled for retry, then end as failed."""
+    db = session_factory()
+    document = create_document(db)
+    storage = UnavailableStorage(base_upload_dir=temp_dir)
+    processor = PDFProcessor(db, storage)
+    scheduler = RetryScheduler(session_factory, storage)
+
+    for attempt in range(1, PROCESSING_MAX_ATTEMPTS + 1):
+        with pytest.raises(ConnectionError):
+            processor.process_document(document.id)
+        db.refresh(document)
+        assert document.attempts == attempt
+        assert document.failure_kind == TRANSIENT
+        if attempt < PROCESSING_MAX_ATTEMPTS:
+            assert document.status == RETRYING_STATUS
+            assert document.next_retry_at > datetime.utcnow()
+            # Make the retry due and claim it back to pending
+            document.next_retry_at = datetime.utcnow() - timedelta(seconds=1)
+            db.commit()
+            assert scheduler.claim_due(db) == [document.id]
+        else:
+            assert document.status == "failed"
+            assert document.next_retry_at is None
+    db.close()
+
+
+def test_permanent_failure_is_dead_lettered_at_once(temp_dir, session_factory):
+    """A PDF that cannot be read should not be retried."""
+    db = session_factory()
+    document = create_document(db)
+    processor = PDFProcessor(db, FileStorage(base_upload_dir=temp_dir))
+
+    with pytest.raises(Exception):
+        processor.process_document(document.id)
+
+    db.refresh(document)
+    assert document.status == "failed"
+    assert document.failure_kind == PERMANENT
+    assert document.attempts == 1
+    db.close()
+
+
+def test_claim_due_skips_documents_not_due_or_deleting(temp_dir, session_factory):
+    """Only retrying documents whose backoff is over should be claimed."""
+    db = session_factory()
+    past = datetime.utcnow() - timedelta(minutes=1)
+    due = create_document(db, status=RETRYING_STATUS, next_retry_at=past)
+    create_document(db, status=RETRYING_STATUS, next_retry_at=datetime.utcnow() + timedelta(hours=1))
+    create_document(db, status="deleting", next_retry_at=past)
+    scheduler = RetryScheduler(session_factory, FileStorage(base_upload_dir=temp_dir))
+
+    assert scheduler.claim_due(db) == [due.id]
+    db.refresh(due)
+    assert due.status == "pending"
+    assert scheduler.claim_due(db) == []
+    db.close()
+
+
+def test_stalled_processing_is_requeued(temp_dir, session_factory):
+    """Documents abandoned mid-processing should be retried; live ones left alone."""
+    db = session_factory()
+    stale = datetime.utcnow() - timedelta(hours=2)
+    stalled = create_document(db, status="processing", updated_at=stale, version=1)
+    live = create_document(db, status="partial", version=1)
+    scheduler = RetryScheduler(session_factory, FileStorage(base_upload_dir=temp_dir), stall_seconds=1800)
+
+    assert scheduler.requeue_stalled(db) == 1
+
+    db.refresh(stalled)
+    db.refresh(live)
+    assert stalled.status == RETRYING_STATUS
+    assert stalled.attempts == 1
+    assert stalled.version == 2
+    assert live.status == "partial"
+    db.close()
+
+
+def test_reprocess_resets_eligible_documents_in_one_update(session_factory):
+    """Reprocessing should queue failed and completed documents with a single UPDATE."""
+    db = session_factory()
+    failed = create_document(db, status="failed", attempts=3, failure_kind=PERMANENT, version=2)
+    completed = create_document(db, status="completed")
+    running = create_document(db, status="processing")
+    statements = []
+    event.listen(db.get_bind(), "before_cursor_execute", lambda *args: statements.append(args[2]))
+
+    response = asyncio.run(reprocess_documents(
+        ReprocessRequest(document_ids=[running.id, completed.id, failed.id, 999]),
+        BackgroundTasks(),
+        db=db,
+        admin=None,
+        inline=False
+    ))
+
+    assert (response.requested, response.queued) == (4, 2)
+    assert sum(statement.lstrip().upper().startswith("UPDATE") for statement in statements) == 1
+    db.expire_all()
+    assert (failed.status, failed.attempts, failed.failure_kind, failed.version) == ("pending", 0, None, 3)
+    assert completed.status == "pending"
+    assert running.status == "processing"
+    db.close()
@@ -0,0 +1,219 @@
+"""Tests for pluggable storage backends.
+
+Feature: smart-pdf-processor
+"""
+
+import io
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+from io import BytesIO
+
+import pytest
+
+from services.file_storage import FileStorage
+from services.storage_backends import LocalBackend, MemoryBackend, S3Backend
+
+
+class FakeClientError(Exception):
+    """Error shaped like botocore's ClientError."""
+
+    def __init__(self, code: str):
+        super().__init__(code)
+        self.response = {"Error": {"Code": code}}
+
+
+class FakeS3Client:
+    """
+    Local stand-in for an S3 client implementing the calls S3Backend makes.
+
+    Records how many parts are being uploaded at once so tests can check
+    that multipart uploads run in parallel.
+    """
+
+    def __init__(self, page_size: int = 1000, part_delay: float = 0.0):
+        self.objects = {}
+        self.uploads = {}
+        self.page_size = page_size
+        self.part_delay = part_delay
+        self.active_parts = 0
+        self.max_active_parts = 0
+        self.aborted = 0
+        self.lock = threading.Lock()
+
+    def put_object(self, Bucket, Key, Body):
+        self.objects[Key] = (bytes(Body), datetime.now(timezone.utc))
+
+    def get_object(self, Bucket, Key, Range=None):
+        if Key not in self.objects:
+            raise FakeClientError("NoSuchKey")
+        data = self.objects[Key][0]
+        if Range:
+            data = data[int(Range[len("bytes="):-1]):]
+        return {"Body": io.BytesIO(data)}
+
+    def head_object(self, Bucket, Key):
+        if Key not in self.objects:
+            raise FakeClientError("404")
+        data, modified = self.objects[Key]
+        return {"ContentLength": len(data), "LastModified": modified}
+
+    def delete_object(self, Bucket, Key):
+        self.objects.pop(Key, None)
+
+    def copy_object(self, Bucket, Key, CopySource):
+        self.objects[Key] = self.objects[CopySource["Key"]]
+
+    def list_objects_v2(self, Bucket, Prefix="", ContinuationToken=None):
+        keys = sorted(key for key in self.objects if key.startswith(Prefix))
+        start = int(ContinuationToken or 0)
+        page = keys[start:start + self.page_size]
+        response = {
+            "Contents": [
+                {"Key": key, "Size": len(self.objects[key][0]), "LastModified": self.objects[key][1]}
+                for key in page
+            ],
+            "IsTruncated": start + self.page_size < len(keys)
+        }
+        if response["IsTruncated"]:
+            response["NextContinuationToken"] = str(start + self.page_size)
+        return response
+
+    def create_multipart_upload(self, Bucket, Key):
+        upload_id = str(len(self.uploads) + 1)
+        self.uploads[upload_id] = {}
+        return {"UploadId": upload_id}
+
+    def upload_part(self, Bucket, Key, UploadId, PartNumber, Body):
+        with self.lock:
+            self.active_parts += 1
+            self.max_active_parts = max(self.max_active_parts, self.active_parts)
+        time.sleep(self.part_delay)
+        self.uploads[UploadId][PartNumber] = bytes(Body)
+        with self.lock:
+            self.active_parts -= 1
+        return {"ETag": f"etag-{PartNumber}"}
+
+    def complete_multipart_upload(self, Bucket, Key, UploadId, MultipartUpload):
+        parts = self.uploads.pop(UploadId)
+        data = b"".join(parts[part["PartNumber"]] for part in MultipartUpload["Parts"])
+        self.objects[Key] = (data, datetime.now(timezone.utc))
+
+    def abort_multipart_upload(self, Bucket, Key, UploadId):
+        self.uploads.pop(UploadId, None)
+        self.aborted += 1
+
+
+@pytest.fixture(params=["local", "memory", "s3"])
+def backend(request):
+    """Each backend implementation, so all are held to the same contract."""
+    if request.param == "local":
+        with tempfile.TemporaryDirectory() as path:
+            yield LocalBackend(path)
+    elif request.param == "memory":
+        yield MemoryBackend()
+    else:
+        yield S3Backend(FakeS3Client(page_size=2), "bucket", prefix="uploads/", part_size=16)
+
+
+def test_save_open_stat_and_delete(backend):
+    """Stored bytes should be readable from any offset and deletable once."""
+    size = backend.save_stream("1/1_a.pdf", BytesIO(b"0123456789" * 5))
+
+    assert size == 50
+    assert backend.stat("1/1_a.pdf").size == 50
+    with backend.open_stream("1/1_a.pdf", 45) as stream:
+        assert stream.read() == b"56789"
+
+    backend.delete("1/1_a.pdf")
+    with pytest.raises(FileNotFoundError):
+        backend.stat("1/1_a.pdf")
+    with pytest.raises(FileNotFoundError):
+        backend.delete("1/1_a.pdf")
+
+
+def test_iter_objects_lists_keys_in_order(backend):
+    """Listings should be sorted by key, across directories and pages."""
+    keys = ["b/1.pdf", "a-b.pdf", "a/2.pdf", "a/10.pdf", "c.pdf"]
+    for key in keys:
+        backend.save_stream(key, BytesIO(b"x"))
+
+    assert [key for key, _ in backend.iter_objects()] == sorted(keys)
+    assert [key for key, _ in backend.iter_objects("a")] == ["a/10.pdf", "a/2.pdf"]
+
+
+def test_save_stream_enforces_max_bytes(backend):
+    """Oversized streams should be rejected without leaving an object."""
+    with pytest.raises(ValueError, match="exceeds maximum size"):
+        backend.save_stream("big.pdf", BytesIO(b"x" * 100), max_bytes=40)
+
+    with pytest.raises(FileNotFoundError):
+        backend.stat("big.pdf")
+
+
+def test_move_replaces_target(backend):
+    """Moving should rename the object and replace an existing target."""
+    backend.save_stream("old/a.pdf", BytesIO(b"new"))
+    backend.save_stream("new/a.pdf", BytesIO(b"old"))
+
+    backend.move("old/a.pdf", "new/a.pdf")
+
+    with backend.open_stream("new/a.pdf") as stream:
+        assert stream.read() == b"new"
+    assert [key for key, _ in backend.iter_objects()] == ["new/a.pdf"]
+
+
+def test_keys_cannot_escape_root(backend):
+    """Traversal in keys should be rejected by every backend."""
+    with pytest.raises(ValueError):
+        backend.save_stream("../outside.pdf", BytesIO(b"x"))
+
+
+def test_s3_multipart_upload_runs_parts_in_parallel():
+    """Large streams should be uploaded as several concurrent parts."""
+    client = FakeS3Client(part_delay=0.05)
+    backend = S3Backend(client, "bucket", part_size=1024, max_workers=4)
+    data = bytes(range(256)) * 40  # 10 parts
+
+    assert backend.save_stream("big.pdf", BytesIO(data)) == len(data)
+
+    assert client.objects["big.pdf"][0] == data
+    assert client.max_active_parts > 1
+    assert client.max_active_parts <= 4
+
+
+def test_s3_multipart_upload_is_aborted_on_failure():
+    """A failed multipart upload should be aborted rather than left dangling."""
+    client = FakeS3Client()
+    backend = S3Backend(client, "bucket", part_size=16)
+
+    with pytest.raises(ValueError):
+        backend.save_stream("big.pdf", BytesIO(b"x" * 100), max_bytes=50)
+
+    assert client.aborted == 1
+    assert client.uploads == {}
+    assert "big.pdf" not in client.objects
+
+
+def test_file_storage_on_memory_backend():
+    """FileStorage should work end to end without touching the upload disk."""
+    with tempfile.TemporaryDirectory() as staging:
+        storage = FileStorage(base_upload_dir=staging, backend=MemoryBackend())
+
+        file_path = storage.save_stream(BytesIO(b"PDF bytes"), 123, 1, "doc.pdf")
+        partial_path = storage.create_partial(upload_id=1)
+        with storage.open_partial(partial_path, 0) as buffer:
+            buffer.write(b"resumed")
+        resumed_path = storage.finalize_partial(partial_path, 123, 2, "big.pdf")
+
+        assert file_path == "123/1_doc.pdf"
+        assert storage.local_path(file_path) is None
+        assert b"".join(storage.iter_range(file_path, 4, 9)) == b"bytes"
+        assert [path for path, _ in storage.iter_files()] == [file_path, resumed_path]
+        with storage.local_copy(resumed_path) as local_file:
+            with open(local_file, "rb") as f:
+                assert f.read() == b"resumed"
+
+        storage.delete_pdf(file_path)
+        assert not storage.file_exists(file_path)
@@ -0,0 +1,192 @@
+"""Tests for storage reconciliation.
+
+Feature: smart-pdf-processor
+"""
+
+import os
+import tempfile
+from datetime import datetime, timedelta
+from io import BytesIO
+
+import pytest
+from hypothesis import given, settings, strategies as st
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from database import Base
+from models import User, Document, Blob
+from services.content_store import ContentStore
+from services.file_storage import FileStorage
+from services.storage_reconciler import StorageReconciler
+
+
+OLD = datetime.utcnow() - timedelta(days=1)
+
+
+@pytest.fixture
+def temp_dir():
+    """Create a temporary upload directory."""
+    with tempfile.TemporaryDirectory() as path:
+        yield path
+
+
+@pytest.fixture
+def session_factory():
+    """Create an in-memory database shared by the read and delete sessions."""
+    engine = create_engine(
+        "sqlite:///:memory:",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool
+    )
+    Base.metadata.create_all(bind=engine)
+    yield sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    engine.dispose()
+
+
+def add_user(db) -> int:
+    """Create a user and return its id."""
+    user = User(email="user@example.com", hashed_password="x")
+    db.add(user)
+    db.commit()
+    return user.id
+
+
+def add_document(db, user_id: int, file_path: str) -> int:
+    """Create an old document record and return its id."""
+    document = Document(user_id=user_id, filename="a.pdf", file_path=file_path, created_at=OLD)
+    db.add(document)
+    db.commit()
+    return document.id
+
+
+def test_reports_orphans_and_dangling_rows(temp_dir, session_factory):
+    """Files without rows and rows without files should both be reported."""
+    storage = FileStorage(base_upload_dir=os.path.join(temp_dir, "uploads"))
+    db = session_factory()
+    user_id = add_user(db)
+    
+    kept = storage.save_stream(BytesIO(b"x"), user_id, 1, "kept.pdf")
+    orphan = storage.save_stream(BytesIO(b"x"), user_id, 2, "orphan.pdf")
+    add_document(db, user_id, kept)
+    dangling_id = add_document(db, user_id, f"{user_id}/3_missing.pdf")
+    empty_id = add_document(db, user_id, "")
+    db.close()
+    
+    reconciler = StorageReconciler(session_factory, storage, min_age_seconds=0)
+    differences = list(reconciler.iter_differences(session_factory()))
+    
+    assert sorted(differences) == sorted([
+        ("orphan", orphan),
+        ("dangling", (dangling_id, f"{user_id}/3_missing.pdf")),
+        ("dangling", (empty_id, "")),
+    ])
+
+
+def test_delete_removes_orphans_and_rows_in_batches(temp_dir, session_factory):
+    """With delete enabled, orphans and dangling rows should be removed."""
+    storage = FileStorage(base_upload_dir=os.path.join(temp_dir, "uploads"))
+    db = session_factory()
+    user_id = add_user(db)
+    
+    kept = storage.save_stream(BytesIO(b"x"), user_id, 1, "kept.pdf")
+    orphan = storage.save_stream(BytesIO(b"x"), user_id, 2, "orphan.pdf")
+    kept_id = add_document(db, user_id, kept)
+    for index in range(5):
+        add_document(db, user_id, f"{user_id}/missing_{index}.pdf")
+    db.close()
+    
+    reconciler = StorageReconciler(session_factory, storage, batch_size=2, min_age_seconds=0)
+    counts = reconciler.reconcile(delete=True)
+    
+    assert counts == {"orphans": 1, "dangling": 5, "files_deleted": 1, "rows_deleted": 5}
+    assert not storage.file_exists(orphan)
+    assert storage.file_exists(kept)
+    db = session_factory()
+    assert [document.id for document in db.query(Document)] == [kept_id]
+    db.close()
+
+
+def test_deleting_rows_releases_their_blob_references(temp_dir, session_factory):
+    """Rows deleted in content-addressed mode should drop their blob reference counts."""
+    storage = FileStorage(base_upload_dir=os.path.join(temp_dir, "uploads"))
+    content_store = ContentStore(storage, enabled=True)
+    db = session_factory()
+    user_id = add_user(db)
+    
+    # Two documents sharing one blob, whose file then goes missing
+    for document_id in (1, 2):
+        path = content_store.save(db, BytesIO(b"same bytes"), user_id, document_id, "a.pdf")
+        add_document(db, user_id, path)
+    assert db.query(Blob).one().ref_count == 2
+    os.remove(storage.get_absolute_path(path))
+    db.close()
+    
+    reconciler = StorageReconciler(session_factory, storage, min_age_seconds=0, content_store=content_store)
+    counts = reconciler.reconcile(delete=True)
+    
+    assert counts["rows_deleted"] == 2
+    db = session_factory()
+    assert db.query(Document).count() == 0
+    assert db.query(Blob).count() == 0
+    db.close()
+
+
+def test_recent_files_and_rows_are_ignored(temp_dir, session_factory):
+    """Uploads still in progress should not be treated as inconsistent."""
+    storage = FileStorage(base_upload_dir=os.path.join(temp_dir, "uploads"))
+    db = session_factory()
+    user_id = add_user(db)
+    
+    storage.save_stream(BytesIO(b"x"), user_id, 1, "new.pdf")
+    db.add(Document(user_id=user_id, filename="a.pdf", file_path=""))
+    db.commit()
+    db.close()
+    
+    reconciler = StorageReconciler(session_factory, storage, min_age_seconds=3600)
+    
+    assert list(reconciler.iter_differences(session_factory())) == []
+
+
+def test_partial_uploads_are_not_orphans(temp_dir, session_factory):
+    """Files of in-progress chunked uploads belong to upload sessions."""
+    storage = FileStorage(base_upload_dir=os.path.join(temp_dir, "uploads"))
+    storage.create_partial(upload_id=1)
+    
+    reconciler = StorageReconciler(session_factory, storage, min_age_seconds=0)
+    
+    assert list(reconciler.iter_differences(session_factory())) == []
+
+
+@settings(max_examples=30, deadline=None)
+@given(
+    names=st.lists(
+        st.text(alphabet="ab-._/0", min_size=1, max_size=8).filter(
+            lambda name: all(part and not part.startswith(".") for part in name.split("/"))
+        ),
+        unique=True,
+        max_size=12
+    )
+)
+def test_iter_files_matches_sorted_paths(names):
+    """
+    Property: the file walk yields paths in plain string order.
+    
+    This is what lets the walk be merge-joined with an ORDER BY file_path
+    query, including names that sort before "/" such as "a-b" next to "a/".
+    """
+    with tempfile.TemporaryDirectory() as root:
+        storage = FileStorage(base_upload_dir=root, shard_roots={"vol1": os.path.join(root, "vol1")})
+        created = []
+        for name in names:
+            path = os.path.join(root, name)
+            if os.path.isdir(path) or any(os.path.isfile(os.path.join(root, *name.split("/")[:i]))
+                                          for i in range(1, name.count("/") + 1)):
+                continue
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            open(path, "wb").close()
+            created.append(name)
+        
+        walked = [file_path for file_path, _ in storage.iter_files()]
+        
+        assert walked == sorted(created)
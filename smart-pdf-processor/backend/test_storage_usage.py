@@ -0,0 +1,156 @@
+"""Tests for per-user storage usage accounting.
+
+Feature: smart-pdf-processor
+"""
+
+import tempfile
+
+import pytest
+from hypothesis import given, settings, strategies as st
+from reportlab.pdfgen import canvas
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from database import Base
+from models import User, Tier, Document, StorageUsage
+from services.file_storage import FileStorage
+from services.pdf_processor import PDFProcessor
+from services.storage_usage import StorageUsageTracker, StorageQuotaExceeded
+
+MB = 1024 * 1024
+
+
+@pytest.fixture
+def db():
+    """Create a fresh in-memory database session."""
+    engine = create_engine("sqlite:///:memory:")
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    yield session
+    session.close()
+    engine.dispose()
+
+
+def create_user(db, storage_mb):
+    """Create a user on a tier with the given storage limit."""
+    tier = Tier(name=f"Tier {storage_mb}", price_cents=0, features={"storage_mb": storage_mb})
+    user = User(email=f"user{storage_mb}@example.com", hashed_password="x", tier=tier)
+    db.add(user)
+    db.commit()
+    return user
+
+
+def test_reserve_creates_and_updates_usage(db):
+    """Reservations should add up in a single row per user."""
+    user = create_user(db, 10)
+    tracker = StorageUsageTracker(db)
+
+    tracker.reserve(user, 3 * MB)
+    tracker.reserve(user, 2 * MB, documents=2)
+    db.commit()
+
+    usage = tracker.get_usage(user.id)
+    assert (usage.bytes, usage.documents) == (5 * MB, 3)
+    assert db.query(StorageUsage).count() == 1
+
+
+def test_reserve_rejects_uploads_over_limit(db):
+    """Uploads that do not fit should be rejected and leave usage unchanged."""
+    user = create_user(db, 1)
+    tracker = StorageUsageTracker(db)
+
+    with pytest.raises(StorageQuotaExceeded):
+        tracker.reserve(user, 2 * MB)
+
+    tracker.reserve(user, MB)
+    with pytest.raises(StorageQuotaExceeded):
+        tracker.reserve(user, 1)
+    db.commit()
+
+    assert tracker.get_usage(user.id).bytes == MB
+    assert not tracker.has_room(user, 1)
+
+
+def test_unlimited_tier_has_no_limit(db):
+    """A None storage_mb should mean unlimited."""
+    user = create_user(db, None)
+    tracker = StorageUsageTracker(db)
+
+    tracker.reserve(user, 10 ** 12)
+
+    assert tracker.get_limit_bytes(user) is None
+    assert tracker.has_room(user, 10 ** 12)
+
+
+def test_release_and_pages(db):
+    """Processing adds pages and deleting releases bytes, pages and the document."""
+    user = create_user(db, 10)
+    tracker = StorageUsageTracker(db)
+
+    tracker.reserve(user, 4096)
+    tracker.add_pages(user.id, 7)
+    tracker.release(user.id, 4096, pages=7)
+    db.commit()
+
+    usage = tracker.get_usage(user.id)
+    assert (usage.bytes, usage.pages, usage.documents) == (0, 0, 0)
+
+
+@settings(max_examples=30, deadline=None)
+@given(sizes=st.lists(st.integers(min_value=1, max_value=400), max_size=20))
+def test_usage_never_exceeds_limit(sizes):
+    """
+    Property: Accepted reservations never add up to more than the limit.
+    """
+    engine = create_engine("sqlite:///:memory:")
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    try:
+        user = create_user(db, 1000 / MB)
+        tracker = StorageUsageTracker(db)
+
+        accepted = 0
+        for size in sizes:
+            try:
+                tracker.reserve(user, size)
+                accepted += size
+            except StorageQuotaExceeded:
+                assert accepted + size > 1000
+        db.commit()
+
+        assert tracker.get_usage(user.id).bytes == accepted <= 1000
+    finally:
+        db.close()
+        engine.dispose()
+
+
+def test_processing_records_page_count(db):
+    """Processing should store the page count on the document and in usage."""
+    user = create_user(db, None)
+    with tempfile.TemporaryDirectory() as upload_dir:
+        storage = FileStorage(base_upload_dir=upload_dir)
+
+        path = f"{upload_dir}/three_pages.pdf"
+        c = canvas.Canvas(path)
+        for page in range(3):
+            c.drawString(50, 750, f"Page {page + 1}")
+            c.showPage()
+        c.save()
+
+        tracker = StorageUsageTracker(db)
+        tracker.reserve(user, 100)
+        document = Document(
+            user_id=user.id,
+            filename="three_pages.pdf",
+            file_path="three_pages.pdf",
+            file_size=100
+        )
+        db.add(document)
+        db.commit()
+
+        PDFProcessor(db, storage).process_document(document.id)
+
+        db.refresh(document)
+        assert document.status == "completed"
+        assert document.page_count == 3
+        assert tracker.get_usage(user.id).pages == 3
@@ -0,0 +1,116 @@
+"""Tests for lazy, cached table extraction.
+
+Feature: smart-pdf-processor
+"""
+
+import json
+import os
+import tempfile
+
+import pytest
+from reportlab.lib.pagesizes import letter
+from reportlab.platypus import PageBreak, Paragraph, SimpleDocTemplate, Table, TableStyle
+from reportlab.lib.styles import getSampleStyleSheet
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from database import Base
+from models import User, Document, DocumentTables
+from services.file_storage import FileStorage
+from services.pdf_extractor import PDFExtractor
+from services.table_cache import DocumentTableCache
+
+
+@pytest.fixture
+def temp_dir():
+    """Create a temporary upload directory."""
+    with tempfile.TemporaryDirectory() as path:
+        yield path
+
+
+@pytest.fixture
+def db():
+    """Create a fresh in-memory database session."""
+    engine = create_engine("sqlite:///:memory:")
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    yield session
+    session.close()
+    engine.dispose()
+
+
+def create_pdf_with_table(path: str) -> None:
+    """Create a two-page PDF with a ruled table on the second page."""
+    styles = getSampleStyleSheet()
+    table = Table([["Item", "Qty"], ["Apples", "3"], ["Pears", "12"]])
+    table.setStyle(TableStyle([("GRID", (0, 0), (-1, -1), 1, "black")]))
+    SimpleDocTemplate(path, pagesize=letter).build([
+        Paragraph("Introduction without tables", styles["Normal"]),
+        PageBreak(),
+        table
+    ])
+
+
+class CountingExtractor(PDFExtractor):
+    """Extractor that counts table extractions."""
+
+    def __init__(self):
+        super().__init__()
+        self.calls = 0
+
+    def extract_tables(self, pdf_path):
+        self.calls += 1
+        return super().extract_tables(pdf_path)
+
+
+@pytest.fixture
+def document(db, temp_dir):
+    """A completed document whose PDF has one table."""
+    user = User(email="user@example.com", hashed_password="x")
+    db.add(user)
+    db.flush()
+    os.makedirs(os.path.join(temp_dir, str(user.id)))
+    file_path = f"{user.id}/tables.pdf"
+    create_pdf_with_table(os.path.join(temp_dir, file_path))
+    document = Document(user_id=user.id, filename="tables.pdf", file_path=file_path, status="completed")
+    db.add(document)
+    db.commit()
+    return document
+
+
+def test_extract_tables_returns_cells_by_page(temp_dir):
+    """Only pages with tables should be returned, with their cell text."""
+    path = os.path.join(temp_dir, "tables.pdf")
+    create_pdf_with_table(path)
+
+    pages = PDFExtractor().extract_tables(path)
+
+    assert pages == [{"page": 2, "tables": [[["Item", "Qty"], ["Apples", "3"], ["Pears", "12"]]]}]
+
+
+def test_tables_are_extracted_once_and_cached(db, temp_dir, document):
+    """The first request extracts and stores; later requests read the cache."""
+    extractor = CountingExtractor()
+    cache = DocumentTableCache(db, FileStorage(base_upload_dir=temp_dir), extractor)
+
+    first = cache.get_tables(document)
+    second = cache.get_tables(document)
+
+    assert extractor.calls == 1
+    assert first == second
+    stored = db.get(DocumentTables, document.id).pages
+    assert json.loads(stored) == first
+    assert ", " not in stored  # Compact separators
+
+
+def test_invalidate_forces_extraction(db, temp_dir, document):
+    """Dropping the cached row should make the next request extract again."""
+    extractor = CountingExtractor()
+    cache = DocumentTableCache(db, FileStorage(base_upload_dir=temp_dir), extractor)
+    cache.get_tables(document)
+
+    cache.invalidate(document.id)
+    db.commit()
+    cache.get_tables(document)
+
+    assert extractor.calls == 2
@@ -0,0 +1,152 @@
+"""Tests for claiming resumable uploads while a chunk is written.
+
+Feature: smart-pdf-processor
+"""
+
+import asyncio
+import os
+import tempfile
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import BackgroundTasks, HTTPException
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+# routes.documents creates its FileStorage at import time
+os.environ.setdefault("PDF_UPLOAD_DIR", tempfile.mkdtemp())
+
+from database import Base
+from models import Blob, Document, User, UploadSession
+from routes import documents as document_routes
+from routes.documents import abort_upload, claim_chunk, complete_upload, release_chunk
+from services.content_store import ContentStore
+from services.file_storage import FileStorage
+
+
+@pytest.fixture
+def session_factory():
+    """Create an in-memory database shared by several sessions."""
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool
+    )
+    Base.metadata.create_all(bind=engine)
+    yield sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    engine.dispose()
+
+
+@pytest.fixture
+def upload_id(session_factory):
+    """An upload session with 100 of 1000 bytes received."""
+    db = session_factory()
+    user = User(email="user@example.com", hashed_password="x")
+    db.add(user)
+    db.flush()
+    upload = UploadSession(
+        user_id=user.id, filename="a.pdf", file_path=".partial/1.part", total_size=1000, received_size=100
+    )
+    db.add(upload)
+    db.commit()
+    upload_id = upload.id
+    db.close()
+    return upload_id
+
+
+def test_concurrent_claims_for_one_offset(session_factory, upload_id):
+    """Only the first of two requests at the same offset may write."""
+    first, second = session_factory(), session_factory()
+    
+    token = claim_chunk(first, first.get(UploadSession, upload_id), 100)
+    with pytest.raises(HTTPException) as rejected:
+        claim_chunk(second, second.get(UploadSession, upload_id), 100)
+    assert rejected.value.status_code == 409
+    
+    # Once released, the next request can claim the offset again
+    release_chunk(first, first.get(UploadSession, upload_id), token)
+    assert claim_chunk(second, second.get(UploadSession, upload_id), 100) != token
+    first.close()
+    second.close()
+
+
+def test_claim_requires_current_offset(session_factory, upload_id):
+    """A claim at a stale offset should report the offset to resume from."""
+    db = session_factory()
+    with pytest.raises(HTTPException) as rejected:
+        claim_chunk(db, db.get(UploadSession, upload_id), 0)
+    assert "offset 100" in rejected.value.detail
+    db.close()
+
+
+def test_expired_claim_can_be_taken_over(session_factory, upload_id):
+    """A claim left by a crashed request should not block the upload forever."""
+    db = session_factory()
+    upload = db.get(UploadSession, upload_id)
+    upload.writer_token = "crashed"
+    upload.writer_expires_at = datetime.utcnow() - timedelta(seconds=1)
+    db.commit()
+    
+    token = claim_chunk(db, upload, 100)
+    
+    db.refresh(upload)
+    assert upload.writer_token == token
+    db.close()
+
+
+def test_abort_waits_for_the_chunk_being_written(session_factory, upload_id):
+    """Aborting while a chunk is written should fail instead of deleting under the writer."""
+    writer, aborter = session_factory(), session_factory()
+    upload = writer.get(UploadSession, upload_id)
+    token = claim_chunk(writer, upload, 100)
+    user = aborter.get(User, upload.user_id)
+    
+    with pytest.raises(HTTPException) as rejected:
+        asyncio.run(abort_upload(upload_id, user=user, db=aborter))
+    assert rejected.value.status_code == 409
+    
+    release_chunk(writer, upload, token)
+    asyncio.run(abort_upload(upload_id, user=user, db=aborter))
+    assert aborter.get(UploadSession, upload_id) is None
+    writer.close()
+    aborter.close()
+
+
+def test_failed_completion_removes_the_stored_file(session_factory, monkeypatch, tmp_path):
+    """A completion whose commit fails should not leave its stored file or session behind."""
+    store = ContentStore(FileStorage(base_upload_dir=str(tmp_path)), enabled=True)
+    monkeypatch.setattr(document_routes, "content_store", store)
+    db = session_factory()
+    user = User(email="user@example.com", hashed_password="x")
+    db.add(user)
+    db.flush()
+    partial_path = store.file_storage.create_partial(upload_id=1)
+    with store.file_storage.open_partial(partial_path, 0) as buffer:
+        buffer.write(b"whole pdf")
+    upload = UploadSession(
+        user_id=user.id, filename="a.pdf", file_path=partial_path, total_size=9, received_size=9
+    )
+    db.add(upload)
+    db.commit()
+    upload_id = upload.id
+    
+    commit = db.commit
+    calls = []
+    
+    def failing_commit():
+        calls.append(1)
+        if len(calls) == 1:
+            raise RuntimeError("connection lost")
+        commit()
+    
+    monkeypatch.setattr(db, "commit", failing_commit)
+    with pytest.raises(HTTPException) as failed:
+        asyncio.run(complete_upload(upload_id, BackgroundTasks(), user=user, db=db, inline=False))
+    assert failed.value.status_code == 500
+    
+    assert db.query(Document).count() == 0
+    assert db.query(Blob).count() == 0
+    assert db.get(UploadSession, upload_id) is None
+    assert list(store.file_storage.iter_files()) == []
+    db.close()
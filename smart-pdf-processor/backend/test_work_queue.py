@@ -0,0 +1,114 @@
+"""Tests for work-set queries and their partial indexes.
+
+Feature: smart-pdf-processor
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, event, insert, text
+from sqlalchemy.orm import sessionmaker
+
+from database import Base
+from models import User, Document
+from services.work_queue import work_set
+
+
+@pytest.fixture
+def engine():
+    """Create an in-memory database with many finished and a few active documents."""
+    engine = create_engine("sqlite:///:memory:")
+    Base.metadata.create_all(bind=engine)
+    now = datetime.utcnow()
+    with engine.begin() as connection:
+        connection.execute(insert(User), [{"email": "user@example.com", "hashed_password": "x"}])
+        rows = [
+            {
+                "user_id": 1,
+                "filename": f"{i}.pdf",
+                "file_path": f"1/{i}.pdf",
+                "status": "completed" if i % 2 else "failed",
+                "updated_at": now - timedelta(days=i % 400)
+            }
+            for i in range(5000)
+        ]
+        for status in ("pending", "processing", "partial", "retrying", "deleting"):
+            rows += [
+                {
+                    "user_id": 1,
+                    "filename": f"{status}{i}.pdf",
+                    "file_path": f"1/{status}{i}.pdf",
+                    "status": status,
+                    "next_retry_at": now if status == "retrying" else None,
+                    "updated_at": now - timedelta(hours=i)
+                }
+                for i in range(3)
+            ]
+        connection.execute(insert(Document), rows)
+        connection.execute(text("ANALYZE"))
+    yield engine
+    engine.dispose()
+
+
+def query_plans(engine, run_queries):
+    """Run queries and return the SQLite query plan of each statement they executed."""
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        db = sessionmaker(bind=engine)()
+        run_queries(db)
+        db.close()
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+    with engine.connect() as connection:
+        return [
+            " ".join(row[3] for row in connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters))
+            for statement, parameters in statements
+        ]
+
+
+def test_queue_scans_use_partial_indexes(engine):
+    """Each queue-style scan should search a work-set index, never the whole table."""
+    now = datetime.utcnow()
+
+    def run_queries(db):
+        work_set(db, ("deleting",)).order_by(Document.id).limit(100).all()
+        work_set(db, ("retrying",), Document.id).filter(
+            Document.next_retry_at <= now
+        ).order_by(Document.next_retry_at).limit(50).all()
+        work_set(db, ("processing", "partial"), Document.id).filter(
+            Document.updated_at < now - timedelta(minutes=30)
+        ).limit(50).all()
+        work_set(db, ("pending",), Document.id).all()
+
+    plans = query_plans(engine, run_queries)
+
+    assert len(plans) == 4
+    for plan in plans:
+        assert "idx_documents_active_" in plan, plan
+        assert "SCAN documents" not in plan, plan
+
+
+def test_work_set_returns_only_requested_statuses(engine):
+    """The work-set predicate should not change which rows are selected."""
+    db = sessionmaker(bind=engine)()
+
+    statuses = {status for (status,) in work_set(db, ("processing", "partial"), Document.status)}
+
+    assert statuses == {"processing", "partial"}
+    assert work_set(db, ("retrying",)).count() == 3
+    db.close()
+
+
+def test_work_set_rejects_terminal_statuses(engine):
+    """Terminal statuses are not in the partial indexes."""
+    db = sessionmaker(bind=engine)()
+
+    with pytest.raises(ValueError):
+        work_set(db, ("pending", "completed"))
+    db.close()
@@ -0,0 +1,34 @@
+"""
+Worker process entry point.
+
+Processes pending documents and runs the purge and retry loops without
+serving HTTP, so it does not import the web framework. Run it next to
+API-only processes (``APP_ROLES=api``):
+
+    python worker.py
+"""
+
+import signal
+import threading
+
+from database import init_db
+from runtime import WORKER_ROLE, start_background_work, stop_background_work
+
+
+def main():
+    """Run the worker role until SIGTERM or SIGINT."""
+    init_db()
+
+    stop = threading.Event()
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(signum, lambda *args: stop.set())
+
+    stops = start_background_work((WORKER_ROLE,))
+    print(f"Worker started: {', '.join(stops) or 'no loops enabled'}")
+    stop.wait()
+    stop_background_work(stops)
+    print("Worker stopped")
+
+
+if __name__ == "__main__":
+    main()
@@ -102,7 +102,13 @@ export default function DocumentUpload({ onUploadSuccess }) {
 
       if (!response.ok) {
         const errorData = await response.json().catch(() => ({ message: 'Upload failed' }));
-        throw new Error(errorData.message || errorData.detail || 'Upload failed');
+        const message = errorData.message || errorData.detail || 'Upload failed';
+        const retryAfter = response.status === 429 && response.headers.get('Retry-After');
+        if (retryAfter) {
+          const minutes = Math.ceil(parseInt(retryAfter, 10) / 60);
+          throw new Error(`${message} (try again in about ${minutes} minute${minutes === 1 ? '' : 's'})`);
+        }
+        throw new Error(message);
       }
 
       const data = await response.json();
@@ -12,6 +12,13 @@ export default function ProcessingStatus({ status, error }) {
           color: '#856404',
           background: '#fff3cd',
         };
+      case 'retrying':
+        return {
+          icon: '⏳',
+          text: 'Retrying',
+          color: '#856404',
+          background: '#fff3cd',
+        };
       case 'processing':
         return {
           icon: '⚙️',
@@ -20,6 +27,14 @@ export default function ProcessingStatus({ status, error }) {
           background: '#cce5ff',
           spinner: true,
         };
+      case 'partial':
+        return {
+          icon: '⚙️',
+          text: 'Partially processed',
+          color: '#004085',
+          background: '#cce5ff',
+          spinner: true,
+        };
       case 'completed':
         return {
           icon: '✅',
@@ -9,7 +9,9 @@ export default function Admin() {
   
   const [tiers, setTiers] = useState([]);
   const [users, setUsers] = useState([]);
+  const [usersCursor, setUsersCursor] = useState(null);
   const [flags, setFlags] = useState([]);
+  const [failedDocuments, setFailedDocuments] = useState([]);
   const [showTierForm, setShowTierForm] = useState(false);
   const [tierForm, setTierForm] = useState({ name: '', price_cents: 0, features: {} });
 
@@ -23,19 +25,32 @@ export default function Admin() {
 
   const loadData = async () => {
     try {
-      const [tiersData, usersData, flagsData] = await Promise.all([
+      const [tiersData, usersData, flagsData, failedData] = await Promise.all([
         api.get('/tiers'),
-        api.get('/admin/users'),
+        api.getPage('/admin/users'),
         api.get('/features'),
+        api.get('/admin/documents/failed'),
       ]);
       setTiers(tiersData);
-      setUsers(usersData);
+      setUsers(usersData.items);
+      setUsersCursor(usersData.nextCursor);
       setFlags(flagsData);
+      setFailedDocuments(failedData);
     } catch (error) {
       console.error('Failed to load data:', error);
     }
   };
 
+  const loadMoreUsers = async () => {
+    try {
+      const page = await api.getPage('/admin/users', usersCursor);
+      setUsers([...users, ...page.items]);
+      setUsersCursor(page.nextCursor);
+    } catch (error) {
+      console.error('Failed to load users:', error);
+    }
+  };
+
   const handleCreateTier = async (e) => {
     e.preventDefault();
     try {
@@ -76,6 +91,16 @@ export default function Admin() {
     }
   };
 
+  const handleReprocess = async (documentIds) => {
+    try {
+      const result = await api.post('/admin/documents/reprocess', { document_ids: documentIds });
+      alert(`Queued ${result.queued} of ${result.requested} documents for processing`);
+      loadData();
+    } catch (error) {
+      alert('Failed to reprocess documents: ' + error.message);
+    }
+  };
+
   return (
     <div style={styles.container}>
       <h1>Admin Panel</h1>
@@ -157,6 +182,41 @@ export default function Admin() {
             </div>
           ))}
         </div>
+        {usersCursor && (
+          <button onClick={loadMoreUsers} style={styles.button}>
+            Load more users
+          </button>
+        )}
+      </div>
+
+      {/* Failed Documents */}
+      <div style={styles.section}>
+        <h2>Failed Documents</h2>
+        {failedDocuments.length === 0 ? (
+          <p>No failed documents.</p>
+        ) : (
+          <>
+            <button
+              onClick={() => handleReprocess(failedDocuments.map(doc => doc.id))}
+              style={styles.button}
+            >
+              Reprocess all shown
+            </button>
+            <div style={styles.list}>
+              {failedDocuments.map(doc => (
+                <div key={doc.id} style={styles.card}>
+                  <p><strong>{doc.filename}</strong></p>
+                  <p>Owner: {doc.user_email}</p>
+                  <p>Failure: {doc.failure_kind || 'unknown'} after {doc.attempts} attempt(s)</p>
+                  {doc.error_message && <p>{doc.error_message}</p>}
+                  <button onClick={() => handleReprocess([doc.id])} style={styles.button}>
+                    Reprocess
+                  </button>
+                </div>
+              ))}
+            </div>
+          </>
+        )}
       </div>
 
       {/* Feature Flags */}
@@ -6,12 +6,12 @@ import { api } from '../api/client';
 export default function Dashboard() {
   const { user, logout } = useAuth();
   const [tiers, setTiers] = useState([]);
-  const [documents, setDocuments] = useState([]);
+  const [summary, setSummary] = useState(null);
   const [loadingDocs, setLoadingDocs] = useState(true);
 
   useEffect(() => {
     loadTiers();
-    loadDocuments();
+    loadSummary();
   }, []);
 
   const loadTiers = async () => {
@@ -23,29 +23,26 @@ export default function Dashboard() {
     }
   };
 
-  const loadDocuments = async () => {
+  const loadSummary = async () => {
     try {
-      const response = await fetch('/api/documents', {
-        credentials: 'include',
-      });
-      if (response.ok) {
-        const data = await response.json();
-        setDocuments(data);
-      }
+      // Counts only; the full document list is never fetched here
+      const data = await api.get('/documents/summary');
+      setSummary(data);
     } catch (error) {
-      console.error('Failed to load documents:', error);
+      console.error('Failed to load document summary:', error);
     } finally {
       setLoadingDocs(false);
     }
   };
 
   const getDocumentStats = () => {
+    const counts = summary?.status_counts || {};
     return {
-      total: documents.length,
-      pending: documents.filter(d => d.status === 'pending').length,
-      processing: documents.filter(d => d.status === 'processing').length,
-      completed: documents.filter(d => d.status === 'completed').length,
-      failed: documents.filter(d => d.status === 'failed').length,
+      total: summary?.total || 0,
+      pending: (counts.pending || 0) + (counts.retrying || 0),
+      processing: (counts.processing || 0) + (counts.partial || 0),
+      completed: counts.completed || 0,
+      failed: counts.failed || 0,
     };
   };
 
@@ -199,6 +196,26 @@ export default function Dashboard() {
                 <div style={{fontSize: '0.8125rem', color: 'var(--gray-600)', fontWeight: '500'}}>Failed</div>
               </div>
             </div>
+            {summary?.recent?.length > 0 && (
+              <div style={{marginTop: '2rem'}}>
+                <h3 style={{fontSize: '0.9375rem', fontWeight: '600', color: 'var(--gray-700)', marginBottom: '0.75rem'}}>
+                  Recent Documents ({summary.total_words} words extracted in total)
+                </h3>
+                {summary.recent.map((doc) => (
+                  <div key={doc.id} style={{
+                    display: 'flex',
+                    justifyContent: 'space-between',
+                    padding: '0.5rem 0',
+                    borderBottom: '1px solid var(--gray-200)'
+                  }}>
+                    <Link to={`/documents/${doc.id}`} style={{fontWeight: '500', color: 'var(--primary-color)'}}>
+                      {doc.filename}
+                    </Link>
+                    <span style={{color: 'var(--gray-600)', fontSize: '0.875rem'}}>{doc.status}</span>
+                  </div>
+                ))}
+              </div>
+            )}
             <div style={{marginTop: '2rem', display: 'flex', gap: '1rem', flexWrap: 'wrap'}}>
               <Link to="/documents" className="btn btn-primary btn-large">
                 View Document Library
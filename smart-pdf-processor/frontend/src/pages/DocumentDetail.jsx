@@ -9,6 +9,10 @@ export default function DocumentDetail() {
   const { id } = useParams();
   const navigate = useNavigate();
   const [document, setDocument] = useState(null);
+  const [related, setRelated] = useState([]);
+  const [tables, setTables] = useState(null);
+  const [tablesLoading, setTablesLoading] = useState(false);
+  const [tablesError, setTablesError] = useState('');
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState('');
 
@@ -44,12 +48,56 @@ export default function DocumentDetail() {
     }
   };
 
+  const fetchRelated = async () => {
+    try {
+      const response = await fetch(`/api/documents/${id}/related`, {
+        credentials: 'include',
+      });
+      if (response.ok) {
+        setRelated(await response.json());
+      }
+    } catch (err) {
+      // Recommendations are optional; the document is still shown
+    }
+  };
+
+  // Tables are extracted on the first request, so only fetch them on demand
+  const fetchTables = async () => {
+    setTablesLoading(true);
+    setTablesError('');
+    try {
+      const response = await fetch(`/api/documents/${id}/tables`, {
+        credentials: 'include',
+      });
+      if (response.status === 403 || response.status === 404) {
+        throw new Error('Table extraction is not available on your plan');
+      }
+      if (!response.ok) {
+        throw new Error('Failed to extract tables');
+      }
+      const data = await response.json();
+      setTables(data.pages);
+    } catch (err) {
+      setTablesError(err.message || 'Failed to extract tables');
+    } finally {
+      setTablesLoading(false);
+    }
+  };
+
+  useEffect(() => {
+    if (document?.status === 'completed') {
+      fetchRelated();
+    } else {
+      setRelated([]);
+    }
+  }, [id, document?.status]);
+
   useEffect(() => {
     fetchDocument();
 
     // Poll for processing documents every 5 seconds
     const interval = setInterval(() => {
-      if (document && (document.status === 'pending' || document.status === 'processing')) {
+      if (document && ['pending', 'processing', 'partial', 'retrying'].includes(document.status)) {
         fetchDocument();
       }
     }, 5000);
@@ -65,8 +113,10 @@ export default function DocumentDetail() {
   const getStatusIcon = (status) => {
     switch (status) {
       case 'pending':
+      case 'retrying':
         return '⏳';
       case 'processing':
+      case 'partial':
         return '⚙️';
       case 'completed':
         return '✅';
@@ -162,6 +212,19 @@ export default function DocumentDetail() {
           </div>
         </div>
 
+        {document.duplicate_of_id && (
+          <div className="alert alert-warning" style={{marginTop: '1.5rem'}}>
+            <strong>Possible duplicate:</strong> this document's text nearly matches{' '}
+            <button
+              className="link-button"
+              onClick={() => navigate(`/documents/${document.duplicate_of_id}`)}
+              style={{fontWeight: '500', color: 'var(--primary-color)'}}
+            >
+              an earlier document
+            </button>.
+          </div>
+        )}
+
         {document.status === 'failed' && document.error_message && (
           <div className="alert alert-error" style={{marginTop: '1.5rem'}}>
             <strong>Processing Error:</strong> {document.error_message}
@@ -187,6 +250,40 @@ export default function DocumentDetail() {
         </div>
       )}
 
+      {document.status === 'retrying' && (
+        <div className="alert alert-warning">
+          Processing hit a temporary problem and will be retried automatically.
+        </div>
+      )}
+
+      {document.status === 'partial' && (
+        <div className="card">
+          <h2 style={{marginBottom: '1rem', fontSize: '1.125rem', fontWeight: '600', color: 'var(--gray-900)'}}>
+            Extracted Text (processing, {document.progress}% of pages read)
+          </h2>
+          <div style={{height: '0.5rem', background: 'var(--gray-200)', borderRadius: 'var(--radius)', marginBottom: '1.5rem', overflow: 'hidden'}}>
+            <div style={{width: `${document.progress}%`, height: '100%', background: 'var(--primary-color)', transition: 'width 0.3s'}}></div>
+          </div>
+          {document.extracted_text ? (
+            <div style={{
+              lineHeight: '1.7',
+              color: 'var(--gray-800)',
+              padding: '1.5rem',
+              background: 'var(--gray-50)',
+              borderRadius: 'var(--radius)',
+              border: '1px solid var(--gray-200)',
+              fontSize: '0.9375rem'
+            }}>
+              {renderExtractedText(document.extracted_text)}
+            </div>
+          ) : (
+            <div className="loading">
+              <div className="spinner"></div>
+            </div>
+          )}
+        </div>
+      )}
+
       {document.status === 'completed' && document.extracted_text && (
         <div className="card">
           <h2 style={{marginBottom: '1.5rem', fontSize: '1.125rem', fontWeight: '600', color: 'var(--gray-900)'}}>
@@ -206,6 +303,73 @@ export default function DocumentDetail() {
         </div>
       )}
 
+      {document.status === 'completed' && (
+        <div className="card" style={{marginTop: '2rem'}}>
+          <div style={{display: 'flex', justifyContent: 'space-between', alignItems: 'center', gap: '1rem', marginBottom: tables ? '1rem' : 0}}>
+            <h2 style={{margin: 0, fontSize: '1.125rem', fontWeight: '600', color: 'var(--gray-900)'}}>
+              Tables
+            </h2>
+            {tables === null && (
+              <button className="btn btn-secondary" onClick={fetchTables} disabled={tablesLoading}>
+                {tablesLoading ? 'Extracting...' : 'Show tables'}
+              </button>
+            )}
+          </div>
+          {tablesError && (
+            <div className="alert alert-error" style={{marginTop: '1rem'}}>
+              {tablesError}
+            </div>
+          )}
+          {tables && tables.length === 0 && (
+            <p style={{color: 'var(--gray-600)'}}>No tables found in this document.</p>
+          )}
+          {tables && tables.map((page) => (
+            page.tables.map((table, tableIndex) => (
+              <div key={`${page.page}-${tableIndex}`} className="table-container" style={{marginBottom: '1.5rem'}}>
+                <div style={{fontSize: '0.75rem', color: 'var(--gray-500)', marginBottom: '0.5rem', textTransform: 'uppercase', letterSpacing: '0.05em', fontWeight: '600'}}>
+                  Page {page.page}, table {tableIndex + 1}
+                </div>
+                <table>
+                  <tbody>
+                    {table.map((row, rowIndex) => (
+                      <tr key={rowIndex}>
+                        {row.map((cell, cellIndex) => (
+                          <td key={cellIndex}>{cell}</td>
+                        ))}
+                      </tr>
+                    ))}
+                  </tbody>
+                </table>
+              </div>
+            ))
+          ))}
+        </div>
+      )}
+
+      {related.length > 0 && (
+        <div className="card" style={{marginTop: '2rem'}}>
+          <h2 style={{marginBottom: '1rem', fontSize: '1.125rem', fontWeight: '600', color: 'var(--gray-900)'}}>
+            Related Documents
+          </h2>
+          <ul style={{listStyle: 'none', padding: 0, margin: 0}}>
+            {related.map((doc) => (
+              <li key={doc.id} style={{display: 'flex', justifyContent: 'space-between', gap: '1rem', padding: '0.5rem 0', borderBottom: '1px solid var(--gray-200)'}}>
+                <button
+                  className="link-button"
+                  onClick={() => navigate(`/documents/${doc.id}`)}
+                  style={{fontWeight: '500', color: 'var(--primary-color)', wordBreak: 'break-word'}}
+                >
+                  {doc.filename}
+                </button>
+                <span style={{color: 'var(--gray-500)', fontSize: '0.875rem', whiteSpace: 'nowrap'}}>
+                  {Math.round(doc.score * 100)}% similar
+                </span>
+              </li>
+            ))}
+          </ul>
+        </div>
+      )}
+
       <style jsx>{`
         .paragraph {
           margin-bottom: 1.5rem;
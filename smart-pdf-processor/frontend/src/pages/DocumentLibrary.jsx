@@ -6,22 +6,86 @@ import { useState, useEffect, useRef } from 'react';
 import { useNavigate } from 'react-router-dom';
 import DocumentUpload from '../components/DocumentUpload';
 
+const PAGE_SIZE = 50;
+const MAX_PAGE_SIZE = 200;
+
 export default function DocumentLibrary() {
   const [documents, setDocuments] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState('');
   const [deleteConfirm, setDeleteConfirm] = useState(null);
   const navigate = useNavigate();
   const documentsRef = useRef(documents);
+  const syncTokenRef = useRef(null);
+  const nextCursorRef = useRef(null);
 
-  // Keep ref in sync with state
+  // Keep refs in sync with state
   useEffect(() => {
     documentsRef.current = documents;
   }, [documents]);
 
-  const fetchDocuments = async () => {
+  useEffect(() => {
+    nextCursorRef.current = nextCursor;
+  }, [nextCursor]);
+
+  // Merge a delta into the loaded list, keeping newest-first order
+  const applyChanges = (current, changed, deleted) => {
+    const byId = new Map(current.map((doc) => [doc.id, doc]));
+    deleted.forEach((id) => byId.delete(id));
+
+    // Documents older than the loaded pages arrive with "Load more" instead
+    const oldest = current.length ? current[current.length - 1].upload_date : null;
+    changed.forEach((doc) => {
+      if (byId.has(doc.id) || !nextCursorRef.current || doc.upload_date >= oldest) {
+        byId.set(doc.id, doc);
+      }
+    });
+
+    return [...byId.values()].sort(
+      (a, b) => b.upload_date.localeCompare(a.upload_date) || b.id - a.id
+    );
+  };
+
+  // Cheap poll: fetch only what changed since the last sync
+  const syncChanges = async () => {
+    if (!syncTokenRef.current) {
+      return;
+    }
     try {
-      const response = await fetch('/api/documents', {
+      let merged = documentsRef.current;
+      let hasMore = true;
+      while (hasMore) {
+        const response = await fetch(
+          `/api/documents/changes?since=${encodeURIComponent(syncTokenRef.current)}`,
+          { credentials: 'include' }
+        );
+        if (response.status === 410) {
+          // Token too old: reload the list from scratch
+          syncTokenRef.current = null;
+          fetchDocuments();
+          return;
+        }
+        if (!response.ok) {
+          return;
+        }
+        const changes = await response.json();
+        merged = applyChanges(merged, changes.changed, changes.deleted);
+        syncTokenRef.current = changes.next_token;
+        hasMore = changes.has_more;
+      }
+      setDocuments(merged);
+    } catch (err) {
+      // Keep showing the current list; the next poll retries
+    }
+  };
+
+  const fetchDocuments = async (cursor = null) => {
+    try {
+      // A refresh reloads as many documents as are already shown
+      const limit = Math.min(Math.max(documentsRef.current.length, PAGE_SIZE), MAX_PAGE_SIZE);
+      const query = cursor ? `cursor=${encodeURIComponent(cursor)}` : `limit=${limit}`;
+      const response = await fetch(`/api/documents?${query}`, {
         credentials: 'include',
       });
 
@@ -30,7 +94,11 @@ export default function DocumentLibrary() {
       }
 
       const data = await response.json();
-      setDocuments(data);
+      setDocuments(cursor ? [...documentsRef.current, ...data] : data);
+      setNextCursor(response.headers.get('X-Next-Cursor'));
+      if (!cursor) {
+        syncTokenRef.current = response.headers.get('X-Sync-Token');
+      }
       setError('');
     } catch (err) {
       setError(err.message || 'Failed to load documents');
@@ -45,10 +113,10 @@ export default function DocumentLibrary() {
     // Poll for processing documents every 5 seconds
     const interval = setInterval(() => {
       const hasProcessing = documentsRef.current.some(
-        (doc) => doc.status === 'pending' || doc.status === 'processing'
+        (doc) => ['pending', 'processing', 'partial', 'retrying'].includes(doc.status)
       );
       if (hasProcessing) {
-        fetchDocuments();
+        syncChanges();
       }
     }, 5000);
 
@@ -80,8 +148,10 @@ export default function DocumentLibrary() {
   const getStatusIcon = (status) => {
     switch (status) {
       case 'pending':
+      case 'retrying':
         return '⏳';
       case 'processing':
+      case 'partial':
         return '⚙️';
       case 'completed':
         return '✅';
@@ -92,8 +162,11 @@ export default function DocumentLibrary() {
     }
   };
 
-  const getStatusText = (status) => {
-    return status.charAt(0).toUpperCase() + status.slice(1);
+  const getStatusText = (doc) => {
+    if (doc.status === 'partial') {
+      return `Processing (${doc.progress}%)`;
+    }
+    return doc.status.charAt(0).toUpperCase() + doc.status.slice(1);
   };
 
   const formatDate = (dateString) => {
@@ -120,9 +193,17 @@ export default function DocumentLibrary() {
             <h1 style={{fontSize: '1.75rem', marginBottom: '0.5rem', color: 'var(--gray-900)', fontWeight: '600'}}>Document Library</h1>
             <p style={{color: 'var(--gray-600)', fontSize: '0.9375rem'}}>Manage your PDF documents</p>
           </div>
-          <button className="btn btn-secondary" onClick={() => navigate('/dashboard')}>
-            ← Back to Dashboard
-          </button>
+          <div style={{display: 'flex', gap: '0.5rem', flexWrap: 'wrap'}}>
+            <a className="btn btn-secondary" href="/api/documents/export?format=ndjson">
+              Export NDJSON
+            </a>
+            <a className="btn btn-secondary" href="/api/documents/export?format=zip">
+              Export ZIP
+            </a>
+            <button className="btn btn-secondary" onClick={() => navigate('/dashboard')}>
+              ← Back to Dashboard
+            </button>
+          </div>
         </div>
       </div>
 
@@ -144,7 +225,7 @@ export default function DocumentLibrary() {
         </div>
       ) : (
         <div className="card">
-          <h2 style={{marginBottom: '1.5rem', fontSize: '1.125rem', fontWeight: '600', color: 'var(--gray-900)'}}>Your Documents ({documents.length})</h2>
+          <h2 style={{marginBottom: '1.5rem', fontSize: '1.125rem', fontWeight: '600', color: 'var(--gray-900)'}}>Your Documents ({documents.length}{nextCursor ? '+' : ''})</h2>
           <div className="table-container">
             <table>
               <thead>
@@ -167,6 +248,11 @@ export default function DocumentLibrary() {
                       >
                         {doc.filename}
                       </button>
+                      {doc.duplicate_of_id && (
+                        <span className="badge badge-warning" style={{marginLeft: '0.5rem'}} title="Nearly the same text as an earlier document">
+                          Possible duplicate
+                        </span>
+                      )}
                     </td>
                     <td className="hide-mobile" style={{color: 'var(--gray-600)', fontSize: '0.875rem'}}>
                       {formatDate(doc.upload_date)}
@@ -174,11 +260,11 @@ export default function DocumentLibrary() {
                     <td>
                       <span className={`badge badge-${
                         doc.status === 'completed' ? 'success' :
-                        doc.status === 'processing' ? 'info' :
-                        doc.status === 'pending' ? 'warning' :
+                        doc.status === 'processing' || doc.status === 'partial' ? 'info' :
+                        doc.status === 'pending' || doc.status === 'retrying' ? 'warning' :
                         'danger'
                       }`}>
-                        {getStatusIcon(doc.status)} {getStatusText(doc.status)}
+                        {getStatusIcon(doc.status)} {getStatusText(doc)}
                       </span>
                     </td>
                     <td className="hide-mobile" style={{fontWeight: '500', color: 'var(--gray-700)'}}>
@@ -205,6 +291,13 @@ export default function DocumentLibrary() {
               </tbody>
             </table>
           </div>
+          {nextCursor && (
+            <div style={{marginTop: '1rem', textAlign: 'center'}}>
+              <button className="btn btn-secondary" onClick={() => fetchDocuments(nextCursor)}>
+                Load more
+              </button>
+            </div>
+          )}
         </div>
       )}
 
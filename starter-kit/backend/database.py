@@ -1,17 +1,44 @@
 """Database connection and session management."""
 
+import hashlib
 import os
-from sqlalchemy import create_engine
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional, Union
+
+from sqlalchemy import (
+    Column, DateTime, MetaData, String, Table, create_engine, inspect, literal, select, text
+)
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import DBAPIError
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.schema import CreateColumn, CreateIndex, CreateTable, DropIndex
 
 DATABASE_URL = os.getenv("DATABASE_URL", "postgresql://saas_user:saas_password@db:5432/saas_starter")
+# Postgres advisory lock held by the one process upgrading the schema and seeding
+STARTUP_LOCK_KEY = int(os.getenv("STARTUP_LOCK_KEY", "720501"))
 
 engine = create_engine(DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
 
+# Versions the database was last brought up to, by name ("schema", "seed")
+schema_versions = Table(
+    "schema_versions",
+    Base.metadata,
+    Column("name", String(50), primary_key=True),
+    Column("version", String(64), nullable=False),
+    Column("updated_at", DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+)
+
+SCHEMA_VERSION_NAME = "schema"
+SEED_VERSION_NAME = "seed"
+
+# Indexes removed from the models; dropped when the schema is upgraded
+OBSOLETE_INDEXES = ()
+
 
 def get_db():
     """Dependency for getting database sessions."""
@@ -22,6 +49,188 @@ def get_db():
         db.close()
 
 
-def init_db():
-    """Initialize database tables."""
-    Base.metadata.create_all(bind=engine)
+def schema_fingerprint(bind: Engine) -> str:
+    """
+    Hash the DDL of every table and index in the models.
+
+    Any model change (a table, column, type or index) changes the
+    fingerprint, so the schema version never has to be bumped by hand.
+    """
+    # Registers every table on Base.metadata
+    import models  # noqa: F401
+
+    digest = hashlib.sha256()
+    for table in Base.metadata.sorted_tables:
+        digest.update(str(CreateTable(table).compile(dialect=bind.dialect)).encode())
+        for index in sorted(table.indexes, key=lambda index: index.name):
+            digest.update(str(CreateIndex(index).compile(dialect=bind.dialect)).encode())
+    return digest.hexdigest()
+
+
+def read_versions(connection: Connection) -> Dict[str, str]:
+    """Get the recorded versions by name (empty before the first startup)."""
+    if not inspect(connection).has_table(schema_versions.name):
+        return {}
+    return dict(connection.execute(select(schema_versions.c.name, schema_versions.c.version)).all())
+
+
+def upsert(
+    connection: Union[Connection, Session],
+    table: Union[Table, type],
+    rows: List[dict],
+    key: Iterable[str],
+    update: Iterable[str] = ()
+) -> None:
+    """
+    Insert rows in one statement, skipping (or updating the ``update``
+    columns of) rows that already exist.
+
+    Args:
+        connection: Connection or session to execute on
+        table: Table (or mapped class) to insert into
+        rows: Rows to insert
+        key: Columns of the unique constraint identifying a row
+        update: Columns overwritten on rows that already exist
+    """
+    if not rows:
+        return
+    bind = connection.get_bind() if isinstance(connection, Session) else connection
+    dialect = postgresql if bind.dialect.name == "postgresql" else sqlite
+    statement = dialect.insert(table).values(rows)
+    update = list(update)
+    if update:
+        statement = statement.on_conflict_do_update(
+            index_elements=list(key),
+            set_={column: statement.excluded[column] for column in update}
+        )
+    else:
+        statement = statement.on_conflict_do_nothing(index_elements=list(key))
+    connection.execute(statement)
+
+
+def _add_column(connection: Connection, table: Table, column: Column) -> None:
+    """Add a model column missing from an existing table."""
+    preparer = connection.dialect.identifier_preparer
+    server_default = column.server_default
+    if server_default is None and column.default is not None and column.default.is_scalar:
+        # Fill existing rows with the model default so NOT NULL holds
+        server_default = text(str(
+            literal(column.default.arg, column.type).compile(
+                dialect=connection.dialect,
+                compile_kwargs={"literal_binds": True}
+            )
+        ))
+    print(f"Adding column {table.name}.{column.name}")
+    added = Column(
+        column.name,
+        column.type,
+        nullable=column.nullable or server_default is None,
+        server_default=server_default
+    )
+    Table(table.name, MetaData(), added)
+
+    ddl = str(CreateColumn(added).compile(dialect=connection.dialect))
+    for foreign_key in column.foreign_keys:
+        target = foreign_key.column
+        ddl += f" REFERENCES {preparer.format_table(target.table)} ({preparer.quote(target.name)})"
+        if foreign_key.ondelete:
+            ddl += f" ON DELETE {foreign_key.ondelete}"
+    connection.execute(text(f"ALTER TABLE {preparer.format_table(table)} ADD COLUMN {ddl}"))
+
+
+def upgrade_schema(connection: Connection) -> None:
+    """
+    Create missing tables, columns and indexes.
+
+    ``create_all`` only creates whole tables, so columns and indexes added
+    to existing tables are created here too. Upgrades are additive: columns
+    are never dropped or altered, and indexes only when their columns
+    changed or they are listed in OBSOLETE_INDEXES.
+    """
+    Base.metadata.create_all(bind=connection)
+    inspector = inspect(connection)
+
+    for table in Base.metadata.sorted_tables:
+        columns = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name not in columns:
+                _add_column(connection, table, column)
+
+        indexes = {index["name"]: index["column_names"] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            existing = indexes.get(index.name)
+            if existing == [column.name for column in index.columns]:
+                continue
+            if existing is not None:
+                connection.execute(DropIndex(index))
+            print(f"Creating index {index.name}")
+            index.create(connection)
+
+    for name in OBSOLETE_INDEXES:
+        connection.execute(text(f"DROP INDEX IF EXISTS {connection.dialect.identifier_preparer.quote(name)}"))
+
+
+def init_db(
+    seed: Optional[Callable[[Session], None]] = None,
+    seed_version: Optional[str] = None,
+    bind: Optional[Engine] = None
+) -> bool:
+    """
+    Bring the schema, and optionally the seed data, up to date.
+
+    When the recorded versions match, this costs a single query, so every
+    process can call it on startup. Otherwise one process at a time (under
+    a Postgres advisory lock) upgrades the schema, runs ``seed`` and records
+    the new versions in a single transaction; processes that waited for the
+    lock find the work done and return.
+
+    Args:
+        seed: Function adding the seed data to a session; it must flush,
+            not commit
+        seed_version: Version of the seed data, recorded once seeded
+        bind: Engine to use (defaults to the application engine)
+
+    Returns:
+        True if the schema was upgraded or the data seeded
+    """
+    bind = bind or engine
+    wanted = {SCHEMA_VERSION_NAME: schema_fingerprint(bind)}
+    if seed is not None:
+        wanted[SEED_VERSION_NAME] = seed_version
+
+    try:
+        with bind.connect() as connection:
+            current = dict(connection.execute(
+                select(schema_versions.c.name, schema_versions.c.version)
+                .where(schema_versions.c.name.in_(list(wanted)))
+            ).all())
+        if current == wanted:
+            return False
+    except DBAPIError:
+        # No schema_versions table yet
+        pass
+
+    with bind.begin() as connection:
+        if connection.dialect.name == "postgresql":
+            connection.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": STARTUP_LOCK_KEY})
+        current = read_versions(connection)
+        if all(current.get(name) == version for name, version in wanted.items()):
+            return False
+
+        if current.get(SCHEMA_VERSION_NAME) != wanted[SCHEMA_VERSION_NAME]:
+            print("Upgrading database schema...")
+            upgrade_schema(connection)
+        if seed is not None and current.get(SEED_VERSION_NAME) != seed_version:
+            print("Seeding database...")
+            with Session(bind=connection, autoflush=False) as db:
+                seed(db)
+                db.flush()
+
+        upsert(
+            connection,
+            schema_versions,
+            [{"name": name, "version": version, "updated_at": datetime.utcnow()} for name, version in wanted.items()],
+            key=["name"],
+            update=["version", "updated_at"]
+        )
+    return True
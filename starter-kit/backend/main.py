@@ -5,7 +5,6 @@ Main FastAPI application entry point.
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
-from database import init_db
 from routes import auth, tiers, features, admin, health
 from exceptions import AuthenticationError, AuthorizationError, NotFoundError, ValidationError
 
@@ -71,9 +70,7 @@ app.include_router(health.router)
 
 @app.on_event("startup")
 async def startup_event():
-    """Initialize database on startup."""
-    init_db()
-    # Seed database with initial data
+    """Upgrade the schema and seed it on startup (one query when up to date)."""
     from seed import seed_database
     seed_database()
 
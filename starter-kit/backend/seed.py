@@ -1,122 +1,128 @@
 """Database seeding script."""
 
+import hashlib
 import os
+from typing import Optional
+from sqlalchemy.engine import Engine
 from sqlalchemy.orm import Session
-from database import SessionLocal, init_db
+from database import init_db, upsert
 from models import User, Tier, FeatureFlag
 from auth import hash_password
 
+# Bump when the data below changes, so running databases are seeded again
+# on their next start
+SEED_VERSION = "1"
 
-def seed_database():
-    """Seed the database with initial data."""
-    db: Session = SessionLocal()
+TIERS = [
+    {
+        "name": "Free",
+        "price_cents": 0,
+        "features": {
+            "max_projects": 1,
+            "advanced_reports": False,
+            "api_access": False,
+            "custom_domain": False
+        }
+    },
+    {
+        "name": "Pro",
+        "price_cents": 999,
+        "features": {
+            "max_projects": 10,
+            "advanced_reports": True,
+            "api_access": True,
+            "custom_domain": False
+        }
+    },
+    {
+        "name": "Enterprise",
+        "price_cents": 4999,
+        "features": {
+            "max_projects": -1,  # unlimited
+            "advanced_reports": True,
+            "api_access": True,
+            "custom_domain": True
+        }
+    }
+]
+
+FEATURE_FLAGS = [
+    ("advanced_reports", "Advanced reporting and analytics features"),
+    ("api_access", "REST API access for integrations"),
+    ("custom_domain", "Custom domain support"),
+    ("advanced_feature", "Advanced feature for testing")
+]
+
+
+def get_admin_email() -> str:
+    """Get the admin user's email from the environment."""
+    return os.getenv("ADMIN_EMAIL", "admin@example.com").lower()
+
+
+def get_seed_version() -> str:
+    """
+    Get the version recorded once the database is seeded.
+
+    Includes the admin email, so a new ADMIN_EMAIL is seeded too.
+    """
+    admin_hash = hashlib.sha256(get_admin_email().encode()).hexdigest()[:16]
+    return f"{SEED_VERSION}-{admin_hash}"
+
+
+def seed_data(db: Session):
+    """
+    Add the tiers, feature flags and admin user.
+
+    Uses upserts that keep existing rows, so it can run against a seeded
+    database. Flushes without committing: init_db commits it with the
+    schema version.
+    
+    Args:
+        db: Database session
+    """
+    upsert(db, Tier, TIERS, key=["name"])
+    upsert(
+        db,
+        FeatureFlag,
+        [
+            {"name": name, "enabled": True, "description": description}
+            for name, description in FEATURE_FLAGS
+        ],
+        key=["name"]
+    )
+    
+    # Create admin user from environment variables
+    admin_email = get_admin_email()
+    enterprise_tier = db.query(Tier).filter(Tier.name == "Enterprise").one()
+    upsert(
+        db,
+        User,
+        [{
+            "email": admin_email,
+            "hashed_password": hash_password(os.getenv("ADMIN_PASSWORD", "admin123")),
+            "is_admin": True,
+            "tier_id": enterprise_tier.id
+        }],
+        key=["email"]
+    )
+    db.flush()
+    print(f"Seeded tiers, feature flags and admin user {admin_email}")
+
+
+def seed_database(bind: Optional[Engine] = None) -> bool:
+    """
+    Create or upgrade the schema and seed the database.
+
+    Does nothing beyond one query when both are up to date; see init_db.
+    
+    Args:
+        bind: Engine to use (defaults to the application engine)
     
-    try:
-        print("Seeding database...")
-        
-        # Create or get example tiers
-        free_tier = db.query(Tier).filter(Tier.name == "Free").first()
-        if not free_tier:
-            free_tier = Tier(
-                name="Free",
-                price_cents=0,
-                features={
-                    "max_projects": 1,
-                    "advanced_reports": False,
-                    "api_access": False,
-                    "custom_domain": False
-                }
-            )
-            db.add(free_tier)
-            db.commit()
-            db.refresh(free_tier)
-            print("Created Free tier")
-        
-        pro_tier = db.query(Tier).filter(Tier.name == "Pro").first()
-        if not pro_tier:
-            pro_tier = Tier(
-                name="Pro",
-                price_cents=999,
-                features={
-                    "max_projects": 10,
-                    "advanced_reports": True,
-                    "api_access": True,
-                    "custom_domain": False
-                }
-            )
-            db.add(pro_tier)
-            db.commit()
-            db.refresh(pro_tier)
-            print("Created Pro tier")
-        
-        enterprise_tier = db.query(Tier).filter(Tier.name == "Enterprise").first()
-        if not enterprise_tier:
-            enterprise_tier = Tier(
-                name="Enterprise",
-                price_cents=4999,
-                features={
-                    "max_projects": -1,  # unlimited
-                    "advanced_reports": True,
-                    "api_access": True,
-                    "custom_domain": True
-                }
-            )
-            db.add(enterprise_tier)
-            db.commit()
-            db.refresh(enterprise_tier)
-            print("Created Enterprise tier")
-        
-        # Create example feature flags
-        flag_data = [
-            ("advanced_reports", "Advanced reporting and analytics features"),
-            ("api_access", "REST API access for integrations"),
-            ("custom_domain", "Custom domain support"),
-            ("advanced_feature", "Advanced feature for testing")
-        ]
-        
-        for flag_name, description in flag_data:
-            existing_flag = db.query(FeatureFlag).filter(FeatureFlag.name == flag_name).first()
-            if not existing_flag:
-                flag = FeatureFlag(
-                    name=flag_name,
-                    enabled=True,
-                    description=description
-                )
-                db.add(flag)
-                db.commit()
-                print(f"Created feature flag: {flag_name}")
-        
-        # Create admin user from environment variables
-        admin_email = os.getenv("ADMIN_EMAIL", "admin@example.com")
-        admin_password = os.getenv("ADMIN_PASSWORD", "admin123")
-        
-        existing_admin = db.query(User).filter(User.email == admin_email.lower()).first()
-        if not existing_admin:
-            admin_user = User(
-                email=admin_email.lower(),
-                hashed_password=hash_password(admin_password),
-                is_admin=True,
-                tier_id=enterprise_tier.id
-            )
-            db.add(admin_user)
-            db.commit()
-            print(f"Created admin user: {admin_email}")
-        else:
-            print(f"Admin user already exists: {admin_email}")
-        
-        print("Database seeding completed!")
-        
-    except Exception as e:
-        print(f"Error seeding database: {e}")
-        import traceback
-        traceback.print_exc()
-        db.rollback()
-    finally:
-        db.close()
+    Returns:
+        True if anything was changed
+    """
+    return init_db(seed_data, get_seed_version(), bind)
 
 
 if __name__ == "__main__":
-    # Initialize database tables
-    init_db()
-    # Seed data
     seed_database()